@@ -0,0 +1,110 @@
+import logging
+from datetime import date
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from storage import DataStore
+from eventstore import EventStore
+from liveanalytics import AnalyticsState
+from dedupe import NearDuplicateDetector
+from export import iter_events, event_row, feedback_row, ndjson_chunks, csv_chunks, EVENT_CSV_FIELDS, FEEDBACK_CSV_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Admin Jobs
+# -----------------------------------------------------------------------------
+# The functions the admin work pool runs (see scheduler.py). They are top-level
+# so they can be pickled to a worker process, take and return plain data, and
+# never import app (which would start a whole server in every worker). Each
+# worker opens its own event store, data store and duplicate detector on first
+# use, from the settings `configure` received when the worker started.
+#
+# An export is fetched a page of EXPORT_PAGE_RECORDS records at a time, each
+# page a job of its own that resumes from the previous page's last cursor. So
+# no worker is held for the whole of a slow download, and analytics requests
+# are served between pages.
+
+EXPORT_PAGE_RECORDS = 10_000
+
+_settings: Dict[str, Any] = {}
+_event_store: Optional[EventStore] = None
+_data_store: Optional[DataStore] = None
+_near_duplicates: Optional[NearDuplicateDetector] = None
+
+def configure(settings: Dict[str, Any]):
+    """Pool initializer. `settings`: analytics_dir, event_store_dir, event_store_cache_rows, db_file, date_format, top_users."""
+    global _event_store, _data_store, _near_duplicates
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    _settings.clear()
+    _settings.update(settings)
+    _event_store = _data_store = _near_duplicates = None
+
+def _events() -> EventStore:
+    global _event_store
+    if _event_store is None:
+        _event_store = EventStore(Path(_settings['analytics_dir']), Path(_settings['event_store_dir']),
+                                  cache_rows=_settings['event_store_cache_rows'])
+    return _event_store
+
+def _store() -> DataStore:
+    global _data_store
+    if _data_store is None:
+        _data_store = DataStore(Path(_settings['db_file']))
+    return _data_store
+
+def analytics_report(year_start: date, year_end: date) -> Optional[Dict[str, Any]]:
+    """The /admin/analytics payload for the days between `year_start` and `year_end`, or None if none were logged."""
+    store = _events()
+    if not store.days(year_start, year_end):
+        return None
+    state = AnalyticsState(top_users=_settings['top_users'])
+    state.load(store, year_start, year_end)
+    return state.render()
+
+def analytics_query(start: date, end: date, group_by: List[str], aggregates: List[str], filters: Dict[str, List[str]],
+                    table: str, order_by: Optional[str], limit: Optional[int]) -> List[Dict[str, Any]]:
+    """EventStore.query in the worker; raises ValueError for an invalid query."""
+    return _events().query(start, end, group_by=group_by, aggregates=aggregates, filters=filters,
+                           table=table, order_by=order_by, limit=limit)
+
+def export_page(source: str, export_format: str, params: Dict[str, Any], after: Optional[str],
+                header: bool) -> Tuple[List[bytes], Optional[str]]:
+    """One page of an export as serialized chunks, plus the cursor to request the next page with (None after the last).
+
+    `params` are iter_events' start, end and event_types for events, or
+    DataStore.iter_feedback's filters for feedback. Malformed cursors or
+    filters raise ValueError.
+    """
+    if source == 'events':
+        records = iter_events(Path(_settings['analytics_dir']), params['start'], params['end'], event_types=params['event_types'],
+                              after=after, date_format=_settings['date_format'])
+        fields, to_row = EVENT_CSV_FIELDS, event_row
+    elif source == 'feedback':
+        records = _store().iter_feedback(after=after, **params)
+        fields, to_row = FEEDBACK_CSV_FIELDS, feedback_row
+    else:
+        raise ValueError(f"Unknown export source: {source}")
+    last: Optional[str] = None
+    count = 0
+
+    def page() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        nonlocal last, count
+        for cursor, record in islice(records, EXPORT_PAGE_RECORDS):
+            last, count = cursor, count + 1
+            yield cursor, record
+
+    if export_format == 'csv':
+        chunks = list(csv_chunks(page(), fields, to_row, header=header))
+    else:
+        chunks = list(ndjson_chunks(page()))
+    return chunks, last if count == EXPORT_PAGE_RECORDS else None
+
+def canonical_documents(kind: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """The canonical (id, document, metadata) triples of every stored job or session (see dedupe.py)."""
+    global _near_duplicates
+    if _near_duplicates is None:
+        _near_duplicates = NearDuplicateDetector() # Keeps signatures of unchanged texts between runs in this worker
+    documents, _ = _near_duplicates.canonical_documents(_store().list_items(f"{kind}s"), kind)
+    return documents
@@ -4,68 +4,46 @@ import csv
 import json
 import logging # Import logging first
 import uuid
+import hmac
+import time
 import traceback
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, timedelta
 from pathlib import Path
 # Import standard typing AFTER standard libraries
-from typing import List, Dict, Any, Optional, Tuple, Union, TypedDict
-
-import firebase_admin
-from firebase_admin import credentials, firestore
+from typing import List, Dict, Any, Optional, Tuple, Union, TypedDict, Callable
 
 # Import external libraries
+# Firebase, Gemini and ChromaDB are imported on first use (see "Lazy Service Clients")
 import requests
-from flask import Flask, request, jsonify, abort
+from flask import Flask, Blueprint, Response, g, request, jsonify, abort
 from flask_cors import CORS
-import google.generativeai as genai
-import chromadb
-from chromadb import PersistentClient, EmbeddingFunction
-
-from chromadb.api.models.Collection import Collection       
-from typing import List, Dict, Any, Optional, TypedDict # Add TypedDict here
 
 import config
 from config.config import GEMINI_API_KEY
+from filestore import file_lock, atomic_write_json, atomic_write_csv, GroupCommitAppender
+from storage import DataStore, JOB_FIELDNAMES, decode_cursor
+from httpcache import ResponseCache
+from metrics import Metrics
+from llm import LLMClient, start_scope as start_llm_scope, end_scope as end_llm_scope, summarize as summarize_llm_usage
+from routing import ModelRouter, RoutingError, parse_topic, topic_heuristic, parse_bias_reply, bias_heuristic, parse_answer
+from profiler import SamplingProfiler
+from prompting import make_rag_prompt, render_snippet, render_job_context_line, render_session_context_line, HISTORY_MAX_TURNS, HISTORY_TURN_MAX_TOKENS
+from conversations import ConversationStore
+from eventstore import EventStore
+from liveanalytics import LiveAnalytics
+from users import is_anonymous
+from listings import ListingIndex, LISTING_FIELDS
+from bulk_import import BulkImporter
+from recommendations import Recommender, Catalog, RECOMMENDED_KINDS
+from export import parse_event_cursor, gzip_chunks, incomplete_chunk
+from scheduler import WorkScheduler, SchedulerBusy, OUTCOMES
+import admin_tasks
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__) # Define logger HERE
 
-# -----------------------------------------------------------------------------
-# Firebase Admin SDK Initialization
-# -----------------------------------------------------------------------------
-db_firestore = None # Initialize as None globally
-try:
-    # --- Construct the relative path to the key file ---
-    # Path(__file__) is the path to app.py
-    # .parent gets the directory containing app.py (backend/)
-    # Then navigate into 'config' and specify the filename
-    relative_path_to_key = Path(__file__).parent / "config" / "asha-ai-firebase-adminsdk-fbsvc-e10ece5897.json"
-
-    if not relative_path_to_key.exists():
-         # This error is critical if you *only* rely on the relative path
-         logger.error(f"Firebase service account key NOT FOUND at expected relative path: {relative_path_to_key}")
-         logger.error("Ensure the key file exists in the 'backend/config/' directory.")
-         # db_firestore remains None
-    else:
-         logger.info(f"Using service account key found at: {relative_path_to_key}")
-         # Initialize using the path object converted to a string
-         cred = credentials.Certificate(str(relative_path_to_key))
-
-         # Check if the app is already initialized (prevents errors on hot-reloading)
-         if not firebase_admin._apps:
-             firebase_admin.initialize_app(cred)
-             logger.info("Firebase Admin SDK initialized successfully.")
-         else:
-              logger.info("Firebase Admin SDK already initialized.")
-         # Get the Firestore client instance
-         db_firestore = firestore.client()
-
-except Exception as e:
-    # Log any other unexpected error during initialization
-    logger.critical(f"CRITICAL: Failed to initialize Firebase Admin SDK: {e}", exc_info=True)
-    db_firestore = None # Ensure db_firestore is None on any init error
-# --- End Firebase Admin Init ---
 
 # --- Type Definitions for Analytics ---
 
@@ -112,12 +90,28 @@ class FeedbackAnalytics(TypedDict, total=False):
     response_quality: ResponseQuality
     last_updated: Optional[str] # ISO format timestamp
 
+class TokenCounts(TypedDict):
+    input: int
+    output: int
+
+class TokenAnalytics(TypedDict, total=False):
+    total_input: int
+    total_output: int
+    calls: int
+    by_date: Dict[str, TokenCounts] # Key is YYYY-MM-DD date string
+    by_topic: Dict[str, TokenCounts]
+    by_language: Dict[str, TokenCounts]
+    by_stage: Dict[str, TokenCounts] # bias_check, embed_query, answer, classify_topic, ...
+    top_users: List[Dict[str, Any]] # Heaviest users first: {"user_id", "input", "output"}
+    last_updated: Optional[str] # ISO format timestamp
+
 # Define the main AnalyticsData structure
 class AnalyticsData(TypedDict):
     # These keys are expected based on the aggregation logic
     conversations: ConversationsAnalytics
     users: UserAnalytics
     feedback: FeedbackAnalytics
+    tokens: TokenAnalytics
 
 # --- End Type Definitions ---
 
@@ -126,7 +120,7 @@ class AnalyticsData(TypedDict):
 # -----------------------------------------------------------------------------
 class Config:
     # File Paths (relative to the app.py file location)
-    DATA_DIR = Path(__file__).parent / "data"
+    DATA_DIR = Path(os.getenv("ASHA_DATA_DIR", Path(__file__).parent / "data")) # Overridden by the load tests
     CHROMA_DB_PATH = DATA_DIR / "chroma_db"
     SESSIONS_FILE = DATA_DIR / "session_details.json"
     JOBS_FILE = DATA_DIR / "job_listing_data.csv"
@@ -134,6 +128,18 @@ class Config:
     ANALYTICS_DIR = DATA_DIR / "analytics"
     FEEDBACK_DIR = DATA_DIR / "feedback"
     FEEDBACK_LIST_FILE = FEEDBACK_DIR / "feedback_list.json"
+    DB_FILE = DATA_DIR / "asha.db" # Jobs, sessions, trusted sources and feedback
+
+    # Admin listings
+    FEEDBACK_PAGE_SIZE = 50
+    FEEDBACK_MAX_PAGE_SIZE = 200
+
+    # Streamed bulk imports (POST /admin/jobs/import)
+    BULK_IMPORT_CHUNK_ROWS = 500 # Rows validated and written per transaction
+
+    # Public listing search (discover page)
+    SEARCH_PAGE_SIZE = 24
+    SEARCH_MAX_PAGE_SIZE = 100
 
     # API Keys
     GEMINI_API_KEY = os.getenv(GEMINI_API_KEY) # Replace fallback
@@ -141,9 +147,84 @@ class Config:
     # ChromaDB
     CHROMA_COLLECTION_NAME = "asha_knowledge"
 
+    # Knowledge Base Snapshots (built offline by build_kb.py, memory-mapped when serving)
+    KB_SNAPSHOT_DIR = DATA_DIR / "kb_snapshots"
+    KB_SNAPSHOT_CHECK_INTERVAL = 2.0 # Seconds between checks for a newly published snapshot
+    KB_SNAPSHOTS_TO_KEEP = 3
+    KB_QUANTIZATION = os.getenv("KB_QUANTIZATION", "none") # none, int8 or pq: compact codes scanned by snapshot searches
+    KB_PQ_SUBSPACES = int(os.getenv("KB_PQ_SUBSPACES", "96")) # PQ bytes per vector; must divide the embedding dimensions
+    EMBEDDING_MODEL = "models/embedding-001"
+    EMBED_BATCH_SIZE = 100 # Texts per embedding request
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "4")) # Concurrent embedding requests during a build
+
+    # External Content (trusted-source pages)
+    EXTERNAL_CACHE_DIR = DATA_DIR / "external_cache"
+    EXTERNAL_FETCH_WORKERS = 8 # Size of the fetch thread pool and HTTP connection pool
+    EXTERNAL_PER_HOST_CONCURRENCY = 2
+    EXTERNAL_PER_HOST_INTERVAL = 1.0 # Minimum seconds between requests to the same host
+    EXTERNAL_FETCH_TIMEOUT = 10
+    EXTERNAL_CACHE_TTL = int(os.getenv("EXTERNAL_CACHE_TTL", str(6 * 3600))) # Seconds before a page is revalidated
+    EXTERNAL_REFRESH_HOURS = float(os.getenv("EXTERNAL_REFRESH_HOURS", "24")) # Default re-crawl interval; sources may set refreshHours
+    EXTERNAL_CHUNK_WORDS = 180
+    # Run the crawl scheduler on a background thread of the web process (otherwise run crawl.py)
+    EXTERNAL_INGEST_IN_PROCESS = os.getenv("EXTERNAL_INGEST_IN_PROCESS", "true").lower() == "true"
+
+    # Metrics (served at /metrics in Prometheus format)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true" # Also needs OTEL_EXPORTER_OTLP_ENDPOINT to export
+
+    # Sampling profiler (/admin/profiler). Disabled unless ADMIN_TOKEN is set.
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILER_INTERVAL_MS = 5 # ~200 samples/s per profiled request thread
+    PROFILER_MAX_SECONDS = 300
+
+    # HTTP Response Cache
+    RESPONSE_CACHE_ENTRIES = 256
+
+    # Conversation Store (per worker process)
+    CONVERSATION_STORE_MAX = int(os.getenv("CONVERSATION_STORE_MAX", "10000")) # Least recently used conversations are evicted beyond this
+    CONVERSATION_IDLE_SECONDS = 3600
+    CONVERSATION_SUMMARY_MAX_TOKENS = 200 # Rolling summary of turns older than the recent window
+
+    # Firebase
+    FIREBASE_KEY_FILE = Path(__file__).parent / "config" / "asha-ai-firebase-adminsdk-fbsvc-e10ece5897.json"
+
+    # Prompt Assembly
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000")) # Approximate input tokens per generation call
+    USER_DAILY_TOKEN_BUDGET = int(os.getenv("USER_DAILY_TOKEN_BUDGET", "0")) # Gemini tokens (in + out) per user per day; 0 = unlimited
+
+    # Model Routing: comma-separated ladders, cheapest first ("heuristic" = local rules, no API call)
+    MODEL_LADDERS = {
+        'classify_topic': os.getenv("MODEL_LADDER_CLASSIFY", "heuristic,gemini-1.5-flash,gemini-1.5-pro").split(","),
+        'bias_check': os.getenv("MODEL_LADDER_BIAS", "heuristic,gemini-1.5-flash,gemini-1.5-pro").split(","),
+        'answer': os.getenv("MODEL_LADDER_ANSWER", "gemini-1.5-flash,gemini-1.5-pro").split(","),
+    }
+
+    # Profile Recommendations (see recommendations.py)
+    RECOMMENDATION_TOP_N = 10 # Jobs and sessions kept ready per user and kind
+    RECOMMENDATIONS_IN_PROMPT = 2 # Profile matches offered to career/session chat prompts
+
     # Analytics
     ANALYTICS_DATE_FORMAT = "%Y-%m-%d"
     ANALYTICS_SUMMARY_DAYS = 30 # How many days of daily data to keep in summaries
+    ANALYTICS_TOP_TOKEN_USERS = 20 # Users listed in the token usage rollup
+    ANALYTICS_GROUP_COMMIT_DELAY = 0.005 # Seconds to wait for other events before rewriting a day file
+    EVENT_STORE_DIR = ANALYTICS_DIR / "columnar" # Closed days compacted for queries (see eventstore.py)
+    EVENT_STORE_CACHE_ROWS = int(os.getenv("EVENT_STORE_CACHE_ROWS", "1000000")) # Decoded events kept in memory per worker (~100 bytes each)
+    ANALYTICS_STREAM_SECONDS = 300 # An SSE connection ends after this long; browsers reconnect and get a fresh snapshot
+    ANALYTICS_STREAM_POLL_SECONDS = 1.0 # How often today's day file is checked for events logged by other workers
+    EXPORT_GZIP_LEVEL = 6 # zlib level for exports requested with Accept-Encoding: gzip
+
+    # Admin Work Pool (analytics, exports and re-ingestion run in separate processes, see scheduler.py)
+    ADMIN_POOL_PROCESSES = int(os.getenv("ADMIN_POOL_PROCESSES", "2")) # Per app worker; 0 runs admin jobs on threads of the app process
+    ADMIN_POOL_NICENESS = int(os.getenv("ADMIN_POOL_NICENESS", "10")) # CPU priority below the serving process (0 = same)
+    ADMIN_JOB_TIMEOUT = 120 # Seconds a caller waits for its analytics, export page or re-ingestion clustering job
+    # Lower 'priority' numbers run first; 'concurrency' caps a class's share of the pool; jobs beyond 'max_queued' get a 503
+    ADMIN_WORK_CLASSES = {
+        'analytics': {'priority': 0, 'concurrency': 2, 'max_queued': 16},
+        'export': {'priority': 1, 'concurrency': 1, 'max_queued': 8},
+        'ingest': {'priority': 2, 'concurrency': 1, 'max_queued': 8},
+    }
 
     # CORS Origins
     CORS_ORIGINS = [
@@ -180,14 +261,12 @@ def read_json(file_path: Path, default: Any = None) -> Any:
         return default
 
 def write_json(file_path: Path, data: Any):
-    """Safely writes JSON data to a file."""
+    """Safely writes JSON data to a file (atomically, under the file's lock)."""
     try:
-        file_path.parent.mkdir(parents=True, exist_ok=True) # Ensure directory exists
-        with file_path.open('w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        # logger.info(f"Successfully wrote JSON to {file_path}")
+        with file_lock(file_path):
+            atomic_write_json(file_path, data)
         return True
-    except (IOError, TypeError) as e:
+    except (IOError, TypeError, ValueError) as e:
         logger.error(f"Error writing JSON file {file_path}: {e}")
         return False
 
@@ -208,7 +287,7 @@ def read_csv(file_path: Path) -> List[Dict[str, str]]:
         return [] # Return empty list on error
 
 def write_csv(file_path: Path, data: List[Dict[str, Any]], fieldnames: Optional[List[str]] = None):
-    """Writes a list of dictionaries to a CSV file."""
+    """Writes a list of dictionaries to a CSV file (atomically, under the file's lock)."""
     try:
         file_path.parent.mkdir(parents=True, exist_ok=True)
         if not data and not fieldnames:
@@ -224,24 +303,388 @@ def write_csv(file_path: Path, data: List[Dict[str, Any]], fieldnames: Optional[
              logger.error(f"Cannot write CSV file without fieldnames: {file_path}")
              return False
 
-        with file_path.open('w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
-        # logger.info(f"Successfully wrote CSV to {file_path}")
+        with file_lock(file_path):
+            atomic_write_csv(file_path, data, fieldnames)
         return True
     except (IOError, csv.Error, IndexError) as e:
         logger.error(f"Error writing CSV file {file_path}: {e}")
         return False
 
+# -----------------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------------
+metrics = Metrics(enabled=Config.METRICS_ENABLED, otel_enabled=Config.OTEL_ENABLED)
+metrics.describe("request_duration_seconds", "HTTP request latency by endpoint.")
+metrics.describe("stage_duration_seconds", "Latency of individual request pipeline stages.")
+metrics.describe("llm_calls_total", "Gemini API calls by model, stage and outcome.")
+metrics.describe("llm_tokens_total", "Gemini tokens by model, stage and direction (reported usage, else estimated).")
+metrics.describe("llm_call_duration_seconds", "Gemini API call latency by model and stage.")
+metrics.describe("token_budget_rejections_total", "Chat requests refused because the user's daily token budget was used up.")
+metrics.describe("routing_decisions_total", "Model routing attempts by task, rung and outcome (accepted, rejected: invalid output or heuristic unsure, error).")
+metrics.describe("routing_rung_duration_seconds", "Latency of each routing rung by task.")
+metrics.describe("errors_total", "Errors by pipeline stage or handler.")
+
+def _record_llm_metrics(call: Dict[str, Any]):
+    """LLMClient listener: counts one Gemini call and its tokens."""
+    if not metrics.enabled:
+        return
+    labels = {"model": call['model'], "stage": call['stage']}
+    metrics.inc("llm_calls_total", status="ok" if call['ok'] else "error", **labels)
+    metrics.inc("llm_tokens_total", call['input_tokens'], direction="input", **labels)
+    metrics.inc("llm_tokens_total", call['output_tokens'], direction="output", **labels)
+    metrics.observe("llm_call_duration_seconds", call['latency'], **labels)
+
+# -----------------------------------------------------------------------------
+# Data Store (SQLite, opened on first query; init_data_store imports the CSV/JSON data files)
+# -----------------------------------------------------------------------------
+data_store = DataStore(Config.DB_FILE)
+
+# -----------------------------------------------------------------------------
+# Lazy Service Clients
+# -----------------------------------------------------------------------------
+# Importing this module must stay cheap and free of side effects: gunicorn
+# imports it once per worker (through wsgi.py), the CLIs import it too, and
+# the SDKs below take seconds to import and connect. Each client is built on
+# first use and shared afterwards. The other objects built at module level
+# only touch the disk or start threads on first use, so nothing is created
+# under DATA_DIR until create_app or init_data_store runs. The knowledge base
+# is only *opened* here; it is populated by `python ingest.py`, never on startup.
+_clients_lock = threading.Lock()
+_genai = None
+_firestore_client = None
+_firestore_initialized = False
+_vector_collection = None
+_kb_snapshots = None
+_content_fetcher = None
+_external_ingestor = None
+_ingest_scheduler = None
+_snapshot_rebuilder = None
+
+def get_genai():
+    """Returns the configured google.generativeai module."""
+    global _genai
+    if _genai is None:
+        with _clients_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=Config.GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+def get_firestore():
+    """Returns the Firestore client, or None if Firebase could not be initialized."""
+    global _firestore_client, _firestore_initialized
+    if _firestore_initialized:
+        return _firestore_client
+    with _clients_lock:
+        if _firestore_initialized:
+            return _firestore_client
+        try:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            if not Config.FIREBASE_KEY_FILE.exists():
+                logger.error(f"Firebase service account key NOT FOUND at expected relative path: {Config.FIREBASE_KEY_FILE}")
+                logger.error("Ensure the key file exists in the 'backend/config/' directory.")
+            else:
+                logger.info(f"Using service account key found at: {Config.FIREBASE_KEY_FILE}")
+                # Check if the app is already initialized (prevents errors on hot-reloading)
+                if not firebase_admin._apps:
+                    firebase_admin.initialize_app(credentials.Certificate(str(Config.FIREBASE_KEY_FILE)))
+                    logger.info("Firebase Admin SDK initialized successfully.")
+                _firestore_client = firestore.client()
+        except Exception as e:
+            logger.critical(f"CRITICAL: Failed to initialize Firebase Admin SDK: {e}", exc_info=True)
+            _firestore_client = None
+        _firestore_initialized = True # Don't retry (and re-log) on every request
+    return _firestore_client
+
+def get_content_fetcher():
+    """Returns the shared ContentFetcher for trusted-source pages."""
+    global _content_fetcher
+    if _content_fetcher is None:
+        with _clients_lock:
+            if _content_fetcher is None:
+                from fetcher import ContentFetcher
+                _content_fetcher = ContentFetcher(
+                    Config.EXTERNAL_CACHE_DIR,
+                    max_workers=Config.EXTERNAL_FETCH_WORKERS,
+                    per_host_concurrency=Config.EXTERNAL_PER_HOST_CONCURRENCY,
+                    per_host_interval=Config.EXTERNAL_PER_HOST_INTERVAL,
+                    timeout=Config.EXTERNAL_FETCH_TIMEOUT,
+                    ttl=Config.EXTERNAL_CACHE_TTL,
+                )
+    return _content_fetcher
+
+def get_knowledge_base():
+    """Imports the knowledge_base module (and with it chromadb and the Gemini SDK)."""
+    import knowledge_base
+    return knowledge_base
+
+def get_vector_collection():
+    """Opens the persisted Chroma collection on first use. Returns None if it cannot be opened."""
+    global _vector_collection
+    if _vector_collection is None:
+        with _clients_lock:
+            if _vector_collection is None:
+                try:
+                    collection = get_knowledge_base().open_collection(
+                        Config.CHROMA_DB_PATH, Config.CHROMA_COLLECTION_NAME, Config.GEMINI_API_KEY
+                    )
+                    if collection.count() == 0:
+                        logger.warning("Knowledge base is empty. Run `python ingest.py` to populate it.")
+                    _vector_collection = collection
+                except Exception as e:
+                    logger.critical(f"CRITICAL: Failed to open vector store: {e}", exc_info=True)
+    return _vector_collection
+
+def get_kb_snapshots():
+    """Returns the SnapshotManager serving the offline-built knowledge base snapshots."""
+    global _kb_snapshots
+    if _kb_snapshots is None:
+        with _clients_lock:
+            if _kb_snapshots is None:
+                from kb_snapshot import SnapshotManager
+                _kb_snapshots = SnapshotManager(Config.KB_SNAPSHOT_DIR, check_interval=Config.KB_SNAPSHOT_CHECK_INTERVAL)
+    return _kb_snapshots
+
+def request_snapshot_rebuild():
+    """Starts build_kb.py in a separate process; the new snapshot is picked up without a restart."""
+    global _snapshot_rebuilder
+    with _clients_lock:
+        if _snapshot_rebuilder is None:
+            from kb_snapshot import SnapshotRebuilder
+            _snapshot_rebuilder = SnapshotRebuilder(Path(__file__).parent / "build_kb.py")
+    _snapshot_rebuilder.request()
+
+# All Gemini generate/embed calls go through this client for token accounting (see llm.py)
+llm = LLMClient(get_genai)
+llm.add_listener(_record_llm_metrics)
+
+# Picks the cheapest model (or local heuristic) per task whose output validates (see routing.py)
+router = ModelRouter(llm, metrics, Config.MODEL_LADDERS)
+
+def embed_texts(texts: List[str], task_type: str = "retrieval_document") -> List[List[float]]:
+    """Embeds a batch of texts with one Gemini request."""
+    stage = "embed_query" if task_type == "retrieval_query" else "embed_documents"
+    return llm.embed(Config.EMBEDDING_MODEL, texts, task_type=task_type, stage=stage)
+
+def token_budget_exceeded(user_id: Optional[str]) -> bool:
+    """True if the user has used up today's USER_DAILY_TOKEN_BUDGET (0 disables budgets).
+
+    Anonymous visitors are never over budget: the frontend sends the same
+    "anonymous" id for all of them, so one shared counter would lock every
+    logged-out user out at once.
+    """
+    if not Config.USER_DAILY_TOKEN_BUDGET or is_anonymous(user_id):
+        return False
+    used = data_store.token_usage(str(user_id), datetime.now().strftime(Config.ANALYTICS_DATE_FORMAT))
+    return used['input_tokens'] + used['output_tokens'] >= Config.USER_DAILY_TOKEN_BUDGET
+
+def knowledge_base_available() -> bool:
+    return get_kb_snapshots().current() is not None or get_vector_collection() is not None
+
+def retrieve_passages(query: str, n_results: int = 5, source_type_filter: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Searches the live snapshot if one has been built, otherwise the Chroma collection."""
+    snapshot = get_kb_snapshots().current()
+    if snapshot is not None:
+        try:
+            with metrics.span("embed_query"):
+                query_vector = embed_texts([query], task_type="retrieval_query")[0]
+            with metrics.span("vector_search", backend="snapshot"):
+                return snapshot.search(query_vector, n_results=n_results, source_type_filter=source_type_filter)
+        except Exception as e:
+            logger.error(f"Snapshot search failed, falling back to Chroma: {e}")
+    with metrics.span("vector_search", backend="chroma"): # Chroma embeds the query inside this stage
+        return get_knowledge_base().get_relevant_passage(
+            query, get_vector_collection(), n_results=n_results, source_type_filter=source_type_filter
+        )
+
+def apply_external_changes(added_chunks: List[Dict[str, Any]], removed_ids: List[str]) -> bool:
+    """Knowledge-base sink for crawled trusted-source chunks."""
+    if get_kb_snapshots().current() is not None:
+        request_snapshot_rebuild()
+        return True
+    collection = get_vector_collection()
+    if not collection:
+        return False
+    from documents import external_document
+    return get_knowledge_base().sync_documents(
+        collection, [external_document(chunk) for chunk in added_chunks], [f"external_{chunk_id}" for chunk_id in removed_ids]
+    )
+
+def get_external_ingestor():
+    """Returns the ExternalIngestor that crawls trusted sources into the knowledge base."""
+    global _external_ingestor
+    if _external_ingestor is None:
+        fetcher = get_content_fetcher()
+        with _clients_lock:
+            if _external_ingestor is None:
+                from external_ingest import ExternalIngestor
+                _external_ingestor = ExternalIngestor(
+                    data_store, fetcher, apply_external_changes,
+                    refresh_hours=Config.EXTERNAL_REFRESH_HOURS,
+                    chunk_words=Config.EXTERNAL_CHUNK_WORDS,
+                    lock_path=Config.EXTERNAL_CACHE_DIR / "ingest",
+                )
+    return _external_ingestor
+
+def start_ingest_scheduler():
+    """Starts the background crawl scheduler once per process."""
+    global _ingest_scheduler
+    if _ingest_scheduler is None:
+        ingestor = get_external_ingestor()
+        with _clients_lock:
+            if _ingest_scheduler is None:
+                from external_ingest import IngestScheduler
+                _ingest_scheduler = IngestScheduler(ingestor)
+                _ingest_scheduler.start()
+
+# Analytics aggregation, exports and duplicate clustering run in separate processes (see scheduler.py, admin_tasks.py)
+scheduler = WorkScheduler(Config.ADMIN_WORK_CLASSES, processes=Config.ADMIN_POOL_PROCESSES, niceness=Config.ADMIN_POOL_NICENESS,
+                          initializer=admin_tasks.configure,
+                          initargs=({'analytics_dir': str(Config.ANALYTICS_DIR), 'event_store_dir': str(Config.EVENT_STORE_DIR),
+                                     'event_store_cache_rows': Config.EVENT_STORE_CACHE_ROWS, 'db_file': str(Config.DB_FILE),
+                                     'date_format': Config.ANALYTICS_DATE_FORMAT, 'top_users': Config.ANALYTICS_TOP_TOKEN_USERS},))
+
+def sync_vector_store(kind: str, upserted_ids: List[str], deleted_ids: List[str],
+                      progress: Optional[Callable[[int, int], None]] = None) -> bool:
+    """Applies point changes to the collection instead of re-ingesting everything.
+
+    All records of the kind are re-clustered (folding reposts into one
+    canonical document, see dedupe.py) in the admin work pool, since an edit
+    can move a posting into or out of a group of duplicates; only new or
+    changed canonical documents are embedded. Deleted records simply no
+    longer appear.
+    `progress(embedded, total)` follows the embedding batches.
+    While a KB snapshot is being served, the changes only go into its next
+    rebuild: the Chroma collection is not what chat reads then.
+    """
+    if get_kb_snapshots().current() is not None:
+        request_snapshot_rebuild() # Unchanged documents reuse their stored embeddings
+        return True # Recommendations follow the new snapshot on lookup
+    collection = get_vector_collection()
+    if not collection:
+        logger.error("Vector store not available for incremental update.")
+        return False
+    try:
+        documents = scheduler.call('ingest', admin_tasks.canonical_documents, kind, timeout=Config.ADMIN_JOB_TIMEOUT)
+        changes = get_knowledge_base().sync_canonical(collection, kind, documents, {f"{kind}_{item_id}" for item_id in upserted_ids},
+                                                      progress=progress)
+        logger.info(f"Vector store {kind} sync ({len(upserted_ids)} upserted, {len(deleted_ids)} deleted): {changes}")
+    except Exception as e:
+        logger.error(f"Error syncing {kind} changes to vector store: {e}")
+        return False
+    refresh_recommendations()
+    return True
+
+# Streamed CSV/NDJSON uploads, written in chunks and embedded in the background (see bulk_import.py)
+bulk_importer = BulkImporter(data_store, sync_vector_store, chunk_rows=Config.BULK_IMPORT_CHUNK_ROWS)
+
+# -----------------------------------------------------------------------------
+# Profile Recommendations
+# -----------------------------------------------------------------------------
+# Each user's top jobs and sessions are kept in the data store and follow the
+# knowledge base incrementally, so chat and /api/recommendations only look them up.
+recommender = Recommender(
+    data_store, lambda text: llm.embed(Config.EMBEDDING_MODEL, [text], task_type="retrieval_query", stage="embed_profile")[0],
+    model=Config.EMBEDDING_MODEL, lock_path=Config.DATA_DIR / "recommendations", top_n=Config.RECOMMENDATION_TOP_N,
+)
+_recommendation_catalog: Optional[Catalog] = None
+_recommendation_catalog_lock = threading.Lock()
+
+def get_recommendation_catalog(rebuild: bool = False) -> Optional[Catalog]:
+    """The jobs and sessions of the live knowledge base, reloaded when it changes. None if there is none."""
+    global _recommendation_catalog
+    snapshot = get_kb_snapshots().current()
+    collection = get_vector_collection() if snapshot is None else None
+    if snapshot is None and collection is None:
+        return None
+    # Chroma has no version of its own; job and session writes bump the data store's
+    version = snapshot.version if snapshot is not None else f"chroma-{data_store.data_version('jobs')}.{data_store.data_version('sessions')}"
+    catalog = _recommendation_catalog
+    if rebuild or catalog is None or catalog.version != version:
+        with _recommendation_catalog_lock:
+            catalog = _recommendation_catalog
+            if rebuild or catalog is None or catalog.version != version:
+                catalog = Catalog.from_snapshot(snapshot) if snapshot is not None else Catalog.from_collection(collection, version)
+                _recommendation_catalog = catalog
+    return catalog
+
+def refresh_recommendations():
+    """Rescores stored profiles against what changed in the Chroma collection (snapshots are picked up on lookup)."""
+    try:
+        catalog = get_recommendation_catalog(rebuild=True)
+        if catalog is not None:
+            recommender.sync_in_background(catalog)
+    except Exception as e:
+        logger.error(f"Failed to refresh recommendations: {e}", exc_info=True)
+
+def observe_profile(user_id: str, profile: Dict[str, Any]) -> bool:
+    """Re-embeds the user's profile if it changed. A failure only costs the personalised matches."""
+    try:
+        catalog = get_recommendation_catalog()
+        if catalog is None:
+            return False
+        with metrics.span("embed_profile"):
+            return recommender.observe_profile(user_id, profile, catalog)
+    except Exception as e:
+        logger.error(f"Failed to update recommendations for user {user_id}: {e}", exc_info=True)
+        return False
+
+def profile_recommendations(user_id: str, kind: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """The user's precomputed matches, best first; empty for users without an embedded profile."""
+    try:
+        catalog = get_recommendation_catalog()
+        return recommender.matches(user_id, catalog, kind=kind, limit=limit) if catalog is not None else []
+    except Exception as e:
+        logger.error(f"Failed to look up recommendations for user {user_id}: {e}", exc_info=True)
+        return []
+
+def fetch_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """Reads the user's Firestore profile; None if Firestore is unavailable or there is no profile."""
+    db_firestore = get_firestore()
+    if not db_firestore:
+        return None
+    user_doc = db_firestore.collection('profiles').document(str(user_id)).get()
+    return (user_doc.to_dict() or None) if user_doc.exists else None
+
+def update_vector_store() -> bool:
+    """Re-ingests every job and session from the data store. Used by ingest.py."""
+    collection = get_vector_collection()
+    if not collection:
+        return False
+    try:
+        logger.info("Re-ingesting all jobs and sessions into the vector store...")
+        knowledge_base = get_knowledge_base()
+        for entity, kind in (('jobs', 'job'), ('sessions', 'session')):
+            documents = scheduler.call('ingest', admin_tasks.canonical_documents, kind, timeout=Config.ADMIN_JOB_TIMEOUT)
+            changes = knowledge_base.sync_canonical(collection, kind, documents, {doc_id for doc_id, _, _ in documents})
+            logger.info(f"Ingested {entity}: {changes}")
+        return True
+    except Exception as e:
+        logger.error(f"Error updating vector store: {e}")
+        return False
+
 # -----------------------------------------------------------------------------
 # Analytics Logging (Simplified - logs raw events)
 # -----------------------------------------------------------------------------
-# REPLACE the existing log_analytics_event function
+# Events arriving within ANALYTICS_GROUP_COMMIT_DELAY of each other (e.g. a burst of
+# feedback submissions) are written as one batch, but each batch still rewrites the
+# whole day array: a day's logging is O(n²) in its events, so the file is written
+# compactly (C JSON encoder) to keep each rewrite as cheap as possible.
+analytics_appender = GroupCommitAppender(max_delay=Config.ANALYTICS_GROUP_COMMIT_DELAY, indent=None)
+
+# Columnar view of the day files for the live stream (admin work pool processes open their own)
+event_store = EventStore(Config.ANALYTICS_DIR, Config.EVENT_STORE_DIR, cache_rows=Config.EVENT_STORE_CACHE_ROWS)
+
+# Current-year totals pushed to dashboards over /admin/analytics/stream (started by the first subscriber)
+live_analytics = LiveAnalytics(event_store, Config.ANALYTICS_DIR, date_format=Config.ANALYTICS_DATE_FORMAT,
+                               top_users=Config.ANALYTICS_TOP_TOKEN_USERS, poll_interval=Config.ANALYTICS_STREAM_POLL_SECONDS)
+
 def log_analytics_event(event_type: str, event_data: Dict[str, Any]):
-    """Logs an analytics event by reading, appending, and writing a JSON array file."""
+    """Logs an analytics event by appending it to the day's JSON array file."""
     try:
-        Config.ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
         timestamp = datetime.now()
         event_id = str(uuid.uuid4())
 
@@ -253,32 +696,13 @@ def log_analytics_event(event_type: str, event_data: Dict[str, Any]):
         }
 
         date_str = timestamp.strftime(Config.ANALYTICS_DATE_FORMAT)
-        # Ensure we use the .json extension
         analytics_file = Config.ANALYTICS_DIR / f"events_{date_str}.json"
 
-        # --- Read-Modify-Write Logic ---
-        events_for_day = []
-        if analytics_file.exists():
-            # Read the existing array using the helper
-            existing_data = read_json(analytics_file, default=[]) # Default to empty list on error/empty
-            # Ensure it's actually a list
-            if isinstance(existing_data, list):
-                events_for_day = existing_data
-            else:
-                logger.warning(f"Analytics file {analytics_file} did not contain a list. Starting fresh for today.")
-                # Optionally, back up the corrupted file here before overwriting
-                # backup_path = analytics_file.with_suffix(f".json.corrupted.{timestamp.isoformat().replace(':','-')}")
-                # analytics_file.rename(backup_path)
-
-        # Append the new event
-        events_for_day.append(event)
-
-        # Write the entire updated array back
-        if not write_json(analytics_file, events_for_day):
+        # Locked, atomic read-modify-write shared with concurrent callers
+        if not analytics_appender.append(analytics_file, event):
              logger.error(f"Failed to write updated events array to {analytics_file}")
              return False # Indicate failure
-
-        # logger.info(f"Logged event {event_id} to {analytics_file}") # Optional: Log success
+        live_analytics.notify()
         return True
 
     except Exception as e:
@@ -291,22 +715,15 @@ def log_analytics_event(event_type: str, event_data: Dict[str, Any]):
 def detect_bias(user_query: str) -> Tuple[bool, Optional[str]]:
     """Detects bias and its type. Returns (is_biased, bias_type)."""
     try:
-        # Configure Gemini if needed (moved key config outside)
-        model = genai.GenerativeModel('gemini-1.5-flash')
         prompt = f"""
         Analyze the following query for gender, racial, religious, age, or other harmful biases/stereotypes:
         Query: "{user_query}"
         Respond ONLY with "Biased: Yes, Type: [type]" or "Biased: No". Replace [type] with one of: gender, racial, religious, age, other.
         """
-        response = model.generate_content(prompt)
-        result = response.text.strip().lower()
-        
-        if result.startswith("biased: yes"):
-            match = re.search(r"type:\s*(\w+)", result)
-            bias_type = match.group(1) if match else "other"
-            return True, bias_type
-        else:
-            return False, None
+        (is_biased, bias_type), rung = router.run('bias_check', prompt, parse_bias_reply, lambda: bias_heuristic(user_query))
+        if is_biased and rung == 'heuristic':
+            logger.warning(f"Heuristic bias detected (Type: {bias_type}) for query: {user_query}")
+        return is_biased, bias_type
     except Exception as e:
         logger.error(f"Error in API bias detection: {e}")
         # Fallback keyword matching
@@ -327,317 +744,219 @@ def handle_bias() -> str:
     """Returns a standard response for biased queries."""
     return "I focus on providing inclusive and respectful information related to career development. Let's rephrase or explore a different topic."
 
-# -----------------------------------------------------------------------------
-# Vector Store Setup and Functions
-# -----------------------------------------------------------------------------
-class GeminiEmbeddingFunction(EmbeddingFunction):
-    def __call__(self, input: List[str]) -> List[List[float]]:
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        model = "models/embedding-001"
-        try:
-            # Batch embedding requests if possible (check API limits)
-            # Simplified: process one by one if batching fails or isn't straightforward
-            embeddings = []
-            for text in input:
-                 result = genai.embed_content(model=model, content=text, task_type="retrieval_document")
-                 embeddings.append(result["embedding"])
-            return embeddings
-            # Note: Original code had `title` which might not be supported by all task types.
-            # Using batch embed requires careful handling of input size.
-            # result = genai.embed_content(model=model, content=input, task_type="retrieval_document")
-            # return result["embedding"] # This assumes batching works directly
-        except Exception as e:
-            logger.error(f"Error generating Gemini embedding: {e}")
-            # Provide zero vectors or raise a specific exception
-            raise RuntimeError("Embedding generation failed.") from e
-
-def initialize_vector_store() -> chromadb.api.models.Collection:
-    """Creates or loads the ChromaDB collection and ingests data."""
-    try:
-        client = PersistentClient(path=str(Config.CHROMA_DB_PATH)) # Path object needs conversion
-        # Use get_or_create for robustness
-        collection = client.get_or_create_collection(
-            name=Config.CHROMA_COLLECTION_NAME,
-            embedding_function=GeminiEmbeddingFunction()
-        )
-        logger.info(f"Chroma collection '{Config.CHROMA_COLLECTION_NAME}' loaded/created.")
-        # Clear existing data before ingestion? Optional, depends on desired behavior.
-        # collection.delete(where={}) # Uncomment to clear before re-ingesting
-        _ingest_data(collection)
-        return collection
-    except Exception as e:
-        logger.error(f"Error initializing Chroma collection: {e}")
-        raise RuntimeError("Vector store initialization failed.") from e
-
-def _ingest_data(collection: Collection):
-    """Helper function to ingest data into the collection with metadata."""
-    ingested_count = 0
-    # Ingest Jobs with metadata
-    jobs = read_csv(Config.JOBS_FILE)
-    if jobs:
-        logger.info(f"Attempting to ingest {len(jobs)} job listings...")
-        for idx, job in enumerate(jobs):
-            job_id = f"job_{job.get('id', uuid.uuid4())}"  # Use provided ID or generate one
-            doc_text = (
-                f"Job Title: {job.get('title', 'N/A')}\n"
-                f"Company: {job.get('company', 'N/A')}\n"
-                f"Location: {job.get('location', 'N/A')}\n"
-                f"Type: {job.get('type', 'N/A')}\n"
-                f"Deadline: {job.get('deadline', 'N/A')}\n"
-                f"Description: {job.get('description', 'No description available.')}"
-            )
-            # ADD METADATA HERE
-            metadata = {
-                'source_type': 'job',
-                'apply_url': job.get('applyUrl', '#'),
-                'title': job.get('title', 'N/A'),
-                'company': job.get('company', 'N/A'),
-                'description': job.get('description', 'N/A'),
-                'location': job.get('location', 'N/A')
-            }
-        try:
-                # Add documents one by one for easier error isolation during dev
-                collection.add(documents=[doc_text], ids=[job_id], metadatas=[metadata])  # Add metadata
-                ingested_count += 1
-        except Exception as e:
-                logger.error(f"Failed to add job {job_id} to collection: {e}")
-        if ingested_count > 0:
-            logger.info(f"Successfully ingested {ingested_count} job listings.")
-
-    # Ingest Sessions with metadata
-    sessions = read_json(Config.SESSIONS_FILE, default=[])
-    if sessions:
-        logger.info(f"Attempting to ingest {len(sessions)} sessions...")
-        ingested_session_count = 0  # Use a different counter variable name
-        for idx, session in enumerate(sessions):
-            session_id = f"session_{session.get('id', uuid.uuid4())}"
-            doc_text = (
-                f"Session Title: {session.get('title', 'N/A')}\n"
-                f"Date: {session.get('date', 'N/A')}\n"
-                f"Time: {session.get('time', 'N/A')}\n"
-                f"Location: {session.get('location', 'N/A')}\n"
-                f"Description: {session.get('description', 'No description available.')}"
-            )
-            # ADD METADATA HERE
-            metadata = {
-                'source_type': 'session',
-                'registerUrl': session.get('registerUrl', 'N/A'),
-                'title': session.get('title', 'N/A'),
-                'description': job.get('description', 'N/A'),
-                'date': session.get('date', 'N/A'),
-                'location': session.get('location', 'N/A')
-            }
-    try:
-                collection.add(documents=[doc_text], ids=[session_id], metadatas=[metadata])  # Add metadata
-                ingested_session_count += 1
-    except Exception as e:
-        logger.error(f"Failed to add session {session_id} to collection: {e}")
-        if ingested_session_count > 0:
-            logger.info(f"Successfully ingested {ingested_session_count} session details.")
-
-    total_ingested = ingested_count + ingested_session_count  # Use both counters
-    if total_ingested == 0:
-        logger.warning("No data was successfully ingested into the vector store.")
-
-# Global variable for the vector store collection.
-vector_collection: Optional[chromadb.api.models.Collection] = None
-
-def update_vector_store():
-    """Reinitializes the vector store. Inefficient for large datasets."""
-    global vector_collection
-    try:
-        logger.info("Attempting to update vector store by re-initialization...")
-        vector_collection = initialize_vector_store()
-        logger.info("Vector store re-initialized successfully.")
-        return True
-    except Exception as e:
-        logger.error(f"Error updating vector store: {e}")
-        return False
-
 # -----------------------------------------------------------------------------
 # RAG Pipeline Functions (Refined Prompts)
 # -----------------------------------------------------------------------------
-# REPLACE this function:
-def get_relevant_passage(
-    query: str,
-    db: Collection, # Changed type hint
-    n_results: int = 5, # Retrieve more initially for potential filtering/ranking
-    source_type_filter: Optional[str] = None
-) -> List[Tuple[str, Dict[str, Any]]]:
-    """Retrieves relevant passages, optionally filtered by source_type, and returns docs with metadata."""
-    if not db:
-        logger.error("Vector store not available for query.")
-        return []
-    try:
-        # Construct the where clause only if a filter is provided
-        where_clause = {'source_type': source_type_filter} if source_type_filter else None
-
-        # Perform the query, including metadata and specifying the where clause if applicable
-        if where_clause:
-            results = db.query(query_texts=[query], n_results=n_results, where=where_clause, include=['documents', 'metadatas'])
-        else:
-            # Query without filter if no source type specified
-            results = db.query(query_texts=[query], n_results=n_results, include=['documents', 'metadatas'])
-
-        # Safely extract documents and metadatas
-        docs = results.get("documents")
-        metadatas = results.get("metadatas")
-
-        # Check if results are valid lists and have content
-        if docs and metadatas and isinstance(docs, list) and len(docs) > 0 and isinstance(metadatas, list) and len(metadatas) > 0:
-            # Ensure docs[0] and metadatas[0] are lists themselves (ChromaDB structure)
-            doc_list = docs[0] if isinstance(docs[0], list) else []
-            meta_list = metadatas[0] if isinstance(metadatas[0], list) else []
-
-            # Combine documents and metadata into tuples, ensuring lengths match
-            min_len = min(len(doc_list), len(meta_list))
-            return list(zip(doc_list[:min_len], meta_list[:min_len]))
-        else:
-            # Return empty list if results are missing or malformed
-            logger.warning(f"Query returned no documents or metadata for query: '{query}' with filter: {source_type_filter}")
-            return []
-    except Exception as e:
-        logger.error(f"Error querying vector store: {e}", exc_info=True)
-        return []
-
-# REPLACE this function:
-def make_rag_prompt(
-    query: str,
-    passages_with_metadata: List[Tuple[str, Dict[str, Any]]],
-    language: str = "English",
-    topic: str = "general"
-    # external_context: Optional[str] = None # Placeholder for scraped content
-) -> str:
-    """Constructs the RAG prompt based on the topic and retrieved data."""
-
-    # --- Base Persona and Instructions ---
-    base_prompt = f"""
-You are Asha, a helpful and empowering AI assistant focused on women's career development in India. Your goal is to provide accurate, unbiased, encouraging, and relevant information based on the provided context and the user's query. Maintain a positive, supportive, and professional tone. Avoid stereotypes and biases. **Respond ONLY in {language}.**
-"""
-    suggest_resources_instruction = "\n\nFinally, suggest 1-2 additional relevant resources (like specific website sections, types of workshops, or relevant organizations from trusted sources if applicable) or next steps the user could take."
-
-    # --- Topic-Specific Handling ---
-    context_str = ""
-    specific_instruction = ""
-
-    # Limit results displayed
-    max_results_to_display = 3
-    relevant_items = passages_with_metadata[:max_results_to_display]
-
-    if topic == "career" and relevant_items:
-        context_str += "**Relevant Job Opportunities Found:**\n"
-        for i, (doc, meta) in enumerate(relevant_items):
-            title = meta.get('title', 'N/A')
-            company = meta.get('company', 'N/A')
-            location = meta.get('location', 'N/A')
-            apply_url = meta.get('apply_url', '') # Get URL, default empty
-            # Extract description snippet carefully
-            desc_match = re.search(r"Description:\s*(.*)", doc, re.IGNORECASE | re.DOTALL)
-            description_snippet = (desc_match.group(1).strip()[:150] + "...") if desc_match and desc_match.group(1).strip() else "Details available."
-            context_str += f"{i+1}. **{title}** at {company} ({location})\n   *Description:* {description_snippet}\n"
-            # Only add apply link if URL is valid
-            if apply_url and apply_url != '#':
-                context_str += f"   *Apply here:* {apply_url}\n"
-            else:
-                context_str += "   *Application link not provided.*\n"
-        specific_instruction = f"Based on the user's query '{query}', present the {len(relevant_items)} most relevant job opportunities listed above. Briefly mention the company and location. Include the application link if available. If the query asks for something specific not covered, address that too."
-    elif topic == "session" and relevant_items: # Handle sessions/events (normalized topic)
-        context_str += "**Relevant Sessions/Events Found:**\n"
-        for i, (doc, meta) in enumerate(relevant_items):
-            title = meta.get('title', 'N/A')
-            date = meta.get('date', 'N/A')
-            location = meta.get('location', 'N/A')
-            register_url = meta.get('register_url', '') # Get URL, default empty
-            desc_match = re.search(r"Description:\s*(.*)", doc, re.IGNORECASE | re.DOTALL)
-            description_snippet = (desc_match.group(1).strip()[:150] + "...") if desc_match and desc_match.group(1).strip() else "Details available."
-            context_str += f"{i+1}. **{title}** ({location} on {date})\n   *Details:* {description_snippet}\n"
-            # Only add register link if URL is valid
-            if register_url and register_url != '#':
-                 context_str += f"   *Register here:* {register_url}\n"
-            else:
-                 context_str += "   *Registration link not provided.*\n"
-        specific_instruction = f"Based on the user's query '{query}', present the {len(relevant_items)} most relevant sessions/events listed above. Briefly mention the date and location. Include the registration link if available. If the query asks for something specific not covered, address that too."
-    else: # General topic or no specific results found for job/session
-        if relevant_items:
-             context_str += "**Relevant Information Found:**\n"
-             # Just use the document text for general context
-             context_str += "\n\n---\n\n".join([doc for doc, meta in relevant_items])
-        else:
-             context_str += "No specific documents found in the internal knowledge base matching the query."
-        specific_instruction = f"Answer the user's query '{query}' clearly and concisely using the provided context if relevant. If the context is insufficient or missing, use your general knowledge but clearly state this (e.g., 'Based on general knowledge,...')."
-        # Placeholder: Integrate external content if available
-        # if external_context:
-        #    context_str += "\n\n**Potentially Relevant External Information:**\n" + external_context
-
-    # --- Final Prompt Assembly ---
-    prompt = f"""{base_prompt}
-
-        **Context:**
-        {context_str}
-
-        **User Query:** "{query}"
-
-        **Instructions:**
-        1. {specific_instruction}
-        2. If no relevant information was found (context indicates this), acknowledge that and answer based on general knowledge if appropriate, stating that you couldn't find specific details in the knowledge base.
-        3. {suggest_resources_instruction}
-
-        **Answer (in {language}):**
-        """
-    return prompt
-
 def generate_answer(prompt: str) -> str:
-    """Generates an answer using the Gemini model."""
+    """Generates an answer, escalating along the 'answer' model ladder on empty responses or errors."""
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
-        answer = response.text.strip()
-        if not answer:
-            logger.warning("Received empty response from Gemini AI.")
-            return "I couldn't generate a specific response for that query. Could you try rephrasing?"
+        answer, _ = router.run('answer', prompt, parse_answer)
         return answer
-
-    except Exception as e:
+    except RoutingError as e:
+        if not e.errors:
+            logger.warning("Received only empty responses from Gemini AI.")
+            return "I couldn't generate a specific response for that query. Could you try rephrasing?"
         logger.error(f"Error generating Gemini response: {e}")
         return "I am sorry, I encountered a technical difficulty. Please try again later."
 
 # -----------------------------------------------------------------------------
-# Flask App and Endpoints
+# Flask Endpoints (registered on the app in create_app)
 # -----------------------------------------------------------------------------
-app = Flask(__name__)
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
-CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
+api = Blueprint('api', __name__)
 
-# Configure Gemini API Key on startup
-genai.configure(api_key=Config.GEMINI_API_KEY)
+# Serialized, compressed bodies of the read-heavy GET endpoints, keyed on data versions
+response_cache = ResponseCache(max_entries=Config.RESPONSE_CACHE_ENTRIES)
 
-# Initialize Vector Store on startup
-try:
-    Config.DATA_DIR.mkdir(parents=True, exist_ok=True)
-    vector_collection = initialize_vector_store()
-except Exception as e:
-    logger.critical(f"CRITICAL: Failed to initialize vector store on startup: {e}", exc_info=True)
-    # Depending on requirements, you might exit or run in a degraded mode
-    # For now, we'll let it continue, but endpoints needing it will fail.
-    vector_collection = None
+# Recent turns and a rolling summary per conversation, so clients only send the new message
+conversations = ConversationStore(
+    max_conversations=Config.CONVERSATION_STORE_MAX, recent_turns=HISTORY_MAX_TURNS, turn_max_tokens=HISTORY_TURN_MAX_TOKENS,
+    summary_max_tokens=Config.CONVERSATION_SUMMARY_MAX_TOKENS, idle_seconds=Config.CONVERSATION_IDLE_SECONDS,
+)
+
+def _entity_version(entity: str) -> Callable[[], int]:
+    return lambda: data_store.data_version(entity)
+
+def _analytics_version() -> Tuple:
+    """Changes when any event file is written (and daily, as figures are relative to today)."""
+    files = sorted((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in Config.ANALYTICS_DIR.glob("events_*.json"))
+    return (datetime.now().date().isoformat(), tuple(files))
+
+def _external_content_version() -> Tuple:
+    try:
+        cache_mtime = Config.EXTERNAL_CACHE_DIR.stat().st_mtime_ns # Changes whenever a cache entry is replaced
+    except FileNotFoundError:
+        cache_mtime = 0
+    # The minute bucket lets the view run regularly, which is what schedules revalidation of stale pages
+    return (data_store.data_version('trusted_sources'), cache_mtime, int(time.time() // 60))
+
+@api.before_app_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    if profiler.running and request.url_rule:
+        g.profiled = profiler.enter(request.url_rule.rule)
+
+@api.teardown_app_request
+def _end_request_profile(exc):
+    if g.get('profiled'):
+        profiler.exit()
+
+@api.before_app_request
+def _start_llm_usage():
+    g.llm_calls, g.llm_scope = start_llm_scope()
+
+@api.teardown_app_request
+def _charge_llm_usage(exc):
+    """Ends the request's usage scope and adds its tokens to the user's daily total (set g.token_user to charge)."""
+    if g.get('llm_scope') is None:
+        return
+    end_llm_scope(g.llm_scope)
+    calls, user_id = g.get('llm_calls'), g.get('token_user')
+    if calls and user_id:
+        usage = summarize_llm_usage(calls)
+        try:
+            data_store.add_token_usage(user_id, datetime.now().strftime(Config.ANALYTICS_DATE_FORMAT), usage['input'], usage['output'], usage['calls'])
+        except Exception as e:
+            logger.error(f"Failed to record token usage for {user_id}: {e}")
+
+@api.after_app_request
+def _record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None and metrics.enabled:
+        # The route pattern, not the path, keeps label cardinality bounded
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe("request_duration_seconds", time.perf_counter() - started,
+                        endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+def _cache_metrics():
+    return [("http_cache_requests_total", "counter", "Cached GET endpoint lookups by result.", {"result": result}, count)
+            for result, count in response_cache.stats.items()]
+
+metrics.register_collector(_cache_metrics)
+
+def _conversation_metrics():
+    return [("conversations_active", "gauge", "Conversations held in this worker's store.", {}, len(conversations)),
+            ("conversations_created_total", "counter", "Conversations started or re-seeded in this worker.", {}, conversations.stats['created'])] + [
+            ("conversation_evictions_total", "counter", "Conversations dropped from the store by reason.", {"reason": reason}, conversations.stats[f'evicted_{reason}'])
+            for reason in ("capacity", "idle")]
+
+metrics.register_collector(_conversation_metrics)
+
+def _recommendation_metrics():
+    return [("recommendation_profiles", "gauge", "User profiles with precomputed job/session matches.", {}, data_store.count_recommendations()),
+            ("recommendation_profiles_embedded_total", "counter", "Profiles embedded in this worker because they were new or changed.", {}, recommender.stats['profiles_embedded']),
+            ("recommendation_documents_scored_total", "counter", "Changed jobs/sessions scored against the stored profiles by this worker.", {}, recommender.stats['documents_scored']),
+            ("recommendation_full_rescores_total", "counter", "Profiles rescored in full because deletions left their list short.", {}, recommender.stats['full_rescores'])]
+
+metrics.register_collector(_recommendation_metrics)
+
+def _live_analytics_metrics():
+    return [("analytics_stream_subscribers", "gauge", "Dashboards subscribed to /admin/analytics/stream in this worker.", {}, len(live_analytics))]
+
+metrics.register_collector(_live_analytics_metrics)
+
+def _admin_work_metrics():
+    samples = []
+    for work_class, counts in scheduler.snapshot().items():
+        labels = {"class": work_class}
+        samples += [("admin_jobs_queued", "gauge", "Admin jobs waiting for the work pool, by work class.", labels, counts['queued']),
+                    ("admin_jobs_running", "gauge", "Admin jobs running in the work pool, by work class.", labels, counts['running']),
+                    ("admin_job_wait_seconds_total", "counter", "Time admin jobs spent queued before they started.", labels,
+                     scheduler.stats[work_class]['wait_seconds'])]
+        samples += [("admin_jobs_total", "counter", "Admin jobs by work class and outcome (rejected: queue full).",
+                     {**labels, "outcome": outcome}, scheduler.stats[work_class][outcome]) for outcome in OUTCOMES]
+    return samples
+
+metrics.register_collector(_admin_work_metrics)
+
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# --- Sampling Profiler (admin only) ---
+profiler = SamplingProfiler(interval=Config.PROFILER_INTERVAL_MS / 1000)
+
+def _admin_denied():
+    """Error response unless the request carries the configured X-Admin-Token."""
+    if not Config.ADMIN_TOKEN:
+        return jsonify({"error": "Not available (ADMIN_TOKEN is not configured)"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), Config.ADMIN_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+@api.route('/admin/profiler', methods=['GET'])
+def profiler_status():
+    denied = _admin_denied()
+    if denied: return denied
+    return jsonify(profiler.status()), 200
+
+@api.route('/admin/profiler', methods=['POST'])
+def start_profiler():
+    """Starts profiling `sample_rate` (0-1) of requests for `seconds`; results at /admin/profiler/stacks."""
+    denied = _admin_denied()
+    if denied: return denied
+    data = request.json or {}
+    try:
+        seconds = float(data.get('seconds', 30))
+        sample_rate = float(data.get('sample_rate', 1.0))
+        interval_ms = float(data.get('interval_ms', Config.PROFILER_INTERVAL_MS))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds, sample_rate and interval_ms must be numbers"}), 400
+    if not 0 < seconds <= Config.PROFILER_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be between 0 and {Config.PROFILER_MAX_SECONDS}"}), 400
+    if not 0 < sample_rate <= 1 or interval_ms < 1:
+        return jsonify({"error": "sample_rate must be in (0, 1] and interval_ms at least 1"}), 400
+    try:
+        return jsonify(profiler.start(seconds, sample_rate=sample_rate, interval=interval_ms / 1000)), 202
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+@api.route('/admin/profiler', methods=['DELETE'])
+def stop_profiler():
+    denied = _admin_denied()
+    if denied: return denied
+    return jsonify(profiler.stop()), 200
+
+@api.route('/admin/profiler/stacks', methods=['GET'])
+def profiler_stacks():
+    """Collapsed stacks (flamegraph.pl / speedscope input), optionally for one endpoint, e.g. ?endpoint=/chat."""
+    denied = _admin_denied()
+    if denied: return denied
+    return Response(profiler.collapsed(request.args.get('endpoint')), mimetype='text/plain')
+
+@api.before_app_request
+def _start_background_jobs():
+    # Started by the first request rather than on import, so CLI tools and forked workers don't inherit it
+    if Config.EXTERNAL_INGEST_IN_PROCESS and _ingest_scheduler is None:
+        start_ingest_scheduler()
 
 # --- Chat Endpoint ---
-# --- Chat Endpoint ---
-@app.route('/chat', methods=['POST'])
+@api.route('/chat', methods=['POST'])
 def chat():
-    global vector_collection, db_firestore # Add db_firestore global
     data = request.json
     if not data: return jsonify({"error": "No data provided"}), 400
 
     query = data.get('query', '').strip()
-    history_list = data.get('conversation_history', [])
     language = data.get('language', 'English')
     # Get user_id, could be null/undefined if anonymous or error in frontend
     user_id = data.get('user_id')
     topic = data.get('topic', 'general').lower()
 
     if not query: return jsonify({"error": "Empty query provided"}), 400
-    if not vector_collection:
+    # A client sending only the new message needs to know when its conversation is gone (evicted, restarted, other
+    # worker), so it can resend the history instead of getting an answer without context
+    seed_history = data.get('conversation_history')
+    if (data.get('conversation_id') and not isinstance(seed_history, list)
+            and not conversations.knows(data.get('conversation_id'), str(user_id) if user_id else None)):
+        return jsonify({"error": "Unknown conversation; resend with conversation_history", "conversation_unknown": True}), 409
+    if not is_anonymous(user_id):
+        g.token_user = str(user_id) # Charged with this request's Gemini tokens on teardown (signed-in users only)
+    if token_budget_exceeded(user_id):
+        metrics.inc("token_budget_rejections_total")
+        return jsonify({"error": "You've reached today's usage limit. Please try again tomorrow."}), 429
+    if not knowledge_base_available():
         logger.error("Chat request failed: Vector store not initialized.")
         return jsonify({"error": "Service temporary unavailable (VS)"}), 503 # Service Unavailable
 
@@ -652,23 +971,30 @@ def chat():
     # --- Fetch User Profile (if user_id provided and it's the start of convo) ---
     user_profile_info = ""
     user_name = "there" # Default greeting name
+    # Server-side history; the client's conversation_history is only read to seed an unknown conversation
+    conversation_id, conversation = conversations.open(
+        data.get('conversation_id'), str(user_id) if user_id else None, seed_history if isinstance(seed_history, list) else None)
     # Determine if this is effectively the first *user* turn being processed
-    is_first_user_message = not any(msg.get('role') == 'user' for msg in history_list)
+    is_first_user_message = conversation['user_turns'] == 0
+    is_logged_in = not is_anonymous(user_id)
+    db_firestore = get_firestore() if is_logged_in and is_first_user_message else None
 
     # Proceed with profile fetch only if logged in, Firestore ready, and first user message
-    if user_id and not str(user_id).startswith('anonymous_') and db_firestore and is_first_user_message:
+    if is_logged_in and db_firestore and is_first_user_message:
         try:
             # Ensure user_id is a string before using it as document ID
             user_id_str = str(user_id)
             logger.info(f"Attempting to fetch profile for user_id: {user_id_str}")
             # Assumes collection named 'userProfiles' and documents are named by UID
             user_doc_ref = db_firestore.collection('profiles').document(user_id_str)
-            user_doc = user_doc_ref.get()
+            with metrics.span("profile_fetch"):
+                user_doc = user_doc_ref.get()
 
             if user_doc.exists:
                 profile_data = user_doc.to_dict()
                 if profile_data: # Check if conversion worked
                     logger.info(f"Fetched profile for user {user_id_str}")
+                    observe_profile(user_id_str, profile_data) # Only re-embedded if the profile changed
                     first_name = profile_data.get('firstName', '').strip()
                     if first_name: user_name = first_name # Use first name for greeting
 
@@ -706,11 +1032,13 @@ def chat():
 
 
     # 1. Bias Check
-    is_biased, bias_type = detect_bias(query)
+    with metrics.span("bias_check"):
+        is_biased, bias_type = detect_bias(query)
     if is_biased:
         logger.warning(f"Bias detected (Type: {bias_type}) in query: {query}")
-        log_analytics_event("bias_detected", { "query": query, "prevented": True, "bias_type": bias_type, "language": language, "user_id": user_id or 'anonymous' })
-        return jsonify({"response": handle_bias()}), 200
+        log_analytics_event("bias_detected", { "query": query, "prevented": True, "bias_type": bias_type, "language": language, "user_id": user_id or 'anonymous', "tokens": summarize_llm_usage(g.llm_calls) })
+        # Not recorded in the conversation, so the biased query never reaches later prompts
+        return jsonify({"response": handle_bias(), "conversation_id": conversation_id}), 200
 
     # 2. Topic-Specific RAG Pipeline
     try:
@@ -719,20 +1047,31 @@ def chat():
         if topic in ["career", "job", "jobs"]: source_filter = "job"; topic = "career"
         elif topic in ["session", "event", "events", "sessions", "workshop", "workshops"]: source_filter = "session"; topic = "session"
 
-        passages_with_metadata = get_relevant_passage(
-            query, vector_collection, n_results=5, source_type_filter=source_filter
-        )
+        with metrics.span("retrieval", topic=topic):
+            passages_with_metadata = retrieve_passages(query, n_results=5, source_type_filter=source_filter)
+
+        # The user's precomputed profile matches of the same kind (a lookup, no vector search)
+        profile_matches: List[Dict[str, Any]] = []
+        if is_logged_in and source_filter:
+            with metrics.span("recommendation_lookup"):
+                profile_matches = profile_recommendations(str(user_id), kind=source_filter, limit=Config.RECOMMENDATIONS_IN_PROMPT)
 
         # Create prompt - Note: We are NOT adding user profile data to the RAG context/prompt itself
-        # The profile info is only used for the initial response message prepending.
-        prompt = make_rag_prompt(
-            query=query,
-            passages_with_metadata=passages_with_metadata,
-            language=language,
-            topic=topic
-        )
+        # The profile info is only used for the initial response message prepending; its matches are listed in the context.
+        with metrics.span("prompt_build"):
+            prompt = make_rag_prompt(
+                query=query,
+                passages_with_metadata=passages_with_metadata,
+                language=language,
+                topic=topic,
+                conversation_history=conversation['history'],
+                token_budget=Config.PROMPT_TOKEN_BUDGET,
+                conversation_summary=conversation['summary'],
+                profile_matches=[match['metadata'] for match in profile_matches]
+            )
 
-        response_text = generate_answer(prompt)
+        with metrics.span("generate"):
+            response_text = generate_answer(prompt)
 
         # Prepend profile info *only* if it was generated earlier
         if user_profile_info:
@@ -749,86 +1088,229 @@ def chat():
         return jsonify({"error": final_response}), 500
 
 
+    conversations.record_exchange(conversation_id, query, final_response)
     end_time = datetime.now()
     response_time_sec = (end_time - start_time).total_seconds()
 
     # 3. Log Analytics
-    log_analytics_event("chat", {
-        "query": query,
-        "response_length": len(final_response), # Log length of the final combined response
-        "response_time": response_time_sec,
-        "language": language,
-        "user_id": user_id or 'anonymous', # Ensure user_id is logged
-        "topic": topic,
-        "has_context": bool(passages_with_metadata)
-    })
+    with metrics.span("analytics_log"):
+        log_analytics_event("chat", {
+            "query": query,
+            "response_length": len(final_response), # Log length of the final combined response
+            "response_time": response_time_sec,
+            "language": language,
+            "user_id": user_id or 'anonymous', # Ensure user_id is logged
+            "topic": topic,
+            "has_context": bool(passages_with_metadata),
+            "tokens": summarize_llm_usage(g.llm_calls) # Per-stage Gemini usage of this request
+        })
 
     return jsonify({
         "response": final_response, # Send the potentially prepended response
+        "conversation_id": conversation_id, # Send back with the next message instead of the history
         "messageId": str(uuid.uuid4()),
         "timestamp": datetime.now().isoformat(),
         "bias_detected": False,
     }), 200
             
+# --- Profile Recommendations ---
+def _recommendation_item(match: Dict[str, Any]) -> Dict[str, Any]:
+    meta = match['metadata']
+    url = meta.get('apply_url') if match['kind'] == 'job' else meta.get('registerUrl')
+    item = {'id': match['id'].split('_', 1)[1], 'kind': match['kind'], 'score': match['score'],
+            'title': meta.get('title'), 'location': meta.get('location'), 'snippet': meta.get('snippet'),
+            'url': url if url not in (None, '', '#', 'N/A') else None}
+    if match['kind'] == 'job':
+        item['company'] = meta.get('company')
+    else:
+        item['date'] = meta.get('date')
+    return item
+
+def _recommendations_response(user_id: str, updated: bool) -> Tuple[Response, int]:
+    kind = request.args.get('kind')
+    if kind and kind not in RECOMMENDED_KINDS:
+        return jsonify({"error": f"Invalid kind: {kind}"}), 400
+    limit = max(1, min(request.args.get('limit', default=Config.RECOMMENDATION_TOP_N, type=int), Config.RECOMMENDATION_TOP_N))
+    matches = profile_recommendations(user_id, kind=kind, limit=limit)
+    return jsonify({"user_id": user_id, "updated": updated, "recommendations": [_recommendation_item(m) for m in matches]}), 200
+
+@api.route('/api/recommendations/<string:user_id>', methods=['GET'])
+def get_recommendations(user_id):
+    """The user's precomputed job and session matches (`kind` and `limit` narrow them down)."""
+    if is_anonymous(user_id):
+        return jsonify({"error": "Recommendations need a profile"}), 404
+    if not knowledge_base_available():
+        return jsonify({"error": "Service temporary unavailable (VS)"}), 503
+    updated = False
+    if data_store.get_recommendation(user_id) is None: # Never seen: embed the profile now
+        profile = fetch_profile(user_id)
+        updated = observe_profile(user_id, profile) if profile else False
+    return _recommendations_response(user_id, updated)
+
+@api.route('/api/recommendations/<string:user_id>/refresh', methods=['POST'])
+def refresh_user_recommendations(user_id):
+    """Called after a profile is saved; re-embeds it only if the matched fields changed."""
+    if is_anonymous(user_id):
+        return jsonify({"error": "Recommendations need a profile"}), 404
+    if not knowledge_base_available():
+        return jsonify({"error": "Service temporary unavailable (VS)"}), 503
+    profile = fetch_profile(user_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return _recommendations_response(user_id, observe_profile(user_id, profile))
+
+# --- Public Listing Search ---
+# Per-worker keyword/facet/date indexes, synced with the data store on the first search after a write
+listing_indexes = {entity: ListingIndex(entity) for entity in LISTING_FIELDS}
+
+@api.route('/api/search', methods=['GET'])
+@response_cache.cached(lambda: (data_store.data_version('jobs'), data_store.data_version('sessions')))
+def search_listings():
+    """Searches jobs or sessions: `q`, facet filters (comma-separated values), `from`/`to` dates, cursor paging."""
+    kind = request.args.get('kind', 'jobs')
+    index = listing_indexes.get(kind)
+    if index is None:
+        return jsonify({"error": f"Invalid kind: {kind}"}), 400
+    index.sync(data_store.data_version(kind), lambda: data_store.list_items(kind))
+    limit = max(1, min(request.args.get('limit', default=Config.SEARCH_PAGE_SIZE, type=int), Config.SEARCH_MAX_PAGE_SIZE))
+    filters = {facet: [value for arg in request.args.getlist(facet) for value in arg.split(',')] for facet in index.facets}
+    try:
+        with metrics.span("listing_search", kind=kind):
+            result = index.search(
+                request.args.get('q', ''), filters=filters, date_from=request.args.get('from'), date_to=request.args.get('to'),
+                sort=request.args.get('sort'), cursor=request.args.get('cursor'), limit=limit,
+            )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
 # --- Admin Data Endpoints ---
-@app.route('/admin/sessions', methods=['GET'])
+def _assign_ids(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Gives records without an 'id' a generated one so they can be stored."""
+    return [item if item.get('id') not in (None, '') else {**item, 'id': str(uuid.uuid4())} for item in items]
+
+@api.route('/admin/sessions', methods=['GET'])
+@response_cache.cached(_entity_version('sessions'))
 def get_sessions():
-    sessions = read_json(Config.SESSIONS_FILE, default=[])
-    return jsonify(sessions)
+    return jsonify(data_store.list_items('sessions'))
 
-@app.route('/admin/sessions', methods=['POST'])
+@api.route('/admin/sessions', methods=['POST'])
 def update_sessions():
     data = request.get_json()
     if not data or 'sessions' not in data:
         return jsonify({"error": "Invalid data format"}), 400
     sessions = data['sessions']
-    if not isinstance(sessions, list):
+    if not isinstance(sessions, list) or not all(isinstance(s, dict) for s in sessions):
         return jsonify({"error": "'sessions' must be a list"}), 400
 
-    if write_json(Config.SESSIONS_FILE, sessions):
-        if update_vector_store():  # Attempt to update vector store
-            return jsonify(sessions), 200
-        else:
-            logger.error("Sessions saved, but failed to update vector store.")
-            return jsonify({"error": "Data saved, but knowledge base update failed. Please try updating manually."}), 500
-    else:
+    sessions = _assign_ids(sessions)
+    try:
+        changes = data_store.replace_items('sessions', sessions)
+    except Exception as e:
+        logger.error(f"Error saving sessions: {e}", exc_info=True)
         return jsonify({"error": "Failed to save session data"}), 500
 
-@app.route('/admin/jobs', methods=['GET'])
+    if sync_vector_store('session', changes['written'], changes['deleted']):
+        return jsonify(sessions), 200
+    logger.error("Sessions saved, but failed to update vector store.")
+    return jsonify({"error": "Data saved, but knowledge base update failed. Please try updating manually."}), 500
+
+@api.route('/admin/sessions/<string:session_id>', methods=['PUT'])
+def update_session(session_id):
+    session = request.get_json()
+    if not isinstance(session, dict):
+        return jsonify({"error": "Invalid data format"}), 400
+    session = {**session, 'id': session_id}
+    data_store.upsert_item('sessions', session)
+    if not sync_vector_store('session', [session_id], []):
+        return jsonify({"error": "Data saved, but knowledge base update failed. Please try updating manually."}), 500
+    return jsonify(session), 200
+
+@api.route('/admin/sessions/<string:session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if not data_store.delete_item('sessions', session_id):
+        return jsonify({"error": "Session not found"}), 404
+    sync_vector_store('session', [], [session_id])
+    return jsonify({"success": True}), 200
+
+@api.route('/admin/jobs', methods=['GET'])
+@response_cache.cached(_entity_version('jobs'))
 def get_jobs():
-    jobs = read_csv(Config.JOBS_FILE)
-    return jsonify(jobs)
+    return jsonify(data_store.list_items('jobs'))
 
-@app.route('/admin/jobs', methods=['POST'])
+@api.route('/admin/jobs', methods=['POST'])
 def update_jobs():
     data = request.get_json()
     if not data or 'jobs' not in data:
         return jsonify({"error": "Invalid data format"}), 400
     jobs = data['jobs']
-    if not isinstance(jobs, list):
+    if not isinstance(jobs, list) or not all(isinstance(j, dict) for j in jobs):
         return jsonify({"error": "'jobs' must be a list"}), 400
 
-    # Define expected headers (adjust if needed)
-    fieldnames = ['id', 'title', 'company', 'location', 'type', 'deadline', 'description', 'applyUrl', 'verified', 'category', 'source', 'diversity_focus']
-
-    if write_csv(Config.JOBS_FILE, jobs, fieldnames=fieldnames):
-        if update_vector_store():
-            return jsonify(jobs), 200
-        else:
-            logger.error("Jobs saved, but failed to update vector store.")
-            return jsonify({"error": "Data saved, but knowledge base update failed. Please try updating manually."}), 500
-    else:
+    # Keep only the expected CSV columns so exports stay well-formed
+    jobs = _assign_ids([{field: job.get(field, '') for field in JOB_FIELDNAMES} for job in jobs])
+    try:
+        changes = data_store.replace_items('jobs', jobs)
+    except Exception as e:
+        logger.error(f"Error saving jobs: {e}", exc_info=True)
         return jsonify({"error": "Failed to save job data"}), 500
 
-@app.route('/admin/trusted-sources', methods=['GET'])
+    if sync_vector_store('job', changes['written'], changes['deleted']):
+        return jsonify(jobs), 200
+    logger.error("Jobs saved, but failed to update vector store.")
+    return jsonify({"error": "Data saved, but knowledge base update failed. Please try updating manually."}), 500
+
+@api.route('/admin/jobs/<string:job_id>', methods=['PUT'])
+def update_job(job_id):
+    job = request.get_json()
+    if not isinstance(job, dict):
+        return jsonify({"error": "Invalid data format"}), 400
+    job = {**{field: job.get(field, '') for field in JOB_FIELDNAMES}, 'id': job_id}
+    data_store.upsert_item('jobs', job)
+    if not sync_vector_store('job', [job_id], []):
+        return jsonify({"error": "Data saved, but knowledge base update failed. Please try updating manually."}), 500
+    return jsonify(job), 200
+
+@api.route('/admin/jobs/<string:job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    if not data_store.delete_item('jobs', job_id):
+        return jsonify({"error": "Job not found"}), 404
+    sync_vector_store('job', [], [job_id])
+    return jsonify({"success": True}), 200
+
+_IMPORT_CONTENT_TYPES = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/jsonl': 'ndjson'}
+
+@api.route('/admin/jobs/import', methods=['POST'])
+def import_jobs():
+    """Imports a CSV (with a header row) or NDJSON upload sent as the raw request body.
+
+    ?format=csv|ndjson (default: from the Content-Type) and ?mode=upsert|replace.
+    Answers 202 once every row is written; embedding continues in the background
+    and is followed with GET /admin/imports/<id>.
+    """
+    fmt = request.args.get('format') or _IMPORT_CONTENT_TYPES.get(request.mimetype, 'csv')
+    try:
+        record = bulk_importer.start('jobs', request.stream, fmt, request.args.get('mode', 'upsert'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if record['status'] == 'failed':
+        return jsonify(record), 400
+    return jsonify(record), 202, {'Location': f"/admin/imports/{record['id']}"}
+
+@api.route('/admin/imports/<string:import_id>', methods=['GET'])
+def get_import(import_id):
+    record = bulk_importer.get(import_id)
+    if record is None:
+        return jsonify({"error": "Import not found"}), 404
+    return jsonify(record), 200
+
+@api.route('/admin/trusted-sources', methods=['GET'])
+@response_cache.cached(_entity_version('trusted_sources'))
 def get_trusted_sources():
     """Returns the raw trusted sources data for admin dashboard."""
-    sources = read_json(Config.TRUSTED_SOURCES_FILE, default=[])
-    if not sources:
-        return jsonify([]), 200  # Return empty array if no sources found
-    return jsonify(sources), 200
+    return jsonify(data_store.list_items('trusted_sources')), 200
 
-@app.route('/admin/trusted-sources', methods=['POST'])
+@api.route('/admin/trusted-sources', methods=['POST'])
 def update_trusted_sources():
     """Updates the trusted sources data."""
     try:
@@ -847,10 +1329,10 @@ def update_trusted_sources():
                     "source": source
                 }), 400
 
-        # Write to the trusted sources file
-        if not write_json(Config.TRUSTED_SOURCES_FILE, sources):
-            return jsonify({"error": "Failed to write trusted sources file"}), 500
-
+        changes = data_store.replace_items('trusted_sources', sources)
+        # Start fetching new or edited sources now rather than on the next page view
+        changed = set(changes['written'])
+        get_content_fetcher().get_many([s['url'] for s in sources if str(s['id']) in changed and str(s['url']).startswith(('http://', 'https://'))])
         return jsonify(sources), 200
 
     except Exception as e:
@@ -858,7 +1340,7 @@ def update_trusted_sources():
         return jsonify({"error": "Internal server error updating trusted sources"}), 500
 
 # --- Feedback Endpoints ---
-@app.route('/api/submit-feedback', methods=['POST'])
+@api.route('/api/submit-feedback', methods=['POST'])
 def submit_feedback():
     feedback_data = request.json
     if not feedback_data:
@@ -878,43 +1360,22 @@ def submit_feedback():
         **feedback_data, # Include all original data
         'id': feedback_id, # Ensure 'id' field exists for consistency
         'feedback_id': feedback_id,
-        'timestamp': timestamp,
-        'status': status,
-        'preview': preview # Add generated preview
-    }
-
-    feedback_file_path = Config.FEEDBACK_DIR / f"{feedback_id}.json"
-    if not write_json(feedback_file_path, feedback_to_save):
-        return jsonify({'error': 'Failed to save feedback detail file'}), 500
-
-    # Update the feedback list
-    feedback_list = read_json(Config.FEEDBACK_LIST_FILE, default=[])
-    if not isinstance(feedback_list, list): feedback_list = [] # Ensure it's a list
-
-    # Create summary for the list
-    feedback_summary = {
-        'id': feedback_id,
         'feedbackType': feedback_data.get('feedbackType', 'general'),
         'timestamp': timestamp,
         'status': status,
-        'preview': preview
+        'preview': preview # Add generated preview
     }
 
-    # Avoid duplicates in list (optional, based on ID)
-    feedback_list = [item for item in feedback_list if item.get('id') != feedback_id]
-    feedback_list.append(feedback_summary)
-
-    if not write_json(Config.FEEDBACK_LIST_FILE, feedback_list):
-         # Log error, but maybe still return success to client? Depends on requirements.
-         logger.error(f"Failed to update feedback list file, but detail file {feedback_id}.json was saved.")
-         # return jsonify({'error': 'Failed to update feedback list'}), 500 # Stricter failure
-         # Lenient failure:
-         return jsonify({'success': True, 'feedback_id': feedback_id, 'warning': 'Failed to update summary list'}), 200
+    try:
+        data_store.save_feedback(feedback_to_save)
+    except Exception as e:
+        logger.error(f"Error saving feedback {feedback_id}: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to save feedback'}), 500
 
     # Log analytics event
     log_analytics_event("feedback", {
         "feedback_id": feedback_id,
-        "feedback_type": feedback_summary['feedbackType'],
+        "feedback_type": feedback_to_save['feedbackType'],
         "accuracy_rating": feedback_data.get("accuracy_rating", "unsure"), # Extract rating if provided
         "helpful": feedback_data.get("helpful", None), # Extract helpfulness if provided
         "user_id": feedback_data.get("userId", "anonymous")
@@ -922,20 +1383,39 @@ def submit_feedback():
 
     return jsonify({'success': True, 'feedback_id': feedback_id}), 200
 
-@app.route('/admin/feedback', methods=['GET'])
-def get_feedback_list():
-    # Directly read the list file
-    feedback_list = read_json(Config.FEEDBACK_LIST_FILE, default=None)
+FEEDBACK_LIST_PARAMS = ('limit', 'cursor', 'status', 'feedbackType', 'from', 'to', 'sort')
 
-    if feedback_list is None: # Check if read_json failed
-        # Make sure to return after error
-        return jsonify({"error": "Could not read feedback list file"}), 500
+@api.route('/admin/feedback', methods=['GET'])
+def get_feedback_list():
+    """Lists feedback summaries.
+
+    With any of limit/cursor/status/feedbackType/from/to/sort this returns one
+    page ({items, next_cursor, total, status_counts}), newest first by default.
+    Without parameters it returns the full list, as before.
+    """
+    if any(param in request.args for param in FEEDBACK_LIST_PARAMS):
+        limit = request.args.get('limit', default=Config.FEEDBACK_PAGE_SIZE, type=int)
+        sort = request.args.get('sort', 'desc').lower()
+        if limit is None or not 1 <= limit <= Config.FEEDBACK_MAX_PAGE_SIZE:
+            return jsonify({"error": f"'limit' must be between 1 and {Config.FEEDBACK_MAX_PAGE_SIZE}"}), 400
+        if sort not in ('asc', 'desc'):
+            return jsonify({"error": "'sort' must be 'asc' or 'desc'"}), 400
+        filters = {
+            'feedback_type': request.args.get('feedbackType') or None,
+            'since': request.args.get('from') or None,
+            'until': request.args.get('to') or None,
+        }
+        status = request.args.get('status') or None
+        try:
+            page = data_store.query_feedback(status=status, sort=sort, limit=limit,
+                                             cursor=request.args.get('cursor') or None, **filters)
+            status_counts = data_store.feedback_status_counts(**filters)
+        except ValueError as e: # Malformed cursor or date
+            return jsonify({"error": str(e)}), 400
+        total = status_counts.get(status, 0) if status else sum(status_counts.values())
+        return jsonify({**page, "total": total, "status_counts": status_counts})
 
-    if not isinstance(feedback_list, list):
-        logger.error(f"Feedback list file does not contain a list: {Config.FEEDBACK_LIST_FILE}")
-        # Attempt to fix by writing an empty list
-        write_json(Config.FEEDBACK_LIST_FILE, [])
-        return jsonify([]), 200 # Return empty list now
+    feedback_list = data_store.list_feedback_summaries()
 
     # Add default sample data if the list is empty (for demo purposes)
     if not feedback_list:
@@ -947,26 +1427,20 @@ def get_feedback_list():
          ]
          return jsonify(sample_feedback) # Return sample if list was empty
 
-    # If everything is okay, return the actual list
     return jsonify(feedback_list)
 
-@app.route('/admin/feedback/<string:feedback_id>', methods=['GET'])
+@api.route('/admin/feedback/<string:feedback_id>', methods=['GET'])
 def get_feedback_detail(feedback_id):
     # Validate feedback_id format (optional, basic check)
     if not re.match(r'^[a-zA-Z0-9-]+$', feedback_id):
         return jsonify({"error": "Invalid feedback ID format"}), 400
 
-    feedback_file_path = Config.FEEDBACK_DIR / f"{feedback_id}.json"
-    feedback_data = read_json(feedback_file_path, default=None)
-
+    feedback_data = data_store.get_feedback(feedback_id)
     if feedback_data is None:
-        # Correct place to return 404
         return jsonify({"error": "Feedback not found or could not be read"}), 404
-
-    # This return should only happen if feedback_data is NOT None
     return jsonify(feedback_data), 200
-        
-@app.route('/admin/feedback/<string:feedback_id>/status', methods=['PUT'])
+
+@api.route('/admin/feedback/<string:feedback_id>/status', methods=['PUT'])
 def update_feedback_status(feedback_id):
     if not re.match(r'^[a-zA-Z0-9-]+$', feedback_id):
         return jsonify({"error": "Invalid feedback ID format"}), 400
@@ -980,64 +1454,37 @@ def update_feedback_status(feedback_id):
     if new_status not in valid_statuses:
         return jsonify({"error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}), 400
 
-    # Update the individual feedback file
-    feedback_file_path = Config.FEEDBACK_DIR / f"{feedback_id}.json"
-    feedback_data = read_json(feedback_file_path, default=None)
-
-    if feedback_data is None:
-        return jsonify({"error": "Feedback detail file not found or could not be read"}), 404 # Return 404
-
-    # Update status in the loaded data
-    feedback_data['status'] = new_status
-
-    # Write the updated data back to the detail file
-    if not write_json(feedback_file_path, feedback_data):
-        # If saving fails, return an error
-        return jsonify({"error": "Failed to update feedback detail file"}), 500
-
-    # --- Attempt to update the master list (secondary operation) ---
-    list_update_failed = False # Flag to track list update status
+    # Single-row update: detail and summary come from the same row now
     try:
-        feedback_list = read_json(Config.FEEDBACK_LIST_FILE, default=[])
-        if isinstance(feedback_list, list):
-            item_found_in_list = False
-            for item in feedback_list:
-                # Use .get() for safer access and compare as string
-                if item.get('id') and str(item.get('id')) == feedback_id:
-                    item['status'] = new_status
-                    item_found_in_list = True
-                    break # Exit loop once found
-
-            if item_found_in_list:
-                if not write_json(Config.FEEDBACK_LIST_FILE, feedback_list):
-                    logger.error(f"Failed to write updated status to feedback list file for {feedback_id}")
-                    list_update_failed = True # Mark list update as failed
-            else:
-                 logger.warning(f"Feedback ID {feedback_id} not found in list file during status update.")
-                 # Don't mark as error if not found, detail was updated successfully
-
-        else:
-            logger.error(f"feedback_list.json content is not a list. Path: {Config.FEEDBACK_LIST_FILE}")
-            list_update_failed = True # Mark as failed if file content is wrong
-
+        feedback_data = data_store.update_feedback_status(feedback_id, new_status)
     except Exception as e:
-        logger.error(f"Exception during feedback list update for {feedback_id}: {e}", exc_info=True)
-        list_update_failed = True # Mark as failed on any exception
+        logger.error(f"Error updating status for feedback {feedback_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to update feedback status"}), 500
 
-    # --- Return final response ---
-    response_payload = {"success": True, "data": feedback_data}
-    if list_update_failed:
-        # Add a warning if the secondary operation (list update) failed
-        response_payload["warning"] = "Feedback detail updated, but failed to update summary list."
+    if feedback_data is None:
+        return jsonify({"error": "Feedback not found"}), 404
+    return jsonify({"success": True, "data": feedback_data}), 200
 
-    # Return 200 OK because the primary operation (updating detail file) succeeded
-    return jsonify(response_payload), 200
-        
 # --- External Content Endpoint ---
-@app.route('/fetch-external-content', methods=['GET'])
+# Mapping from source 'dataType' to our internal category keys
+EXTERNAL_CATEGORY_MAP = {
+    'career_resources': 'career_resources', 'tech_careers': 'career_resources',
+    'entrepreneurship': 'entrepreneurship', 'entrepreneurship_resources': 'entrepreneurship', 'startup_resources': 'entrepreneurship',
+    'job_listings': 'job_opportunities', 'communities_jobs': 'job_opportunities',
+    'skilling_livelihoods': 'skill_development', 'tech_education': 'skill_development',
+    'policies_programs': 'policy_initiatives', 'legal_support': 'policy_initiatives', 'research_advocacy': 'policy_initiatives',
+    'articles_resources': 'latest_articles', 'recognition_stories': 'latest_articles'
+}
+
+@api.route('/fetch-external-content', methods=['GET'])
+@response_cache.cached(_external_content_version)
 def fetch_external_content():
-    """Fetches and categorizes content from trusted sources."""
-    sources = read_json(Config.TRUSTED_SOURCES_FILE, default=[])
+    """Returns categorized content from trusted sources.
+
+    Answers from the fetch cache; stale or never-fetched sources are refreshed
+    in the background and show their stored description until then.
+    """
+    sources = data_store.list_items('trusted_sources')
     if not sources:
         return jsonify({"error": "Trusted sources file not found or empty"}), 500
 
@@ -1045,42 +1492,32 @@ def fetch_external_content():
         "career_resources": [], "entrepreneurship": [], "job_opportunities": [],
         "skill_development": [], "policy_initiatives": [], "latest_articles": []
     }
-    # Mapping from source 'dataType' to our internal category keys
-    category_map = {
-        'career_resources': 'career_resources', 'tech_careers': 'career_resources',
-        'entrepreneurship': 'entrepreneurship', 'entrepreneurship_resources': 'entrepreneurship', 'startup_resources': 'entrepreneurship',
-        'job_listings': 'job_opportunities', 'communities_jobs': 'job_opportunities',
-        'skilling_livelihoods': 'skill_development', 'tech_education': 'skill_development',
-        'policies_programs': 'policy_initiatives', 'legal_support': 'policy_initiatives', 'research_advocacy': 'policy_initiatives',
-        'articles_resources': 'latest_articles', 'recognition_stories': 'latest_articles'
-    }
+    urls = [source['url'] for source in sources if str(source.get('url', '')).startswith(('http://', 'https://'))]
+    cached = get_content_fetcher().get_many(urls)
 
     for source in sources:
         source_name = source.get('name', 'Unknown Source')
         data_type = source.get('dataType')
-        category = category_map.get(data_type, 'latest_articles') # Default to articles if type unknown
+        category = EXTERNAL_CATEGORY_MAP.get(data_type, 'latest_articles') # Default to articles if type unknown
+        entry = cached.get(source.get('url')) or {}
+        fetched_at = entry.get('fetched_at')
 
-        # Simulate fetching - Replace with actual fetching logic using requests
-        # Example: requests.get(source['url'], timeout=10).json() or parse HTML
-        simulated_data = {
-            "title": f"Content from {source_name}",
-            "description": source.get('description', f"Explore resources from {source_name}."),
+        external_content[category].append({
+            "title": entry.get('title') or f"Content from {source_name}",
+            "description": entry.get('description') or source.get('description', f"Explore resources from {source_name}."),
             "url": source.get('url', '#'),
             "source": source_name,
-            "date": datetime.now().strftime(Config.ANALYTICS_DATE_FORMAT),
-            "verified": source.get('verified', False)
-        }
-        if category in external_content:
-            external_content[category].append(simulated_data)
-        else:
-             logger.warning(f"Unknown category '{category}' derived from dataType '{data_type}' for source '{source_name}'")
+            "date": datetime.fromtimestamp(fetched_at if fetched_at else time.time()).strftime(Config.ANALYTICS_DATE_FORMAT),
+            "verified": source.get('verified', False),
+            "cached": bool(fetched_at),
+        })
+
+    return jsonify(external_content), 200
 
-        
-        return jsonify(external_content), 200
-        
 # --- Analytics Aggregation Endpoint ---
 # REPLACE the /admin/analytics endpoint function:
-@app.route('/admin/analytics', methods=['GET'])
+@api.route('/admin/analytics', methods=['GET'])
+@response_cache.cached(_analytics_version)
 def get_analytics_data():
     """Aggregates and returns analytics data based on logged events for a specific year."""
     try:
@@ -1098,185 +1535,188 @@ def get_analytics_data():
 
         logger.info(f"Generating analytics for year: {year_to_process}")
 
-        # --- Aggregate Data for the Selected Year ---
-# Inside the get_analytics_data function:
-
-# --- Aggregate Data for the Selected Year ---
-        raw_events = []
-        # CHANGE THE GLOB PATTERN back to .json
-        year_pattern = f"events_{year_to_process}-??-??.json" # Look for .json files
-        event_files = sorted(Config.ANALYTICS_DIR.glob(year_pattern))
+        # --- Aggregate Data for the Selected Year (columnar scans in the admin work pool, see eventstore.py) ---
+        year_start, year_end = date(year_to_process, 1, 1), date(year_to_process, 12, 31)
 
-        if not event_files:
+        final_data: Optional[AnalyticsData] = scheduler.call('analytics', admin_tasks.analytics_report, year_start, year_end,
+                                                             timeout=Config.ADMIN_JOB_TIMEOUT)
+        if final_data is None:
             logger.warning(f"No event files found for year {year_to_process}")
-            # ... (return empty data structure as before) ...
-            empty_data: AnalyticsData = { # Define or import AnalyticsData type
+            empty_data: AnalyticsData = {
                 "conversations": {"total_conversations": 0, "conversations_by_date": {}, "language_distribution": {}, "topic_distribution": {}, "response_times": [], "bias_metrics": {"bias_detected_count": 0, "bias_prevented_count": 0, "bias_types": {}}},
                 "users": {"total_users": 0, "active_users": 0},
-                "feedback": {"total_feedback": 0, "accuracy_ratings": {"accurate": 0, "inaccurate": 0, "unsure": 0, "other": 0}, "feedback_by_date": {}, "response_quality": {"helpful": 0, "not_helpful": 0}}
+                "feedback": {"total_feedback": 0, "accuracy_ratings": {"accurate": 0, "inaccurate": 0, "unsure": 0, "other": 0}, "feedback_by_date": {}, "response_quality": {"helpful": 0, "not_helpful": 0}},
+                "tokens": {"total_input": 0, "total_output": 0, "calls": 0, "by_date": {}, "by_topic": {}, "by_language": {}, "by_stage": {}, "top_users": []}
             }
             return jsonify(empty_data), 200
 
-
-        # Read each file, expecting a JSON array inside
-        for event_file in event_files:
-            try:
-                # Use read_json helper, expecting a list
-                file_events = read_json(event_file, default=None) # Default to None to detect read errors
-
-                if file_events is None:
-                    logger.error(f"Failed to read or parse JSON array from {event_file}")
-                    continue # Skip this file if reading failed
-
-                if isinstance(file_events, list):
-                    # EXTEND the main list with the list from the file
-                    valid_events_in_file = []
-                    for event in file_events:
-                        if isinstance(event, dict) and 'timestamp' in event and 'event_type' in event:
-                            valid_events_in_file.append(event)
-                        else:
-                            logger.warning(f"Skipping invalid event structure within {event_file}: {str(event)[:100]}...")
-                    raw_events.extend(valid_events_in_file)
-                else:
-                    logger.warning(f"Content of {event_file} is not a JSON list. Skipping file.")
-
-            except Exception as e: # Catch potential errors during read_json or processing
-                logger.error(f"Could not process event file {event_file}: {e}")
-
-
-        # --- Process Events into Desired Structure (Logic remains largely the same) ---
-        conversations: Dict[str, Any] = {
-            "total_conversations": 0,
-            "conversations_by_date": {}, # Will contain daily data for the whole year
-            "language_distribution": {},
-            "topic_distribution": {},
-            "response_times": [],
-            "bias_metrics": {"bias_detected_count": 0, "bias_prevented_count": 0, "bias_types": {}},
-        }
-        feedback: Dict[str, Any] = {
-            "total_feedback": 0,
-            "accuracy_ratings": {"accurate": 0, "inaccurate": 0, "unsure": 0, "other": 0},
-            "feedback_by_date": {}, # Daily data for the whole year
-            "response_quality": {"helpful": 0, "not_helpful": 0},
-        }
-        users_seen_in_year = set()
-
-        for event in raw_events:
-            event_type = event.get("event_type")
-            event_data = event.get("data", {})
-            try:
-                # Use date part only for aggregation keys
-                event_date = datetime.fromisoformat(event["timestamp"]).strftime(Config.ANALYTICS_DATE_FORMAT)
-            except (KeyError, ValueError):
-                 logger.warning(f"Skipping event with invalid timestamp: {event.get('id', 'N/A')}")
-                 continue # Skip event if timestamp is bad
-
-            # User Tracking for the year
-            user_id = event_data.get("user_id")
-            if user_id: users_seen_in_year.add(user_id)
-
-            # Conversation Aggregation
-            if event_type == "chat":
-                conversations["total_conversations"] += 1
-                conversations["conversations_by_date"][event_date] = conversations["conversations_by_date"].get(event_date, 0) + 1
-                lang = event_data.get("language", "Unknown")
-                conversations["language_distribution"][lang] = conversations["language_distribution"].get(lang, 0) + 1
-                topic = event_data.get("topic", "general")
-                conversations["topic_distribution"][topic] = conversations["topic_distribution"].get(topic, 0) + 1
-                response_time = event_data.get("response_time_sec") or event_data.get("response_time")
-                if response_time is not None:
-                    try: # Add try-except for float conversion
-                       conversations["response_times"].append(float(response_time))
-                    except ValueError:
-                       logger.warning(f"Skipping invalid response_time value: {response_time}")
-
-
-            # Bias Aggregation
-            elif event_type == "bias_detected":
-                metrics = conversations["bias_metrics"]
-                metrics["bias_detected_count"] += 1
-                if event_data.get("prevented"): metrics["bias_prevented_count"] += 1
-                b_type = event_data.get("bias_type", "other")
-                metrics["bias_types"][b_type] = metrics["bias_types"].get(b_type, 0) + 1
-
-            # Feedback Aggregation
-            elif event_type == "feedback":
-                feedback["total_feedback"] += 1
-                feedback["feedback_by_date"][event_date] = feedback["feedback_by_date"].get(event_date, 0) + 1
-                accuracy = event_data.get("accuracy_rating", "unsure").lower()
-                if accuracy in feedback["accuracy_ratings"]:
-                     feedback["accuracy_ratings"][accuracy] += 1
-                else:
-                     feedback["accuracy_ratings"]["other"] += 1
-                if event_data.get("helpful") is True:
-                    feedback["response_quality"]["helpful"] += 1
-                elif event_data.get("helpful") is False:
-                    feedback["response_quality"]["not_helpful"] += 1
-
-        # --- Calculate Derived Metrics (Logic remains the same) ---
-        if conversations["total_conversations"] > 0:
-            total_feedback = feedback["total_feedback"]
-            accurate = feedback["accuracy_ratings"].get("accurate", 0) # Use .get with default
-            inaccurate = feedback["accuracy_ratings"].get("inaccurate", 0)
-            rated_total = accurate + inaccurate
-            feedback["calculated_accuracy_rate"] = (accurate / rated_total * 100) if rated_total > 0 else None
-        else:
-            feedback["calculated_accuracy_rate"] = None
-
-        detected = conversations["bias_metrics"].get("bias_detected_count", 0)
-        prevented = conversations["bias_metrics"].get("bias_prevented_count", 0)
-        if detected > 0:
-            conversations["bias_metrics"]["prevention_rate"] = (prevented / detected * 100)
-        else:
-             conversations["bias_metrics"]["prevention_rate"] = None
-
-        # --- Prepare final response ---
-        user_metrics = {
-            "total_users": len(users_seen_in_year), # Users seen in the selected year
-            "active_users": len(users_seen_in_year), # Approximation for the year
-            "new_users": None,
-            "retention_rate": None
-        }
-
-        # Add last updated timestamps
-        last_update_time = datetime.now().isoformat()
-        conversations["last_updated"] = last_update_time
-        feedback["last_updated"] = last_update_time
-
-        # Limit response times array size
-        if len(conversations.get("response_times", [])) > 2000: # Allow more for yearly view
-             conversations["response_times"] = conversations["response_times"][-2000:]
-
-        # Final structure
-        final_data: AnalyticsData = {
-            "conversations": conversations,
-            "users": user_metrics,
-            "feedback": feedback
-        }
-
         return jsonify(final_data), 200
 
+    except SchedulerBusy:
+        raise
     except Exception as e:
         logger.error(f"Error generating analytics data: {e}", exc_info=True)
         return jsonify({"error": "Failed to generate analytics data"}), 500
 
-@app.route('/admin/feedback-count', methods=['GET'])
+@api.route('/admin/analytics/stream', methods=['GET'])
+def stream_analytics():
+    """Server-sent events with the current year's analytics: a `snapshot` event
+    (the /admin/analytics payload under `data`), then `delta` events whose
+    `patch` is a JSON merge patch of the changed values and whose
+    `response_times` are appended to the snapshot's list (keep the last 2000).
+    """
+    subscriber, snapshot = live_analytics.subscribe()
+    return Response(live_analytics.events(subscriber, snapshot, Config.ANALYTICS_STREAM_SECONDS), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/admin/analytics/query', methods=['GET'])
+@response_cache.cached(_analytics_version)
+def query_analytics():
+    """Ad-hoc aggregation over analytics events, e.g.
+    ?start=2026-01-01&end=2026-03-31&group_by=topic,language&agg=count,sum:tokens_input&filter=event_type:chat&filter=language:English|Hindi
+    Also accepts table=events|stages, order_by=<aggregate key> and limit.
+    """
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else date.today()
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else date(end.year, 1, 1)
+        filters: Dict[str, List[str]] = {}
+        for spec in request.args.getlist('filter'):
+            column, _, values = spec.partition(':')
+            filters.setdefault(column, []).extend(values.split('|'))
+        rows = scheduler.call(
+            'analytics', admin_tasks.analytics_query,
+            start, end,
+            [col for col in request.args.get('group_by', '').split(',') if col],
+            [agg for agg in request.args.get('agg', 'count').split(',') if agg],
+            filters,
+            request.args.get('table', 'events'),
+            request.args.get('order_by'),
+            request.args.get('limit', type=int),
+            timeout=Config.ADMIN_JOB_TIMEOUT,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"start": start.isoformat(), "end": end.isoformat(), "rows": rows}), 200
+
+# --- Streaming Export ---
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+def _export_pages(source: str, export_format: str, params: Dict[str, Any], after: Optional[str]):
+    """The export's chunks, serialized a page at a time in the admin work pool (see admin_tasks.export_page).
+
+    The first page is fetched before the response starts, so a bad cursor or
+    filter still gets a 400 and a full queue a 503. Once the response has
+    started neither can be sent: a later page waits for room in a full queue
+    (up to ADMIN_JOB_TIMEOUT), and if it still cannot be produced the export
+    ends with an explicit marker (see export.incomplete_chunk) instead of
+    looking complete.
+    """
+    chunks, after = scheduler.call('export', admin_tasks.export_page, source, export_format, params, after, True,
+                                   timeout=Config.ADMIN_JOB_TIMEOUT)
+
+    def next_page(after: str) -> Tuple[List[bytes], Optional[str]]:
+        deadline = time.monotonic() + Config.ADMIN_JOB_TIMEOUT
+        while True:
+            try:
+                return scheduler.call('export', admin_tasks.export_page, source, export_format, params, after, False,
+                                      timeout=max(deadline - time.monotonic(), 0))
+            except SchedulerBusy as e:
+                if time.monotonic() + e.retry_after > deadline:
+                    raise
+                time.sleep(e.retry_after)
+
+    def pages(chunks: List[bytes], after: Optional[str]):
+        yield from chunks
+        while after:
+            try:
+                chunks, next_after = next_page(after)
+            except Exception as e:
+                logger.error(f"{source} export stopped after cursor {after}: {e!r}")
+                yield incomplete_chunk(export_format, str(e) or type(e).__name__, after)
+                return
+            yield from chunks
+            after = next_after
+
+    return pages(chunks, after)
+
+def _export_response(chunks, export_format: str, filename: str) -> Response:
+    """Streams an export's chunks as NDJSON or CSV, gzip'ed if the client accepts it.
+
+    The generators need nothing from the request context (so no
+    stream_with_context, which would run the teardown handlers twice).
+    """
+    headers = {'Content-Disposition': f'attachment; filename="{filename}.{export_format}"',
+               'Cache-Control': 'no-store', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = gzip_chunks(chunks, Config.EXPORT_GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(chunks, mimetype=EXPORT_FORMATS[export_format], headers=headers)
+
+@api.route('/admin/export/events', methods=['GET'])
+def export_events():
+    """Streams raw analytics events, oldest first, e.g.
+    ?start=2026-01-01&end=2026-12-31&format=csv&type=chat,feedback
+    Each record carries a cursor (`_cursor` / the `cursor` column); pass the
+    last one received as ?after= to resume an interrupted export.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "'format' must be 'ndjson' or 'csv'"}), 400
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else date.today()
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else date(end.year, 1, 1)
+        after = request.args.get('after') or None
+        if after:
+            parse_event_cursor(after)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    event_types = [t for t in request.args.get('type', '').split(',') if t] or None
+    chunks = _export_pages('events', export_format, {'start': start, 'end': end, 'event_types': event_types}, after)
+    return _export_response(chunks, export_format, f"events_{start.isoformat()}_{end.isoformat()}")
+
+@api.route('/admin/export/feedback', methods=['GET'])
+def export_feedback():
+    """Streams full feedback records, oldest first. Takes the /admin/feedback
+    filters (status, feedbackType, from, to), format=ndjson|csv and ?after=<cursor>.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "'format' must be 'ndjson' or 'csv'"}), 400
+    filters = {
+        'status': request.args.get('status') or None,
+        'feedback_type': request.args.get('feedbackType') or None,
+        'since': request.args.get('from') or None,
+        'until': request.args.get('to') or None,
+    }
+    try:
+        chunks = _export_pages('feedback', export_format, filters, request.args.get('after') or None)
+    except ValueError as e: # Malformed cursor or date
+        return jsonify({"error": str(e)}), 400
+    return _export_response(chunks, export_format, "feedback")
+
+@api.route('/admin/feedback-count', methods=['GET'])
 def get_feedback_count():
-    """Returns the total number of feedback submissions."""
+    """Returns the total number of feedback submissions (and the per-status breakdown)."""
     try:
-        feedback_list = read_json(Config.FEEDBACK_LIST_FILE, default=[])
-        count = len(feedback_list) if isinstance(feedback_list, list) else 0
-        return jsonify({"count": count}), 200
+        status_counts = data_store.feedback_status_counts()
+        return jsonify({"count": sum(status_counts.values()), "status_counts": status_counts}), 200
     except Exception as e:
         logger.error(f"Error getting feedback count: {e}")
         return jsonify({"error": "Failed to get feedback count"}), 500
 
 # --- Global Error Handler ---
-@app.errorhandler(Exception)
+@api.app_errorhandler(SchedulerBusy)
+def handle_scheduler_busy(e):
+    """The admin work pool's queue for this kind of job is full."""
+    metrics.inc("errors_total", where="admin_pool_busy")
+    return jsonify({"error": "The server is busy with other admin work; try again shortly."}), 503, {'Retry-After': str(e.retry_after)}
+
+@api.app_errorhandler(Exception)
 def handle_exception(e):
     """Logs unhandled exceptions and returns a generic error response."""
     tb_str = traceback.format_exc()
     logger.error(f"Unhandled Exception: {e}\nTraceback:\n{tb_str}")
+    metrics.inc("errors_total", where="unhandled")
     # Avoid exposing internal details in production
     error_message = "An internal server error occurred."
     # For development, you might want more detail:
@@ -1296,7 +1736,7 @@ def ensure_initial_files():
     # Initialize empty files if they don't exist
     files_to_init = [
         (Config.SESSIONS_FILE, []),
-        (Config.JOBS_FILE, [], ['id', 'title', 'company', 'location', 'type', 'deadline', 'description', 'applyUrl', 'verified', 'category', 'source', 'diversity_focus']), # CSV needs headers
+        (Config.JOBS_FILE, [], JOB_FIELDNAMES), # CSV needs headers
         (Config.TRUSTED_SOURCES_FILE, []),
         (Config.FEEDBACK_LIST_FILE, [])
     ]
@@ -1309,7 +1749,7 @@ def ensure_initial_files():
             else:
                 write_json(file_path, default_data)
 
-@app.route('/api/classify-topic', methods=['POST'])
+@api.route('/api/classify-topic', methods=['POST'])
 def classify_topic():
     """Classifies the topic of a conversation using Gemini."""
     try:
@@ -1318,10 +1758,9 @@ def classify_topic():
             return jsonify({'error': 'No message provided'}), 400
 
         message = data['message']
-        
-        # Configure Gemini
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-pro')
+        user_id = data.get('user_id')
+        if not is_anonymous(user_id):
+            g.token_user = str(user_id)
         
         # Create the classification prompt
         prompt = f"""
@@ -1339,16 +1778,13 @@ def classify_topic():
         Respond with only the topic name in lowercase, nothing else.
         """
 
-        # Generate classification
-        response = model.generate_content(prompt)
-        topic = response.text.strip().lower()
-        print(topic)
-        # Validate the topic is one of the expected values
-        # valid_topics = {'Career', 'education', 'skill development', 'interview prep', 
-        #                'entrepreneurship', 'mentorship', 'general'}
-        # if topic not in valid_topics:
-        #     topic = 'general'  # Default to general if unexpected topic returned
-        
+        # Keyword rules first, then models up the ladder until one answers with a known topic
+        try:
+            topic, rung = router.run('classify_topic', prompt, parse_topic, lambda: topic_heuristic(message))
+        except RoutingError:
+            topic, rung = 'general', None # Default to general if no rung returned a known topic
+        log_analytics_event("llm_usage", {"endpoint": "classify_topic", "topic": topic, "routed_to": rung, "user_id": user_id or 'anonymous', "tokens": summarize_llm_usage(g.llm_calls)})
+
         return jsonify({
             'topic': topic,
             'original_message': message
@@ -1358,9 +1794,20 @@ def classify_topic():
         logger.error(f"Error classifying topic: {str(e)}")
         return jsonify({'error': 'Failed to classify topic'}), 500
 
-if __name__ == "__main__":
-    ensure_initial_files() # Ensure directories/files exist before starting
-    # Note: Vector store initialization now happens eagerly outside the if __name__ block
-    if vector_collection is None:
-         logger.warning("Running Flask app without a functional vector store. RAG features will fail.")
-    app.run(host="0.0.0.0", port=5000, debug=os.getenv("FLASK_DEBUG", "False").lower() == "true") # Enable debug based on env var
\ No newline at end of file
+def init_data_store():
+    """Creates the data directories and default files, and imports the data files into a new database."""
+    ensure_initial_files()
+    data_store.import_from_files(Config.JOBS_FILE, Config.SESSIONS_FILE, Config.TRUSTED_SOURCES_FILE, Config.FEEDBACK_DIR)
+
+def create_app() -> Flask:
+    """Builds the Flask app. Gemini, Firestore and the vector store are connected on first use."""
+    init_data_store() # Ensure directories/files exist before serving
+
+    flask_app = Flask(__name__)
+    flask_app.json.compact = True # No pretty-printing: smaller bodies, less CPU per response
+    CORS(flask_app, origins=Config.CORS_ORIGINS, supports_credentials=True)
+    flask_app.register_blueprint(api)
+    return flask_app
+
+if __name__ == "__main__": # Development server; in production `gunicorn wsgi:app`
+    create_app().run(host="0.0.0.0", port=5000, debug=os.getenv("FLASK_DEBUG", "False").lower() == "true") # Enable debug based on env var
\ No newline at end of file
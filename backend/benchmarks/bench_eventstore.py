@@ -0,0 +1,116 @@
+"""Storage size and query latency: JSON day files vs the columnar event store.
+
+Writes a synthetic year of analytics events, then for each query times:
+  * json     - parse the year's day files and aggregate in Python (what
+               /admin/analytics did before the columnar store);
+  * cold     - the columnar store reading compacted .col files from disk;
+  * warm     - the same with the decoded days already in memory.
+Compaction time and on-disk sizes are reported too.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_eventstore [--scale small|medium|large]
+"""
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from datetime import date
+from pathlib import Path
+
+from benchmarks.corpora import SCALES, write_corpus
+from eventstore import EventStore
+
+ROUNDS = 3
+
+
+def _json_topic_counts(files):
+    counts = {}
+    for path in files:
+        for event in json.loads(path.read_text(encoding="utf-8")):
+            if event.get("event_type") == "chat":
+                topic = event["data"].get("topic", "general")
+                counts[topic] = counts.get(topic, 0) + 1
+    return counts
+
+
+def _json_tokens_by_user(files):
+    totals = {}
+    for path in files:
+        for event in json.loads(path.read_text(encoding="utf-8")):
+            usage = event.get("data", {}).get("tokens")
+            if isinstance(usage, dict):
+                user = event["data"].get("user_id") or "anonymous"
+                totals[user] = totals.get(user, 0) + int(usage.get("input", 0)) + int(usage.get("output", 0))
+    return totals
+
+
+def _json_daily_chats_in_q1(files, year):
+    counts = {}
+    for path in files:
+        if path.stem[len("events_"):] > f"{year}-03-31":
+            continue
+        for event in json.loads(path.read_text(encoding="utf-8")):
+            if event.get("event_type") == "chat" and event["data"].get("language") in ("Hindi", "Tamil"):
+                day = event["timestamp"][:10]
+                counts[day] = counts.get(day, 0) + 1
+    return counts
+
+
+def _median_ms(fn):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix="asha-eventstore-"))
+    try:
+        write_corpus(data_dir, args.scale)
+        analytics_dir = data_dir / "analytics"
+        files = sorted(analytics_dir.glob("events_*.json"))
+        year = date.today().year
+        start, end = date(year, 1, 1), date(year, 12, 31)
+
+        started = time.perf_counter()
+        EventStore(analytics_dir, analytics_dir / "columnar").compact()
+        compact_seconds = time.perf_counter() - started
+        json_bytes = sum(path.stat().st_size for path in files)
+        columnar_bytes = sum(path.stat().st_size for path in (analytics_dir / "columnar").glob("*.col"))
+
+        queries = (
+            ("chats by topic", lambda: _json_topic_counts(files),
+             lambda store: store.query(start, end, group_by=["topic"], filters={"event_type": ["chat"]})),
+            ("tokens by user", lambda: _json_tokens_by_user(files),
+             lambda store: store.query(start, end, group_by=["user_id"], aggregates=["sum:tokens_input", "sum:tokens_output"],
+                                       filters={"has_tokens": ["true"]})),
+            ("Q1 daily Hindi/Tamil chats", lambda: _json_daily_chats_in_q1(files, year),
+             lambda store: store.query(start, date(year, 3, 31), group_by=["date"],
+                                       filters={"event_type": ["chat"], "language": ["Hindi", "Tamil"]})),
+        )
+
+        print(f"{args.scale}: {SCALES[args.scale]['events']:,} events in {len(files)} day files")
+        print(f"storage: json {json_bytes / 1e6:.2f} MB, columnar {columnar_bytes / 1e6:.2f} MB "
+              f"({json_bytes / max(columnar_bytes, 1):.1f}x smaller), compaction {compact_seconds:.2f}s")
+        print(f"{'query':<28}{'json':>10}{'cold':>10}{'warm':>10}   (median ms of {ROUNDS})")
+        for label, json_query, store_query in queries:
+            json_ms = _median_ms(json_query)
+            cold_ms = _median_ms(lambda: store_query(EventStore(analytics_dir, analytics_dir / "columnar")))
+            warm_store = EventStore(analytics_dir, analytics_dir / "columnar")
+            store_query(warm_store)
+            warm_ms = _median_ms(lambda: store_query(warm_store))
+            print(f"{label:<28}{json_ms:>10.1f}{cold_ms:>10.1f}{warm_ms:>10.1f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Throughput and memory of the streaming export endpoints.
+
+Writes a synthetic corpus, then pulls /admin/export/events (NDJSON, CSV,
+gzip'ed CSV) and /admin/export/feedback through the Flask test client one
+chunk at a time, like a slow client would. For each export it reports the
+records and bytes sent, throughput, and the worker's RSS before the export
+and at its peak. The peak should stay flat as the corpus grows: nothing is
+materialized beyond one read buffer and one output chunk.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_export [--scale small|medium|large] [--feedback N]
+"""
+import os
+import time
+import zlib
+import shutil
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpora import SCALES, write_corpus
+from benchmarks.loadtest import _rss_mb
+
+SAMPLE_EVERY = 64 # chunks between RSS samples
+
+
+def _export(client, path, headers=None):
+    started = time.perf_counter()
+    before = peak = _rss_mb()
+    response = client.get(path, headers=headers or {}, buffered=False)
+    assert response.status_code == 200, response.status_code
+    gunzip = zlib.decompressobj(31) if response.headers.get("Content-Encoding") == "gzip" else None
+    sent = lines = 0
+    for i, chunk in enumerate(response.response):
+        sent += len(chunk)
+        lines += (gunzip.decompress(chunk) if gunzip else chunk).count(b"\n")
+        if i % SAMPLE_EVERY == 0:
+            peak = max(peak, _rss_mb())
+    response.close()
+    return {"bytes": sent, "lines": lines, "seconds": time.perf_counter() - started,
+            "rss_before": before, "rss_peak": max(peak, _rss_mb())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    parser.add_argument("--feedback", type=int, default=None, help="feedback records to insert (default: events / 10)")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix="asha-export-"))
+    try:
+        write_corpus(data_dir, args.scale)
+        # The app reads its configuration at import time
+        os.environ["ASHA_DATA_DIR"] = str(data_dir)
+        os.environ["EXTERNAL_INGEST_IN_PROCESS"] = "false"
+        import app as asha
+        client = asha.create_app().test_client()
+        logging.disable(logging.CRITICAL)
+
+        feedback = args.feedback if args.feedback is not None else SCALES[args.scale]["events"] // 10
+        for i in range(feedback):
+            asha.data_store.save_feedback({
+                "id": f"fb{i}", "feedbackType": "response", "status": "pending", "timestamp": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.{i:06d}",
+                "preview": "The answer listed a programme that closed last year.", "messageContent": "x" * 400,
+            })
+
+        window = "start=2000-01-01&end=2100-12-31"
+        exports = (
+            ("events ndjson", f"/admin/export/events?{window}", None),
+            ("events csv", f"/admin/export/events?{window}&format=csv", None),
+            ("events csv+gzip", f"/admin/export/events?{window}&format=csv", {"Accept-Encoding": "gzip"}),
+            ("feedback ndjson", "/admin/export/feedback", None),
+        )
+        print(f"{args.scale}: {SCALES[args.scale]['events']:,} events, {feedback:,} feedback records")
+        print(f"{'export':<18}{'lines':>10}{'MB':>9}{'MB/s':>8}{'rows/s':>10}{'rss MB':>9}{'peak MB':>9}")
+        for label, path, headers in exports:
+            r = _export(client, path, headers)
+            print(f"{label:<18}{r['lines']:>10,}{r['bytes'] / 1e6:>9.1f}{r['bytes'] / 1e6 / r['seconds']:>8.1f}"
+                  f"{r['lines'] / r['seconds']:>10,.0f}{r['rss_before']:>9.1f}{r['rss_peak']:>9.1f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
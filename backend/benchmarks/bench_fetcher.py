@@ -0,0 +1,92 @@
+"""Trusted-source fetcher against local HTTP stub servers: sequential vs
+concurrent cold fetch, conditional revalidation (304s) and cached reads.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_fetcher
+"""
+import time
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+import requests
+
+from fetcher import ContentFetcher
+
+LATENCY = 0.2 # Simulated server think time per request
+HOSTS = 6
+PAGES_PER_HOST = 3
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    hits = {"200": 0, "304": 0}
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        body = (f"<html><head><title>Stub {self.server.server_port}{self.path}</title>"
+                f"<meta name=\"description\" content=\"Page {self.path}\"></head><body>hello</body></html>").encode()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            _StubHandler.hits["304"] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        _StubHandler.hits["200"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_servers():
+    servers = []
+    for _ in range(HOSTS):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def main():
+    servers = _start_servers()
+    urls = [f"http://127.0.0.1:{server.server_port}/page{i}" for server in servers for i in range(PAGES_PER_HOST)]
+
+    started = time.perf_counter()
+    for url in urls: # What a naive loop over trusted_sources.json costs
+        requests.get(url, timeout=10)
+    sequential = time.perf_counter() - started
+
+    fetcher = ContentFetcher(Path(tempfile.mkdtemp()), max_workers=8, per_host_concurrency=2, per_host_interval=0.0)
+    started = time.perf_counter()
+    fetcher.refresh_all(urls)
+    concurrent = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fetcher.refresh_all(urls, force=True)
+    revalidate = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(100):
+        entries = fetcher.get_many(urls)
+    cached = (time.perf_counter() - started) / 100
+
+    assert all(entry and entry.get("title") for entry in entries.values())
+    print(f"{len(urls)} pages on {HOSTS} hosts, {LATENCY * 1000:.0f} ms server latency")
+    print(f"sequential cold fetch : {sequential * 1000:8.1f} ms")
+    print(f"concurrent cold fetch : {concurrent * 1000:8.1f} ms")
+    print(f"conditional refresh   : {revalidate * 1000:8.1f} ms  (304s: {_StubHandler.hits['304']})")
+    print(f"cached get_many       : {cached * 1000:8.3f} ms")
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Overhead of the sampling profiler on CPU-bound request threads.
+
+Runs the prompt builder (pure Python, like the hot part of /chat) on several
+threads with the profiler off, on with every request tracked, and on at a
+10% request sample rate, and reports throughput overhead and the sampler's
+own CPU use. Fully CPU-bound threads are the worst case: real /chat requests
+spend most of their time waiting on Gemini with the GIL released.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_profiler
+"""
+import time
+import statistics
+import threading
+
+from profiler import SamplingProfiler
+from prompting import make_rag_prompt
+
+THREADS = 4
+SECONDS = 1.0
+PROMPTS_PER_REQUEST = 20 # ~0.5 ms of pure-Python work per simulated request
+ROUNDS = 7 # Configurations are interleaved and medians reported, since run-to-run noise is several %
+
+PASSAGES = [(
+    "Job Title: Data Analyst\nCompany: Example Corp\nLocation: Bengaluru\nDescription: " + "Responsibilities include analysis. " * 40,
+    {"source_type": "job", "title": f"Data Analyst {i}", "company": "Example Corp", "location": "Bengaluru"},
+) for i in range(5)]
+HISTORY = [{"role": "user" if i % 2 == 0 else "assistant", "content": "Tell me about remote data roles. " * 10} for i in range(12)]
+
+
+def _work(profiler, stop, counts, index):
+    while not stop.is_set():
+        tracked = profiler.enter("/chat") if profiler else False
+        for _ in range(PROMPTS_PER_REQUEST):
+            make_rag_prompt("remote data analyst jobs", PASSAGES, "English", "career", HISTORY, token_budget=2000)
+        if tracked:
+            profiler.exit()
+        counts[index] += 1
+
+
+def _run(profiler=None):
+    stop = threading.Event()
+    counts = [0] * THREADS
+    threads = [threading.Thread(target=_work, args=(profiler, stop, counts, i)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / SECONDS
+
+
+CONFIGS = (
+    ("profiler off", None, None),
+    ("all requests, 5 ms", 1.0, 0.005),
+    ("all requests, 1 ms", 1.0, 0.001),
+    ("10% of requests, 5 ms", 0.1, 0.005),
+)
+
+
+def main():
+    results = {label: [] for label, _, _ in CONFIGS}
+    loads = {label: [] for label, _, _ in CONFIGS}
+    for _ in range(ROUNDS):
+        for label, rate, interval in CONFIGS:
+            if rate is None:
+                results[label].append(_run())
+                continue
+            profiler = SamplingProfiler(interval=interval)
+            profiler.start(SECONDS + 5, sample_rate=rate)
+            results[label].append(_run(profiler))
+            loads[label].append(profiler.stop()['sampler_load'])
+
+    baseline = statistics.median(results["profiler off"])
+    print(f"{THREADS} threads, {PROMPTS_PER_REQUEST} prompt builds per request, median of {ROUNDS} x {SECONDS:g}s")
+    for label, _, _ in CONFIGS:
+        throughput = statistics.median(results[label])
+        line = f"{label:<22}: {throughput:9.0f} requests/s"
+        if loads[label]:
+            overhead = (baseline - throughput) / baseline * 100
+            line += f"  overhead {overhead:5.1f}%  sampler CPU {statistics.median(loads[label]) * 100:4.1f}% of a core"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Micro-benchmark: per-request RAG prompt construction, before and after
+precomputing snippets/context lines at ingest time.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_prompt
+"""
+import re
+import timeit
+from typing import List, Dict, Any, Tuple
+
+from prompting import make_rag_prompt, estimate_tokens, render_snippet, render_job_context_line, render_session_context_line
+
+
+def legacy_make_rag_prompt(
+    query: str,
+    passages_with_metadata: List[Tuple[str, Dict[str, Any]]],
+    language: str = "English",
+    topic: str = "general"
+    # external_context: Optional[str] = None # Placeholder for scraped content
+) -> str:
+    """The pre-change builder, copied verbatim from app.py: regex + slicing + `+=` on every request."""
+
+    # --- Base Persona and Instructions ---
+    base_prompt = f"""
+You are Asha, a helpful and empowering AI assistant focused on women's career development in India. Your goal is to provide accurate, unbiased, encouraging, and relevant information based on the provided context and the user's query. Maintain a positive, supportive, and professional tone. Avoid stereotypes and biases. **Respond ONLY in {language}.**
+"""
+    suggest_resources_instruction = "\n\nFinally, suggest 1-2 additional relevant resources (like specific website sections, types of workshops, or relevant organizations from trusted sources if applicable) or next steps the user could take."
+
+    # --- Topic-Specific Handling ---
+    context_str = ""
+    specific_instruction = ""
+
+    # Limit results displayed
+    max_results_to_display = 3
+    relevant_items = passages_with_metadata[:max_results_to_display]
+
+    if topic == "career" and relevant_items:
+        context_str += "**Relevant Job Opportunities Found:**\n"
+        for i, (doc, meta) in enumerate(relevant_items):
+            title = meta.get('title', 'N/A')
+            company = meta.get('company', 'N/A')
+            location = meta.get('location', 'N/A')
+            apply_url = meta.get('apply_url', '') # Get URL, default empty
+            # Extract description snippet carefully
+            desc_match = re.search(r"Description:\s*(.*)", doc, re.IGNORECASE | re.DOTALL)
+            description_snippet = (desc_match.group(1).strip()[:150] + "...") if desc_match and desc_match.group(1).strip() else "Details available."
+            context_str += f"{i+1}. **{title}** at {company} ({location})\n   *Description:* {description_snippet}\n"
+            # Only add apply link if URL is valid
+            if apply_url and apply_url != '#':
+                context_str += f"   *Apply here:* {apply_url}\n"
+            else:
+                context_str += "   *Application link not provided.*\n"
+        specific_instruction = f"Based on the user's query '{query}', present the {len(relevant_items)} most relevant job opportunities listed above. Briefly mention the company and location. Include the application link if available. If the query asks for something specific not covered, address that too."
+    elif topic == "session" and relevant_items: # Handle sessions/events (normalized topic)
+        context_str += "**Relevant Sessions/Events Found:**\n"
+        for i, (doc, meta) in enumerate(relevant_items):
+            title = meta.get('title', 'N/A')
+            date = meta.get('date', 'N/A')
+            location = meta.get('location', 'N/A')
+            register_url = meta.get('register_url', '') # Get URL, default empty
+            desc_match = re.search(r"Description:\s*(.*)", doc, re.IGNORECASE | re.DOTALL)
+            description_snippet = (desc_match.group(1).strip()[:150] + "...") if desc_match and desc_match.group(1).strip() else "Details available."
+            context_str += f"{i+1}. **{title}** ({location} on {date})\n   *Details:* {description_snippet}\n"
+            # Only add register link if URL is valid
+            if register_url and register_url != '#':
+                 context_str += f"   *Register here:* {register_url}\n"
+            else:
+                 context_str += "   *Registration link not provided.*\n"
+        specific_instruction = f"Based on the user's query '{query}', present the {len(relevant_items)} most relevant sessions/events listed above. Briefly mention the date and location. Include the registration link if available. If the query asks for something specific not covered, address that too."
+    else: # General topic or no specific results found for job/session
+        if relevant_items:
+             context_str += "**Relevant Information Found:**\n"
+             # Just use the document text for general context
+             context_str += "\n\n---\n\n".join([doc for doc, meta in relevant_items])
+        else:
+             context_str += "No specific documents found in the internal knowledge base matching the query."
+        specific_instruction = f"Answer the user's query '{query}' clearly and concisely using the provided context if relevant. If the context is insufficient or missing, use your general knowledge but clearly state this (e.g., 'Based on general knowledge,...')."
+        # Placeholder: Integrate external content if available
+        # if external_context:
+        #    context_str += "\n\n**Potentially Relevant External Information:**\n" + external_context
+
+    # --- Final Prompt Assembly ---
+    prompt = f"""{base_prompt}
+
+        **Context:**
+        {context_str}
+
+        **User Query:** "{query}"
+
+        **Instructions:**
+        1. {specific_instruction}
+        2. If no relevant information was found (context indicates this), acknowledge that and answer based on general knowledge if appropriate, stating that you couldn't find specific details in the knowledge base.
+        3. {suggest_resources_instruction}
+
+        **Answer (in {language}):**
+        """
+    return prompt
+
+
+def _synthetic_passages(description_length: int) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    description = ("Mentorship, flexible hours and a returnship track for women restarting careers. " * 400)[:description_length]
+    jobs, sessions = [], []
+    for i in range(5):
+        job = {'title': f"Engineer {i}", 'company': "TechCorp", 'location': "Remote", 'type': "Full-time",
+               'deadline': "2025-06-01", 'description': description, 'applyUrl': f"https://example.com/jobs/{i}"}
+        doc = (f"Job Title: {job['title']}\nCompany: {job['company']}\nLocation: {job['location']}\n"
+               f"Type: {job['type']}\nDeadline: {job['deadline']}\nDescription: {description}")
+        jobs.append((doc, {'source_type': 'job', 'apply_url': job['applyUrl'], 'title': job['title'],
+                           'company': job['company'], 'location': job['location'], 'description': description,
+                           'snippet': render_snippet(description), 'context_line': render_job_context_line(job)}))
+        session = {'title': f"Workshop {i}", 'date': "2025-05-01", 'time': "10:00", 'location': "Virtual",
+                   'description': description, 'registerUrl': f"https://example.com/events/{i}"}
+        doc = (f"Session Title: {session['title']}\nDate: {session['date']}\nTime: {session['time']}\n"
+               f"Location: {session['location']}\nDescription: {description}")
+        sessions.append((doc, {'source_type': 'session', 'registerUrl': session['registerUrl'], 'title': session['title'],
+                               'date': session['date'], 'location': session['location'], 'description': description,
+                               'snippet': render_snippet(description), 'context_line': render_session_context_line(session)}))
+    return {"career": jobs, "session": sessions}
+
+
+def main(number: int = 20000):
+    query = "Find me returnship roles in engineering"
+    for description_length in (200, 2000):
+        passages = _synthetic_passages(description_length)
+        for topic in ("career", "session"):
+            before = timeit.timeit(lambda: legacy_make_rag_prompt(query, passages[topic], topic=topic), number=number)
+            after = timeit.timeit(lambda: make_rag_prompt(query, passages[topic], topic=topic), number=number)
+            print(f"topic={topic:<8} desc_len={description_length:<5} "
+                  f"before={before / number * 1e6:7.2f} us  after={after / number * 1e6:7.2f} us  "
+                  f"speedup={before / after:4.2f}x")
+
+    # General topic: whole documents were sent unbounded before the token budget
+    for description_length in (2000, 20000):
+        passages = [(doc, {}) for doc, _ in _synthetic_passages(description_length)["career"]]
+        before = estimate_tokens(legacy_make_rag_prompt(query, passages, topic="general"))
+        after = estimate_tokens(make_rag_prompt(query, passages, topic="general"))
+        print(f"topic=general  desc_len={description_length:<5} before={before:6d} tok  after={after:6d} tok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Bytes per vector, query latency and recall@k of quantized snapshots.
+
+Builds one knowledge base snapshot per quantization method from the same
+synthetic 768-dimension embeddings (clustered, with a decaying variance
+spectrum like real text embeddings) and searches each with queries near
+random documents. Recall@k is measured against the exact float32 top k:
+  * codes    - top k by the approximate scores alone;
+  * rescored - what SnapshotIndex.search returns (codes, then float32
+               re-scoring of the best candidates).
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_quantization [--documents 50000] [--queries 200] [--k 10]
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.fakes import EMBEDDING_DIMENSIONS
+from kb_snapshot import SnapshotIndex, build_snapshot, CODES_FILE, VECTORS_FILE
+
+METHODS = ("none", "int8", "pq")
+CLUSTERS = 500
+
+
+def _synthetic_embeddings(n: int, rng: np.random.Generator) -> np.ndarray:
+    spectrum = 1 / np.sqrt(np.arange(1, EMBEDDING_DIMENSIONS + 1))
+    basis = np.linalg.qr(rng.standard_normal((EMBEDDING_DIMENSIONS, EMBEDDING_DIMENSIONS)))[0]
+    centers = (rng.standard_normal((CLUSTERS, EMBEDDING_DIMENSIONS)) * spectrum) @ basis
+    vectors = centers[rng.integers(0, CLUSTERS, n)] + 0.6 * (rng.standard_normal((n, EMBEDDING_DIMENSIONS)) * spectrum) @ basis
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _recall(found, exact) -> float:
+    return statistics.mean(len(set(f) & set(e)) / len(e) for f, e in zip(found, exact))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-subspaces", type=int, default=96)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vectors = _synthetic_embeddings(args.documents, rng)
+    queries = vectors[rng.integers(0, args.documents, args.queries)] + 0.02 * rng.standard_normal((args.queries, EMBEDDING_DIMENSIONS)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = [np.argsort(-(vectors @ q))[:args.k].tolist() for q in queries]
+    documents = [(f"doc_{i}", f"document {i}", {"source_type": "external", "row": i}) for i in range(args.documents)]
+    rows = {text: i for i, (_, text, _) in enumerate(documents)}
+
+    def embed_batch(texts):
+        return [vectors[rows[text]] for text in texts]
+
+    root = Path(tempfile.mkdtemp(prefix="asha-bench-quantization-"))
+    try:
+        print(f"{args.documents:,} documents x {EMBEDDING_DIMENSIONS} dimensions, {args.queries} queries, k={args.k}")
+        print(f"{'method':<8}{'bytes/vec':>10}{'scanned MB':>12}{'build s':>9}{'query ms':>10}{'recall codes':>14}{'recall rescored':>17}")
+        for method in METHODS:
+            started = time.perf_counter()
+            summary = build_snapshot(root / method, documents, embed_batch, "synthetic", batch_size=5_000, workers=1,
+                                     quantization=method, pq_subspaces=args.pq_subspaces)
+            build_seconds = time.perf_counter() - started
+            index = SnapshotIndex(root / method / summary["version"])
+            scanned = root / method / summary["version"] / (CODES_FILE if index.quantizer else VECTORS_FILE)
+
+            timings, found = [], []
+            for q in queries:
+                started = time.perf_counter()
+                results = index.search(q, n_results=args.k)
+                timings.append((time.perf_counter() - started) * 1000)
+                found.append([meta["row"] for _, meta in results])
+            codes_only = ([np.argsort(-index.quantizer.score(index.codes, q))[:args.k].tolist() for q in queries]
+                          if index.quantizer else found)
+            print(f"{method:<8}{index.bytes_per_vector:>10}{scanned.stat().st_size / 1e6:>12.1f}{build_seconds:>9.1f}"
+                  f"{statistics.median(timings):>10.2f}{_recall(codes_only, exact):>14.3f}{_recall(found, exact):>17.3f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
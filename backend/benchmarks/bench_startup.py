@@ -0,0 +1,56 @@
+"""Cold-start benchmark: how long a fresh interpreter takes to import and build
+the app (wsgi.py), i.e. what every gunicorn worker (re)start pays before
+serving requests.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_startup [runs]
+
+Exits non-zero if the median exceeds STARTUP_TARGET_SECONDS (default 2.0) or
+if starting the app pulled in a heavy SDK that should load lazily.
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TARGET_SECONDS = float(os.getenv("STARTUP_TARGET_SECONDS", "2.0"))
+LAZY_MODULES = ("chromadb", "google.generativeai", "firebase_admin", "knowledge_base")
+
+PROBE = f"""
+import sys, time, json
+started = time.perf_counter()
+import wsgi
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _run_once() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int = 5) -> int:
+    samples = [_run_once() for _ in range(runs)]
+    seconds = sorted(sample["seconds"] for sample in samples)
+    median = statistics.median(seconds)
+    loaded = sorted({module for sample in samples for module in sample["loaded"]})
+    print(f"import wsgi: runs={runs} min={seconds[0]:.3f}s median={median:.3f}s max={seconds[-1]:.3f}s "
+          f"target={TARGET_SECONDS:.2f}s")
+    if loaded:
+        print(f"FAIL: eagerly imported {', '.join(loaded)}")
+        return 1
+    if median > TARGET_SECONDS:
+        print("FAIL: cold start above target")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
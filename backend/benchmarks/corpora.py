@@ -0,0 +1,117 @@
+"""Synthetic, seeded jobs / sessions / analytics events / user profiles for the load tests."""
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any
+
+from filestore import atomic_write_csv, atomic_write_json
+from storage import JOB_FIELDNAMES
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"jobs": 200, "sessions": 50, "events": 5_000, "users": 100},
+    "medium": {"jobs": 2_000, "sessions": 500, "events": 50_000, "users": 1_000},
+    "large": {"jobs": 20_000, "sessions": 5_000, "events": 500_000, "users": 10_000},
+}
+
+ROLES = ["Data Analyst", "Software Engineer", "Product Manager", "UX Designer", "HR Business Partner", "Marketing Lead",
+         "Content Writer", "DevOps Engineer", "Sales Executive", "Financial Analyst", "Operations Manager", "Teacher"]
+COMPANIES = ["Infosys", "Razorpay", "Zomato", "Wipro", "Freshworks", "Swiggy", "TCS", "Nykaa", "Zoho", "Byju's"]
+CITIES = ["Bengaluru", "Mumbai", "Delhi", "Hyderabad", "Pune", "Chennai", "Remote", "Kolkata"]
+JOB_TYPES = ["Full-time", "Part-time", "Contract", "Internship", "Returnship"]
+SKILLS = ["SQL", "Python", "stakeholder management", "Figma", "negotiation", "Excel", "Kubernetes", "copywriting",
+          "people analytics", "financial modelling", "public speaking", "React"]
+SESSION_TOPICS = ["Returning to work after a break", "Negotiating your salary", "Intro to data science",
+                  "Leadership for first-time managers", "Building a startup", "Interview preparation bootcamp"]
+LANGUAGES = ["English", "Hindi", "Tamil", "Bengali", "Marathi"]
+TOPICS = ["career", "session", "general", "education", "mentorship"]
+
+QUERIES = [
+    "Find remote data analyst jobs", "Are there part-time jobs in Pune?", "How do I restart my career after a break?",
+    "Any workshops on salary negotiation this month?", "Show me product manager roles in Bengaluru",
+    "What skills do I need for a UX designer job?", "Returnship programs for women engineers",
+    "Upcoming leadership sessions", "Internships in marketing", "Tips for a technical interview",
+]
+
+
+def _description(rng: random.Random, role: str) -> str:
+    skills = ", ".join(rng.sample(SKILLS, 3))
+    return (f"We are looking for a {role} to join a diverse, flexible team. You will work with {skills}. "
+            f"Women returning from a career break are encouraged to apply. " + "The role offers mentoring and growth. " * rng.randint(1, 6))
+
+
+def generate_jobs(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    jobs = []
+    for i in range(n):
+        role = rng.choice(ROLES)
+        jobs.append({
+            "id": str(i + 1), "title": role, "company": rng.choice(COMPANIES), "location": rng.choice(CITIES),
+            "type": rng.choice(JOB_TYPES), "deadline": (datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 364))).strftime("%Y-%m-%d"),
+            "description": _description(rng, role), "applyUrl": f"https://example.com/jobs/{i + 1}", "verified": "true",
+            "category": rng.choice(["tech", "non-tech"]), "source": "synthetic", "diversity_focus": "women",
+        })
+    return jobs
+
+
+def generate_sessions(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [{
+        "id": str(i + 1), "title": rng.choice(SESSION_TOPICS), "date": (datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 364))).strftime("%Y-%m-%d"),
+        "time": f"{rng.randint(9, 18)}:00", "location": rng.choice(CITIES),
+        "description": "An interactive session with industry mentors. " * rng.randint(1, 5),
+        "registerUrl": f"https://example.com/sessions/{i + 1}", "category": rng.choice(["workshop", "webinar", "meetup"]),
+    } for i in range(n)]
+
+
+def generate_profiles(n: int, rng: random.Random) -> Dict[str, Dict[str, Any]]:
+    return {f"user{i}": {
+        "firstName": f"User{i}", "age": rng.randint(21, 55), "bio": "Career returner interested in tech.",
+        "careerGoals": f"Become a {rng.choice(ROLES)}", "domainsOfInterest": rng.sample(SKILLS, 2),
+        "industry": rng.choice(["IT", "Finance", "Education", "Retail"]), "yearsOfExperience": str(rng.randint(0, 20)),
+    } for i in range(n)}
+
+
+def _token_summary(rng: random.Random) -> Dict[str, Any]:
+    stages = {"bias_check": ("gemini-1.5-flash", rng.randint(60, 90), 3), "embed_query": ("models/embedding-001", rng.randint(5, 20), 0),
+              "answer": ("gemini-1.5-flash", rng.randint(800, 2000), rng.randint(100, 500))}
+    by_stage = {stage: {"model": model, "input": tokens_in, "output": tokens_out, "calls": 1} for stage, (model, tokens_in, tokens_out) in stages.items()}
+    return {"input": sum(s["input"] for s in by_stage.values()), "output": sum(s["output"] for s in by_stage.values()),
+            "calls": len(by_stage), "estimated": False, "by_stage": by_stage}
+
+
+def generate_events(n: int, users: int, rng: random.Random, end: datetime) -> Dict[str, List[Dict[str, Any]]]:
+    """Events spread over this year up to `end`, grouped into per-day files as log_analytics_event writes them."""
+    start = datetime(end.year, 1, 1)
+    span = max(1, int((end - start).total_seconds()))
+    days: Dict[str, List[Dict[str, Any]]] = {}
+    for i in range(n):
+        timestamp = start + timedelta(seconds=rng.randint(0, span))
+        user_id = f"user{rng.randrange(users)}" if rng.random() < 0.7 else "anonymous"
+        kind = rng.random()
+        if kind < 0.85:
+            event = {"event_type": "chat", "data": {
+                "query": rng.choice(QUERIES), "response_length": rng.randint(200, 2000), "response_time": round(rng.uniform(0.5, 6.0), 3),
+                "language": rng.choice(LANGUAGES), "user_id": user_id, "topic": rng.choice(TOPICS), "has_context": rng.random() < 0.9,
+                "tokens": _token_summary(rng)}}
+        elif kind < 0.97:
+            event = {"event_type": "feedback", "data": {
+                "feedback_id": f"fb{i}", "feedback_type": "response", "accuracy_rating": rng.choice(["accurate", "inaccurate", "unsure"]),
+                "helpful": rng.random() < 0.8, "user_id": user_id}}
+        else:
+            event = {"event_type": "bias_detected", "data": {
+                "query": "...", "prevented": True, "bias_type": rng.choice(["gender", "age", "other"]), "language": "English", "user_id": user_id}}
+        event.update({"id": f"evt{i}", "timestamp": timestamp.isoformat()})
+        days.setdefault(timestamp.strftime("%Y-%m-%d"), []).append(event)
+    return days
+
+
+def write_corpus(data_dir: Path, scale: str, seed: int = 42) -> Dict[str, Any]:
+    """Writes the data files the app imports on startup and returns the in-memory corpus."""
+    sizes = SCALES[scale]
+    rng = random.Random(seed)
+    jobs, sessions = generate_jobs(sizes["jobs"], rng), generate_sessions(sizes["sessions"], rng)
+    (data_dir / "analytics").mkdir(parents=True, exist_ok=True)
+    atomic_write_csv(data_dir / "job_listing_data.csv", jobs, JOB_FIELDNAMES)
+    atomic_write_json(data_dir / "session_details.json", sessions)
+    atomic_write_json(data_dir / "trusted_sources.json", [])
+    for day, events in generate_events(sizes["events"], sizes["users"], rng, datetime.now()).items():
+        atomic_write_json(data_dir / "analytics" / f"events_{day}.json", events)
+    return {"jobs": jobs, "sessions": sessions, "profiles": generate_profiles(sizes["users"], rng), "sizes": sizes}
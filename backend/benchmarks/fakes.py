@@ -0,0 +1,141 @@
+"""In-process stand-ins for Gemini and Firestore used by the load tests.
+
+FakeGemini implements the small part of the google.generativeai module the
+app uses (GenerativeModel(...).generate_content, embed_content, configure)
+with a configurable latency distribution and injected error rate. Calls
+sleep instead of computing, so, like the real network calls, they release
+the GIL and concurrency behaves as it does in production. Embeddings are
+deterministic hashed bag-of-words vectors, so retrieval returns sensible
+neighbours. FakeFirestore serves user profiles from a dict.
+"""
+import math
+import time
+import random
+import zlib
+import threading
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+EMBEDDING_DIMENSIONS = 768 # Same as models/embedding-001
+
+
+class FakeGeminiError(RuntimeError):
+    """An injected API failure (what a 429/503 from Gemini looks like to the app)."""
+
+
+class LatencyModel:
+    """Log-normal latency with the given median (ms) and spread, plus an error probability."""
+
+    def __init__(self, median_ms: float, sigma: float = 0.5, error_rate: float = 0.0, seed: int = 0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self, what: str):
+        with self._lock:
+            delay = self.median_ms * math.exp(self._rng.gauss(0, self.sigma)) / 1000 if self.median_ms > 0 else 0.0
+            failed = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            raise FakeGeminiError(f"503 Service Unavailable (injected) in {what}")
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def fake_embedding(text: str) -> List[float]:
+    vector = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    for word in text.lower().split():
+        h = zlib.crc32(word.strip(".,:;!?()*").encode("utf-8"))
+        vector[h % EMBEDDING_DIMENSIONS] += 1.0 if h & 1 << 31 else -1.0
+    norm = float(np.linalg.norm(vector))
+    return (vector / norm if norm else vector).tolist()
+
+
+class _FakeModel:
+    def __init__(self, gemini: "FakeGemini", name: str):
+        self.gemini = gemini
+        self.model_name = name
+
+    def generate_content(self, prompt: str):
+        self.gemini.calls[self.model_name] = self.gemini.calls.get(self.model_name, 0) + 1
+        self.gemini.generate_latency.wait(f"generate_content({self.model_name})")
+        if "Biased: Yes" in prompt:
+            text = "Biased: No"
+        elif "Classify the following message" in prompt:
+            text = "career"
+        else:
+            text = ("Here are some opportunities that match what you asked for. " * self.gemini.answer_sentences).strip()
+        usage = SimpleNamespace(prompt_token_count=_tokens(prompt), candidates_token_count=_tokens(text))
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeGemini:
+    """Drop-in for the `google.generativeai` module as returned by app.get_genai()."""
+
+    def __init__(self, generate_latency: LatencyModel, embed_latency: LatencyModel, answer_sentences: int = 12):
+        self.generate_latency = generate_latency
+        self.embed_latency = embed_latency
+        self.answer_sentences = answer_sentences
+        self.calls: Dict[str, int] = {}
+
+    def configure(self, **kwargs):
+        pass
+
+    def GenerativeModel(self, name: str) -> _FakeModel:
+        return _FakeModel(self, name)
+
+    def embed_content(self, model: str, content: Union[str, List[str]], task_type: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self.calls[model] = self.calls.get(model, 0) + 1
+        self.embed_latency.wait(f"embed_content({model})")
+        if isinstance(content, str):
+            return {"embedding": fake_embedding(content)}
+        return {"embedding": [fake_embedding(text) for text in content]}
+
+
+class _FakeSnapshot:
+    def __init__(self, data: Optional[Dict[str, Any]]):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+
+class _FakeDocument:
+    def __init__(self, firestore: "FakeFirestore", collection: str, doc_id: str):
+        self.firestore = firestore
+        self.path = (collection, doc_id)
+
+    def get(self) -> _FakeSnapshot:
+        self.firestore.latency.wait("firestore.get")
+        return _FakeSnapshot(self.firestore.documents.get(self.path))
+
+    def set(self, data: Dict[str, Any]):
+        self.firestore.latency.wait("firestore.set")
+        self.firestore.documents[self.path] = dict(data)
+
+
+class _FakeCollection:
+    def __init__(self, firestore: "FakeFirestore", name: str):
+        self.firestore = firestore
+        self.name = name
+
+    def document(self, doc_id: str) -> _FakeDocument:
+        return _FakeDocument(self.firestore, self.name, doc_id)
+
+
+class FakeFirestore:
+    """In-memory Firestore client: collection(name).document(id).get()/set()."""
+
+    def __init__(self, latency: LatencyModel, profiles: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.latency = latency
+        self.documents: Dict[tuple, Dict[str, Any]] = {("profiles", uid): p for uid, p in (profiles or {}).items()}
+
+    def collection(self, name: str) -> _FakeCollection:
+        return _FakeCollection(self, name)
@@ -0,0 +1,291 @@
+"""End-to-end load tests against fake Gemini and Firestore backends.
+
+Builds a synthetic corpus at the chosen scale in a temporary data directory,
+starts the app on it with FakeGemini/FakeFirestore (see fakes.py), embeds
+the corpus into a knowledge base snapshot and then drives concurrent
+requests through the WSGI app:
+
+    ingest          full snapshot build, then an incremental one (1% changed)
+    chat            POST /chat (mixed topics; some logged-in first messages hit Firestore)
+    chat_under_admin  POST /chat while admins keep recomputing /admin/analytics and exporting events
+    analytics       GET /admin/analytics, recomputed on every request (from the compacted event store)
+    analytics_hot   GET /admin/analytics, served from the response cache
+    feedback        POST /api/submit-feedback
+
+For each scenario it reports throughput, p50/p95/p99 latency and process
+memory, and can compare against (or update) the committed baseline.
+chat_under_admin should stay close to chat; run it with ADMIN_POOL_PROCESSES=0
+to see the admin work on the serving process's threads instead.
+
+Run from the backend/ directory:
+    python -m benchmarks.loadtest                          (small scale, compare with baseline.json)
+    python -m benchmarks.loadtest --scale medium --save-baseline
+    python -m benchmarks.loadtest --generate-ms 800 --error-rate 0.05 --scenarios chat
+    ADMIN_POOL_PROCESSES=0 python -m benchmarks.loadtest --scenarios chat,chat_under_admin
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import statistics
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+
+from benchmarks.corpora import SCALES, QUERIES, TOPICS, LANGUAGES, write_corpus
+from benchmarks.fakes import FakeGemini, FakeFirestore, LatencyModel
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+SCENARIOS = ("ingest", "chat", "chat_under_admin", "analytics", "analytics_hot", "feedback")
+ADMIN_LOAD_THREADS = 2 # One recomputes the year's analytics in a loop, the other exports every event
+NOISE_FLOOR_MS = 50 # p95 differences smaller than this are scheduling noise, whatever the ratio
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KiB on Linux
+
+
+def _summarize(latencies: List[float], errors: int, wall: float) -> Dict[str, Any]:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies), "errors": errors, "throughput_rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(cuts[49] * 1000, 1), "p95_ms": round(cuts[94] * 1000, 1), "p99_ms": round(cuts[98] * 1000, 1),
+        "rss_mb": round(_rss_mb(), 1), "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _drive(flask_app, make_request: Callable[[int, random.Random], Dict[str, Any]], total: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    """Sends `total` requests from `concurrency` threads, each with its own test client."""
+    local = threading.local()
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        if not hasattr(local, "client"):
+            local.client = flask_app.test_client()
+        spec = make_request(i, random.Random(seed * 1_000_003 + i))
+        started = time.perf_counter()
+        response = local.client.open(spec["path"], method=spec.get("method", "GET"), json=spec.get("json"))
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code >= 500:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return _summarize(latencies, errors, time.perf_counter() - started)
+
+
+def _chat_request(users: int) -> Callable[[int, random.Random], Dict[str, Any]]:
+    def make(i: int, rng: random.Random) -> Dict[str, Any]:
+        logged_in = rng.random() < 0.5
+        first_message = rng.random() < 0.4
+        history = [] if first_message else [
+            {"role": "user" if turn % 2 == 0 else "assistant", "content": rng.choice(QUERIES)} for turn in range(rng.randint(2, 10))]
+        return {"path": "/chat", "method": "POST", "json": {
+            "query": rng.choice(QUERIES), "topic": rng.choice(TOPICS[:3]), "language": rng.choice(LANGUAGES),
+            "user_id": f"user{rng.randrange(users)}" if logged_in else f"anonymous_{i}", "conversation_history": history}}
+    return make
+
+
+def _admin_load(flask_app, stop: threading.Event):
+    """Starts the background admins of chat_under_admin; they run until `stop` is set."""
+    def admin(i: int):
+        client, n = flask_app.test_client(), 0
+        while not stop.is_set():
+            path = f"/admin/analytics?admin={i}&run={n}" if i % 2 == 0 else "/admin/export/events?format=csv&start=2020-01-01"
+            client.get(path).get_data() # Distinct query strings miss the response cache
+            n += 1
+
+    threads = [threading.Thread(target=admin, args=(i,), daemon=True) for i in range(ADMIN_LOAD_THREADS)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _feedback_request(i: int, rng: random.Random) -> Dict[str, Any]:
+    return {"path": "/api/submit-feedback", "method": "POST", "json": {
+        "feedbackType": "response", "messageContent": rng.choice(QUERIES), "accuracy_rating": rng.choice(["accurate", "inaccurate", "unsure"]),
+        "helpful": rng.random() < 0.8, "userId": f"user{rng.randrange(100)}", "additionalDetails": "Synthetic load-test feedback."}}
+
+
+def _ingest(asha, corpus: Dict[str, Any], workers: int) -> Dict[str, Dict[str, Any]]:
+    from dedupe import NearDuplicateDetector
+    from kb_snapshot import build_snapshot
+    detector = NearDuplicateDetector()
+
+    def build(jobs, label): # Like build_kb.py
+        job_documents, dedupe = detector.canonical_documents(jobs, 'job')
+        documents = job_documents + detector.canonical_documents(corpus["sessions"], 'session')[0]
+        started = time.perf_counter()
+        summary = build_snapshot(asha.Config.KB_SNAPSHOT_DIR, documents, asha.embed_texts, asha.Config.EMBEDDING_MODEL,
+                                 batch_size=asha.Config.EMBED_BATCH_SIZE, workers=workers)
+        wall = time.perf_counter() - started
+        result = _summarize([wall], 0, wall)
+        result.update({"requests": len(documents), "throughput_rps": round(len(documents) / wall, 1), "embedded": summary["embedded"],
+                       "job_dedupe_ratio": dedupe["dedupe_ratio"]})
+        return label, result
+
+    jobs = corpus["jobs"]
+    changed = [dict(job, description=job["description"] + " Updated.") if i % 100 == 0 else job for i, job in enumerate(jobs)]
+    return dict([build(jobs, "ingest"), build(changed, "ingest_incremental")])
+
+
+def run(args) -> Dict[str, Any]:
+    data_dir = Path(tempfile.mkdtemp(prefix="asha-loadtest-"))
+    corpus = write_corpus(data_dir, args.scale, seed=args.seed)
+
+    # The app reads its configuration at import time
+    os.environ["ASHA_DATA_DIR"] = str(data_dir)
+    os.environ["EXTERNAL_INGEST_IN_PROCESS"] = "false"
+    started = time.perf_counter()
+    import app as asha
+    flask_app = asha.create_app()
+    startup = time.perf_counter() - started
+    if not args.verbose:
+        logging.disable(logging.CRITICAL) # Injected failures are expected; keep the report readable
+
+    asha._genai = FakeGemini(
+        LatencyModel(args.generate_ms, args.sigma, args.error_rate, seed=args.seed),
+        LatencyModel(args.embed_ms, args.sigma, args.error_rate, seed=args.seed + 1),
+    )
+    asha._firestore_client = FakeFirestore(LatencyModel(args.firestore_ms, args.sigma, seed=args.seed + 2), corpus["profiles"])
+    asha._firestore_initialized = True
+
+    results: Dict[str, Dict[str, Any]] = {}
+    scenarios = args.scenarios.split(",")
+    if "ingest" in scenarios or "chat" in scenarios or "chat_under_admin" in scenarios:
+        ingest = _ingest(asha, corpus, args.embed_workers) # chat needs the snapshot
+        if "ingest" in scenarios:
+            results.update(ingest)
+    users = corpus["sizes"]["users"]
+    if "chat" in scenarios:
+        results["chat"] = _drive(flask_app, _chat_request(users), args.requests, args.concurrency, args.seed)
+    if "chat_under_admin" in scenarios:
+        asha.event_store.compact()
+        stop = threading.Event()
+        admins = _admin_load(flask_app, stop)
+        results["chat_under_admin"] = _drive(flask_app, _chat_request(users), args.requests, args.concurrency, args.seed)
+        stop.set()
+        for thread in admins:
+            thread.join()
+    if "analytics" in scenarios:
+        # A distinct query string per request misses the response cache, so every request aggregates the year.
+        # Closed days are compacted first, as they are in a running deployment (only the in-memory blocks start cold).
+        asha.event_store.compact()
+        results["analytics"] = _drive(flask_app, lambda i, rng: {"path": f"/admin/analytics?run={i}"},
+                                      max(10, args.requests // 10), min(args.concurrency, 4), args.seed)
+    if "analytics_hot" in scenarios:
+        flask_app.test_client().get("/admin/analytics") # Warm the cache: this scenario measures steady-state hits
+        results["analytics_hot"] = _drive(flask_app, lambda i, rng: {"path": "/admin/analytics"}, args.requests, args.concurrency, args.seed)
+    if "feedback" in scenarios:
+        results["feedback"] = _drive(flask_app, _feedback_request, args.requests, args.concurrency, args.seed)
+
+    asha.scheduler.shutdown()
+    shutil.rmtree(data_dir, ignore_errors=True)
+    return {
+        "scale": args.scale, "sizes": corpus["sizes"], "startup_s": round(startup, 2),
+        "config": {"concurrency": args.concurrency, "requests": args.requests, "generate_ms": args.generate_ms, "embed_ms": args.embed_ms,
+                   "firestore_ms": args.firestore_ms, "sigma": args.sigma, "error_rate": args.error_rate, "seed": args.seed},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(terse=True), "cpus": os.cpu_count()},
+        "admin_pool_processes": asha.Config.ADMIN_POOL_PROCESSES,
+        "gemini_calls": asha._genai.calls,
+        "scenarios": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of p95 latency or throughput beyond `tolerance` (a fraction) against the baseline."""
+    regressions = []
+    error_slack = 2 * report["config"]["error_rate"] + 0.01 # Injected errors are random
+    for name, current in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if current["p95_ms"] > max(base["p95_ms"] * (1 + tolerance), base["p95_ms"] + NOISE_FLOOR_MS):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput_rps']}/s < baseline {base['throughput_rps']}/s")
+        if current["errors"] > base["errors"] + max(1, base["requests"] * error_slack):
+            regressions.append(f"{name}: {current['errors']} errors (baseline {base['errors']})")
+    return regressions
+
+
+def _print(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    sizes = ", ".join(f"{v} {k}" for k, v in report["sizes"].items())
+    print(f"scale={report['scale']} ({sizes}); app startup {report['startup_s']}s")
+    print(f"{'scenario':<20}{'n':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rss MB':>8}  vs baseline p95")
+    for name, r in report["scenarios"].items():
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        delta = f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:+6.1f}%" if base and base["p95_ms"] else "     -"
+        print(f"{name:<20}{r['requests']:>7}{r['errors']:>5}{r['throughput_rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['rss_mb']:>8}  {delta}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the app against fake Gemini/Firestore backends.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--generate-ms", type=float, default=150, help="median fake generate_content latency")
+    parser.add_argument("--embed-ms", type=float, default=30, help="median fake embed_content latency")
+    parser.add_argument("--firestore-ms", type=float, default=20, help="median fake Firestore read latency")
+    parser.add_argument("--sigma", type=float, default=0.4, help="log-normal spread of the fake latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake Gemini calls that fail (e.g. 0.02)")
+    parser.add_argument("--embed-workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the baseline for its scale")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed regression as a fraction (0.3 = 30%%)")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep application logging")
+    args = parser.parse_args()
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    report = run(args)
+    baseline = baselines.get(args.scale)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print(report, baseline)
+
+    if args.save_baseline:
+        baselines[args.scale] = report
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Saved baseline for scale '{args.scale}' to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline for scale '{args.scale}' in {args.baseline}.")
+        return 0
+    if baseline.get("config") != report["config"]:
+        print("Note: baseline was recorded with a different configuration; comparison is indicative only.")
+    regressions = compare(report, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Builds a knowledge base snapshot offline and publishes it to serving workers.
+
+Reads the jobs, sessions and crawled trusted-source chunks, folds near-duplicate
+jobs and sessions into one canonical document each (see dedupe.py), embeds them
+in parallel batches (reusing the vectors of unchanged documents from the live
+snapshot) and writes a new versioned, checksummed snapshot under
+data/kb_snapshots, optionally with int8 or product-quantized codes of the
+vectors. Running workers switch to it within a few seconds, without a restart.
+The printed summary includes the dedupe ratio of jobs and sessions.
+
+    python build_kb.py               (run from backend/; reads the data store)
+    python build_kb.py --from-files  (reads job_listing_data.csv / session_details.json)
+    python build_kb.py --quantization int8|pq  (default: KB_QUANTIZATION, "none")
+"""
+import sys
+import json
+import logging
+import argparse
+
+from app import Config, data_store, init_data_store, read_csv, read_json, embed_texts
+from documents import external_document
+from dedupe import NearDuplicateDetector
+from kb_snapshot import build_snapshot
+
+logger = logging.getLogger(__name__)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build and publish a knowledge base snapshot.")
+    parser.add_argument("--from-files", action="store_true", help="read the CSV/JSON data files instead of the data store")
+    parser.add_argument("--workers", type=int, default=Config.EMBED_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=Config.EMBED_BATCH_SIZE)
+    parser.add_argument("--quantization", choices=("none", "int8", "pq"), default=Config.KB_QUANTIZATION,
+                        help="store compact vector codes that searches scan before re-scoring the best candidates")
+    parser.add_argument("--pq-subspaces", type=int, default=Config.KB_PQ_SUBSPACES)
+    args = parser.parse_args()
+
+    if not Config.GEMINI_API_KEY:
+        logger.error("GEMINI_API_KEY is not set; embeddings cannot be generated.")
+        return 1
+    if args.from_files:
+        jobs, sessions = read_csv(Config.JOBS_FILE), read_json(Config.SESSIONS_FILE, default=[])
+    else:
+        init_data_store()
+        jobs, sessions = data_store.list_items('jobs'), data_store.list_items('sessions')
+    detector = NearDuplicateDetector()
+    job_documents, job_stats = detector.canonical_documents(jobs, 'job')
+    session_documents, session_stats = detector.canonical_documents(sessions, 'session')
+    documents = job_documents + session_documents
+    documents += [external_document(chunk) for chunk in data_store.list_external_chunks()]
+
+    try:
+        summary = build_snapshot(
+            Config.KB_SNAPSHOT_DIR, documents, embed_texts, Config.EMBEDDING_MODEL,
+            batch_size=args.batch_size, workers=args.workers, keep=Config.KB_SNAPSHOTS_TO_KEEP,
+            quantization=args.quantization, pq_subspaces=args.pq_subspaces,
+        )
+    except Exception as e:
+        logger.error(f"Snapshot build failed: {e}", exc_info=True)
+        return 1
+    summary['dedupe'] = [job_stats, session_stats]
+    print(json.dumps(summary))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
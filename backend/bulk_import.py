@@ -0,0 +1,191 @@
+import io
+import csv
+import json
+import uuid
+import logging
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Callable, BinaryIO
+
+from storage import JOB_FIELDNAMES
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Streamed Bulk Imports
+# -----------------------------------------------------------------------------
+# POST /admin/jobs/import takes a CSV or NDJSON upload and reads it as a
+# stream: rows are validated one at a time and written to the data store in
+# chunks of CHUNK_ROWS, so a worker holds one chunk however large the file is.
+# The ids each import wrote are kept in the database, not in memory.
+#
+# Embedding the new and changed rows is queued as a background job once the
+# upload has been written; the request returns 202 straight away. The import's
+# progress (rows read, written and rejected, documents embedded) is stored with
+# it, so GET /admin/imports/<id> can be answered by any worker.
+#
+# mode=upsert adds and updates rows by id; mode=replace also deletes the rows
+# the upload did not contain (like POST /admin/jobs), and only if the whole
+# upload was read.
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_MODES = ('upsert', 'replace')
+CHUNK_ROWS = 500
+MAX_REPORTED_ERRORS = 50
+REQUIRED_JOB_FIELDS = ('title', 'company')
+
+SyncFn = Callable[[str, List[str], List[str], Callable[[int, int], None]], bool]
+
+def _text_stream(stream: BinaryIO) -> io.TextIOWrapper:
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    return io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """(line number, row) pairs of a CSV upload with a header row."""
+    reader = csv.DictReader(_text_stream(stream))
+    for row in reader:
+        # Cells beyond the header end up under the None key; they are not part of any field
+        yield reader.line_num, {key: value for key, value in row.items() if key is not None}
+
+def iter_ndjson_rows(stream: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """(line number, object) pairs of a newline-delimited JSON upload; blank lines are skipped."""
+    for line_number, line in enumerate(_text_stream(stream), start=1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, ValueError(f"invalid JSON: {e.msg}")
+
+ROW_READERS: Dict[str, Callable[[BinaryIO], Iterator[Tuple[int, Any]]]] = {'csv': iter_csv_rows, 'ndjson': iter_ndjson_rows}
+
+def validate_job(row: Any) -> Dict[str, Any]:
+    """The row as a job record with exactly the CSV columns. Raises ValueError if it is not a valid job."""
+    if isinstance(row, Exception):
+        raise ValueError(str(row))
+    if not isinstance(row, dict):
+        raise ValueError("expected an object")
+    job = {}
+    for field in JOB_FIELDNAMES:
+        value = row.get(field)
+        if isinstance(value, (dict, list)):
+            raise ValueError(f"'{field}' must be a string")
+        job[field] = '' if value is None else str(value).strip()
+    missing = [field for field in REQUIRED_JOB_FIELDS if not job[field]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    if job['deadline']:
+        try:
+            date.fromisoformat(job['deadline'])
+        except ValueError:
+            raise ValueError(f"deadline must be YYYY-MM-DD, got '{job['deadline']}'") from None
+    if not job['id']:
+        job['id'] = str(uuid.uuid4())
+    return job
+
+VALIDATORS: Dict[str, Callable[[Any], Dict[str, Any]]] = {'jobs': validate_job}
+
+class BulkImporter:
+    """Writes streamed uploads in chunks and embeds them on a background thread."""
+
+    def __init__(self, store, sync: SyncFn, chunk_rows: int = CHUNK_ROWS):
+        self.store = store
+        self.sync = sync # (kind, changed ids, deleted ids, progress) -> success, e.g. app.sync_vector_store
+        self.chunk_rows = chunk_rows
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-import") # One embedding run at a time
+
+    def get(self, import_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get_bulk_import(import_id)
+
+    def _save(self, record: Dict[str, Any], **changes):
+        record.update(changes, updated_at=datetime.now().isoformat())
+        self.store.save_bulk_import(record)
+
+    def start(self, entity: str, stream: BinaryIO, fmt: str, mode: str = 'upsert') -> Dict[str, Any]:
+        """Reads and writes the whole upload, then queues its embedding. Returns the import record.
+
+        Raises ValueError for an unsupported entity, format or mode; problems
+        with the upload itself are reported in the record.
+        """
+        if entity not in VALIDATORS:
+            raise ValueError(f"Bulk import is not supported for {entity}")
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"Invalid format: {fmt} (expected {' or '.join(IMPORT_FORMATS)})")
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"Invalid mode: {mode} (expected {' or '.join(IMPORT_MODES)})")
+        now = datetime.now().isoformat()
+        # status: receiving -> queued -> embedding -> done, or failed
+        record: Dict[str, Any] = {
+            'id': str(uuid.uuid4()), 'entity': entity, 'format': fmt, 'mode': mode, 'status': 'receiving',
+            'created_at': now, 'updated_at': now, 'error': None, 'errors': [],
+            'rows': {'read': 0, 'written': 0, 'unchanged': 0, 'rejected': 0, 'deleted': 0},
+            'embedding': {'total': 0, 'done': 0},
+        }
+        self.store.save_bulk_import(record)
+        validate, rows = VALIDATORS[entity], record['rows']
+        chunk: List[Dict[str, Any]] = []
+
+        def flush():
+            first_position = rows['read'] - rows['rejected'] - len(chunk) if mode == 'replace' else None # Upload order
+            written = self.store.upsert_items(entity, chunk, import_id=record['id'], first_position=first_position)
+            rows['written'] += len(written)
+            rows['unchanged'] += len(chunk) - len(written)
+            chunk.clear()
+            self._save(record)
+
+        try:
+            for line, row in ROW_READERS[fmt](stream):
+                rows['read'] += 1
+                try:
+                    chunk.append(validate(row))
+                except ValueError as e:
+                    rows['rejected'] += 1
+                    if len(record['errors']) < MAX_REPORTED_ERRORS:
+                        record['errors'].append({'line': line, 'error': str(e)})
+                    continue
+                if len(chunk) >= self.chunk_rows:
+                    flush()
+            if chunk:
+                flush()
+        except Exception as e: # Undecodable bytes, malformed CSV, a client that disconnected mid-upload...
+            # Rows of earlier chunks stay written; nothing is deleted and they are embedded as usual
+            logger.error(f"Bulk import {record['id']} stopped after {rows['read']} rows: {e}")
+            record['error'] = f"Upload could not be read after {rows['read']} rows: {e}"
+            mode = 'upsert'
+
+        deleted: List[str] = []
+        if mode == 'replace':
+            if rows['read'] - rows['rejected'] == 0:
+                record['error'] = "No valid rows; nothing was replaced"
+            else:
+                deleted = self.store.delete_items_not_imported(entity, record['id'])
+                rows['deleted'] = len(deleted)
+        status = 'queued' if rows['written'] or rows['deleted'] else 'done'
+        if record['error'] and status == 'done':
+            status = 'failed'
+        self._save(record, status=status)
+        logger.info(f"Bulk import {record['id']} ({entity}, {fmt}, {mode}): {rows}")
+        if status == 'queued':
+            self._executor.submit(self._embed, record['id'], deleted)
+        else:
+            self.store.clear_bulk_import_items(record['id'])
+        return record
+
+    def _embed(self, import_id: str, deleted: List[str]):
+        record = self.store.get_bulk_import(import_id)
+        kind = record['entity'][:-1] # jobs -> job, as in document ids
+        try:
+            changed = self.store.bulk_import_item_ids(import_id)
+            self._save(record, status='embedding')
+
+            def progress(done: int, total: int):
+                self._save(record, embedding={'total': total, 'done': done})
+
+            if self.sync(kind, changed, deleted, progress):
+                self._save(record, status='failed' if record['error'] else 'done')
+            else:
+                self._save(record, status='failed', error="Rows were saved, but the knowledge base update failed")
+        except Exception as e:
+            logger.error(f"Bulk import {import_id} embedding failed: {e}", exc_info=True)
+            self._save(record, status='failed', error=f"Rows were saved, but embedding failed: {e}")
+        finally:
+            self.store.clear_bulk_import_items(import_id)
@@ -0,0 +1,138 @@
+import re
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Tuple
+
+from prompting import estimate_tokens, compress_text
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Server-side Conversation Store
+# -----------------------------------------------------------------------------
+# Conversations are kept in process, keyed by conversation id, so clients only
+# post the new message. Each conversation holds:
+#   * the last `recent_turns` turns as compact {role, content} records, with
+#     content already compressed to what the prompt would use;
+#   * a rolling summary: when a turn falls out of the recent window, a one-line
+#     gist of it is appended, and the oldest gists are dropped once the summary
+#     exceeds `summary_max_tokens`. Nothing is ever re-summarized.
+# So a conversation's memory is bounded, and so is their number: the least
+# recently used conversation is evicted when the store is full, and ones idle
+# for longer than `idle_seconds` are dropped as soon as they reach the LRU end.
+# Each worker process has its own store; a conversation id the worker doesn't
+# know (evicted, restarted, other worker) is re-seeded from the client's
+# `conversation_history` if it sent one.
+
+_CONVERSATION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+GIST_MAX_TOKENS = 30
+
+class _Conversation:
+    __slots__ = ('user_id', 'turns', 'summary', 'summary_tokens', 'user_turns', 'last_seen')
+
+    def __init__(self, user_id: Optional[str], recent_turns: int):
+        self.user_id = user_id
+        self.turns: deque = deque(maxlen=recent_turns)
+        self.summary: deque = deque() # (gist line, tokens), oldest first
+        self.summary_tokens = 0
+        self.user_turns = 0
+        self.last_seen = time.monotonic()
+
+class ConversationStore:
+    def __init__(self, max_conversations: int = 10_000, recent_turns: int = 6, turn_max_tokens: int = 120,
+                 summary_max_tokens: int = 200, idle_seconds: float = 3600):
+        self.max_conversations = max_conversations
+        self.recent_turns = recent_turns
+        self.turn_max_tokens = turn_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.idle_seconds = idle_seconds
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'created': 0, 'evicted_capacity': 0, 'evicted_idle': 0}
+
+    def _evict(self, now: float):
+        while self._conversations:
+            oldest = next(iter(self._conversations.values()))
+            if len(self._conversations) > self.max_conversations:
+                self.stats['evicted_capacity'] += 1
+            elif now - oldest.last_seen > self.idle_seconds:
+                self.stats['evicted_idle'] += 1
+            else:
+                break
+            self._conversations.popitem(last=False)
+
+    def _fold_into_summary(self, conversation: _Conversation, turn: Dict[str, str]):
+        speaker = "User asked" if turn['role'] == 'user' else "Asha answered"
+        gist = f"{speaker}: {compress_text(turn['content'], GIST_MAX_TOKENS)}"
+        tokens = estimate_tokens(gist) + 1
+        conversation.summary.append((gist, tokens))
+        conversation.summary_tokens += tokens
+        while conversation.summary_tokens > self.summary_max_tokens and len(conversation.summary) > 1:
+            conversation.summary_tokens -= conversation.summary.popleft()[1]
+
+    def _append(self, conversation: _Conversation, role: str, content: str):
+        content = str(content or '').strip()
+        if not content:
+            return
+        if len(conversation.turns) == conversation.turns.maxlen:
+            self._fold_into_summary(conversation, conversation.turns[0])
+        conversation.turns.append({'role': 'user' if role == 'user' else 'assistant',
+                                   'content': compress_text(content, self.turn_max_tokens)})
+        if role == 'user':
+            conversation.user_turns += 1
+
+    def open(self, conversation_id: Optional[str], user_id: Optional[str],
+             seed_history: Optional[List[Dict[str, Any]]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Returns (conversation_id, context) for an existing conversation, or starts one.
+
+        An unknown (or another user's) conversation starts fresh, seeded from
+        `seed_history` if given. It keeps the requested id when that id is
+        unknown and well-formed, else gets a new one. `context` is a snapshot:
+        {'history': [...], 'summary': str, 'user_turns': int}.
+        """
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._conversations.get(conversation_id) if conversation_id else None
+            if conversation is not None and conversation.user_id != user_id:
+                conversation, conversation_id = None, None
+            if conversation is None:
+                if not conversation_id or not _CONVERSATION_ID.match(conversation_id):
+                    conversation_id = uuid.uuid4().hex
+                conversation = _Conversation(user_id, self.recent_turns)
+                for message in seed_history or []:
+                    if isinstance(message, dict):
+                        self._append(conversation, message.get('role'), message.get('content'))
+                self._conversations[conversation_id] = conversation
+                self.stats['created'] += 1
+            else:
+                self._conversations.move_to_end(conversation_id)
+            conversation.last_seen = now
+            self._evict(now)
+            return conversation_id, {
+                'history': list(conversation.turns),
+                'summary': "\n".join(gist for gist, _ in conversation.summary),
+                'user_turns': conversation.user_turns,
+            }
+
+    def knows(self, conversation_id: Optional[str], user_id: Optional[str]) -> bool:
+        """True if this worker holds `conversation_id` for `user_id` (an unknown one would be started fresh by open)."""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id) if conversation_id else None
+            return conversation is not None and conversation.user_id == user_id
+
+    def record_exchange(self, conversation_id: str, query: str, response: str):
+        """Appends a user turn and Asha's reply. A no-op if the conversation was evicted meanwhile."""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return
+            self._append(conversation, 'user', query)
+            self._append(conversation, 'assistant', response)
+            conversation.last_seen = time.monotonic()
+            self._conversations.move_to_end(conversation_id)
+
+    def __len__(self) -> int:
+        return len(self._conversations)
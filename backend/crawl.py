@@ -0,0 +1,40 @@
+"""Crawls trusted sources into the knowledge base (source_type 'external').
+
+    python crawl.py           run every source that is due, then exit
+    python crawl.py --all     re-crawl every source now
+    python crawl.py --loop    keep running on the per-source schedule
+
+The web app runs the same scheduler on a background thread unless
+EXTERNAL_INGEST_IN_PROCESS=false; use this with cron or a separate service
+instead in that case.
+"""
+import sys
+import json
+import logging
+import argparse
+
+from app import Config, data_store, init_data_store, get_external_ingestor
+
+logger = logging.getLogger(__name__)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Crawl trusted sources into the knowledge base.")
+    parser.add_argument("--all", action="store_true", help="ignore the schedule and crawl every source")
+    parser.add_argument("--loop", action="store_true", help="run continuously on the per-source schedule")
+    args = parser.parse_args()
+
+    init_data_store()
+    ingestor = get_external_ingestor()
+    if args.all:
+        for source_id, state in data_store.get_crawl_states().items():
+            data_store.save_crawl_state(source_id, {**state, 'next_run': None})
+    if args.loop:
+        from external_ingest import IngestScheduler
+        IngestScheduler(ingestor).run_forever()
+        return 0
+    results = ingestor.run_due()
+    print(json.dumps(results, indent=2))
+    return 1 if any(result['error'] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import re
+import zlib
+import hashlib
+import logging
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple, Callable
+
+import numpy as np
+
+from documents import job_document, session_document
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Near-Duplicate Detection
+# -----------------------------------------------------------------------------
+# Job boards repost the same role with a slightly different title or blurb.
+# Before jobs and sessions are embedded they are clustered by MinHash over
+# character shingles (postings are short, so a few edited words would change
+# most word shingles), with LSH banding to find candidate pairs. Only one
+# canonical document per cluster goes into the knowledge base; its metadata
+# lists the record ids of the variants it stands for, so retrieval results are
+# not filled with copies of one posting.
+#
+# Only postings in the same block are compared (same company and city for
+# jobs, same date and city for sessions): the same text elsewhere or on another
+# day is a different opportunity.
+
+NUM_PERM = 128
+BANDS = 16 # 16 bands of 8 rows: pairs above ~0.7 Jaccard similarity become candidates
+SHINGLE_CHARS = 5
+SIMILARITY_THRESHOLD = 0.8 # Estimated Jaccard similarity at which candidates are merged
+MAX_PAIRWISE_BUCKET = 64 # Larger LSH buckets are compared against their first member only
+
+_rng = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"[^\W_]+")
+
+def _city(record: Dict[str, Any]) -> str:
+    return str(record.get('location') or '').split(',')[0].strip().lower()
+
+def _job_text(job: Dict[str, Any]) -> Tuple[str, str]:
+    return f"{str(job.get('company') or '').strip().lower()}|{_city(job)}", f"{job.get('title', '')} {job.get('type', '')} {job.get('description', '')}"
+
+def _session_text(session: Dict[str, Any]) -> Tuple[str, str]:
+    return f"{str(session.get('date') or '').strip()}|{_city(session)}", f"{session.get('title', '')} {session.get('description', '')}"
+
+# kind -> (record -> (block, text), record -> (id, document, metadata))
+KINDS: Dict[str, Tuple[Callable[[Dict[str, Any]], Tuple[str, str]], Callable]] = {
+    'job': (_job_text, job_document),
+    'session': (_session_text, session_document),
+}
+
+def minhash_signature(text: str) -> np.ndarray:
+    """NUM_PERM minimum hashes of the text's character shingles (multiply-shift hashing, uint64 wrap-around)."""
+    normalized = " ".join(_WORD.findall(text.lower())) # Case, punctuation and spacing don't matter
+    shingles = {normalized[i:i + SHINGLE_CHARS] for i in range(max(1, len(normalized) - SHINGLE_CHARS + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((hashes[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)).min(axis=0)
+
+class _Clusters:
+    """Union-find over record positions; the lowest position is a cluster's root."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+class NearDuplicateDetector:
+    """Clusters near-identical records; signatures of unchanged texts are reused between runs."""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def _signature(self, text: str, seen: Dict[str, np.ndarray]) -> np.ndarray:
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        signature = self._signatures.get(key)
+        if signature is None:
+            signature = minhash_signature(text)
+        seen[key] = signature
+        return signature
+
+    def cluster(self, records: List[Dict[str, Any]], kind: str) -> List[List[int]]:
+        """Groups record positions into clusters of near-duplicates, each in input order."""
+        to_text = KINDS[kind][0]
+        seen: Dict[str, np.ndarray] = {}
+        blocks, signatures = [], []
+        for record in records:
+            block, text = to_text(record)
+            blocks.append(block)
+            signatures.append(self._signature(text, seen))
+        self._signatures = seen # Keeps only the current records' signatures
+        clusters = _Clusters(len(records))
+        if records:
+            matrix = np.stack(signatures)
+            rows = NUM_PERM // BANDS
+            for band in range(BANDS):
+                buckets: Dict[Tuple[str, bytes], List[int]] = defaultdict(list)
+                band_bytes = matrix[:, band * rows:(band + 1) * rows]
+                for i in range(len(records)):
+                    buckets[(blocks[i], band_bytes[i].tobytes())].append(i)
+                for members in buckets.values():
+                    if len(members) < 2:
+                        continue
+                    pairs = ([(a, b) for n, a in enumerate(members) for b in members[n + 1:]]
+                             if len(members) <= MAX_PAIRWISE_BUCKET else [(members[0], b) for b in members[1:]])
+                    for a, b in pairs:
+                        if clusters.find(a) != clusters.find(b) and np.mean(matrix[a] == matrix[b]) >= self.threshold:
+                            clusters.union(a, b)
+        grouped: Dict[int, List[int]] = defaultdict(list)
+        for i in range(len(records)):
+            grouped[clusters.find(i)].append(i)
+        return list(grouped.values())
+
+    def canonical_documents(self, records: List[Dict[str, Any]], kind: str) -> Tuple[List[Tuple[str, str, Dict[str, Any]]], Dict[str, Any]]:
+        """One (id, document, metadata) triple per cluster, for its first record, plus the run's dedupe stats.
+
+        The metadata gains `duplicate_ids` (comma-separated record ids of the
+        other postings; Chroma metadata must be scalar) and `duplicate_count`.
+        """
+        build_document = KINDS[kind][1]
+        documents = []
+        for members in self.cluster(records, kind):
+            doc_id, text, metadata = build_document(records[members[0]])
+            variants = [str(records[i].get('id')) for i in members[1:]]
+            if variants:
+                metadata = {**metadata, 'duplicate_ids': ",".join(variants), 'duplicate_count': len(variants)}
+            documents.append((doc_id, text, metadata))
+        stats = {
+            'kind': kind, 'records': len(records), 'canonical': len(documents), 'duplicates': len(records) - len(documents),
+            'dedupe_ratio': round((len(records) - len(documents)) / len(records), 4) if records else 0.0,
+        }
+        logger.info(f"Near-duplicate {kind}s: {stats['duplicates']} of {stats['records']} folded into "
+                    f"{stats['canonical']} canonical documents (ratio {stats['dedupe_ratio']:.1%}).")
+        return documents, stats
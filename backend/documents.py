@@ -0,0 +1,76 @@
+import uuid
+from typing import Dict, Any, Tuple
+
+from prompting import render_snippet, render_job_context_line, render_session_context_line
+
+# -----------------------------------------------------------------------------
+# Knowledge Base Documents
+# -----------------------------------------------------------------------------
+# Shared by the Chroma collection (knowledge_base.py) and the offline snapshot
+# builder (kb_snapshot.py), so both index exactly the same text and metadata.
+
+def job_document(job: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """Builds the (id, document, metadata) triple stored in Chroma for a job listing.
+
+    Prompt snippets and context lines are rendered here once and stored as
+    metadata so that make_rag_prompt only has to fill a template per request.
+    """
+    job_id = f"job_{job.get('id', uuid.uuid4())}"  # Use provided ID or generate one
+    doc_text = (
+        f"Job Title: {job.get('title', 'N/A')}\n"
+        f"Company: {job.get('company', 'N/A')}\n"
+        f"Location: {job.get('location', 'N/A')}\n"
+        f"Type: {job.get('type', 'N/A')}\n"
+        f"Deadline: {job.get('deadline', 'N/A')}\n"
+        f"Description: {job.get('description', 'No description available.')}"
+    )
+    metadata = {
+        'source_type': 'job',
+        'apply_url': job.get('applyUrl', '#'),
+        'title': job.get('title', 'N/A'),
+        'company': job.get('company', 'N/A'),
+        'description': job.get('description', 'N/A'),
+        'location': job.get('location', 'N/A'),
+        'snippet': render_snippet(job.get('description', '')),
+        'context_line': render_job_context_line(job),
+    }
+    return job_id, doc_text, metadata
+
+def session_document(session: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """Builds the (id, document, metadata) triple stored in Chroma for a session."""
+    session_id = f"session_{session.get('id', uuid.uuid4())}"
+    doc_text = (
+        f"Session Title: {session.get('title', 'N/A')}\n"
+        f"Date: {session.get('date', 'N/A')}\n"
+        f"Time: {session.get('time', 'N/A')}\n"
+        f"Location: {session.get('location', 'N/A')}\n"
+        f"Description: {session.get('description', 'No description available.')}"
+    )
+    metadata = {
+        'source_type': 'session',
+        'registerUrl': session.get('registerUrl', 'N/A'),
+        'title': session.get('title', 'N/A'),
+        'description': session.get('description', 'N/A'),
+        'date': session.get('date', 'N/A'),
+        'location': session.get('location', 'N/A'),
+        'snippet': render_snippet(session.get('description', '')),
+        'context_line': render_session_context_line(session),
+    }
+    return session_id, doc_text, metadata
+
+def external_document(chunk: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """Builds the (id, document, metadata) triple for a chunk of crawled trusted-source text."""
+    doc_text = (
+        f"Source: {chunk.get('sourceName', 'N/A')} - {chunk.get('title', 'N/A')}\n"
+        f"URL: {chunk.get('url', 'N/A')}\n"
+        f"{chunk.get('text', '')}"
+    )
+    metadata = {
+        'source_type': 'external',
+        'source_id': str(chunk.get('sourceId', '')),
+        'source_name': chunk.get('sourceName', 'N/A'),
+        'url': chunk.get('url', 'N/A'),
+        'title': chunk.get('title', 'N/A'),
+        'snippet': render_snippet(chunk.get('text', '')),
+    }
+    return f"external_{chunk['id']}", doc_text, metadata
@@ -0,0 +1,528 @@
+import os
+import json
+import logging
+import zlib
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Sequence, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Columnar Analytics Event Store
+# -----------------------------------------------------------------------------
+# The JSON day files written by log_analytics_event stay the raw record. Each
+# closed day is additionally compacted into <dir>/events_YYYY-MM-DD.col, a
+# zlib-compressed JSON header followed by one raw array per field:
+#
+#   ts                        datetime64[us] (as int64)
+#   <dict column>             uint8/16 or int32 codes into header.dicts[column] (code 0 = missing)
+#   response_time             float64 (NaN = missing)
+#   response_length, tokens_* int64
+#   stages__{stage_event, stage, tokens_input, tokens_output}
+#                             per-stage token usage, one row per (event, stage)
+#
+# The header also records the [mtime_ns, size] of the JSON file the day was
+# built from. Loading is one decompression; the columns are views into it.
+#
+# Queries scan only the columns they touch, over any date range, with
+# group-by, filters and aggregates computed by numpy. A day whose .col file is
+# missing or older than its JSON file (today's, always) is decoded from JSON
+# instead, and closed days are compacted on the way. In memory, closed days
+# are merged into month blocks kept in an LRU bounded by total rows.
+
+FORMAT_VERSION = 1
+MAGIC = b"ASHAEV\n"
+COMPRESSION_LEVEL = 6
+
+DICT_COLUMNS = ('event_type', 'language', 'topic', 'user_id', 'bias_type', 'accuracy_rating',
+                'helpful', 'prevented', 'has_context', 'has_tokens')
+NUMERIC_COLUMNS = ('response_time', 'response_length', 'tokens_input', 'tokens_output', 'tokens_calls')
+DERIVED_COLUMNS = ('date', 'month', 'hour') # Computed from ts at query time
+TABLES = ('events', 'stages')
+AGGREGATES = ('count', 'sum', 'avg', 'min', 'max', 'distinct')
+
+def _flag(value: Any) -> Optional[str]:
+    return None if value is None else ('true' if value else 'false')
+
+def _as_int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def _as_label(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+def _code_dtype(size: int) -> type:
+    return np.uint8 if size <= 1 << 8 else np.uint16 if size <= 1 << 16 else np.int32
+
+class DayColumns:
+    """One day of events, decoded. `dicts[col][code]` is the value of `codes[col]`; index 0 is None."""
+    __slots__ = ('ts', 'codes', 'dicts', 'numbers', 'stages')
+
+    def __init__(self, ts: np.ndarray, codes: Dict[str, np.ndarray], dicts: Dict[str, List[Optional[str]]],
+                 numbers: Dict[str, np.ndarray], stages: Dict[str, np.ndarray]):
+        self.ts = ts
+        self.codes = codes
+        self.dicts = dicts
+        self.numbers = numbers
+        self.stages = stages
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+def encode_events(events: List[Any]) -> DayColumns:
+    """Column-encodes a day file's events, skipping malformed ones like the JSON aggregation does."""
+    timestamps: List[np.datetime64] = []
+    rows: List[Dict[str, Any]] = []
+    for event in events:
+        if not isinstance(event, dict) or 'timestamp' not in event or 'event_type' not in event:
+            continue
+        try:
+            timestamps.append(np.datetime64(datetime.fromisoformat(event['timestamp']).replace(tzinfo=None), 'us'))
+        except (TypeError, ValueError):
+            continue
+        rows.append(event)
+
+    dicts: Dict[str, Dict[Optional[str], int]] = {col: {None: 0} for col in DICT_COLUMNS + ('stage',)}
+    labels: Dict[str, List[Optional[str]]] = {col: [] for col in DICT_COLUMNS}
+    numbers: Dict[str, List[Any]] = {col: [] for col in NUMERIC_COLUMNS}
+    stage_event: List[int] = []
+    stage_codes: List[int] = []
+    stage_input: List[int] = []
+    stage_output: List[int] = []
+
+    for i, event in enumerate(rows):
+        data = event.get('data') if isinstance(event.get('data'), dict) else {}
+        usage = data.get('tokens') if isinstance(data.get('tokens'), dict) else None
+        labels['event_type'].append(_as_label(event['event_type']))
+        labels['language'].append(_as_label(data.get('language')))
+        labels['topic'].append(_as_label(data.get('topic')))
+        labels['user_id'].append(_as_label(data.get('user_id') or None))
+        labels['bias_type'].append(_as_label(data.get('bias_type')))
+        labels['accuracy_rating'].append(_as_label(data.get('accuracy_rating')))
+        labels['helpful'].append(_flag(data['helpful']) if isinstance(data.get('helpful'), bool) else None)
+        labels['prevented'].append(_flag(data.get('prevented')) if 'prevented' in data else None)
+        labels['has_context'].append(_flag(data.get('has_context')) if 'has_context' in data else None)
+        labels['has_tokens'].append('true' if usage is not None else 'false')
+        numbers['response_time'].append(_as_float(data.get('response_time_sec') or data.get('response_time')))
+        numbers['response_length'].append(_as_int(data.get('response_length')))
+        numbers['tokens_input'].append(_as_int(usage.get('input', 0)) if usage else 0)
+        numbers['tokens_output'].append(_as_int(usage.get('output', 0)) if usage else 0)
+        numbers['tokens_calls'].append(_as_int(usage.get('calls', 0)) if usage else 0)
+        by_stage = usage.get('by_stage') if usage else None
+        for stage, stage_usage in (by_stage.items() if isinstance(by_stage, dict) else ()):
+            if not isinstance(stage_usage, dict):
+                continue
+            stage_event.append(i)
+            stage_codes.append(dicts['stage'].setdefault(str(stage), len(dicts['stage'])))
+            stage_input.append(_as_int(stage_usage.get('input', 0)))
+            stage_output.append(_as_int(stage_usage.get('output', 0)))
+
+    codes = {}
+    for col in DICT_COLUMNS:
+        mapping = dicts[col]
+        codes[col] = np.fromiter((mapping.setdefault(v, len(mapping)) for v in labels[col]), dtype=np.int32, count=len(rows))
+        codes[col] = codes[col].astype(_code_dtype(len(mapping)))
+    stage_codes = np.array(stage_codes, dtype=np.int32).astype(_code_dtype(len(dicts['stage'])))
+    return DayColumns(
+        ts=np.array(timestamps, dtype='datetime64[us]'),
+        codes=codes,
+        dicts={col: list(mapping) for col, mapping in dicts.items()}, # dicts keep insertion order, so list index = code
+        numbers={col: np.array(values, dtype=np.float64 if col == 'response_time' else np.int64)
+                 for col, values in numbers.items()},
+        stages={
+            'stage_event': np.array(stage_event, dtype=np.int32), 'stage': stage_codes,
+            'tokens_input': np.array(stage_input, dtype=np.int64), 'tokens_output': np.array(stage_output, dtype=np.int64),
+        },
+    )
+
+def merge_days(days: List[DayColumns]) -> DayColumns:
+    """Concatenates days into one DayColumns with merged dictionaries."""
+    if len(days) == 1:
+        return days[0]
+    dicts: Dict[str, Dict[Optional[str], int]] = {col: {None: 0} for col in DICT_COLUMNS + ('stage',)}
+    codes: Dict[str, List[np.ndarray]] = {col: [] for col in DICT_COLUMNS + ('stage',)}
+    stage_event, offset = [], 0
+    for day in days:
+        for col in codes:
+            mapping = dicts[col]
+            remap = np.fromiter((mapping.setdefault(v, len(mapping)) for v in day.dicts[col]), dtype=np.int32, count=len(day.dicts[col]))
+            codes[col].append(remap[day.stages['stage'] if col == 'stage' else day.codes[col]])
+        stage_event.append(day.stages['stage_event'].astype(np.int32) + offset)
+        offset += len(day)
+    merged = {col: np.concatenate(parts).astype(_code_dtype(len(dicts[col]))) if parts else np.zeros(0, dtype=np.uint8)
+              for col, parts in codes.items()}
+    return DayColumns(
+        ts=np.concatenate([day.ts for day in days]) if days else np.zeros(0, dtype='datetime64[us]'),
+        codes={col: merged[col] for col in DICT_COLUMNS},
+        dicts={col: list(mapping) for col, mapping in dicts.items()},
+        numbers={col: np.concatenate([day.numbers[col] for day in days]) if days else np.zeros(0) for col in NUMERIC_COLUMNS},
+        stages={
+            'stage_event': np.concatenate(stage_event) if days else np.zeros(0, dtype=np.int32), 'stage': merged['stage'],
+            'tokens_input': np.concatenate([day.stages['tokens_input'] for day in days]) if days else np.zeros(0, dtype=np.int64),
+            'tokens_output': np.concatenate([day.stages['tokens_output'] for day in days]) if days else np.zeros(0, dtype=np.int64),
+        },
+    )
+
+def _save(path: Path, day: DayColumns, source: Tuple[int, int]):
+    """Writes MAGIC + zlib(header length, JSON header, column bytes), atomically."""
+    arrays: Dict[str, np.ndarray] = {'ts': day.ts.astype(np.int64)}
+    arrays.update(day.codes)
+    arrays.update(day.numbers)
+    arrays.update({f"stages__{col}": values for col, values in day.stages.items()})
+    columns, blocks, offset = [], [], 0
+    for name, values in arrays.items():
+        data = np.ascontiguousarray(values).tobytes()
+        padding = -len(data) % 8 # Keeps every column 8-byte aligned for frombuffer
+        columns.append([name, values.dtype.str, offset, len(values)])
+        blocks.append(data + b"\0" * padding)
+        offset += len(data) + padding
+    header = json.dumps({
+        'format': FORMAT_VERSION, 'source': list(source), 'columns': columns,
+        'dicts': {col: values[1:] for col, values in day.dicts.items()}, # Index 0 (None) is implied
+    }, ensure_ascii=False).encode('utf-8')
+    payload = zlib.compress(struct.pack('<I', len(header)) + header + b"".join(blocks), COMPRESSION_LEVEL)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(MAGIC + payload)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+def _load(path: Path, source: Tuple[int, int]) -> Optional[DayColumns]:
+    """The compacted day, or None if it is missing, from another format version or stale."""
+    try:
+        raw = path.read_bytes()
+        if not raw.startswith(MAGIC):
+            return None
+        payload = zlib.decompress(raw[len(MAGIC):])
+        header_length = struct.unpack_from('<I', payload)[0]
+        header = json.loads(payload[4:4 + header_length])
+        if header['format'] != FORMAT_VERSION or tuple(header['source']) != source:
+            return None
+        body = memoryview(payload)[4 + header_length:]
+        arrays = {name: np.frombuffer(body, dtype=np.dtype(dtype), count=count, offset=offset)
+                  for name, dtype, offset, count in header['columns']}
+        return DayColumns(
+            ts=arrays['ts'].view('datetime64[us]'),
+            codes={col: arrays[col] for col in DICT_COLUMNS},
+            dicts={col: [None] + header['dicts'][col] for col in DICT_COLUMNS + ('stage',)},
+            numbers={col: arrays[col] for col in NUMERIC_COLUMNS},
+            stages={col: arrays[f"stages__{col}"] for col in ('stage_event', 'stage', 'tokens_input', 'tokens_output')},
+        )
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable columnar file {path}: {e}")
+        return None
+
+class _GlobalDict:
+    """Maps values from all days onto one code space for grouping. Code 0 is None."""
+
+    def __init__(self):
+        self.values: List[Any] = [None]
+        self._codes: Dict[Any, int] = {None: 0}
+
+    def _code(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def remap(self, values: Sequence[Any]) -> np.ndarray:
+        """Global codes for a day's dictionary, to be indexed with that day's codes."""
+        return np.fromiter((self._code(v) for v in values), dtype=np.int64, count=len(values))
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+class EventStore:
+    def __init__(self, analytics_dir: Path, columnar_dir: Path, cache_rows: int = 1_000_000):
+        self.analytics_dir = Path(analytics_dir)
+        self.columnar_dir = Path(columnar_dir)
+        self.cache_rows = cache_rows # Roughly 100 bytes of memory per cached event
+        self._cache: "OrderedDict[Tuple[Tuple[str, int, int], ...], DayColumns]" = OrderedDict() # Block files -> merged columns
+        self._cached_rows = 0
+        self._build_lock = threading.Lock() # Concurrent cold queries wait for one build instead of repeating it
+        self._lock = threading.Lock()
+
+    def _json_path(self, day: str) -> Path:
+        return self.analytics_dir / f"events_{day}.json"
+
+    def days(self, start: date, end: date) -> List[str]:
+        """Days in [start, end] that have an event file, oldest first."""
+        found = []
+        for path in self.analytics_dir.glob("events_????-??-??.json"):
+            day = path.stem[len("events_"):]
+            try:
+                if start <= date.fromisoformat(day) <= end:
+                    found.append(day)
+            except ValueError:
+                continue
+        return sorted(found)
+
+    def _read_day(self, day: str, source: Tuple[int, int]) -> Optional[DayColumns]:
+        """One day's columns from its .col file or, failing that, its JSON file (compacting closed days)."""
+        json_path = self._json_path(day)
+        closed = day < date.today().isoformat()
+        columns = _load(self.columnar_dir / f"events_{day}.col", source) if closed else None
+        if columns is None:
+            try:
+                events = json.loads(json_path.read_text(encoding='utf-8') or '[]')
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read event file {json_path}: {e}")
+                return None
+            columns = encode_events(events if isinstance(events, list) else [])
+            if closed:
+                try:
+                    _save(self.columnar_dir / f"events_{day}.col", columns, source)
+                except OSError as e:
+                    logger.warning(f"Could not compact {json_path}: {e}")
+        return columns
+
+    def _build_block(self, key: Tuple[Tuple[str, int, int], ...]) -> DayColumns:
+        with self._build_lock:
+            with self._lock:
+                block = self._cache.get(key)
+            if block is not None:
+                return block
+            days = [self._read_day(day, (mtime, size)) for day, mtime, size in key]
+            block = merge_days([columns for columns in days if columns is not None])
+            with self._lock:
+                self._cache[key] = block
+                self._cached_rows += len(block)
+                while self._cached_rows > self.cache_rows and len(self._cache) > 1:
+                    self._cached_rows -= len(self._cache.popitem(last=False)[1])
+            return block
+
+    def _blocks(self, start: date, end: date) -> Iterator[DayColumns]:
+        """The days in range as cached blocks: closed days merged per month, today on its own.
+
+        Merging keeps the per-partition cost of a scan (a few numpy calls) from
+        dominating on days with few events. A block is keyed on the
+        (day, mtime, size) of its files, so any late write rebuilds it.
+        """
+        today = date.today().isoformat()
+        groups: Dict[str, List[Tuple[str, int, int]]] = {}
+        for day in self.days(start, end):
+            try:
+                stat = self._json_path(day).stat()
+            except FileNotFoundError:
+                continue
+            groups.setdefault(day[:7] if day < today else day, []).append((day, stat.st_mtime_ns, stat.st_size))
+
+        for key in (tuple(files) for files in groups.values()):
+            with self._lock:
+                block = self._cache.get(key)
+                if block is not None:
+                    self._cache.move_to_end(key)
+            if block is None:
+                block = self._build_block(key)
+            if len(block):
+                yield block
+
+    def compact(self, before: Optional[date] = None) -> int:
+        """Compacts every day before `before` (default today) that has no up-to-date .col file. Returns how many were written."""
+        before = before or date.today()
+        written = 0
+        for day in self.days(date.min, before):
+            if day >= before.isoformat():
+                continue
+            json_path = self._json_path(day)
+            stat = json_path.stat()
+            source = (stat.st_mtime_ns, stat.st_size)
+            col_path = self.columnar_dir / f"events_{day}.col"
+            if _load(col_path, source) is not None:
+                continue
+            events = json.loads(json_path.read_text(encoding='utf-8') or '[]')
+            _save(col_path, encode_events(events if isinstance(events, list) else []), source)
+            written += 1
+        return written
+
+    def _scan(self, start: date, end: date, table: str, columns: Sequence[str],
+              filters: Dict[str, List[Optional[str]]], dicts: Dict[str, _GlobalDict]) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """Per block, (row count, requested columns) of the rows passing `filters`, with labels mapped into `dicts`."""
+        for block in self._blocks(start, end):
+            rows = block.stages['stage_event'] if table == 'stages' else None
+
+            def dict_codes(col: str) -> np.ndarray:
+                codes = block.stages['stage'] if col == 'stage' else block.codes[col]
+                return codes if rows is None or col == 'stage' else codes[rows]
+
+            mask = None
+            for col, allowed in filters.items():
+                wanted = np.fromiter((v in allowed for v in block.dicts[col]), dtype=bool) # Lookup table by code
+                match = wanted[dict_codes(col)]
+                mask = match if mask is None else mask & match
+            if mask is not None and not mask.any():
+                continue
+
+            out: Dict[str, np.ndarray] = {}
+            for col in columns:
+                if col in DERIVED_COLUMNS:
+                    ts = block.ts if rows is None else block.ts[rows]
+                    if col == 'hour':
+                        values = (ts.astype('datetime64[h]').astype(np.int64) % 24)
+                        out[col] = dicts[col].remap(range(24))[values]
+                    else:
+                        unique, inverse = np.unique(ts.astype('datetime64[D]' if col == 'date' else 'datetime64[M]'), return_inverse=True)
+                        out[col] = dicts[col].remap([str(u) for u in unique])[inverse.reshape(-1)]
+                elif col in DICT_COLUMNS or col == 'stage':
+                    out[col] = dicts[col].remap(block.dicts[col])[dict_codes(col)]
+                elif table == 'stages' and col in ('tokens_input', 'tokens_output'):
+                    out[col] = block.stages[col]
+                else:
+                    values = block.numbers[col]
+                    out[col] = values if rows is None else values[rows]
+            if mask is not None:
+                yield int(mask.sum()), {col: values[mask] for col, values in out.items()}
+            else:
+                yield (len(block) if rows is None else len(rows)), out
+
+    def _validate(self, table: str, group_by: Sequence[str], aggregates: Sequence[str], filters: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}' (expected one of {', '.join(TABLES)})")
+        dimensions = DICT_COLUMNS + DERIVED_COLUMNS + (('stage',) if table == 'stages' else ())
+        numeric = ('tokens_input', 'tokens_output') if table == 'stages' else NUMERIC_COLUMNS
+        for col in group_by:
+            if col not in dimensions:
+                raise ValueError(f"Cannot group by '{col}'")
+        for col in filters:
+            if col not in DICT_COLUMNS + (('stage',) if table == 'stages' else ()):
+                raise ValueError(f"Cannot filter on '{col}'")
+        parsed = []
+        for spec in aggregates:
+            func, _, col = spec.partition(':')
+            if func not in AGGREGATES or (func == 'count') != (not col):
+                raise ValueError(f"Invalid aggregate '{spec}'")
+            if func == 'distinct' and col not in DICT_COLUMNS:
+                raise ValueError(f"distinct needs a label column, not '{col}'")
+            if func not in ('count', 'distinct') and col not in numeric:
+                raise ValueError(f"{func} needs a numeric column, not '{col}'")
+            parsed.append((func, col or None))
+        return parsed
+
+    def query(
+        self,
+        start: date,
+        end: date,
+        group_by: Sequence[str] = (),
+        aggregates: Sequence[str] = ('count',),
+        filters: Optional[Dict[str, Sequence[Optional[str]]]] = None,
+        table: str = 'events',
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Aggregates events between two dates (inclusive).
+
+        `aggregates` are 'count', '<sum|avg|min|max>:<numeric column>' or
+        'distinct:<label column>'; each row has the group-by values plus one
+        key per aggregate ('count', 'sum_tokens_input', ...). `filters` maps a
+        label column to the values to keep (None matches missing). The
+        'stages' table has one row per (event, stage) with that stage's
+        tokens_input/tokens_output, plus the event's label columns.
+        Rows are ordered by group, or by `order_by` (an aggregate key) descending.
+        """
+        filters = {col: set(values) for col, values in (filters or {}).items()}
+        parsed = self._validate(table, group_by, aggregates, filters)
+        value_columns = {col for func, col in parsed if col}
+        dicts = {col: _GlobalDict() for col in set(group_by) | {col for func, col in parsed if func == 'distinct'}}
+
+        parts = list(self._scan(start, end, table, list(dict.fromkeys(list(group_by) + sorted(value_columns))), filters, dicts))
+        total = sum(n for n, _ in parts)
+        if not total:
+            return []
+        columns = {col: np.concatenate([part[col] for _, part in parts]) for col in parts[0][1]}
+        if group_by:
+            keys = np.ravel_multi_index([columns[col] for col in group_by], [len(dicts[col]) for col in group_by])
+            groups, inverse = np.unique(keys, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            groups, inverse = np.zeros(1, dtype=np.int64), np.zeros(total, dtype=np.int64)
+        n_groups = len(groups)
+        counts = np.bincount(inverse, minlength=n_groups)
+
+        results: Dict[str, np.ndarray] = {}
+        for func, col in parsed:
+            name = func if col is None else f"{func}_{col}"
+            if func == 'count':
+                results[name] = counts
+                continue
+            values = columns[col]
+            if func == 'distinct':
+                size = len(dicts[col])
+                pairs = np.unique((inverse * size + values)[values != 0])
+                results[name] = np.bincount(pairs // size, minlength=n_groups)
+                continue
+            valid = ~np.isnan(values) if values.dtype.kind == 'f' else np.ones(total, dtype=bool)
+            valid_counts = np.bincount(inverse[valid], minlength=n_groups)
+            if func in ('sum', 'avg'):
+                sums = np.bincount(inverse[valid], weights=values[valid], minlength=n_groups)
+                results[name] = sums if func == 'sum' else np.divide(sums, valid_counts, out=np.full(n_groups, np.nan), where=valid_counts > 0)
+            else:
+                extreme = np.full(n_groups, np.inf if func == 'min' else -np.inf)
+                (np.minimum if func == 'min' else np.maximum).at(extreme, inverse[valid], values[valid].astype(np.float64))
+                extreme[valid_counts == 0] = np.nan
+                results[name] = extreme
+
+        group_values = np.unravel_index(groups, [len(dicts[col]) for col in group_by]) if group_by else []
+        rows: List[Dict[str, Any]] = []
+        integral = {name for name, (func, col) in zip(results, parsed) if func in ('count', 'distinct') or (func == 'sum' and col != 'response_time')}
+        for g in range(n_groups):
+            row: Dict[str, Any] = {col: dicts[col].values[int(codes[g])] for col, codes in zip(group_by, group_values)}
+            for name, values in results.items():
+                value = values[g]
+                row[name] = None if value != value else (int(value) if name in integral else float(value))
+            rows.append(row)
+
+        if order_by is not None:
+            if order_by not in results:
+                raise ValueError(f"order_by must be one of: {', '.join(results)}")
+            rows.sort(key=lambda row: (row[order_by] is not None, row[order_by] or 0), reverse=True)
+        else:
+            rows.sort(key=lambda row: tuple((row[col] is not None, str(row[col])) for col in group_by))
+        return rows[:limit] if limit is not None else rows
+
+    def values(self, start: date, end: date, column: str, filters: Optional[Dict[str, Sequence[Optional[str]]]] = None,
+               last: Optional[int] = None) -> List[float]:
+        """Non-missing values of a numeric column in event order, optionally only the last `last` of them."""
+        filters = {col: set(values) for col, values in (filters or {}).items()}
+        self._validate('events', (), (f"sum:{column}",), filters)
+        parts = [part[column] for _, part in self._scan(start, end, 'events', [column], filters, {})]
+        if not parts:
+            return []
+        values = np.concatenate(parts)
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        return values[-last:].tolist() if last else values.tolist()
+
+if __name__ == "__main__":
+    # python eventstore.py compact  (run from backend/)
+    import sys
+    analytics_dir = Path(os.getenv("ASHA_DATA_DIR", Path(__file__).parent / "data")) / "analytics"
+    if sys.argv[1:] == ["compact"]:
+        print(f"Compacted {EventStore(analytics_dir, analytics_dir / 'columnar').compact()} day files")
+    else:
+        print("Usage: python eventstore.py compact")
+        sys.exit(1)
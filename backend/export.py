@@ -0,0 +1,171 @@
+import io
+import csv
+import json
+import zlib
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Streaming Export
+# -----------------------------------------------------------------------------
+# Exports are generators end to end: day files are parsed one event at a time
+# from fixed-size reads, feedback comes out of SQLite in keyset batches, rows
+# are serialized into ~64 KB chunks and (optionally) gzip'ed as they go. So a
+# worker's memory does not depend on how much is exported.
+#
+# Every record carries a cursor. A client whose download broke off passes the
+# last cursor it received as `after` and the export resumes with the next
+# record. Event cursors are "YYYY-MM-DD:<index in that day's file>"; day files
+# are append-only, so an index always names the same event.
+
+READ_CHUNK_CHARS = 1 << 16
+FLUSH_BYTES = 1 << 16
+
+EVENT_CSV_FIELDS = ['cursor', 'id', 'timestamp', 'event_type', 'user_id', 'data']
+FEEDBACK_CSV_FIELDS = ['cursor', 'id', 'timestamp', 'feedbackType', 'status', 'preview', 'data']
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+def iter_json_array(path: Path, chunk_chars: int = READ_CHUNK_CHARS) -> Iterator[Any]:
+    """Yields the items of a JSON array file without loading the whole file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = "", 0, False
+        started = False
+        while True:
+            # Skip whitespace and the array punctuation between items
+            while pos < len(buffer) and (buffer[pos] in _WHITESPACE or buffer[pos] == ','
+                                         or (not started and buffer[pos] == '[')):
+                started = started or buffer[pos] == '['
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            if pos < len(buffer):
+                try:
+                    item, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    item = None # Item straddles the read boundary
+                else:
+                    # A number cut by the read boundary ("12|3", "0|.5", "1|e3") parses as a shorter
+                    # one, so a scalar only counts once a delimiter (or the end of the file) follows it
+                    if (isinstance(item, (dict, list, str)) or eof
+                            or (end < len(buffer) and buffer[end] in _WHITESPACE + ',]')):
+                        yield item
+                        pos = end
+                        continue
+            if eof:
+                if started or buffer.strip():
+                    raise ValueError(f"{path}: unterminated JSON array")
+                return
+            chunk = f.read(chunk_chars)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+def parse_event_cursor(cursor: str) -> Tuple[date, int]:
+    """'YYYY-MM-DD:N' -> (day, N); raises ValueError for malformed cursors."""
+    day, sep, index = cursor.partition(':')
+    try:
+        if not sep:
+            raise ValueError
+        return date.fromisoformat(day), int(index)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+
+def iter_events(analytics_dir: Path, start: date, end: date, event_types: Optional[Iterable[str]] = None,
+                after: Optional[str] = None, date_format: str = "%Y-%m-%d") -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields (cursor, event) for events from `start` to `end` inclusive, oldest day first, resuming after `after`."""
+    wanted = set(event_types) if event_types else None
+    skip_day, skip_through = None, -1
+    if after:
+        skip_day, skip_through = parse_event_cursor(after)
+        start = max(start, skip_day)
+    days = []
+    for path in Path(analytics_dir).glob("events_*.json"):
+        try:
+            day = datetime.strptime(path.stem[len("events_"):], date_format).date()
+        except ValueError:
+            continue
+        if start <= day <= end:
+            days.append((day, path))
+    for day, path in sorted(days):
+        day_key = day.isoformat()
+        try:
+            for index, event in enumerate(iter_json_array(path)):
+                if day == skip_day and index <= skip_through:
+                    continue
+                if not isinstance(event, dict) or (wanted is not None and event.get('event_type') not in wanted):
+                    continue
+                yield f"{day_key}:{index}", event
+        except FileNotFoundError:
+            continue
+        except (ValueError, OSError) as e:
+            # A corrupt day must not cut the rest of the export short
+            logger.error(f"Export skipped the rest of {path}: {e}")
+
+def event_row(cursor: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    data = event.get('data') if isinstance(event.get('data'), dict) else {}
+    return {'cursor': cursor, 'id': event.get('id'), 'timestamp': event.get('timestamp'),
+            'event_type': event.get('event_type'), 'user_id': data.get('user_id'),
+            'data': json.dumps(data, ensure_ascii=False, separators=(',', ':'))}
+
+def feedback_row(cursor: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    return {'cursor': cursor, 'id': record.get('id'), 'timestamp': record.get('timestamp'),
+            'feedbackType': record.get('feedbackType'), 'status': record.get('status'),
+            'preview': record.get('preview'), 'data': json.dumps(record, ensure_ascii=False, separators=(',', ':'))}
+
+def ndjson_chunks(records: Iterable[Tuple[str, Dict[str, Any]]], flush_bytes: int = FLUSH_BYTES) -> Iterator[bytes]:
+    """One JSON object per line, each with its resume cursor under '_cursor'."""
+    lines: List[str] = []
+    size = 0
+    for cursor, record in records:
+        line = json.dumps({**record, '_cursor': cursor}, ensure_ascii=False, separators=(',', ':'))
+        lines.append(line)
+        size += len(line) + 1
+        if size >= flush_bytes:
+            yield ("\n".join(lines) + "\n").encode('utf-8')
+            lines, size = [], 0
+    if lines:
+        yield ("\n".join(lines) + "\n").encode('utf-8')
+
+def csv_chunks(records: Iterable[Tuple[str, Dict[str, Any]]], fieldnames: List[str],
+               to_row: Callable[[str, Dict[str, Any]], Dict[str, Any]], flush_bytes: int = FLUSH_BYTES,
+               header: bool = True) -> Iterator[bytes]:
+    """A header line (resumed exports start with one too), then one row per record."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    if header:
+        writer.writeheader()
+    for cursor, record in records:
+        writer.writerow(to_row(cursor, record))
+        if buffer.tell() >= flush_bytes:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def incomplete_chunk(export_format: str, message: str, after: Optional[str]) -> bytes:
+    """The last line of an export that broke off: its reason and the cursor to resume from.
+
+    NDJSON gets an object with '_error' (and '_cursor' as on records); CSV, which
+    has no way to mark a row as special, gets a '#' comment line.
+    """
+    if export_format == 'csv':
+        return f"# export incomplete: {message}; resume with after={after}\n".encode('utf-8')
+    return (json.dumps({'_error': f"export incomplete: {message}", '_cursor': after}, ensure_ascii=False) + "\n").encode('utf-8')
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compresses a byte stream into a single gzip member as it is produced."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31) # wbits=31: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,228 @@
+import re
+import html
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+
+from fetcher import ContentFetcher
+from filestore import file_lock
+from storage import DataStore
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Trusted-Source Content Ingestion
+# -----------------------------------------------------------------------------
+# crawl (ContentFetcher) -> extract text -> chunk -> dedupe by content hash ->
+# embed and upsert only the new chunks as source_type 'external'.
+#
+# Chunks follow paragraph boundaries without overlap, so an edit to one part
+# of a page changes only the chunks around it and everything else keeps its
+# hash (and its embedding). This runs on a scheduler thread or from crawl.py,
+# never on a request thread.
+
+_DROP_BLOCKS = re.compile(r"<(script|style|noscript|svg|template|nav|header|footer|aside|form|iframe)\b[^>]*>.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+_BLOCK_TAGS = re.compile(r"</?(p|div|br|li|ul|ol|h[1-6]|tr|td|th|table|section|article|main|blockquote|pre|dd|dt)\b[^>]*>", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]+>")
+_SENTENCES = re.compile(r"(?<=[.!?])\s+")
+
+ChunkSink = Callable[[List[Dict[str, Any]], List[str]], bool]
+
+def extract_text(page: str, min_words: int = 5) -> str:
+    """Visible body text of an HTML page, one paragraph per line. Short lines (menus, buttons) are dropped."""
+    page = _DROP_BLOCKS.sub(" ", _COMMENTS.sub(" ", page))
+    page = _TAGS.sub(" ", _BLOCK_TAGS.sub("\n", page))
+    paragraphs = []
+    for line in html.unescape(page).splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        if len(line.split()) >= min_words:
+            paragraphs.append(line)
+    return "\n".join(paragraphs)
+
+def chunk_text(text: str, max_words: int = 180) -> List[str]:
+    """Packs paragraphs into chunks of up to `max_words`; longer paragraphs are split on sentences."""
+    pieces: List[str] = []
+    for paragraph in text.splitlines():
+        if len(paragraph.split()) <= max_words:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCES.split(paragraph):
+            words = sentence.split()
+            pieces.extend(" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words))
+
+    chunks, current, current_words = [], [], 0
+    for piece in pieces:
+        words = len(piece.split())
+        if current and current_words + words > max_words:
+            chunks.append("\n".join(current))
+            current, current_words = [], 0
+        current.append(piece)
+        current_words += words
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def chunk_id(text: str) -> str:
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]
+
+class ExternalIngestor:
+    """Crawls due trusted sources and keeps their chunks in the data store and the knowledge base in sync.
+
+    `sink(added_chunks, removed_chunk_ids)` embeds/upserts and deletes in the
+    knowledge base and returns False on failure (the source is then retried
+    on the next run).
+    """
+
+    def __init__(
+        self,
+        store: DataStore,
+        fetcher: ContentFetcher,
+        sink: ChunkSink,
+        refresh_hours: float = 24,
+        retry_minutes: float = 30,
+        chunk_words: int = 180,
+        lock_path: Optional[Path] = None
+    ):
+        self.store = store
+        self.fetcher = fetcher
+        self.sink = sink
+        self.refresh_hours = refresh_hours
+        self.retry_minutes = retry_minutes
+        self.chunk_words = chunk_words
+        self.lock_path = lock_path # Serializes runs across worker processes
+
+    def _interval(self, source: Dict[str, Any]) -> timedelta:
+        """Per-source schedule: a source's own `refreshHours` overrides the default."""
+        try:
+            hours = float(source.get('refreshHours') or self.refresh_hours)
+        except (TypeError, ValueError):
+            hours = self.refresh_hours
+        return timedelta(hours=max(hours, 0.1))
+
+    def due_sources(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        now = now or datetime.now()
+        states = self.store.get_crawl_states()
+        due = []
+        for source in self.store.list_items('trusted_sources'):
+            if not str(source.get('url', '')).startswith(('http://', 'https://')):
+                continue
+            next_run = states.get(str(source.get('id')), {}).get('next_run')
+            if not next_run or next_run <= now.isoformat():
+                due.append(source)
+        return due
+
+    def next_due_in(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Seconds until the next source is due (0 if one is due now), or None if nothing is scheduled."""
+        now = now or datetime.now()
+        runs = [state.get('next_run') for state in self.store.get_crawl_states().values() if state.get('next_run')]
+        if self.due_sources(now):
+            return 0.0
+        if not runs:
+            return None
+        return max(0.0, (datetime.fromisoformat(min(runs)) - now).total_seconds())
+
+    def _chunks_for(self, source: Dict[str, Any], entry: Dict[str, Any], page: str) -> List[Dict[str, Any]]:
+        title = entry.get('title') or source.get('name', 'N/A')
+        return [{
+            'id': chunk_id(text), 'sourceId': str(source['id']), 'sourceName': source.get('name', 'N/A'),
+            'url': source['url'], 'title': title, 'position': position, 'text': text,
+        } for position, text in enumerate(chunk_text(extract_text(page), self.chunk_words))]
+
+    def ingest_source(self, source: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Updates one source from its (already refreshed) fetch cache entry and records its next run."""
+        source_id = str(source['id'])
+        now = datetime.now()
+        state = self.store.get_crawl_states().get(source_id, {})
+        result = {'source_id': source_id, 'added': 0, 'removed': 0, 'unchanged': False, 'error': None}
+
+        page = self.fetcher.read_body(source['url']) if not entry.get('error') else None
+        if page is None:
+            result['error'] = entry.get('error') or "no content"
+            next_run = now + min(self._interval(source), timedelta(minutes=self.retry_minutes))
+        elif entry.get('content_hash') == state.get('content_hash'):
+            result['unchanged'] = True
+            next_run = now + self._interval(source)
+        else:
+            previous = self.store.list_external_chunks(source_id)
+            changes = self.store.replace_external_chunks(source_id, self._chunks_for(source, entry, page))
+            result['added'], result['removed'] = len(changes['added']), len(changes['removed'])
+            if (changes['added'] or changes['removed']) and not self.sink(changes['added'], changes['removed']):
+                # Put the old chunks back so the retry computes the same changes
+                self.store.replace_external_chunks(source_id, previous)
+                result['error'] = "knowledge base update failed"
+                next_run = now + timedelta(minutes=self.retry_minutes)
+            else:
+                state['content_hash'] = entry.get('content_hash')
+                state['chunk_count'] = changes['kept']
+                next_run = now + self._interval(source)
+
+        state.update({'url': source['url'], 'last_run': now.isoformat(), 'next_run': next_run.isoformat(), 'error': result['error']})
+        self.store.save_crawl_state(source_id, state)
+        return result
+
+    def prune_removed_sources(self) -> int:
+        """Removes chunks of sources that are no longer in the trusted sources list."""
+        active = {str(source.get('id')) for source in self.store.list_items('trusted_sources')}
+        removed: List[str] = []
+        for source_id in set(self.store.get_crawl_states()) - active:
+            removed.extend(self.store.delete_external_source(source_id))
+        if removed:
+            self.sink([], removed)
+        return len(removed)
+
+    def run_due(self) -> List[Dict[str, Any]]:
+        """Fetches every due source concurrently, then ingests them one by one."""
+        if self.lock_path is None:
+            return self._run_due()
+        with file_lock(self.lock_path):
+            return self._run_due()
+
+    def _run_due(self) -> List[Dict[str, Any]]:
+        self.prune_removed_sources()
+        due = self.due_sources()
+        if not due:
+            return []
+        entries = self.fetcher.refresh_all([source['url'] for source in due], force=True)
+        results = []
+        for source in due:
+            try:
+                results.append(self.ingest_source(source, entries.get(source['url'], {'error': "not fetched"})))
+            except Exception as e:
+                logger.error(f"Ingesting trusted source {source.get('id')} failed: {e}", exc_info=True)
+        added = sum(r['added'] for r in results)
+        removed = sum(r['removed'] for r in results)
+        logger.info(f"External ingest: {len(due)} source(s) due, {added} chunk(s) added, {removed} removed.")
+        return results
+
+class IngestScheduler:
+    """Daemon thread that runs ExternalIngestor.run_due whenever a source falls due."""
+
+    def __init__(self, ingestor: ExternalIngestor, poll_seconds: float = 300):
+        self.ingestor = ingestor
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name="external-ingest", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        """Runs the scheduling loop on the calling thread until stop() is called."""
+        while not self._stop.is_set():
+            try:
+                self.ingestor.run_due()
+                wait = self.ingestor.next_due_in()
+            except Exception as e:
+                logger.error(f"External ingest run failed: {e}", exc_info=True)
+                wait = None
+            self._stop.wait(min(wait, self.poll_seconds) if wait is not None else self.poll_seconds)
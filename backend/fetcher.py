@@ -0,0 +1,232 @@
+import re
+import json
+import time
+import html
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from filestore import atomic_write_json, atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# External Content Fetcher
+# -----------------------------------------------------------------------------
+# Trusted-source pages are fetched on a bounded thread pool and cached on disk
+# (one <key>.json entry plus the page body in <key>.html). Reads always come
+# from the cache; stale or missing entries are refreshed in the background
+# with conditional GETs (If-None-Match / If-Modified-Since), so callers get an
+# answer immediately and a 304 costs the remote site almost nothing.
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_META_TAG_RE = re.compile(r"<meta\s[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)""")
+_DESCRIPTION_KEYS = ("description", "og:description", "twitter:description")
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+def extract_summary(page: str) -> Dict[str, str]:
+    """Pulls the <title> and meta description out of an HTML page."""
+    summary: Dict[str, str] = {}
+    title = _TITLE_RE.search(page)
+    if title and _clean(title.group(1)):
+        summary['title'] = _clean(title.group(1))
+    for tag in _META_TAG_RE.findall(page):
+        attrs = {k.lower(): v.strip("\"'") for k, v in _ATTR_RE.findall(tag)}
+        key = (attrs.get('name') or attrs.get('property') or '').lower()
+        if key in _DESCRIPTION_KEYS and _clean(attrs.get('content', '')):
+            summary['description'] = _clean(attrs['content'])
+            if key == 'description':
+                break # Prefer the plain description over social tags
+    return summary
+
+class _HostGate:
+    """Per-host politeness: at most `concurrency` requests in flight and `interval` seconds between starts."""
+
+    def __init__(self, concurrency: int, interval: float):
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+
+class ContentFetcher:
+    """Concurrent, polite, conditional-GET fetcher with a stale-while-revalidate disk cache."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_workers: int = 8,
+        per_host_concurrency: int = 2,
+        per_host_interval: float = 1.0,
+        timeout: float = 10.0,
+        ttl: float = 6 * 3600,
+        error_ttl: float = 300,
+        max_bytes: int = 2 * 1024 * 1024,
+        user_agent: str = "AshaBot/1.0 (+trusted-source fetcher)"
+    ):
+        self.cache_dir = cache_dir
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_interval = per_host_interval
+        self.timeout = timeout
+        self.ttl = ttl
+        self.error_ttl = error_ttl # Failed fetches are retried sooner than successful ones are revalidated
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers['User-Agent'] = user_agent
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetcher")
+        self._lock = threading.Lock()
+        self._gates: Dict[str, _HostGate] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._memory: Dict[str, Dict[str, Any]] = {} # Entry cache in front of the JSON files
+
+    # --- Cache ---
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+    def _entry_path(self, url: str) -> Path:
+        return self.cache_dir / f"{self._key(url)}.json"
+
+    def body_path(self, url: str) -> Path:
+        return self.cache_dir / f"{self._key(url)}.html"
+
+    def cached(self, url: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached entry for `url` (fresh or stale) without any network access."""
+        entry = self._memory.get(url)
+        if entry is None:
+            try:
+                entry = json.loads(self._entry_path(url).read_text(encoding='utf-8'))
+            except (OSError, json.JSONDecodeError):
+                return None
+            self._memory[url] = entry
+        return entry
+
+    def read_body(self, url: str) -> Optional[str]:
+        try:
+            return self.body_path(url).read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def is_stale(self, entry: Optional[Dict[str, Any]]) -> bool:
+        if entry is None:
+            return True
+        ttl = min(self.ttl, self.error_ttl) if entry.get('error') else self.ttl
+        return time.time() - entry.get('checked_at', 0) > ttl
+
+    def _store(self, url: str, entry: Dict[str, Any], body: Optional[str] = None):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if body is not None:
+            atomic_write_text(self.body_path(url), body)
+        atomic_write_json(self._entry_path(url), entry)
+        self._memory[url] = entry
+
+    # --- Fetching ---
+    def _gate(self, url: str) -> _HostGate:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._gates:
+                self._gates[host] = _HostGate(self.per_host_concurrency, self.per_host_interval)
+            return self._gates[host]
+
+    def refresh(self, url: str) -> Dict[str, Any]:
+        """Fetches `url` now (conditionally if cached) and updates the cache. Runs on the calling thread."""
+        previous = self.cached(url) or {}
+        headers = {}
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+
+        now = time.time()
+        try:
+            with self._gate(url):
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+                try:
+                    if response.status_code == 304 and previous:
+                        entry = {**previous, 'checked_at': now, 'error': None}
+                        self._store(url, entry)
+                        return entry
+                    response.raise_for_status()
+                    raw = response.raw.read(self.max_bytes + 1, decode_content=True)
+                finally:
+                    response.close()
+        except Exception as e:
+            logger.warning(f"Fetching {url} failed: {e}")
+            # Keep serving what we had; retry after the next TTL period
+            entry = {**previous, 'url': url, 'checked_at': now, 'error': str(e)}
+            self._store(url, entry)
+            return entry
+
+        content_type = response.headers.get('Content-Type', '')
+        # requests assumes ISO-8859-1 for text/* without a charset; most of these sites are UTF-8
+        encoding = response.encoding if 'charset=' in content_type.lower() else 'utf-8'
+        body = raw[:self.max_bytes].decode(encoding or 'utf-8', errors='replace')
+        entry = {
+            'url': url,
+            'status': response.status_code,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': content_type,
+            'content_hash': hashlib.sha256(raw[:self.max_bytes]).hexdigest(),
+            'fetched_at': now,
+            'checked_at': now,
+            'truncated': len(raw) > self.max_bytes,
+            'error': None,
+            **extract_summary(body),
+        }
+        self._store(url, entry, body=body)
+        return entry
+
+    def refresh_async(self, url: str) -> Future:
+        """Schedules a background refresh; concurrent requests for the same URL share one fetch."""
+        with self._lock:
+            future = self._in_flight.get(url)
+            if future is not None:
+                return future
+            future = self._pool.submit(self.refresh, url)
+            self._in_flight[url] = future
+        future.add_done_callback(lambda _: self._forget(url))
+        return future
+
+    def _forget(self, url: str):
+        with self._lock:
+            self._in_flight.pop(url, None)
+
+    def get_many(self, urls: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Returns cached entries immediately and revalidates stale or missing ones in the background."""
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        for url in urls:
+            entry = self.cached(url)
+            if self.is_stale(entry):
+                self.refresh_async(url)
+            results[url] = entry
+        return results
+
+    def refresh_all(self, urls: List[str], force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Refreshes (stale, or all if `force`) URLs concurrently and waits for them."""
+        futures = {url: self.refresh_async(url) for url in urls if force or self.is_stale(self.cached(url))}
+        return {url: future.result() for url, future in futures.items()}
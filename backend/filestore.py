@@ -0,0 +1,166 @@
+import os
+import csv
+import io
+import json
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Iterator
+
+try:
+    import fcntl # POSIX only; on other platforms locks are per-process
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Transactional File Store
+# -----------------------------------------------------------------------------
+# Writes go to a temp file in the same directory, are fsync'ed and then
+# renamed over the target, so readers only ever see the old or the new
+# contents. Read-modify-write cycles hold a per-file lock that is shared
+# between threads (threading.Lock) and worker processes (flock on a sidecar
+# .lock file).
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+def _thread_lock(path: Path) -> threading.Lock:
+    key = str(path.resolve())
+    with _thread_locks_guard:
+        if key not in _thread_locks:
+            _thread_locks[key] = threading.Lock()
+        return _thread_locks[key]
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock on `path` across threads and processes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _thread_lock(path):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def atomic_write_text(path: Path, text: str):
+    """Replaces `path` with `text` via write-to-temp, fsync and rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as tmp:
+            tmp.write(text)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(str(path.parent), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def atomic_write_json(path: Path, data: Any, indent: Optional[int] = 2):
+    # indent=None uses json's C encoder, several times faster on large files
+    atomic_write_text(path, json.dumps(data, indent=indent, ensure_ascii=False))
+
+def atomic_write_csv(path: Path, rows: List[Dict[str, Any]], fieldnames: List[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    atomic_write_text(path, buffer.getvalue())
+
+def _load_json_for_update(path: Path, default: Any) -> Any:
+    """Reads JSON for a read-modify-write. Corrupt files are moved aside instead of being silently overwritten."""
+    if not path.exists():
+        return default
+    content = path.read_text(encoding='utf-8').strip()
+    if not content:
+        return default
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as e:
+        backup = path.with_name(f"{path.name}.corrupt-{datetime.now().strftime('%Y%m%dT%H%M%S')}")
+        os.replace(path, backup)
+        logger.error(f"Corrupt JSON in {path} ({e}); moved to {backup} and starting fresh.")
+        return default
+
+def update_json(path: Path, update: Callable[[Any], Any], default: Any = None, indent: Optional[int] = 2) -> Any:
+    """Locked read-modify-write of a JSON file. `update` returns the new contents."""
+    with file_lock(path):
+        new_data = update(_load_json_for_update(path, default))
+        atomic_write_json(path, new_data, indent=indent)
+        return new_data
+
+# -----------------------------------------------------------------------------
+# Group Commit for JSON Array Appends
+# -----------------------------------------------------------------------------
+class _Batch:
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = threading.Event()
+        self.ok = False
+
+class GroupCommitAppender:
+    """Appends items to JSON array files, sharing one rewrite per burst.
+
+    The first caller for a file becomes the batch leader: it waits up to
+    `max_delay` seconds for others to join, then commits every queued item
+    in a single locked read-modify-write. Followers block until that commit
+    finishes, so append() still returns only once the item is durable.
+    """
+
+    def __init__(self, max_delay: float = 0.005, indent: Optional[int] = 2):
+        self.max_delay = max_delay
+        self.indent = indent
+        self._guard = threading.Lock()
+        self._open_batches: Dict[str, _Batch] = {}
+
+    def append(self, path: Path, item: Any) -> bool:
+        key = str(path)
+        with self._guard:
+            batch = self._open_batches.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._open_batches[key] = _Batch()
+            batch.items.append(item)
+
+        if not is_leader:
+            batch.done.wait()
+            return batch.ok
+
+        time.sleep(self.max_delay)
+        with self._guard:
+            del self._open_batches[key] # Later arrivals start the next batch
+        try:
+            def extend(existing: Any) -> List[Any]:
+                if not isinstance(existing, list):
+                    if existing is not None:
+                        logger.warning(f"{path} did not contain a list. Starting fresh.")
+                    existing = []
+                existing.extend(batch.items)
+                return existing
+            update_json(path, extend, default=[], indent=self.indent)
+            batch.ok = True
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch.items)} item(s) to {path} failed: {e}", exc_info=True)
+        finally:
+            batch.done.set()
+        return batch.ok
@@ -0,0 +1,111 @@
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Callable
+
+from flask import request, make_response, Response
+
+try:
+    import brotli # Optional: enables Content-Encoding: br
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# HTTP Response Cache (ETag / 304 / compression)
+# -----------------------------------------------------------------------------
+# Read-heavy GET endpoints are wrapped with `ResponseCache.cached(version)`.
+# `version()` returns a cheap token that changes whenever the underlying data
+# does (a data-store version counter, file mtimes, ...). The strong ETag is
+# derived from it and the request URL, so:
+#   * a matching If-None-Match is answered with 304 before the view runs;
+#   * otherwise the serialized body (and its gzip/br variants) is served from
+#     an in-process LRU, and only rebuilt after a write changed the version.
+# Because versions come from shared storage, writes made by another worker
+# process invalidate this process's entries too.
+
+class _Entry:
+    __slots__ = ('etag', 'variants')
+
+    def __init__(self, etag: str, body: bytes):
+        self.etag = etag
+        self.variants: Dict[str, bytes] = {'identity': body}
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, min_compress_bytes: int = 1024, gzip_level: int = 6):
+        self.max_entries = max_entries
+        self.min_compress_bytes = min_compress_bytes
+        self.gzip_level = gzip_level
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    def _negotiate(self, size: int) -> str:
+        if size < self.min_compress_bytes:
+            return 'identity'
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br'] > 0:
+            return 'br'
+        if accepted['gzip'] > 0:
+            return 'gzip'
+        return 'identity'
+
+    def _variant(self, entry: _Entry, encoding: str) -> bytes:
+        body = entry.variants.get(encoding)
+        if body is None:
+            identity = entry.variants['identity']
+            body = brotli.compress(identity, quality=5) if encoding == 'br' else gzip.compress(identity, self.gzip_level)
+            entry.variants[encoding] = body # Compressed once per version, then reused
+        return body
+
+    def _headers(self, etag: str) -> Dict[str, str]:
+        # no-cache: browsers may keep the body but must revalidate (cheap 304) before using it
+        return {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+
+    def cached(self, version: Callable[[], object]) -> Callable:
+        """Decorator for a GET view returning a JSON response."""
+        def decorator(view: Callable) -> Callable:
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = request.full_path
+                try:
+                    token = version()
+                except Exception as e:
+                    logger.warning(f"Cache version lookup failed for {key}: {e}")
+                    return view(*args, **kwargs)
+                etag = '"' + hashlib.sha1(f"{key}|{token}".encode('utf-8')).hexdigest()[:24] + '"'
+
+                if request.if_none_match.contains(etag.strip('"')):
+                    self.stats['not_modified'] += 1
+                    return Response(status=304, headers=self._headers(etag))
+
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry.etag == etag:
+                        self._entries.move_to_end(key)
+                        self.stats['hits'] += 1
+                    else:
+                        entry = None
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or not response.is_json:
+                        return response # Errors are never cached
+                    entry = _Entry(etag, response.get_data())
+                    self.stats['misses'] += 1
+                    with self._lock:
+                        self._entries[key] = entry
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+
+                encoding = self._negotiate(len(entry.variants['identity']))
+                headers = self._headers(etag)
+                if encoding != 'identity':
+                    headers['Content-Encoding'] = encoding
+                return Response(self._variant(entry, encoding), status=200, mimetype='application/json', headers=headers)
+            return wrapper
+        return decorator
@@ -0,0 +1,29 @@
+"""Populates the ChromaDB knowledge base from the data store.
+
+The web app only opens the persisted collection, so run this after the first
+checkout, after a bulk data import, or when changing how documents are built:
+    python ingest.py          (run from backend/)
+"""
+import sys
+import time
+import logging
+
+from app import Config, init_data_store, update_vector_store, get_vector_collection
+
+logger = logging.getLogger(__name__)
+
+def main() -> int:
+    if not Config.GEMINI_API_KEY:
+        logger.error("GEMINI_API_KEY is not set; embeddings cannot be generated.")
+        return 1
+    started = time.perf_counter()
+    init_data_store()
+    if not update_vector_store():
+        logger.error("Ingestion failed.")
+        return 1
+    collection = get_vector_collection()
+    logger.info(f"Knowledge base holds {collection.count()} documents ({time.perf_counter() - started:.1f}s).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+import numpy as np
+
+from filestore import file_lock, atomic_write_text
+from quantization import METHODS as QUANTIZATION_METHODS, Quantizer, train_quantizer, load_quantizer
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Knowledge Base Snapshots
+# -----------------------------------------------------------------------------
+# An offline build (build_kb.py) embeds every document and writes an immutable
+# snapshot directory:
+#
+#   <root>/<version>/vectors.npy     float32, L2-normalised, one row per document
+#   <root>/<version>/documents.json  ids, texts, metadata and content hashes
+#   <root>/<version>/manifest.json   version, dimensions and sha256 of the files
+#   <root>/<version>/codes.npy       optional int8 or PQ codes of the vectors
+#   <root>/<version>/codebook.npy    their per-dimension scales or PQ codebooks
+#   <root>/CURRENT                   name of the live version (atomically replaced)
+#
+# Serving workers memory-map the live snapshot and switch to a new version in
+# the background when CURRENT changes, so rebuilds never block chat requests.
+# A quantized snapshot is searched on its codes, and only the best candidates
+# are re-scored with the float32 vectors (see quantization.py).
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+MANIFEST_FILE = "manifest.json"
+CODES_FILE = "codes.npy"
+CODEBOOK_FILE = "codebook.npy"
+CURRENT_FILE = "CURRENT"
+EMBED_ATTEMPTS = 3
+RESCORE_FACTOR = 10 # Candidates re-scored in float32 per requested result, when searching codes
+RESCORE_MIN = 100
+
+EmbedBatch = Callable[[List[str]], List[List[float]]]
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_current_version(root: Path) -> Optional[str]:
+    try:
+        return (root / CURRENT_FILE).read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, incomplete or fails its checksum."""
+
+class SnapshotIndex:
+    """A loaded snapshot: memory-mapped vectors plus document metadata."""
+
+    def __init__(self, path: Path, verify: bool = True):
+        self.path = path
+        try:
+            self.manifest = json.loads((path / MANIFEST_FILE).read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError) as e:
+            raise SnapshotError(f"Cannot read manifest in {path}: {e}") from e
+        if verify:
+            for name, expected in self.manifest.get('sha256', {}).items():
+                if _file_sha256(path / name) != expected:
+                    raise SnapshotError(f"Checksum mismatch for {path / name}")
+        self.version: str = self.manifest['version']
+        self.vectors = np.load(path / VECTORS_FILE, mmap_mode='r')
+        self.quantizer: Optional[Quantizer] = None
+        self.codes: Optional[np.ndarray] = None
+        method = self.manifest.get('quantization', {}).get('method', 'none')
+        if method != 'none':
+            self.quantizer = load_quantizer(method, np.load(path / CODEBOOK_FILE))
+            self.codes = np.load(path / CODES_FILE, mmap_mode='r')
+        records = json.loads((path / DOCUMENTS_FILE).read_text(encoding='utf-8'))
+        self.ids: List[str] = [r['id'] for r in records]
+        self.documents: List[str] = [r['document'] for r in records]
+        self.metadatas: List[Dict[str, Any]] = [r['metadata'] for r in records]
+        self.hashes: List[str] = [r['hash'] for r in records]
+        self._source_types = np.array([m.get('source_type', '') for m in self.metadatas])
+        if len(self.ids) != self.vectors.shape[0]:
+            raise SnapshotError(f"{path} has {len(self.ids)} documents but {self.vectors.shape[0]} vectors")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """Bytes of the representation every search scans (the codes if quantized)."""
+        scanned = self.codes if self.codes is not None else self.vectors
+        return scanned.nbytes // len(self) if len(self) else 0
+
+    def search(self, query_vector: List[float], n_results: int = 5, source_type_filter: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Cosine top-k, returned as (document, metadata) pairs like get_relevant_passage."""
+        if not len(self):
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != self.vectors.shape[1]:
+            return []
+        query = query / norm
+        if self.quantizer is None:
+            scores = self.vectors @ query
+            if source_type_filter:
+                scores = np.where(self._source_types == source_type_filter, scores, -np.inf)
+            k = min(n_results, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.documents[i], self.metadatas[i]) for i in top if np.isfinite(scores[i])]
+
+        approximate = self.quantizer.score(self.codes, query)
+        if source_type_filter:
+            approximate = np.where(self._source_types == source_type_filter, approximate, -np.inf)
+        c = min(max(n_results * RESCORE_FACTOR, RESCORE_MIN), len(approximate))
+        candidates = np.sort(np.argpartition(-approximate, c - 1)[:c]) # Ascending rows read the memory map sequentially
+        candidates = candidates[np.isfinite(approximate[candidates])]
+        scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+        order = np.argsort(-scores)[:n_results]
+        return [(self.documents[i], self.metadatas[i]) for i in candidates[order]]
+
+# -----------------------------------------------------------------------------
+# Building
+# -----------------------------------------------------------------------------
+def _embed_with_retry(embed_batch: EmbedBatch, texts: List[str]) -> List[List[float]]:
+    for attempt in range(1, EMBED_ATTEMPTS + 1):
+        try:
+            vectors = embed_batch(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+            return vectors
+        except Exception as e:
+            if attempt == EMBED_ATTEMPTS:
+                raise
+            logger.warning(f"Embedding batch of {len(texts)} failed (attempt {attempt}): {e}. Retrying...")
+            time.sleep(2 ** attempt)
+
+def _previous_vectors(root: Path, model: str) -> Dict[str, np.ndarray]:
+    """Maps content hash -> vector from the live snapshot, so unchanged documents aren't re-embedded."""
+    version = read_current_version(root)
+    if not version:
+        return {}
+    try:
+        previous = SnapshotIndex(root / version, verify=False)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable snapshot {version}: {e}")
+        return {}
+    if previous.manifest.get('model') != model:
+        return {}
+    return {h: np.array(previous.vectors[i]) for i, h in enumerate(previous.hashes)}
+
+def build_snapshot(
+    root: Path,
+    documents: List[Tuple[str, str, Dict[str, Any]]],
+    embed_batch: EmbedBatch,
+    model: str,
+    batch_size: int = 100,
+    workers: int = 4,
+    keep: int = 3,
+    quantization: str = 'none',
+    pq_subspaces: int = 96
+) -> Dict[str, Any]:
+    """Embeds (id, text, metadata) documents and publishes them as the new live snapshot.
+
+    `quantization` ('none', 'int8' or 'pq') adds compact codes that searches
+    scan instead of the float32 vectors. Returns a summary dict. If nothing
+    changed since the live snapshot, no new version is written.
+    """
+    if quantization not in QUANTIZATION_METHODS: # Checked before anything is embedded
+        raise ValueError(f"Unknown quantization method: {quantization}")
+    root.mkdir(parents=True, exist_ok=True)
+    with file_lock(root / "build"): # One builder at a time, across processes
+        hashes = [content_hash(text) for _, text, _ in documents]
+        settings = [model] if quantization == 'none' else [model, quantization, pq_subspaces if quantization == 'pq' else None]
+        fingerprint = hashlib.sha256(json.dumps(
+            settings + [[doc_id, h, metadata] for (doc_id, _, metadata), h in zip(documents, hashes)], sort_keys=True, default=str
+        ).encode('utf-8')).hexdigest()
+
+        current = read_current_version(root)
+        if current and current.endswith(fingerprint[:12]) and (root / current).exists():
+            logger.info(f"Snapshot {current} is already up to date.")
+            return {'version': current, 'documents': len(documents), 'embedded': 0, 'reused': len(documents), 'changed': False}
+
+        known = _previous_vectors(root, model)
+        pending = sorted({h: text for (_, text, _), h in zip(documents, hashes) if h not in known}.items())
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        if batches:
+            logger.info(f"Embedding {len(pending)} new/changed document(s) in {len(batches)} batch(es) with {workers} worker(s)...")
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                results = pool.map(lambda batch: _embed_with_retry(embed_batch, [text for _, text in batch]), batches)
+                for batch, vectors in zip(batches, results):
+                    for (h, _), vector in zip(batch, vectors):
+                        known[h] = np.asarray(vector, dtype=np.float32)
+
+        dimensions = len(next(iter(known.values()))) if known else 0
+        matrix = np.zeros((len(documents), dimensions), dtype=np.float32)
+        for row, h in enumerate(hashes):
+            matrix[row] = known[h]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        quantizer = train_quantizer(quantization, matrix, pq_subspaces)
+
+        version = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{fingerprint[:12]}"
+        staging = root / f".tmp-{version}"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        arrays = {VECTORS_FILE: matrix}
+        if quantizer is not None:
+            arrays.update({CODES_FILE: quantizer.encode(matrix), CODEBOOK_FILE: quantizer.parameters()})
+        for name, array in arrays.items():
+            with open(staging / name, 'wb') as f:
+                np.save(f, array)
+                f.flush()
+                os.fsync(f.fileno())
+        records = [{'id': doc_id, 'document': text, 'metadata': metadata, 'hash': h}
+                   for (doc_id, text, metadata), h in zip(documents, hashes)]
+        atomic_write_text(staging / DOCUMENTS_FILE, json.dumps(records, ensure_ascii=False))
+        manifest = {
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'model': model,
+            'count': len(documents),
+            'dimensions': dimensions,
+            'quantization': {**(quantizer.describe() if quantizer else {'method': 'none'}),
+                             'bytes_per_vector': arrays[CODES_FILE if quantizer else VECTORS_FILE].nbytes // max(1, len(documents))},
+            'sha256': {name: _file_sha256(staging / name) for name in (*arrays, DOCUMENTS_FILE)},
+        }
+        atomic_write_text(staging / MANIFEST_FILE, json.dumps(manifest, indent=2))
+        os.replace(staging, root / version)
+        atomic_write_text(root / CURRENT_FILE, version) # The switch-over point for serving workers
+        logger.info(f"Published snapshot {version} ({len(documents)} documents, {len(pending)} embedded).")
+
+        _prune_versions(root, keep=keep, live=version)
+        return {'version': version, 'documents': len(documents), 'embedded': len(pending),
+                'reused': len(documents) - len(pending), 'changed': True, 'quantization': manifest['quantization']}
+
+def _prune_versions(root: Path, keep: int, live: str):
+    """Deletes all but the newest `keep` versions. Workers still mapping an old one keep their handle."""
+    versions = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.')), key=lambda p: p.name)
+    for old in versions[:-keep] if keep > 0 else []:
+        if old.name != live:
+            shutil.rmtree(old, ignore_errors=True)
+
+# -----------------------------------------------------------------------------
+# Serving
+# -----------------------------------------------------------------------------
+class SnapshotManager:
+    """Holds the live SnapshotIndex and swaps it when CURRENT points at a new version.
+
+    The pointer is checked at most every `check_interval` seconds; a new
+    version is loaded (and checksum-verified) on a background thread while
+    requests keep using the old one.
+    """
+
+    def __init__(self, root: Path, check_interval: float = 2.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._index: Optional[SnapshotIndex] = None
+        self._lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+        self._loading: Optional[str] = None
+        self._failed: Optional[str] = None
+        self._next_check = 0.0
+
+    def current(self) -> Optional[SnapshotIndex]:
+        if self._index is None:
+            # Nothing to serve yet: load inline, and make concurrent first callers wait for it
+            # rather than see None and fall back to Chroma
+            with self._first_load_lock:
+                if self._index is None:
+                    return self._check()
+        return self._check()
+
+    def _check(self) -> Optional[SnapshotIndex]:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            version = read_current_version(self.root)
+            if version and version != self._failed and (self._index is None or version != self._index.version):
+                if self._index is None:
+                    self._load(version)
+                else:
+                    self._load_in_background(version)
+        return self._index
+
+    def _load(self, version: str):
+        try:
+            index = SnapshotIndex(self.root / version)
+        except Exception as e:
+            logger.error(f"Failed to load knowledge base snapshot {version}: {e}")
+            self._failed = version
+            return
+        with self._lock:
+            self._index = index # Single reference swap; in-flight searches keep the old index
+        logger.info(f"Serving knowledge base snapshot {version} ({len(index)} documents).")
+
+    def _load_in_background(self, version: str):
+        with self._lock:
+            if self._loading == version:
+                return
+            self._loading = version
+
+        def run():
+            try:
+                self._load(version)
+            finally:
+                with self._lock:
+                    self._loading = None
+        threading.Thread(target=run, name=f"snapshot-load-{version}", daemon=True).start()
+
+class SnapshotRebuilder:
+    """Runs the offline builder as a separate process, coalescing requests made while one is running."""
+
+    def __init__(self, script: Path):
+        self.script = script
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._pending = False
+
+    def request(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._pending = True
+                return
+            self._start()
+
+    def _start(self):
+        self._pending = False
+        self._process = subprocess.Popen([sys.executable, str(self.script)], cwd=str(self.script.parent))
+        threading.Thread(target=self._wait, args=(self._process,), daemon=True).start()
+
+    def _wait(self, process: subprocess.Popen):
+        returncode = process.wait()
+        if returncode != 0:
+            logger.error(f"Knowledge base rebuild exited with status {returncode}.")
+        with self._lock:
+            if self._pending and self._process is process:
+                self._start()
@@ -0,0 +1,129 @@
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Set, Callable
+
+# Heavy imports: this module is only imported on first use of the knowledge base
+import google.generativeai as genai
+from chromadb import PersistentClient, EmbeddingFunction
+from chromadb.api.models.Collection import Collection
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Vector Store Setup and Functions
+# -----------------------------------------------------------------------------
+class GeminiEmbeddingFunction(EmbeddingFunction):
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        genai.configure(api_key=self.api_key)
+        model = "models/embedding-001"
+        try:
+            # Simplified: process one by one if batching fails or isn't straightforward
+            embeddings = []
+            for text in input:
+                 result = genai.embed_content(model=model, content=text, task_type="retrieval_document")
+                 embeddings.append(result["embedding"])
+            return embeddings
+        except Exception as e:
+            logger.error(f"Error generating Gemini embedding: {e}")
+            raise RuntimeError("Embedding generation failed.") from e
+
+def open_collection(db_path: Path, name: str, api_key: Optional[str] = None) -> Collection:
+    """Opens (or creates) the persisted ChromaDB collection without ingesting anything."""
+    try:
+        client = PersistentClient(path=str(db_path)) # Path object needs conversion
+        collection = client.get_or_create_collection(name=name, embedding_function=GeminiEmbeddingFunction(api_key))
+        logger.info(f"Chroma collection '{name}' opened with {collection.count()} documents.")
+        return collection
+    except Exception as e:
+        logger.error(f"Error opening Chroma collection: {e}")
+        raise RuntimeError("Vector store initialization failed.") from e
+
+def sync_canonical(collection: Collection, kind: str, documents: List[Tuple[str, str, Dict[str, Any]]],
+                   changed_ids: Set[str], batch_size: int = 50,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+    """Makes the collection's `kind` documents exactly `documents` (the canonical ones, see dedupe.py).
+
+    Only documents that are new or listed in `changed_ids` are embedded; the
+    others just get their metadata (e.g. the list of duplicates) rewritten if
+    it changed. Documents no longer wanted, such as a posting that became a
+    duplicate, are deleted. `progress(embedded, total)` is called after each
+    embedded batch.
+    """
+    existing = collection.get(where={'source_type': kind}, include=['metadatas'])
+    current = dict(zip(existing['ids'], existing['metadatas']))
+    wanted = {doc_id for doc_id, _, _ in documents}
+    stale = [doc_id for doc_id in current if doc_id not in wanted]
+    embed = [d for d in documents if d[0] not in current or d[0] in changed_ids]
+    relabel = [d for d in documents if d[0] in current and d[0] not in changed_ids and current[d[0]] != d[2]]
+    if stale:
+        collection.delete(ids=stale)
+    for start in range(0, len(embed), batch_size):
+        batch = embed[start:start + batch_size]
+        collection.upsert(ids=[d[0] for d in batch], documents=[d[1] for d in batch], metadatas=[d[2] for d in batch])
+        if progress:
+            progress(start + len(batch), len(embed))
+    for start in range(0, len(relabel), batch_size):
+        batch = relabel[start:start + batch_size]
+        collection.update(ids=[d[0] for d in batch], metadatas=[d[2] for d in batch]) # No re-embedding
+    return {'embedded': len(embed), 'relabelled': len(relabel), 'deleted': len(stale)}
+
+def sync_documents(collection: Collection, documents: List[Tuple[str, str, Dict[str, Any]]], deleted_ids: List[str], batch_size: int = 50) -> bool:
+    """Upserts prebuilt (id, document, metadata) triples and deletes document ids, in batches."""
+    try:
+        if deleted_ids:
+            collection.delete(ids=deleted_ids)
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            collection.upsert(ids=[d[0] for d in batch], documents=[d[1] for d in batch], metadatas=[d[2] for d in batch])
+        return True
+    except Exception as e:
+        logger.error(f"Error syncing documents to vector store: {e}")
+        return False
+
+# -----------------------------------------------------------------------------
+# Retrieval
+# -----------------------------------------------------------------------------
+def get_relevant_passage(
+    query: str,
+    db: Collection,
+    n_results: int = 5, # Retrieve more initially for potential filtering/ranking
+    source_type_filter: Optional[str] = None
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Retrieves relevant passages, optionally filtered by source_type, and returns docs with metadata."""
+    if not db:
+        logger.error("Vector store not available for query.")
+        return []
+    try:
+        # Construct the where clause only if a filter is provided
+        where_clause = {'source_type': source_type_filter} if source_type_filter else None
+
+        # Perform the query, including metadata and specifying the where clause if applicable
+        if where_clause:
+            results = db.query(query_texts=[query], n_results=n_results, where=where_clause, include=['documents', 'metadatas'])
+        else:
+            # Query without filter if no source type specified
+            results = db.query(query_texts=[query], n_results=n_results, include=['documents', 'metadatas'])
+
+        # Safely extract documents and metadatas
+        docs = results.get("documents")
+        metadatas = results.get("metadatas")
+
+        # Check if results are valid lists and have content
+        if docs and metadatas and isinstance(docs, list) and len(docs) > 0 and isinstance(metadatas, list) and len(metadatas) > 0:
+            # Ensure docs[0] and metadatas[0] are lists themselves (ChromaDB structure)
+            doc_list = docs[0] if isinstance(docs[0], list) else []
+            meta_list = metadatas[0] if isinstance(metadatas[0], list) else []
+
+            # Combine documents and metadata into tuples, ensuring lengths match
+            min_len = min(len(doc_list), len(meta_list))
+            return list(zip(doc_list[:min_len], meta_list[:min_len]))
+        else:
+            # Return empty list if results are missing or malformed
+            logger.warning(f"Query returned no documents or metadata for query: '{query}' with filter: {source_type_filter}")
+            return []
+    except Exception as e:
+        logger.error(f"Error querying vector store: {e}", exc_info=True)
+        return []
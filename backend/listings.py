@@ -0,0 +1,269 @@
+import re
+import json
+import base64
+import bisect
+import logging
+import threading
+from datetime import date
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Listing Search
+# -----------------------------------------------------------------------------
+# The discover page searches jobs and sessions through /api/search instead of
+# downloading every listing. Each worker keeps one in-memory index per entity:
+#
+#   * an inverted index over the words of the searchable fields; query words
+#     match by prefix ("eng" finds "engineer") and title words weigh more;
+#   * one posting set per facet value (location city, type, category, ...);
+#   * the listings in date order (deadline for jobs, date for sessions).
+#
+# The index follows the data store's version counter: after a write (by any
+# worker) the listings are re-read and compared record by record, and only
+# added, changed or deleted ones are re-indexed.
+#
+# Pages are addressed by an opaque cursor holding the sort key of the last
+# item returned, so paging stays consistent while listings are added.
+
+LISTING_FIELDS: Dict[str, Dict[str, Any]] = {
+    'jobs': {
+        'text': {'title': 3, 'company': 2, 'location': 1, 'type': 1, 'category': 1, 'description': 1},
+        'facets': ('location', 'type', 'category', 'diversity_focus'),
+        'date': 'deadline',
+    },
+    'sessions': {
+        'text': {'title': 3, 'organizer': 2, 'location': 1, 'category': 1, 'tags': 1, 'description': 1},
+        'facets': ('location', 'category', 'tags'),
+        'date': 'date',
+    },
+}
+SORTS = ('date', 'relevance')
+MAX_FACET_VALUES = 20
+
+_WORD = re.compile(r"[^\W_]+")
+_NO_DATE = "9999-99-99" # Undated listings sort last
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def _values(value: Any) -> List[str]:
+    """A record field as a list of non-empty strings (tags are lists, everything else a scalar)."""
+    items = value if isinstance(value, list) else [value]
+    return [str(item).strip() for item in items if item is not None and str(item).strip()]
+
+def _facet_value(facet: str, value: str) -> str:
+    # "Bangalore, Karnataka" and "Bangalore" are the same place to a visitor
+    return value.split(',')[0].strip() if facet == 'location' else value
+
+def encode_search_cursor(key: Tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_search_cursor(cursor: str) -> Tuple:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(key, list) or not key:
+            raise ValueError
+        return tuple(key)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+
+def _parse_day(value: Optional[str], name: str) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid {name} date: {value}") from None
+
+class _Doc:
+    __slots__ = ('record', 'weights', 'facets', 'day')
+
+    def __init__(self, record: Dict[str, Any], weights: Dict[str, int], facets: Dict[str, Dict[str, str]], day: str):
+        self.record = record
+        self.weights = weights # token -> highest weight of a field it occurs in
+        self.facets = facets # facet -> {normalised value: label}
+        self.day = day
+
+class ListingIndex:
+    """In-memory keyword, facet and date index over one entity's listings."""
+
+    def __init__(self, entity: str):
+        fields = LISTING_FIELDS[entity]
+        self.entity = entity
+        self.text_fields: Dict[str, int] = fields['text']
+        self.facets: Tuple[str, ...] = fields['facets']
+        self.date_field: str = fields['date']
+        self.version: Optional[int] = None
+        self._docs: Dict[str, _Doc] = {}
+        self._postings: Dict[str, Dict[str, int]] = {} # token -> {listing id: weight}
+        self._vocabulary: List[str] = [] # Sorted tokens, for prefix lookups
+        self._facet_postings: Dict[str, Dict[str, Set[str]]] = {facet: {} for facet in self.facets}
+        self._facet_labels: Dict[str, Dict[str, str]] = {facet: {} for facet in self.facets}
+        self._order: List[Tuple[str, str]] = [] # (day, id) of every listing, ascending
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # --- Maintenance ---
+    def sync(self, version: int, load: Callable[[], List[Dict[str, Any]]]) -> Dict[str, int]:
+        """Brings the index up to `version` of the data store, re-indexing only records that differ."""
+        if version == self.version:
+            return {'indexed': 0, 'removed': 0}
+        with self._lock:
+            if version == self.version:
+                return {'indexed': 0, 'removed': 0}
+            records = load() # Read after `version`, so a concurrent write is at worst picked up twice
+            seen: Set[str] = set()
+            indexed = 0
+            for record in records:
+                listing_id = str(record.get('id'))
+                seen.add(listing_id)
+                current = self._docs.get(listing_id)
+                if current is not None and current.record == record:
+                    continue
+                if current is not None:
+                    self._remove(listing_id)
+                self._add(listing_id, record)
+                indexed += 1
+            removed = [listing_id for listing_id in self._docs if listing_id not in seen]
+            for listing_id in removed:
+                self._remove(listing_id)
+            if indexed or removed:
+                self._vocabulary = sorted(self._postings)
+                self._order = sorted((doc.day, listing_id) for listing_id, doc in self._docs.items())
+                logger.info(f"Search index for {self.entity}: {indexed} listing(s) indexed, {len(removed)} removed, {len(self._docs)} total.")
+            self.version = version
+            return {'indexed': indexed, 'removed': len(removed)}
+
+    def _add(self, listing_id: str, record: Dict[str, Any]):
+        weights: Dict[str, int] = {}
+        for field, weight in self.text_fields.items():
+            for value in _values(record.get(field)):
+                for token in tokenize(value):
+                    if weights.get(token, 0) < weight:
+                        weights[token] = weight
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[listing_id] = weight
+        facets: Dict[str, Dict[str, str]] = {}
+        for facet in self.facets:
+            labels = {_facet_value(facet, v).lower(): _facet_value(facet, v) for v in _values(record.get(facet))}
+            for key, label in labels.items():
+                self._facet_postings[facet].setdefault(key, set()).add(listing_id)
+                self._facet_labels[facet].setdefault(key, label)
+            facets[facet] = labels
+        try:
+            day = date.fromisoformat(str(record.get(self.date_field) or '')).isoformat()
+        except ValueError:
+            day = _NO_DATE
+        self._docs[listing_id] = _Doc(record, weights, facets, day)
+
+    def _remove(self, listing_id: str):
+        doc = self._docs.pop(listing_id)
+        for token in doc.weights:
+            postings = self._postings[token]
+            postings.pop(listing_id, None)
+            if not postings:
+                del self._postings[token]
+        for facet, labels in doc.facets.items():
+            for key in labels:
+                postings = self._facet_postings[facet][key]
+                postings.discard(listing_id)
+                if not postings:
+                    del self._facet_postings[facet][key]
+                    del self._facet_labels[facet][key]
+
+    # --- Queries ---
+    def _match_terms(self, terms: List[str]) -> Dict[str, int]:
+        """Listings containing every term (as a word prefix) -> relevance score."""
+        scores: Optional[Dict[str, int]] = None
+        for term in terms:
+            matched: Dict[str, int] = {}
+            i = bisect.bisect_left(self._vocabulary, term)
+            while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+                token = self._vocabulary[i]
+                exact = 2 if token == term else 1 # Whole-word matches rank above prefix matches
+                for listing_id, weight in self._postings[token].items():
+                    if matched.get(listing_id, 0) < weight * exact:
+                        matched[listing_id] = weight * exact
+                i += 1
+            if scores is None:
+                scores = matched
+            else:
+                scores = {listing_id: score + matched[listing_id] for listing_id, score in scores.items() if listing_id in matched}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search(self, query: str = "", filters: Optional[Dict[str, List[str]]] = None, date_from: Optional[str] = None,
+               date_to: Optional[str] = None, sort: Optional[str] = None, cursor: Optional[str] = None, limit: int = 24) -> Dict[str, Any]:
+        """One page of listings plus the total and facet counts. Raises ValueError for invalid parameters."""
+        terms = tokenize(query or "")
+        sort = sort or ('relevance' if terms else 'date')
+        if sort not in SORTS:
+            raise ValueError(f"Invalid sort: {sort}")
+        date_from, date_to = _parse_day(date_from, 'from'), _parse_day(date_to, 'to')
+        after = decode_search_cursor(cursor) if cursor else None
+        key_types = (int, str, str) if sort == 'relevance' else (str, str)
+        if after is not None and (len(after) != len(key_types) or not all(isinstance(v, t) for v, t in zip(after, key_types))):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        selected = {facet: {_facet_value(facet, v.strip()).lower() for v in values if v.strip()}
+                    for facet, values in (filters or {}).items() if facet in self.facets}
+        selected = {facet: keys for facet, keys in selected.items() if keys}
+
+        with self._lock:
+            scores = self._match_terms(terms) if terms else None
+            candidates: Set[str] = set(scores) if scores is not None else set(self._docs)
+            if date_from or date_to:
+                low, high = date_from or "", date_to or "9999-12-31"
+                candidates = {listing_id for listing_id in candidates if low <= self._docs[listing_id].day <= high}
+            facet_sets = {facet: set().union(*(self._facet_postings[facet].get(key, ()) for key in keys))
+                          for facet, keys in selected.items()}
+
+            def narrowed(skip: Optional[str] = None) -> Set[str]:
+                result = candidates
+                for facet, allowed in facet_sets.items():
+                    if facet != skip:
+                        result = result & allowed
+                return result
+
+            matched = narrowed()
+            # Each facet is counted with the other facets' filters applied, so a visitor can widen a selection
+            facet_counts: Dict[str, List[Dict[str, Any]]] = {}
+            for facet in self.facets:
+                base = narrowed(skip=facet) if facet in facet_sets else matched
+                counts = [(len(base & postings), key) for key, postings in self._facet_postings[facet].items()]
+                counts.sort(key=lambda c: (-c[0], c[1]))
+                facet_counts[facet] = [{'value': self._facet_labels[facet][key], 'count': count}
+                                       for count, key in counts[:MAX_FACET_VALUES] if count or key in selected.get(facet, ())]
+
+            if sort == 'relevance':
+                keys = sorted((-(scores or {}).get(listing_id, 0), self._docs[listing_id].day, listing_id) for listing_id in matched)
+                start = bisect.bisect_right(keys, after) if after else 0
+                page_keys = keys[start:start + limit + 1]
+            elif len(matched) * 8 < len(self._order):
+                keys = sorted((self._docs[listing_id].day, listing_id) for listing_id in matched)
+                start = bisect.bisect_right(keys, after) if after else 0
+                page_keys = keys[start:start + limit + 1]
+            else:
+                # Most listings match: walk the precomputed date order from the cursor instead of sorting
+                start = bisect.bisect_right(self._order, after) if after else 0
+                page_keys = []
+                for key in self._order[start:] if start else self._order:
+                    if key[1] in matched:
+                        page_keys.append(key)
+                        if len(page_keys) > limit:
+                            break
+            has_more = len(page_keys) > limit
+            page_keys = page_keys[:limit]
+            items = [self._docs[key[-1]].record for key in page_keys]
+
+        return {
+            'items': items,
+            'total': len(matched),
+            'next_cursor': encode_search_cursor(list(page_keys[-1])) if has_more else None,
+            'facets': facet_counts,
+            'sort': sort,
+        }
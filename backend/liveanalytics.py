@@ -0,0 +1,487 @@
+import os
+import copy
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+from eventstore import EventStore
+from export import iter_json_array
+from users import ANONYMOUS, is_anonymous
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Live Analytics
+# -----------------------------------------------------------------------------
+# AnalyticsState holds the running totals behind /admin/analytics. It is
+# loaded from the event store with a handful of columnar queries, and events
+# can then be added to it one by one, each touching a few counters.
+#
+# LiveAnalytics keeps one such state for the current year. Closed days come
+# from the store; today's day file is followed by a background thread, which
+# reads only the bytes appended since its last read. Every append rewrites the
+# file as "[..., new events]", so new events always start at the old closing
+# bracket. Following the file rather than hooking log_analytics_event means
+# every worker sees events logged by all workers; log_analytics_event only
+# wakes the thread up early. Subscribers get the rendered state once and then
+# a JSON merge patch (RFC 7386) of the changed counters per batch of events,
+# so keeping a dashboard current costs the same however long the history is.
+
+RESPONSE_TIMES_KEPT = 2000
+ACCURACY_KEYS = ("accurate", "inaccurate", "unsure", "other")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+def _label(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+def _as_int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+def _response_time(data: Dict[str, Any]) -> Optional[float]:
+    try:
+        value = float(data.get('response_time_sec') or data.get('response_time'))
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value # NaN counts as missing
+
+def _set_path(target: Dict[str, Any], path: Tuple[str, ...], value: Any):
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    target[path[-1]] = value
+
+def _get_path(source: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    for key in path:
+        source = source[key]
+    return source
+
+class AnalyticsState:
+    """The /admin/analytics aggregates for a date range, updatable one event at a time."""
+
+    def __init__(self, top_users: int = 20):
+        self.top_users = top_users
+        self.data: Dict[str, Any] = {
+            "conversations": {"total_conversations": 0, "conversations_by_date": {}, "language_distribution": {}, "topic_distribution": {},
+                              "bias_metrics": {"bias_detected_count": 0, "bias_prevented_count": 0, "bias_types": {}}},
+            "users": {"total_users": 0, "active_users": 0, "new_users": None, "retention_rate": None},
+            "feedback": {"total_feedback": 0, "accuracy_ratings": dict.fromkeys(ACCURACY_KEYS, 0), "feedback_by_date": {},
+                         "response_quality": {"helpful": 0, "not_helpful": 0}},
+            "tokens": {"total_input": 0, "total_output": 0, "calls": 0, "by_date": {}, "by_topic": {}, "by_language": {}, "by_stage": {}},
+        }
+        self.response_times: deque = deque(maxlen=RESPONSE_TIMES_KEPT)
+        self.users: set = set()
+        self.tokens_by_user: Dict[str, Dict[str, int]] = {}
+        self._top: List[str] = []
+        # Changes since the last take_delta()
+        self._dirty: set = set()
+        self._new_response_times: List[float] = []
+        self._top_changed = False
+
+    # --- Bulk load ---
+    def load(self, store: EventStore, start: date, end: date):
+        """Fills the totals from the store's events between `start` and `end` (inclusive)."""
+        def counts(column: str, event_type: str, missing: Optional[str] = None) -> Dict[str, int]:
+            """Event counts of one type by a label column, with missing labels counted under `missing`."""
+            result: Dict[str, int] = {}
+            for row in store.query(start, end, group_by=[column], filters={"event_type": [event_type]}):
+                key = row[column] if row[column] is not None else missing
+                result[key] = result.get(key, 0) + row["count"]
+            return result
+
+        def token_counts(column: str, missing: str, table: str = "events") -> Dict[str, Dict[str, int]]:
+            """Token usage by a label column, over events that carry a usage summary."""
+            result: Dict[str, Dict[str, int]] = {}
+            for row in store.query(start, end, group_by=[column], aggregates=["sum:tokens_input", "sum:tokens_output"],
+                                   filters={"has_tokens": ["true"]}, table=table):
+                entry = result.setdefault(row[column] if row[column] is not None else missing, {"input": 0, "output": 0})
+                entry["input"] += row["sum_tokens_input"]
+                entry["output"] += row["sum_tokens_output"]
+            return result
+
+        conversations, feedback, tokens = self.data["conversations"], self.data["feedback"], self.data["tokens"]
+        conversations["conversations_by_date"] = counts("date", "chat")
+        conversations["total_conversations"] = sum(conversations["conversations_by_date"].values())
+        conversations["language_distribution"] = counts("language", "chat", "Unknown")
+        conversations["topic_distribution"] = counts("topic", "chat", "general")
+        bias = conversations["bias_metrics"]
+        bias["bias_types"] = counts("bias_type", "bias_detected", "other")
+        bias["bias_detected_count"] = sum(bias["bias_types"].values())
+        bias["bias_prevented_count"] = counts("prevented", "bias_detected").get("true", 0)
+        self.response_times.extend(store.values(start, end, "response_time", filters={"event_type": ["chat"]}, last=RESPONSE_TIMES_KEPT))
+
+        feedback["feedback_by_date"] = counts("date", "feedback")
+        feedback["total_feedback"] = sum(feedback["feedback_by_date"].values())
+        for rating, count in counts("accuracy_rating", "feedback", "unsure").items():
+            feedback["accuracy_ratings"][rating.lower() if rating.lower() in ACCURACY_KEYS else "other"] += count
+        helpful = counts("helpful", "feedback")
+        feedback["response_quality"] = {"helpful": helpful.get("true", 0), "not_helpful": helpful.get("false", 0)}
+
+        # Chat, bias_detected and llm_usage events carry the request's Gemini usage
+        self.users = {row["user_id"] for row in store.query(start, end, group_by=["user_id"]) if row["user_id"] is not None}
+        self.data["users"]["total_users"] = self.data["users"]["active_users"] = len(self.users) # Users seen in the range
+        totals = store.query(start, end, aggregates=["sum:tokens_input", "sum:tokens_output", "sum:tokens_calls"], filters={"has_tokens": ["true"]})
+        if totals:
+            tokens["total_input"], tokens["total_output"], tokens["calls"] = (
+                totals[0]["sum_tokens_input"], totals[0]["sum_tokens_output"], totals[0]["sum_tokens_calls"])
+        tokens["by_date"] = token_counts("date", "Unknown")
+        tokens["by_topic"] = token_counts("topic", "general")
+        tokens["by_language"] = token_counts("language", "Unknown")
+        tokens["by_stage"] = token_counts("stage", "unknown", table="stages")
+        self.tokens_by_user = token_counts("user_id", ANONYMOUS)
+        # Anonymous visitors share ids, so they are not ranked as one heavy "user"
+        self._top = [user for user, _ in sorted(((user, usage) for user, usage in self.tokens_by_user.items() if not is_anonymous(user)),
+                                                key=lambda item: item[1]["input"] + item[1]["output"], reverse=True)[:self.top_users]]
+
+    # --- Incremental updates ---
+    def _bump(self, path: Tuple[str, ...], amount: int = 1):
+        parent = self.data
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = parent.get(path[-1], 0) + amount
+        self._dirty.add(path)
+
+    def _add_tokens(self, section: str, key: str, input_tokens: int, output_tokens: int):
+        self._bump(("tokens", section, key, "input"), input_tokens)
+        self._bump(("tokens", section, key, "output"), output_tokens)
+
+    def _charge_user(self, user: str, input_tokens: int, output_tokens: int):
+        entry = self.tokens_by_user.setdefault(user, {"input": 0, "output": 0})
+        entry["input"] += input_tokens
+        entry["output"] += output_tokens
+        if is_anonymous(user):
+            return
+        # Totals only grow, so only the user just charged can enter or move within the top list
+        total = lambda uid: self.tokens_by_user[uid]["input"] + self.tokens_by_user[uid]["output"]
+        if user in self._top or len(self._top) < self.top_users or total(user) > total(self._top[-1]):
+            if user not in self._top:
+                self._top.append(user)
+            self._top = sorted(self._top, key=total, reverse=True)[:self.top_users]
+            self._top_changed = True
+
+    def add(self, event: Any):
+        """Adds one raw event, skipping malformed ones like the event store does."""
+        if not isinstance(event, dict) or 'timestamp' not in event or 'event_type' not in event:
+            return
+        try:
+            day = datetime.fromisoformat(event['timestamp']).date().isoformat()
+        except (TypeError, ValueError):
+            return
+        event_type = _label(event['event_type'])
+        data = event.get('data') if isinstance(event.get('data'), dict) else {}
+        user = _label(data.get('user_id') or None)
+        language, topic = _label(data.get('language')), _label(data.get('topic'))
+
+        if user is not None and user not in self.users:
+            self.users.add(user)
+            self.data["users"]["total_users"] = self.data["users"]["active_users"] = len(self.users)
+            self._dirty.update({("users", "total_users"), ("users", "active_users")})
+
+        if event_type == "chat":
+            self._bump(("conversations", "total_conversations"))
+            self._bump(("conversations", "conversations_by_date", day))
+            self._bump(("conversations", "language_distribution", language if language is not None else "Unknown"))
+            self._bump(("conversations", "topic_distribution", topic if topic is not None else "general"))
+            response_time = _response_time(data)
+            if response_time is not None:
+                self.response_times.append(response_time)
+                self._new_response_times.append(response_time)
+        elif event_type == "bias_detected":
+            bias_type = _label(data.get('bias_type'))
+            self._bump(("conversations", "bias_metrics", "bias_detected_count"))
+            self._bump(("conversations", "bias_metrics", "bias_types", bias_type if bias_type is not None else "other"))
+            if data.get('prevented'):
+                self._bump(("conversations", "bias_metrics", "bias_prevented_count"))
+        elif event_type == "feedback":
+            rating = _label(data.get('accuracy_rating'))
+            rating = "unsure" if rating is None else rating.lower()
+            self._bump(("feedback", "total_feedback"))
+            self._bump(("feedback", "feedback_by_date", day))
+            self._bump(("feedback", "accuracy_ratings", rating if rating in ACCURACY_KEYS else "other"))
+            if isinstance(data.get('helpful'), bool):
+                self._bump(("feedback", "response_quality", "helpful" if data['helpful'] else "not_helpful"))
+
+        usage = data.get('tokens') if isinstance(data.get('tokens'), dict) else None
+        if usage is not None:
+            input_tokens, output_tokens = _as_int(usage.get('input', 0)), _as_int(usage.get('output', 0))
+            self._bump(("tokens", "total_input"), input_tokens)
+            self._bump(("tokens", "total_output"), output_tokens)
+            self._bump(("tokens", "calls"), _as_int(usage.get('calls', 0)))
+            self._add_tokens("by_date", day, input_tokens, output_tokens)
+            self._add_tokens("by_topic", topic if topic is not None else "general", input_tokens, output_tokens)
+            self._add_tokens("by_language", language if language is not None else "Unknown", input_tokens, output_tokens)
+            by_stage = usage.get('by_stage')
+            for stage, stage_usage in (by_stage.items() if isinstance(by_stage, dict) else ()):
+                if isinstance(stage_usage, dict):
+                    self._add_tokens("by_stage", str(stage), _as_int(stage_usage.get('input', 0)), _as_int(stage_usage.get('output', 0)))
+            self._charge_user(user if user is not None else ANONYMOUS, input_tokens, output_tokens)
+
+    # --- Output ---
+    def _derived(self) -> Dict[str, Any]:
+        """Rates, the top-users list and timestamps, as a merge patch over `data`."""
+        conversations, feedback = self.data["conversations"], self.data["feedback"]
+        bias = conversations["bias_metrics"]
+        rated = feedback["accuracy_ratings"]["accurate"] + feedback["accuracy_ratings"]["inaccurate"]
+        accuracy_rate = (feedback["accuracy_ratings"]["accurate"] / rated * 100) if rated > 0 and conversations["total_conversations"] > 0 else None
+        now = datetime.now().isoformat()
+        return {
+            "conversations": {"last_updated": now, "bias_metrics": {
+                "prevention_rate": (bias["bias_prevented_count"] / bias["bias_detected_count"] * 100) if bias["bias_detected_count"] > 0 else None}},
+            "feedback": {"last_updated": now, "calculated_accuracy_rate": accuracy_rate},
+            "tokens": {"last_updated": now},
+        }
+
+    def _top_users(self) -> List[Dict[str, Any]]:
+        return [{"user_id": uid, **self.tokens_by_user[uid]} for uid in self._top]
+
+    def render(self) -> Dict[str, Any]:
+        """The full /admin/analytics payload."""
+        result = copy.deepcopy(self.data)
+        for section, values in self._derived().items():
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    result[section][key].update(value)
+                else:
+                    result[section][key] = value
+        result["conversations"]["response_times"] = list(self.response_times)
+        result["tokens"]["top_users"] = self._top_users()
+        return result
+
+    def take_delta(self) -> Optional[Dict[str, Any]]:
+        """Changes since the last call: {'patch': merge patch, 'response_times': [appended]}, or None if nothing changed."""
+        if not self._dirty and not self._new_response_times:
+            return None
+        patch = self._derived()
+        for path in self._dirty:
+            _set_path(patch, path, _get_path(self.data, path))
+        if self._top_changed:
+            patch["tokens"]["top_users"] = self._top_users()
+        delta: Dict[str, Any] = {"patch": patch}
+        if self._new_response_times:
+            delta["response_times"] = self._new_response_times
+        self._dirty, self._new_response_times, self._top_changed = set(), [], False
+        return delta
+
+# --- Following a day file ---
+def _skip_whitespace(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+def _parse_appended(text: str, first: bool) -> Optional[Tuple[List[Any], int]]:
+    """Items in `text`, which starts at the previous closing bracket (or at the file start if `first`).
+
+    Returns (items, index of the new closing bracket), or None if the text
+    is not "[a, b]" / ", c, d]" (the file was rewritten some other way).
+    """
+    pos = _skip_whitespace(text, 0)
+    if first:
+        if not text.startswith('[', pos):
+            return None
+        pos = _skip_whitespace(text, pos + 1)
+    items: List[Any] = []
+    while pos < len(text):
+        if text[pos] == ']':
+            return items, pos
+        if items or not first:
+            if text[pos] != ',':
+                return None
+            pos = _skip_whitespace(text, pos + 1)
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return None
+        items.append(item)
+        pos = _skip_whitespace(text, pos)
+    return None
+
+class _DayTail:
+    """Returns the events appended to one day file since the previous read."""
+
+    def __init__(self, path: Path, day: date):
+        self.path = path
+        self.day = day
+        self.offset = 0 # Byte offset of the closing bracket once the file has been read
+        self.count = 0
+        self.version: Optional[Tuple[int, int]] = None
+
+    def read_new(self) -> List[Any]:
+        try:
+            f = open(self.path, 'rb') # Appends replace the file atomically, so this is one consistent version
+        except FileNotFoundError:
+            return []
+        with f:
+            stat = os.fstat(f.fileno())
+            version = (stat.st_mtime_ns, stat.st_size)
+            if version == self.version:
+                return []
+            f.seek(self.offset)
+            text = f.read().decode('utf-8')
+        parsed = _parse_appended(text, first=self.count == 0 and self.offset == 0)
+        if parsed is not None:
+            items, end = parsed
+            self.offset += len(text[:end].encode('utf-8'))
+        else:
+            # Not a plain append (e.g. reformatted by a tool): re-read the file and skip what was seen
+            logger.info(f"{self.path} was rewritten; re-reading it")
+            try:
+                items = list(islice(iter_json_array(self.path), self.count, None))
+            except ValueError as e:
+                logger.error(f"Could not read {self.path}: {e}")
+                items = []
+            with open(self.path, 'rb') as f:
+                f.seek(max(0, stat.st_size - 64))
+                tail = f.read()
+            self.offset = max(0, stat.st_size - len(tail) + tail.rfind(b']'))
+        self.count += len(items)
+        self.version = version
+        return items
+
+class _Subscriber:
+    __slots__ = ('queue', 'lagged')
+
+    def __init__(self, size: int):
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=size)
+        self.lagged = False
+
+    def put(self, message: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.lagged = True # Too slow to keep up: gets a fresh snapshot instead
+
+class LiveAnalytics:
+    def __init__(self, store: EventStore, analytics_dir: Path, date_format: str = "%Y-%m-%d", top_users: int = 20,
+                 poll_interval: float = 1.0, queue_size: int = 256):
+        self.store = store
+        self.analytics_dir = Path(analytics_dir)
+        self.date_format = date_format
+        self.top_users = top_users
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._state: Optional[AnalyticsState] = None
+        self._year: Optional[int] = None
+        self._tail: Optional[_DayTail] = None
+        self._seq = 0
+        self._subscribers: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _day_tail(self, day: date) -> _DayTail:
+        return _DayTail(self.analytics_dir / f"events_{day.strftime(self.date_format)}.json", day)
+
+    def _reset(self, today: date):
+        """Loads the year's closed days from the store and starts following today's file (lock held)."""
+        state = AnalyticsState(self.top_users)
+        if today > date(today.year, 1, 1):
+            state.load(self.store, date(today.year, 1, 1), today - timedelta(days=1))
+        self._tail = self._day_tail(today)
+        for event in self._tail.read_new():
+            state.add(event)
+        state.take_delta()
+        self._state, self._year = state, today.year
+        self._seq += 1
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {"type": "snapshot", "seq": self._seq, "year": self._year, "data": self._state.render()}
+
+    def _publish(self, message: Dict[str, Any]):
+        for subscriber in self._subscribers:
+            subscriber.put(message)
+
+    def poll(self):
+        """Applies events appended since the last poll and publishes the resulting delta."""
+        today = date.today()
+        with self._lock:
+            if self._state is None:
+                return
+            if today.year != self._year:
+                self._reset(today)
+                self._publish(self._snapshot())
+                return
+        tail = self._tail
+        events = tail.read_new()
+        if today != tail.day:
+            # Midnight: drain yesterday's file (its last batch may have landed late), then follow today's
+            self._tail = self._day_tail(today)
+            events += self._tail.read_new()
+        with self._lock:
+            for event in events:
+                self._state.add(event)
+            delta = self._state.take_delta()
+            if delta is not None:
+                self._seq += 1
+                self._publish({"type": "delta", "seq": self._seq, **delta})
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Live analytics update failed: {e}", exc_info=True)
+
+    def notify(self):
+        """Called after an event is logged, so this worker publishes it without waiting for the next poll."""
+        self._wake.set()
+
+    def subscribe(self) -> Tuple[_Subscriber, Dict[str, Any]]:
+        """Registers a subscriber and returns it with a snapshot; deltas queued for it follow that snapshot."""
+        with self._lock:
+            if self._state is None:
+                self._reset(date.today())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-analytics", daemon=True)
+                self._thread.start()
+            subscriber = _Subscriber(self.queue_size)
+            self._subscribers.add(subscriber)
+            return subscriber, self._snapshot()
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def next_message(self, subscriber: _Subscriber, timeout: float) -> Optional[Dict[str, Any]]:
+        """The subscriber's next message (a fresh snapshot if it fell behind), or None after `timeout` seconds."""
+        if subscriber.lagged:
+            with self._lock:
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.lagged = False
+                return self._snapshot()
+        try:
+            return subscriber.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def events(self, subscriber: _Subscriber, snapshot: Dict[str, Any], seconds: float, keepalive: float = 15) -> Iterator[str]:
+        """Server-sent events for one subscriber: the snapshot, then deltas, for `seconds` (clients reconnect)."""
+        deadline = time.monotonic() + seconds
+        try:
+            yield "retry: 3000\n" + _sse(snapshot)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                message = self.next_message(subscriber, min(keepalive, remaining))
+                yield _sse(message) if message is not None else ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+def _sse(message: Dict[str, Any]) -> str:
+    return f"event: {message['type']}\nid: {message['seq']}\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
@@ -0,0 +1,107 @@
+import time
+import logging
+import contextvars
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from prompting import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Gemini Call Layer
+# -----------------------------------------------------------------------------
+# Every generate/embed call goes through LLMClient, which records one call
+# dict per request to Gemini:
+#   {stage, model, input_tokens, output_tokens, estimated, latency, ok}
+# Token counts come from the response's usage_metadata; when the API does
+# not report them (embeddings) they are estimated locally and `estimated` is
+# set. Failed requests are recorded with zero tokens. Calls are appended to
+# the current usage scope (one per HTTP request, see start_scope) and passed
+# to listeners (metrics).
+
+LLMCall = Dict[str, Any]
+Listener = Callable[[LLMCall], None]
+
+_current_calls: contextvars.ContextVar[Optional[List[LLMCall]]] = contextvars.ContextVar('llm_calls', default=None)
+
+def start_scope() -> Tuple[List[LLMCall], contextvars.Token]:
+    """Starts collecting calls made on this thread/context. Pass the token to end_scope."""
+    calls: List[LLMCall] = []
+    return calls, _current_calls.set(calls)
+
+def end_scope(token: contextvars.Token):
+    _current_calls.reset(token)
+
+def summarize(calls: List[LLMCall]) -> Dict[str, Any]:
+    """Totals and a per-stage breakdown, in the shape stored on analytics events."""
+    by_stage: Dict[str, Dict[str, Any]] = {}
+    for call in calls:
+        stage = by_stage.setdefault(call['stage'], {'model': call['model'], 'input': 0, 'output': 0, 'calls': 0})
+        stage['input'] += call['input_tokens']
+        stage['output'] += call['output_tokens']
+        stage['calls'] += 1
+    return {
+        'input': sum(call['input_tokens'] for call in calls),
+        'output': sum(call['output_tokens'] for call in calls),
+        'calls': len(calls),
+        'estimated': any(call['estimated'] for call in calls),
+        'by_stage': by_stage,
+    }
+
+class LLMClient:
+    """Thin wrapper over the google.generativeai module that accounts for tokens per stage."""
+
+    def __init__(self, genai_provider: Callable[[], Any]):
+        self._genai = genai_provider # Called per request, so the SDK is still imported lazily
+        self._listeners: List[Listener] = []
+
+    def add_listener(self, listener: Listener):
+        self._listeners.append(listener)
+
+    def _record(self, call: LLMCall):
+        calls = _current_calls.get()
+        if calls is not None:
+            calls.append(call)
+        for listener in self._listeners:
+            try:
+                listener(call)
+            except Exception as e:
+                logger.warning(f"LLM call listener failed: {e}")
+
+    def generate(self, model: str, prompt: str, stage: str) -> str:
+        """Runs generate_content and returns the response text. Raises on API errors."""
+        started = time.perf_counter()
+        response, text, ok = None, "", False
+        try:
+            response = self._genai().GenerativeModel(model).generate_content(prompt)
+            text = response.text # Raises if the candidate was blocked
+            ok = True
+        finally:
+            usage = getattr(response, 'usage_metadata', None)
+            input_tokens = getattr(usage, 'prompt_token_count', None)
+            output_tokens = getattr(usage, 'candidates_token_count', None)
+            if response is None:
+                input_tokens = output_tokens = 0 # The request failed; nothing was generated or billed
+            self._record({
+                'stage': stage, 'model': model,
+                'input_tokens': input_tokens if input_tokens is not None else estimate_tokens(prompt),
+                'output_tokens': output_tokens if output_tokens is not None else estimate_tokens(text),
+                'estimated': input_tokens is None or output_tokens is None,
+                'latency': time.perf_counter() - started, 'ok': ok,
+            })
+        return text
+
+    def embed(self, model: str, texts: List[str], task_type: str, stage: str) -> List[List[float]]:
+        """Embeds a batch of texts with one request. The embedding API reports no usage, so tokens are estimated."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = self._genai().embed_content(model=model, content=texts, task_type=task_type)
+            ok = True
+            return result["embedding"]
+        finally:
+            self._record({
+                'stage': stage, 'model': model,
+                'input_tokens': sum(estimate_tokens(text) for text in texts) if ok else 0, 'output_tokens': 0,
+                'estimated': ok, 'latency': time.perf_counter() - started, 'ok': ok,
+            })
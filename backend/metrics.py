@@ -0,0 +1,176 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Metrics and Tracing
+# -----------------------------------------------------------------------------
+# A small in-process registry of counters and histograms, rendered in the
+# Prometheus text format by the /metrics endpoint. `span()` times one stage of
+# a request into a histogram and, when OpenTelemetry is enabled, also emits a
+# trace span. With enabled=False every call returns immediately.
+#
+# Each worker process keeps its own registry; Prometheus should scrape every
+# worker (or aggregate by instance), as with any multi-process WSGI server.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Collector = Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+class Metrics:
+    def __init__(self, enabled: bool = True, namespace: str = "asha", otel_enabled: bool = False):
+        self.enabled = enabled
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Collector] = []
+        self._tracer = _otel_tracer(namespace) if enabled and otel_enabled else None
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}"
+
+    def describe(self, name: str, help_text: str):
+        self._help[self._name(name)] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(self._name(name), {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(self._name(name), {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def register_collector(self, collector: Collector):
+        """Adds a callable returning (name, type, help, labels, value) samples computed at scrape time."""
+        self._collectors.append(collector)
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[None]:
+        """Times a pipeline stage into stage_duration_seconds{stage=...} (and an OpenTelemetry span if enabled)."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        otel_span = self._tracer.start_as_current_span(stage, attributes=attributes) if self._tracer else None
+        if otel_span is not None:
+            otel_span.__enter__()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("stage_duration_seconds", elapsed, stage=stage)
+            if failed:
+                self.inc("errors_total", where=stage)
+            if otel_span is not None:
+                otel_span.__exit__(None, None, None)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: (list(h.counts), h.total, h.count, h.buckets) for k, h in series.items()}
+                          for name, series in self._histograms.items()}
+
+        for name in sorted(counters):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for name in sorted(histograms):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (counts, total, count, buckets) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total:g}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        described = set()
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                full_name = self._name(name)
+                if full_name not in described:
+                    lines.append(f"# HELP {full_name} {help_text}")
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    described.add(full_name)
+                lines.append(f"{full_name}{_format_labels(_label_key(labels))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+def _otel_tracer(name: str):
+    """Returns an OpenTelemetry tracer, exporting via OTLP when OTEL_EXPORTER_OTLP_ENDPOINT is set."""
+    try:
+        from opentelemetry import trace
+        if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", name)}))
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            trace.set_tracer_provider(provider)
+        return trace.get_tracer(name)
+    except ImportError:
+        logger.warning("OpenTelemetry is not installed; tracing export disabled.")
+        return None
+    except Exception as e:
+        logger.error(f"Failed to set up OpenTelemetry: {e}")
+        return None
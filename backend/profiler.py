@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Sampling Profiler
+# -----------------------------------------------------------------------------
+# Opt-in, in-process sampling profiler for live diagnosis. While a session is
+# running, a daemon thread wakes every `interval` seconds, reads the current
+# frame of every thread that is serving a *tracked* request
+# (sys._current_frames) and counts the stack, prefixed with the request's
+# endpoint. Nothing is traced or instrumented, so untracked requests pay only a
+# dictionary insert/pop, and tracked ones pay for the sampler holding the GIL
+# for a few microseconds per sample (see benchmarks/bench_profiler.py).
+#
+# Output is "collapsed stacks" (one `frame;frame;frame count` line per unique
+# stack, root first), which flamegraph.pl, speedscope and inferno read as is.
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 100):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._tracked: Dict[int, str] = {} # thread id -> endpoint of the request it is serving
+        self._stacks: Counter = Counter()
+        self._requests: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._session: Dict[str, Any] = {}
+
+    # --- Session control ---
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, sample_rate: float = 1.0, interval: Optional[float] = None) -> Dict[str, Any]:
+        """Starts a session that profiles `sample_rate` of requests for `seconds`. Clears previous results."""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profiling session is already running.")
+            self._stacks.clear()
+            self._requests.clear()
+            self._stop.clear()
+            now = time.time()
+            self._session = {
+                'started_at': now,
+                'ends_at': now + seconds,
+                'sample_rate': min(max(sample_rate, 0.0), 1.0),
+                'interval': interval or self.interval,
+                'samples': 0,
+                'sampler_cpu_seconds': 0.0,
+            }
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Profiling {self._session['sample_rate']:.0%} of requests for {seconds:g}s.")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+        return self.status()
+
+    # --- Request tracking (called from request hooks) ---
+    def enter(self, endpoint: str) -> bool:
+        """Marks the current thread as serving `endpoint` if a session is running and the request is sampled."""
+        if not self.running or random.random() >= self._session.get('sample_rate', 0):
+            return False
+        with self._lock:
+            self._tracked[threading.get_ident()] = endpoint
+            self._requests[endpoint] += 1
+        return True
+
+    def exit(self):
+        with self._lock:
+            self._tracked.pop(threading.get_ident(), None)
+
+    # --- Sampling ---
+    def _run(self):
+        session = self._session
+        while not self._stop.is_set() and time.time() < session['ends_at']:
+            started = time.thread_time()
+            with self._lock:
+                tracked = dict(self._tracked)
+            if tracked:
+                sampled: List[str] = []
+                frames = sys._current_frames()
+                for thread_id, endpoint in tracked.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    labels: List[str] = []
+                    while frame is not None and len(labels) < self.max_depth:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(endpoint)
+                    sampled.append(";".join(reversed(labels)))
+                del frames # Holding frames keeps their locals alive
+                with self._lock:
+                    self._stacks.update(sampled)
+                    session['samples'] += len(sampled)
+            session['sampler_cpu_seconds'] += time.thread_time() - started
+            self._stop.wait(session['interval'])
+        session['ended_at'] = time.time()
+        logger.info(f"Profiling session finished: {session['samples']} samples.")
+
+    # --- Results ---
+    def collapsed(self, endpoint: Optional[str] = None) -> str:
+        """Collapsed stacks of the current/last session, most frequent first."""
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks
+                       if endpoint is None or stack.split(";", 1)[0] == endpoint)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            session = dict(self._session)
+            stacks = self._stacks.copy()
+            requests = dict(self._requests)
+        samples_by_endpoint: Counter = Counter()
+        for stack, count in stacks.items():
+            samples_by_endpoint[stack.split(";", 1)[0]] += count
+        elapsed = (session.get('ended_at') or time.time()) - session['started_at'] if session else 0.0
+        return {
+            'running': self.running,
+            **session,
+            # CPU the sampler thread itself used, as a share of one core
+            'sampler_load': round(session.get('sampler_cpu_seconds', 0.0) / elapsed, 4) if elapsed > 0 else 0.0,
+            'requests': requests,
+            'samples_by_endpoint': dict(samples_by_endpoint),
+            'unique_stacks': len(stacks),
+        }
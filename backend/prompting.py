@@ -0,0 +1,300 @@
+import re
+import logging
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Precomputed Prompt Fragments
+# -----------------------------------------------------------------------------
+# Snippets and context lines are rendered once at ingest time and stored as
+# Chroma metadata, so building a prompt is only a template fill per request.
+
+SNIPPET_LENGTH = 150
+MAX_RESULTS_TO_DISPLAY = 3
+
+def render_snippet(description: str) -> str:
+    """Returns the truncated description shown in prompt bullets."""
+    description = (description or "").strip()
+    if not description:
+        return "Details available."
+    return description[:SNIPPET_LENGTH] + "..."
+
+def render_job_context_line(job: Dict[str, Any]) -> str:
+    """Renders the (unnumbered) prompt bullet for a job listing."""
+    apply_url = job.get('applyUrl', '')
+    line = (
+        f"**{job.get('title', 'N/A')}** at {job.get('company', 'N/A')} ({job.get('location', 'N/A')})\n"
+        f"   *Description:* {render_snippet(job.get('description', ''))}\n"
+    )
+    if apply_url and apply_url != '#':
+        line += f"   *Apply here:* {apply_url}\n"
+    else:
+        line += "   *Application link not provided.*\n"
+    return line
+
+def render_session_context_line(session: Dict[str, Any]) -> str:
+    """Renders the (unnumbered) prompt bullet for a session/event."""
+    register_url = session.get('registerUrl', '')
+    line = (
+        f"**{session.get('title', 'N/A')}** ({session.get('location', 'N/A')} on {session.get('date', 'N/A')})\n"
+        f"   *Details:* {render_snippet(session.get('description', ''))}\n"
+    )
+    if register_url and register_url not in ('#', 'N/A'):
+        line += f"   *Register here:* {register_url}\n"
+    else:
+        line += "   *Registration link not provided.*\n"
+    return line
+
+def _context_line(meta: Dict[str, Any], topic: str) -> str:
+    """Returns the precomputed context line, rendering it for documents ingested before it existed."""
+    line = meta.get('context_line')
+    if line:
+        return line
+    if topic == "career":
+        return render_job_context_line({
+            'title': meta.get('title'), 'company': meta.get('company'), 'location': meta.get('location'),
+            'description': meta.get('description', ''), 'applyUrl': meta.get('apply_url', ''),
+        })
+    return render_session_context_line({
+        'title': meta.get('title'), 'location': meta.get('location'), 'date': meta.get('date'),
+        'description': meta.get('description', ''), 'registerUrl': meta.get('registerUrl', ''),
+    })
+
+# -----------------------------------------------------------------------------
+# Token Estimation and Compression
+# -----------------------------------------------------------------------------
+# A local approximation of the Gemini tokenizer: roughly four ASCII characters
+# per token, while Indic and other non-Latin scripts tokenize far denser.
+
+DEFAULT_TOKEN_BUDGET = 2000
+HISTORY_SHARE = 0.25 # Fraction of the free budget reserved for recent history
+HISTORY_MAX_TURNS = 6
+HISTORY_TURN_MAX_TOKENS = 120
+MIN_PASSAGE_TOKENS = 40 # Below this a truncated passage is not worth sending
+
+_SENTENCE_END = re.compile(r"(?<=[.!?\n])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Approximates the number of model tokens in a piece of text."""
+    if not text:
+        return 0
+    if text.isascii():
+        return (len(text) + 3) // 4
+    # Most non-ASCII characters here (Devanagari, Tamil, ...) are 3 bytes in UTF-8
+    other_chars = min(len(text), (len(text.encode('utf-8')) - len(text)) // 2)
+    ascii_chars = len(text) - other_chars
+    return (ascii_chars + 3) // 4 + (other_chars * 2 + 2) // 3
+
+def compress_text(text: str, max_tokens: int) -> str:
+    """Shrinks text to fit max_tokens, keeping whole leading sentences where possible."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    kept, used = [], 1 # Reserve a token for the ellipsis
+    for sentence in _SENTENCE_END.split(text):
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept) + " …"
+    # First sentence alone is too long: hard cut, shrinking until it fits
+    cut = text[:max_tokens * 4]
+    while cut and estimate_tokens(cut) + 1 > max_tokens:
+        cut = cut[:int(len(cut) * 0.8)]
+    return cut.rstrip() + "…"
+
+def _compress_context_line(line: str, max_tokens: int) -> str:
+    """Shrinks a job or session bullet to max_tokens by compressing only its description.
+
+    The title line and the closing "Apply here:"/"Register here:" line are the
+    actionable parts, so they are kept whole; "" if they alone do not fit.
+    """
+    lines = line.rstrip("\n").split("\n")
+    if len(lines) < 3:
+        return compress_text(line, max_tokens)
+    title, description, link = lines[0], "\n".join(lines[1:-1]), lines[-1]
+    room = max_tokens - estimate_tokens(f"{title}\n{link}\n") - 1
+    if room <= 0:
+        return ""
+    return f"{title}\n{compress_text(description, room)}\n{link}\n"
+
+def _pack_passages(items: List[str], budget: int, separator: str,
+                   compress: Callable[[str, int], str] = compress_text) -> Tuple[List[str], int]:
+    """Packs ranked passages into budget: top items whole, the next one compressed, the rest dropped."""
+    packed: List[str] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item) + (estimate_tokens(separator) if packed else 0)
+        if used + cost <= budget:
+            packed.append(item)
+            used += cost
+            continue
+        room = budget - used - (estimate_tokens(separator) if packed else 0)
+        compressed = compress(item, room) if room >= MIN_PASSAGE_TOKENS else ""
+        if compressed:
+            packed.append(compressed)
+            used += estimate_tokens(compressed) + (estimate_tokens(separator) if len(packed) > 1 else 0)
+        break
+    return packed, used
+
+def _render_history(conversation_history: Optional[List[Dict[str, Any]]], budget: int, summary: str = "") -> str:
+    """Renders the most recent turns, newest first until the budget runs out, in chronological order.
+
+    What's left of the budget goes to the rolling summary of earlier turns, if any.
+    """
+    if not conversation_history or budget <= 0:
+        return ""
+    lines: List[str] = []
+    used = estimate_tokens("**Recent Conversation:**\n")
+    for message in reversed(conversation_history[-HISTORY_MAX_TURNS:]):
+        content = str(message.get('content', '')).strip()
+        if not content:
+            continue
+        speaker = "User" if message.get('role') == 'user' else "Asha"
+        line = f"{speaker}: {compress_text(content, HISTORY_TURN_MAX_TOKENS)}"
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return ""
+    history = "**Recent Conversation:**\n" + "\n".join(reversed(lines)) + "\n\n        "
+    room = budget - used - estimate_tokens("**Earlier in this conversation:**\n")
+    gists: List[str] = []
+    for gist in reversed(summary.splitlines() if room >= MIN_PASSAGE_TOKENS else []): # Newest gists first
+        cost = estimate_tokens(gist) + 1
+        if cost > room:
+            break
+        gists.append(gist)
+        room -= cost
+    if gists:
+        history = "**Earlier in this conversation:**\n" + "\n".join(reversed(gists)) + "\n\n        " + history
+    return history
+
+# -----------------------------------------------------------------------------
+# Prompt Templates
+# -----------------------------------------------------------------------------
+BASE_PROMPT_TEMPLATE = """
+You are Asha, a helpful and empowering AI assistant focused on women's career development in India. Your goal is to provide accurate, unbiased, encouraging, and relevant information based on the provided context and the user's query. Maintain a positive, supportive, and professional tone. Avoid stereotypes and biases. **Respond ONLY in {language}.**
+"""
+
+# Follow-up turns already carry the persona in the conversation, so a short reminder is enough
+FOLLOWUP_PROMPT_TEMPLATE = """
+You are Asha, continuing a conversation about women's career development in India. Stay accurate, unbiased, supportive and professional. **Respond ONLY in {language}.**
+"""
+
+SUGGEST_RESOURCES_INSTRUCTION = "\n\nFinally, suggest 1-2 additional relevant resources (like specific website sections, types of workshops, or relevant organizations from trusted sources if applicable) or next steps the user could take."
+
+CAREER_INSTRUCTION = "Based on the user's query '{query}', present the {count} most relevant job opportunities listed above. Briefly mention the company and location. Include the application link if available. If the query asks for something specific not covered, address that too."
+SESSION_INSTRUCTION = "Based on the user's query '{query}', present the {count} most relevant sessions/events listed above. Briefly mention the date and location. Include the registration link if available. If the query asks for something specific not covered, address that too."
+GENERAL_INSTRUCTION = "Answer the user's query '{query}' clearly and concisely using the provided context if relevant. If the context is insufficient or missing, use your general knowledge but clearly state this (e.g., 'Based on general knowledge,...')."
+NO_CONTEXT_MESSAGE = "No specific documents found in the internal knowledge base matching the query."
+# Precomputed matches for the user's profile (see recommendations.py), shown below the retrieved ones
+PROFILE_MATCHES_HEADER = "\n**Also Matching the User's Profile:**\n"
+PROFILE_MATCHES_INSTRUCTION = " Where they fit the query, you may also mention the ones matching the user's profile."
+
+PROMPT_TEMPLATE = """{base_prompt}
+
+        **Context:**
+        {context_str}
+
+        {history_str}**User Query:** "{query}"
+
+        **Instructions:**
+        1. {specific_instruction}
+        2. If no relevant information was found (context indicates this), acknowledge that and answer based on general knowledge if appropriate, stating that you couldn't find specific details in the knowledge base.
+        3. {suggest_resources_instruction}
+
+        **Answer (in {language}):**
+        """
+
+# Static template text plus the resources instruction, counted once
+_TEMPLATE_TOKENS = estimate_tokens(PROMPT_TEMPLATE.format(
+    base_prompt="", context_str="", history_str="", query="", specific_instruction="",
+    suggest_resources_instruction=SUGGEST_RESOURCES_INSTRUCTION, language="",
+))
+
+def make_rag_prompt(
+    query: str,
+    passages_with_metadata: List[Tuple[str, Dict[str, Any]]],
+    language: str = "English",
+    topic: str = "general",
+    conversation_history: Optional[List[Dict[str, Any]]] = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    conversation_summary: str = "",
+    profile_matches: Optional[List[Dict[str, Any]]] = None
+) -> str:
+    """Constructs the RAG prompt from precomputed fragments within an approximate token budget.
+
+    The persona, instructions and query are always sent. Retrieved passages are
+    packed by rank (lower-ranked ones compressed or dropped) and recent history
+    is folded into whatever budget is left, followed by the rolling summary of
+    older turns (see conversations.py) if there is room. For career and
+    session queries, the metadata of the user's precomputed profile matches
+    fills the context budget left after the passages.
+    """
+    relevant_items = passages_with_metadata[:MAX_RESULTS_TO_DISPLAY]
+    is_followup = any(msg.get('role') == 'assistant' for msg in (conversation_history or []))
+    base_prompt = (FOLLOWUP_PROMPT_TEMPLATE if is_followup else BASE_PROMPT_TEMPLATE).format(language=language)
+
+    if topic in ("career", "session") and relevant_items:
+        header = "**Relevant Job Opportunities Found:**\n" if topic == "career" else "**Relevant Sessions/Events Found:**\n"
+        candidates = [_context_line(meta, topic) for _, meta in relevant_items]
+        separator = ""
+        instruction = CAREER_INSTRUCTION if topic == "career" else SESSION_INSTRUCTION
+    elif relevant_items: # General topic: use the document text itself
+        header = "**Relevant Information Found:**\n"
+        candidates = [doc for doc, _ in relevant_items]
+        separator = "\n\n---\n\n"
+        instruction = GENERAL_INSTRUCTION
+    else:
+        header, candidates, separator, instruction = "", [], "", GENERAL_INSTRUCTION
+
+    def render(context_str: str, history_str: str, count: int) -> str:
+        return PROMPT_TEMPLATE.format(
+            base_prompt=base_prompt,
+            context_str=context_str,
+            history_str=history_str,
+            query=query,
+            specific_instruction=instruction.format(query=query, count=count) + (PROFILE_MATCHES_INSTRUCTION if matches_str else ""),
+            suggest_resources_instruction=SUGGEST_RESOURCES_INSTRUCTION,
+            language=language,
+        )
+
+    fixed_tokens = (
+        _TEMPLATE_TOKENS + estimate_tokens(base_prompt) + estimate_tokens(header or NO_CONTEXT_MESSAGE)
+        + estimate_tokens(instruction.format(query=query, count=len(candidates)))
+        + estimate_tokens(query) + estimate_tokens(language)
+    )
+    free_budget = max(0, token_budget - fixed_tokens)
+    history_reserve = int(free_budget * HISTORY_SHARE) if conversation_history else 0
+    compress = _compress_context_line if topic in ("career", "session") else compress_text
+    packed, used = _pack_passages(candidates, free_budget - history_reserve, separator, compress)
+
+    if packed:
+        if topic in ("career", "session"):
+            context_str = header + "".join(f"{i}. {line}" for i, line in enumerate(packed, start=1))
+        else:
+            context_str = header + separator.join(packed)
+    else:
+        if candidates:
+            logger.warning(f"Token budget {token_budget} left no room for retrieved context.")
+        context_str = NO_CONTEXT_MESSAGE
+    matches_str = ""
+    if topic in ("career", "session") and profile_matches:
+        lines = [_context_line(meta, topic) for meta in profile_matches]
+        lines = [line for line in lines if line not in candidates] # Already listed as a retrieved result
+        room = (free_budget - history_reserve - used - estimate_tokens(PROFILE_MATCHES_HEADER)
+                - estimate_tokens(PROFILE_MATCHES_INSTRUCTION))
+        packed_matches, matches_used = _pack_passages(lines, room, "", _compress_context_line) if room > 0 else ([], 0)
+        if packed_matches:
+            matches_str = PROFILE_MATCHES_HEADER + "".join(f"- {line}" for line in packed_matches)
+            context_str += matches_str
+            used += matches_used + estimate_tokens(PROFILE_MATCHES_HEADER) + estimate_tokens(PROFILE_MATCHES_INSTRUCTION)
+    history_str = _render_history(conversation_history, free_budget - used, conversation_summary)
+    return render(context_str, history_str, len(packed))
@@ -0,0 +1,151 @@
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# Vector Quantization
+# -----------------------------------------------------------------------------
+# A snapshot can store a compact copy of its vectors next to the float32 ones
+# (chosen when it is built, see build_kb.py --quantization):
+#
+#   int8  one signed byte per dimension, scaled per dimension (4x smaller);
+#   pq    product quantization: the vector is cut into `subspaces` slices and
+#         each slice is replaced by the index of its nearest of 256 centroids,
+#         one byte per slice (32x smaller with 96 subspaces of 768 dimensions).
+#         Codes are stored subspace-major, so a search sums one contiguous
+#         table lookup per subspace.
+#
+# Searches score every document on the compact codes, then re-score only the
+# best candidates with their float32 vectors. The float file stays memory-mapped
+# and is read a few rows at a time, so the working set that has to stay in the
+# page cache is the codes.
+
+METHODS = ('none', 'int8', 'pq')
+PQ_CENTROIDS = 256 # One byte per subspace
+PQ_TRAIN_SAMPLE = 20_000 # Vectors the codebooks are trained on
+PQ_ITERATIONS = 12
+SCORE_BLOCK = 1024 # int8 rows converted to float32 per step, small enough to stay in the CPU cache
+ENCODE_BLOCK = 8192 # Vectors assigned to PQ centroids per step
+
+class Quantizer:
+    """Encodes vectors into compact codes and scores a query against them."""
+
+    method = 'none'
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate inner products of `query` with every encoded vector."""
+        raise NotImplementedError
+
+    def parameters(self) -> np.ndarray:
+        """The array saved next to the codes (scales or codebooks)."""
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, Any]:
+        return {'method': self.method}
+
+class Int8Quantizer(Quantizer):
+    """Symmetric scalar quantization with one scale per dimension."""
+
+    method = 'int8'
+
+    def __init__(self, scales: np.ndarray):
+        self.scales = scales.astype(np.float32)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray) -> 'Int8Quantizer':
+        peaks = np.abs(vectors).max(axis=0) if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+        return cls(np.where(peaks == 0, 1, peaks) / 127)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scales), -127, 127).astype(np.int8)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scaled = (query * self.scales).astype(np.float32)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK):
+            scores[start:start + SCORE_BLOCK] = codes[start:start + SCORE_BLOCK].astype(np.float32) @ scaled
+        return scores
+
+    def parameters(self) -> np.ndarray:
+        return self.scales
+
+class ProductQuantizer(Quantizer):
+    """Product quantization with k-means codebooks per subspace, scored by table lookups."""
+
+    method = 'pq'
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = codebooks.astype(np.float32) # (subspaces, centroids, subspace dimensions)
+        self.subspaces, self.centroids, self.width = self.codebooks.shape
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, subspaces: int, seed: int = 0) -> 'ProductQuantizer':
+        dimensions = vectors.shape[1]
+        if subspaces <= 0 or dimensions % subspaces:
+            raise ValueError(f"{dimensions} dimensions cannot be split into {subspaces} subspaces")
+        rng = np.random.default_rng(seed)
+        sample = vectors if len(vectors) <= PQ_TRAIN_SAMPLE else vectors[np.sort(rng.choice(len(vectors), PQ_TRAIN_SAMPLE, replace=False))]
+        sample = np.asarray(sample, dtype=np.float32)
+        width = dimensions // subspaces
+        centroids = max(1, min(PQ_CENTROIDS, len(sample)))
+        slices = sample.reshape(len(sample), subspaces, width).transpose(1, 0, 2) # (subspaces, n, width)
+        codebooks = slices[:, rng.choice(len(sample), centroids, replace=False)].copy()
+        for _ in range(PQ_ITERATIONS):
+            assignment = _nearest(slices, codebooks)
+            for s in range(subspaces):
+                counts = np.bincount(assignment[s], minlength=centroids)
+                sums = np.stack([np.bincount(assignment[s], weights=slices[s][:, w], minlength=centroids) for w in range(width)], axis=1)
+                filled = counts > 0
+                codebooks[s, filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+        return cls(codebooks)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """(subspaces x vectors) centroid indices."""
+        codes = np.empty((self.subspaces, len(vectors)), dtype=np.uint8)
+        for start in range(0, len(vectors), ENCODE_BLOCK):
+            block = np.asarray(vectors[start:start + ENCODE_BLOCK], dtype=np.float32)
+            codes[:, start:start + ENCODE_BLOCK] = _nearest(block.reshape(len(block), self.subspaces, self.width).transpose(1, 0, 2), self.codebooks)
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Inner product of each query slice with each centroid, then one lookup per (subspace, document)
+        table = np.einsum('skw,sw->sk', self.codebooks, query.reshape(self.subspaces, self.width).astype(np.float32))
+        scores = np.zeros(codes.shape[1], dtype=np.float32)
+        for s in range(self.subspaces):
+            scores += np.take(table[s], codes[s])
+        return scores
+
+    def parameters(self) -> np.ndarray:
+        return self.codebooks
+
+    def describe(self) -> Dict[str, Any]:
+        return {'method': self.method, 'subspaces': self.subspaces, 'centroids': self.centroids}
+
+def _nearest(slices: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid for every (subspace, vector) slice."""
+    nearest = np.empty(slices.shape[:2], dtype=np.uint8)
+    norms = (codebooks ** 2).sum(axis=2)
+    for s in range(len(codebooks)): # One subspace at a time keeps the distance matrix to (n x centroids)
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2, and |x|^2 doesn't change the argmin
+        nearest[s] = (norms[s] - 2 * (slices[s] @ codebooks[s].T)).argmin(axis=1)
+    return nearest
+
+def train_quantizer(method: str, vectors: np.ndarray, pq_subspaces: int = 96) -> Optional[Quantizer]:
+    """A quantizer fitted to `vectors`, or None for 'none'. Raises ValueError for unknown methods."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown quantization method: {method} (expected one of {', '.join(METHODS)})")
+    if method == 'none' or not len(vectors):
+        return None
+    if method == 'int8':
+        return Int8Quantizer.train(vectors)
+    return ProductQuantizer.train(vectors, pq_subspaces)
+
+def load_quantizer(method: str, parameters: np.ndarray) -> Quantizer:
+    if method == 'int8':
+        return Int8Quantizer(parameters)
+    if method == 'pq':
+        return ProductQuantizer(parameters)
+    raise ValueError(f"Unknown quantization method: {method}")
@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+
+import numpy as np
+
+from filestore import file_lock
+from kb_snapshot import content_hash
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Profile Recommendations
+# -----------------------------------------------------------------------------
+# A logged-in user's profile (career goals, domains of interest, industry,
+# experience) is embedded once per change and stored together with its best
+# matching jobs and sessions. Serving a user's matches is then a primary-key
+# lookup rather than a query embedding plus a vector search.
+#
+# When the knowledge base changes, only added or edited documents are scored
+# against the stored profile vectors and merged into each list; deleted ones
+# are dropped. Lists keep CANDIDATE_FACTOR x top_n matches per kind so that
+# deletions rarely leave one short; a user whose list does is rescored in full.
+
+RECOMMENDED_KINDS = ('job', 'session')
+CANDIDATE_FACTOR = 2
+USER_BATCH = 1000 # Profiles rescored per matrix product during a sync
+
+Match = List[Any] # [doc_id, kind, score], as stored
+
+def profile_text(profile: Dict[str, Any]) -> str:
+    """The part of a Firestore profile that is embedded; an empty string if there is nothing to match on."""
+    parts = []
+    if str(profile.get('careerGoals') or '').strip(): parts.append(f"Career Goals: {str(profile['careerGoals']).strip()}")
+    domains = profile.get('domainsOfInterest')
+    if isinstance(domains, list) and any(str(d).strip() for d in domains):
+        parts.append(f"Domains of Interest: {', '.join(str(d).strip() for d in domains if str(d).strip())}")
+    if str(profile.get('industry') or '').strip(): parts.append(f"Industry: {str(profile['industry']).strip()}")
+    if str(profile.get('yearsOfExperience') or '').strip(): parts.append(f"Experience: {str(profile['yearsOfExperience']).strip()}")
+    return "\n".join(parts)
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+class Catalog:
+    """The jobs and sessions recommendations are drawn from: normalised vectors, metadata and content hashes."""
+
+    __slots__ = ('version', 'ids', 'vectors', 'metadatas', 'hashes', 'kinds', '_rows')
+
+    def __init__(self, version: str, ids: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]], hashes: List[str]):
+        self.version = version
+        self.ids = ids
+        self.vectors = vectors
+        self.metadatas = metadatas
+        self.hashes = hashes
+        self.kinds = np.array([m.get('source_type', '') for m in metadatas])
+        self._rows = {doc_id: row for row, doc_id in enumerate(ids)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'Catalog':
+        rows = [i for i, meta in enumerate(snapshot.metadatas) if meta.get('source_type') in RECOMMENDED_KINDS]
+        vectors = np.array(snapshot.vectors[rows], dtype=np.float32) if rows else np.zeros((0, snapshot.vectors.shape[1]), dtype=np.float32)
+        return cls(snapshot.version, [snapshot.ids[i] for i in rows], vectors,
+                   [snapshot.metadatas[i] for i in rows], [snapshot.hashes[i] for i in rows])
+
+    @classmethod
+    def from_collection(cls, collection, version: str) -> 'Catalog':
+        """Reads the stored embeddings of a Chroma collection (nothing is re-embedded)."""
+        result = collection.get(where={'source_type': {'$in': list(RECOMMENDED_KINDS)}}, include=['embeddings', 'metadatas', 'documents'])
+        vectors = np.asarray(result['embeddings'] if len(result['ids']) else np.zeros((0, 0)), dtype=np.float32)
+        return cls(version, list(result['ids']), _normalize(vectors), list(result['metadatas']),
+                   [content_hash(doc or '') for doc in result['documents']])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, doc_id: str) -> Optional[int]:
+        return self._rows.get(doc_id)
+
+    def kind_counts(self) -> Dict[str, int]:
+        return {kind: int(np.count_nonzero(self.kinds == kind)) for kind in RECOMMENDED_KINDS}
+
+def _merge(matches: List[Match], keep: int) -> List[Match]:
+    """Best `keep` matches per kind, highest score first."""
+    merged: List[Match] = []
+    for kind in RECOMMENDED_KINDS:
+        merged.extend(sorted((m for m in matches if m[1] == kind), key=lambda m: -m[2])[:keep])
+    return merged
+
+def _top_matches(scores: np.ndarray, kinds: np.ndarray, ids: List[str], keep: int) -> List[List[Match]]:
+    """Per row of a (users x documents) score matrix, the `keep` best documents of each kind."""
+    results: List[List[Match]] = [[] for _ in range(scores.shape[0])]
+    for kind in RECOMMENDED_KINDS:
+        columns = np.flatnonzero(kinds == kind)
+        if not len(columns):
+            continue
+        k = min(keep, len(columns))
+        kind_scores = scores[:, columns]
+        top = np.argpartition(-kind_scores, k - 1, axis=1)[:, :k]
+        for user, picks in enumerate(top):
+            results[user].extend([ids[columns[c]], kind, round(float(kind_scores[user, c]), 4)] for c in picks)
+    return [_merge(matches, keep) for matches in results]
+
+class Recommender:
+    """Keeps every profile's top matches in the data store, in step with the knowledge base."""
+
+    def __init__(self, store, embed: Callable[[str], List[float]], model: str, lock_path: Path, top_n: int = 10):
+        self.store = store
+        self.embed = embed
+        self.model = model
+        self.lock_path = lock_path
+        self.top_n = top_n
+        self.keep = top_n * CANDIDATE_FACTOR
+        self.stats = {'profiles_embedded': 0, 'documents_scored': 0, 'full_rescores': 0}
+        self._synced: Optional[str] = None # Catalog version this process last brought the store up to
+        self._sync_lock = threading.Lock()
+
+    def _profile_hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{text}".encode('utf-8')).hexdigest()
+
+    def observe_profile(self, user_id: str, profile: Dict[str, Any], catalog: Catalog) -> bool:
+        """Embeds and scores the profile if it changed since it was last seen. Returns True if it did."""
+        text = profile_text(profile)
+        if not text:
+            self.store.delete_recommendation(user_id)
+            return False
+        profile_hash = self._profile_hash(text)
+        stored = self.store.get_recommendation(user_id)
+        if stored and stored['profile_hash'] == profile_hash:
+            return False
+        vector = _normalize(np.asarray(self.embed(text), dtype=np.float32))
+        matches = self._score(vector[None, :], catalog)[0]
+        self.store.save_recommendation(user_id, profile_hash, self.model, vector.tobytes(), matches, datetime.now().isoformat())
+        self.stats['profiles_embedded'] += 1
+        return True
+
+    def _score(self, vectors: np.ndarray, catalog: Catalog, rows: Optional[np.ndarray] = None) -> List[List[Match]]:
+        if not len(catalog) or vectors.shape[1] != catalog.vectors.shape[1]:
+            return [[] for _ in range(vectors.shape[0])]
+        if rows is None:
+            return _top_matches(vectors @ catalog.vectors.T, catalog.kinds, catalog.ids, self.keep)
+        ids = [catalog.ids[r] for r in rows]
+        return _top_matches(vectors @ catalog.vectors[rows].T, catalog.kinds[rows], ids, self.keep)
+
+    def matches(self, user_id: str, catalog: Catalog, kind: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The user's stored matches (best first), restricted to documents still in the catalog."""
+        if catalog.version != self._synced:
+            self.sync_in_background(catalog)
+        stored = self.store.get_recommendation(user_id)
+        if not stored:
+            return []
+        limit = limit or self.top_n
+        results: List[Dict[str, Any]] = []
+        for kind_name in ([kind] if kind else RECOMMENDED_KINDS):
+            picked = [m for m in stored['matches'] if m[1] == kind_name and catalog.row(m[0]) is not None][:limit]
+            results.extend({'id': doc_id, 'kind': kind_name, 'score': score, 'metadata': catalog.metadatas[catalog.row(doc_id)]}
+                           for doc_id, _, score in picked)
+        return results
+
+    def sync(self, catalog: Catalog) -> Dict[str, int]:
+        """Brings every stored match list up to date with the catalog, scoring only what changed."""
+        with file_lock(self.lock_path): # One sync at a time, across processes
+            previous = self.store.recommendation_catalog()
+            current = dict(zip(catalog.ids, catalog.hashes))
+            changed = [doc_id for doc_id, h in current.items() if previous.get(doc_id) != h]
+            removed = [doc_id for doc_id in previous if doc_id not in current]
+            summary = {'changed': len(changed), 'removed': len(removed), 'profiles': 0, 'full_rescores': 0}
+            if changed or removed:
+                stale = set(changed) | set(removed)
+                changed_rows = np.array([catalog.row(doc_id) for doc_id in changed], dtype=np.int64)
+                available = catalog.kind_counts()
+                for batch in self.store.iter_recommendations(USER_BATCH):
+                    vectors = np.stack([np.frombuffer(r['vector'], dtype=np.float32) for r in batch])
+                    if vectors.shape[1] != catalog.vectors.shape[1]:
+                        continue # Embedded with another model; rescored when the profile is next seen
+                    fresh = self._score(vectors, catalog, changed_rows) if len(changed_rows) else [[] for _ in batch]
+                    updates, short = [], []
+                    for i, record in enumerate(batch):
+                        merged = _merge([m for m in record['matches'] if m[0] not in stale] + fresh[i], self.keep)
+                        if any(sum(1 for m in merged if m[1] == kind) < min(self.top_n, available[kind]) for kind in RECOMMENDED_KINDS):
+                            short.append(i)
+                        else:
+                            updates.append((record['user_id'], record['profile_hash'], merged))
+                    if short:
+                        rescored = self._score(vectors[short], catalog)
+                        updates.extend((batch[i]['user_id'], batch[i]['profile_hash'], matches) for i, matches in zip(short, rescored))
+                    summary['profiles'] += self.store.update_recommendation_matches(updates, datetime.now().isoformat())
+                    summary['full_rescores'] += len(short)
+                self.store.update_recommendation_catalog({doc_id: current[doc_id] for doc_id in changed}, removed)
+                self.stats['documents_scored'] += len(changed)
+                self.stats['full_rescores'] += summary['full_rescores']
+                logger.info(f"Recommendations synced to catalog {catalog.version}: {summary}")
+            self._synced = catalog.version
+            return summary
+
+    def sync_in_background(self, catalog: Catalog):
+        """Starts a sync unless one is already running in this process."""
+        if not self._sync_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.sync(catalog)
+            except Exception as e:
+                logger.error(f"Recommendation sync to catalog {catalog.version} failed: {e}", exc_info=True)
+                self._synced = catalog.version # Retried when the catalog next changes
+            finally:
+                self._sync_lock.release()
+        threading.Thread(target=run, name=f"recommendation-sync-{catalog.version}", daemon=True).start()
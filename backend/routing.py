@@ -0,0 +1,120 @@
+import re
+import time
+import logging
+from typing import List, Dict, Optional, Callable, Tuple, TypeVar
+
+from llm import LLMClient
+from metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Model Routing
+# -----------------------------------------------------------------------------
+# Each task (topic classification, bias check, answer generation) has a
+# ladder of rungs, cheapest first, e.g. ["heuristic", "gemini-1.5-flash",
+# "gemini-1.5-pro"]. A rung's output is passed through the task's parser,
+# which returns None when the output is unusable (unknown topic, malformed
+# "Biased:" reply, empty answer). The router stops at the first usable
+# result and escalates otherwise, including on API errors. The "heuristic"
+# rung runs a local function that returns None when it is not confident.
+
+HEURISTIC = "heuristic"
+
+T = TypeVar('T')
+
+class RoutingError(Exception):
+    """Every rung failed. `errors` is True if at least one rung raised (rather than returning unusable output)."""
+
+    def __init__(self, task: str, errors: bool):
+        super().__init__(f"No rung of the '{task}' ladder produced a valid result")
+        self.task = task
+        self.errors = errors
+
+class ModelRouter:
+    def __init__(self, llm: LLMClient, metrics: Metrics, ladders: Dict[str, List[str]]):
+        self.llm = llm
+        self.metrics = metrics
+        self.ladders = ladders
+
+    def run(
+        self,
+        task: str,
+        prompt: str,
+        parse: Callable[[str], Optional[T]],
+        heuristic: Optional[Callable[[], Optional[T]]] = None
+    ) -> Tuple[T, str]:
+        """Returns (result, rung) from the first rung whose output parses. Raises RoutingError if none does."""
+        errors = False
+        for rung in self.ladders[task]:
+            if rung == HEURISTIC and heuristic is None:
+                continue
+            started = time.perf_counter()
+            try:
+                result = heuristic() if rung == HEURISTIC else parse(self.llm.generate(rung, prompt, stage=task))
+                outcome = "accepted" if result is not None else "rejected"
+            except Exception as e:
+                logger.warning(f"Routing '{task}' via {rung} failed: {e}")
+                result, outcome, errors = None, "error", True
+            self.metrics.inc("routing_decisions_total", task=task, rung=rung, outcome=outcome)
+            self.metrics.observe("routing_rung_duration_seconds", time.perf_counter() - started, task=task, rung=rung)
+            if result is not None:
+                return result, rung
+        raise RoutingError(task, errors)
+
+# --- Task parsers (validators) and heuristics ---
+TOPICS = ('career', 'education', 'skill development', 'interview prep', 'entrepreneurship', 'mentorship', 'general')
+
+TOPIC_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'career': ('job', 'jobs', 'career', 'hiring', 'vacancy', 'vacancies', 'role', 'roles', 'salary', 'resume', 'cv', 'returnship'),
+    'education': ('degree', 'college', 'university', 'course', 'courses', 'study', 'studying', 'mba', 'certification', 'scholarship'),
+    'skill development': ('skill', 'skills', 'learn', 'learning', 'training', 'upskill', 'upskilling', 'bootcamp'),
+    'interview prep': ('interview', 'interviews', 'mock interview', 'aptitude'),
+    'entrepreneurship': ('startup', 'start-up', 'business', 'founder', 'entrepreneur', 'funding', 'investor'),
+    'mentorship': ('mentor', 'mentors', 'mentorship', 'mentoring', 'coach', 'coaching'),
+}
+
+_WORDS = re.compile(r"[a-z][a-z'-]*")
+
+def parse_topic(reply: str) -> Optional[str]:
+    topic = reply.strip().strip('."\'*').lower()
+    return topic if topic in TOPICS else None
+
+def topic_heuristic(message: str) -> Optional[str]:
+    """The topic if the message's keywords point at exactly one of them, else None."""
+    words = set(_WORDS.findall(message.lower()))
+    text = message.lower()
+    matches = {topic for topic, keywords in TOPIC_KEYWORDS.items()
+               if any((k in text) if ' ' in k else (k in words) for k in keywords)}
+    return matches.pop() if len(matches) == 1 else None
+
+_BIAS_REPLY = re.compile(r"^\s*\**biased\**\s*:\s*(yes|no)\b(?:.*?type\s*:\s*(\w+))?", re.IGNORECASE | re.DOTALL)
+BIAS_TYPES = ('gender', 'racial', 'religious', 'age', 'other')
+
+# Phrases that are unambiguous on their own; anything else goes to a model
+BIAS_PHRASES: Dict[str, Tuple[str, ...]] = {
+    'gender': ("women can't", "women cannot", "women should not", "women shouldn't", "women are not capable",
+               "girls can't", "women belong in the kitchen", "men are better", "not a job for women"),
+}
+
+def parse_bias_reply(reply: str) -> Optional[Tuple[bool, Optional[str]]]:
+    """(is_biased, bias_type) from a 'Biased: Yes, Type: x' / 'Biased: No' reply, or None if malformed."""
+    match = _BIAS_REPLY.match(reply)
+    if not match:
+        return None
+    if match.group(1).lower() == 'no':
+        return False, None
+    bias_type = (match.group(2) or 'other').lower()
+    return True, bias_type if bias_type in BIAS_TYPES else 'other'
+
+def bias_heuristic(query: str) -> Optional[Tuple[bool, Optional[str]]]:
+    """Flags queries containing an unambiguous biased phrase; None (ask a model) otherwise."""
+    text = query.lower().replace("’", "'")
+    for bias_type, phrases in BIAS_PHRASES.items():
+        if any(phrase in text for phrase in phrases):
+            return True, bias_type
+    return None
+
+def parse_answer(reply: str) -> Optional[str]:
+    answer = reply.strip()
+    return answer or None
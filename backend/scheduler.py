@@ -0,0 +1,165 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Admin Work Scheduling
+# -----------------------------------------------------------------------------
+# Analytics aggregation, exports and the clustering step of re-ingestion are
+# CPU-bound Python. Run on a request thread they hold the GIL away from the
+# threads serving /chat, so one admin loading a year of analytics slows every
+# user down. They run in a small pool of separate processes instead; the
+# request thread only waits for the result.
+#
+# Jobs belong to a work class (e.g. analytics, export, ingest). Each class has
+# a priority, a concurrency limit and a queue limit. Whenever a pool process is
+# free, the highest-priority class below its concurrency limit gets it, so a
+# long export never holds every process and dashboards go ahead of background
+# re-ingestion. A class whose queue is full turns new jobs away (SchedulerBusy,
+# which the API answers with 503) rather than letting waits grow unbounded.
+#
+# Workers are spawned, not forked: the serving process has threads and open
+# SQLite connections that a forked child must not inherit. They are started on
+# the first job, lower their CPU priority by `niceness` (so when cores are
+# scarce the kernel runs the serving process first) and run
+# `initializer(*initargs)` once. With processes=0 jobs run on threads of this
+# process under the same limits (development, comparisons).
+
+OUTCOMES = ('completed', 'failed', 'rejected', 'cancelled')
+
+def _start_worker(niceness: int, initializer: Optional[Callable], initargs: Tuple):
+    if niceness and hasattr(os, 'nice'):
+        os.nice(niceness)
+    if initializer:
+        initializer(*initargs)
+
+class SchedulerBusy(Exception):
+    """Raised by submit() when the work class already has `max_queued` jobs waiting."""
+
+    def __init__(self, work_class: str, retry_after: int = 5):
+        super().__init__(f"Too many queued {work_class} jobs")
+        self.work_class = work_class
+        self.retry_after = retry_after
+
+class WorkScheduler:
+    """Runs jobs in a process pool by work class priority, within per-class concurrency and queue limits."""
+
+    def __init__(self, classes: Dict[str, Dict[str, int]], processes: int = 2, niceness: int = 10,
+                 initializer: Optional[Callable] = None, initargs: Tuple = ()):
+        self.classes = classes # name -> {'priority': lower runs first, 'concurrency': ..., 'max_queued': ...}
+        self.processes = processes
+        self.niceness = niceness
+        self._initializer = initializer
+        self._initargs = initargs
+        self._order = sorted(classes, key=lambda name: classes[name]['priority'])
+        self._slots = processes if processes > 0 else sum(c['concurrency'] for c in classes.values())
+        self._queues: Dict[str, deque] = {name: deque() for name in classes} # (future, fn, args, queued at)
+        self._running = {name: 0 for name in classes}
+        self.stats: Dict[str, Dict[str, float]] = {name: {**{outcome: 0 for outcome in OUTCOMES}, 'wait_seconds': 0.0}
+                                                   for name in classes}
+        self._pool = None
+        self._lock = threading.RLock() # Done callbacks can run inside submit() and re-enter _dispatch
+
+    def _executor(self):
+        if self._pool is None:
+            if self.processes > 0:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_start_worker, initargs=(self.niceness, self._initializer, self._initargs))
+            else:
+                if self._initializer:
+                    self._initializer(*self._initargs)
+                self._pool = ThreadPoolExecutor(max_workers=self._slots, thread_name_prefix="admin-work")
+        return self._pool
+
+    def submit(self, work_class: str, fn: Callable, *args) -> Future:
+        """Queues fn(*args), a picklable top-level function, and returns its Future. Raises SchedulerBusy."""
+        if work_class not in self.classes:
+            raise ValueError(f"Unknown work class: {work_class}")
+        future: Future = Future()
+        with self._lock:
+            if len(self._queues[work_class]) >= self.classes[work_class]['max_queued']:
+                self.stats[work_class]['rejected'] += 1
+                raise SchedulerBusy(work_class)
+            self._queues[work_class].append((future, fn, args, time.monotonic()))
+            self._dispatch()
+        return future
+
+    def call(self, work_class: str, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Runs fn(*args) in the pool and returns its result (or raises its exception).
+
+        On timeout a job that has not started yet is dropped; one that has
+        started runs to completion, since a pool process cannot be interrupted.
+        """
+        future = self.submit(work_class, fn, *args)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError: # Only the builtin TimeoutError from Python 3.11 on
+            future.cancel()
+            raise
+
+    def _dispatch(self):
+        """Hands free pool slots to queued jobs, highest priority first. Called with the lock held."""
+        for name in self._order:
+            queue, limit = self._queues[name], self.classes[name]['concurrency']
+            while queue and self._running[name] < limit and sum(self._running.values()) < self._slots:
+                future, fn, args, queued_at = queue.popleft()
+                if not future.set_running_or_notify_cancel(): # The caller gave up while it was queued
+                    self.stats[name]['cancelled'] += 1
+                    continue
+                self.stats[name]['wait_seconds'] += time.monotonic() - queued_at
+                self._running[name] += 1
+                try:
+                    pool = self._executor()
+                    try:
+                        inner = pool.submit(fn, *args)
+                    except (BrokenProcessPool, RuntimeError) as e: # A worker died since the last job finished
+                        logger.error(f"Admin work pool unavailable ({e}); starting a new one")
+                        self._discard_pool()
+                        pool = self._executor()
+                        inner = pool.submit(fn, *args)
+                except Exception as e: # Not even a new pool takes the job: fail it rather than leave it running
+                    logger.error(f"Could not start a {name} job: {e}")
+                    self._running[name] -= 1
+                    self.stats[name]['failed'] += 1
+                    future.set_exception(e)
+                    continue
+                inner.add_done_callback(lambda done, name=name, future=future, pool=pool: self._finished(name, future, pool, done))
+
+    def _finished(self, name: str, future: Future, pool, done: Future):
+        # A job still pending in the pool is cancelled when the pool shuts down; exception() would raise for it
+        error = CancelledError() if done.cancelled() else done.exception()
+        with self._lock:
+            self._running[name] -= 1
+            self.stats[name]['cancelled' if done.cancelled() else 'failed' if error else 'completed'] += 1
+            if isinstance(error, BrokenProcessPool) and pool is self._pool: # Every job of a broken pool fails; replace it once
+                logger.error(f"Admin work pool broke while running a {name} job; starting a new one")
+                self._discard_pool()
+            self._dispatch()
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(done.result())
+
+    def _discard_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=False)
+            self._pool = None
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Queued and running jobs per work class."""
+        with self._lock:
+            return {name: {'queued': len(self._queues[name]), 'running': self._running[name]} for name in self.classes}
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
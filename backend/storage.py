@@ -0,0 +1,722 @@
+import csv
+import json
+import base64
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from filestore import file_lock, atomic_write_json, atomic_write_csv
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Embedded SQLite Storage
+# -----------------------------------------------------------------------------
+# Jobs, sessions, trusted sources and feedback live in one SQLite database in
+# WAL mode. Each row keeps the original record as JSON in `data`, plus the few
+# columns we filter or sort on, so the CSV/JSON formats round-trip unchanged.
+
+JOB_FIELDNAMES = ['id', 'title', 'company', 'location', 'type', 'deadline', 'description', 'applyUrl', 'verified', 'category', 'source', 'diversity_focus']
+
+# Entity name -> {indexed column: record key}
+ENTITY_COLUMNS: Dict[str, Dict[str, str]] = {
+    'jobs': {'type': 'type', 'deadline': 'deadline', 'category': 'category'},
+    'sessions': {'date': 'date', 'category': 'category'},
+    'trusted_sources': {'category': 'category', 'data_type': 'dataType'},
+    'feedback': {'feedback_type': 'feedbackType', 'status': 'status', 'timestamp': 'timestamp'},
+}
+# Stored when the record lacks the key, so filters, counts and keyset cursors never meet NULLs
+COLUMN_DEFAULTS: Dict[str, Dict[str, str]] = {
+    'feedback': {'status': 'pending', 'timestamp': ''},
+}
+
+# -----------------------------------------------------------------------------
+# Schema Migrations
+# -----------------------------------------------------------------------------
+# Each feature adds its tables and indexes in a migration of its own. They run
+# in order, once per database: store_meta's 'schema_version' is the number of
+# migrations applied, bumped in the same transaction as the migrations, so
+# workers starting together apply each one once. Append new migrations; never
+# edit or reorder applied ones. (Databases created before this list existed
+# start at 0; everything up to the bulk imports is IF [NOT] EXISTS.)
+
+STORE_META_SCHEMA = """
+-- One-off facts about the database itself: the schema version, when the legacy data files were imported
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY, value TEXT NOT NULL
+);
+"""
+
+MIGRATIONS: List[Tuple[str, str]] = [
+    ("entities", """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY, position INTEGER NOT NULL, type TEXT, deadline TEXT, category TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_type ON jobs(type);
+CREATE INDEX IF NOT EXISTS idx_jobs_position ON jobs(position);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY, position INTEGER NOT NULL, date TEXT, category TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions(date);
+CREATE INDEX IF NOT EXISTS idx_sessions_position ON sessions(position);
+
+CREATE TABLE IF NOT EXISTS trusted_sources (
+    id TEXT PRIMARY KEY, position INTEGER NOT NULL, category TEXT, data_type TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trusted_sources_position ON trusted_sources(position);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    id TEXT PRIMARY KEY, position INTEGER NOT NULL, feedback_type TEXT, status TEXT, timestamp TEXT,
+    preview TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_position ON feedback(position);
+
+-- Bumped on every write to an entity; HTTP ETags are derived from it
+CREATE TABLE IF NOT EXISTS data_versions (
+    entity TEXT PRIMARY KEY, version INTEGER NOT NULL
+);
+"""),
+    ("feedback keyset indexes", """
+-- Composite (filter, timestamp, id) indexes back keyset pagination of the feedback list
+DROP INDEX IF EXISTS idx_feedback_status;
+DROP INDEX IF EXISTS idx_feedback_type;
+DROP INDEX IF EXISTS idx_feedback_timestamp;
+CREATE INDEX IF NOT EXISTS idx_feedback_status_ts ON feedback(status, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_feedback_type_ts ON feedback(feedback_type, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_feedback_ts ON feedback(timestamp, id);
+"""),
+    ("external content", """
+-- Text chunks crawled from trusted sources; id is the chunk's content hash
+CREATE TABLE IF NOT EXISTS external_chunks (
+    id TEXT PRIMARY KEY, source_id TEXT NOT NULL, position INTEGER NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_external_chunks_source ON external_chunks(source_id, position);
+
+CREATE TABLE IF NOT EXISTS crawl_state (
+    source_id TEXT PRIMARY KEY, next_run TEXT, data TEXT NOT NULL
+);
+"""),
+    ("token usage", """
+-- Gemini tokens per user and day, for per-user budgets (shared by all worker processes)
+CREATE TABLE IF NOT EXISTS token_usage (
+    user_id TEXT NOT NULL, day TEXT NOT NULL, input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0, calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+"""),
+    ("recommendations", """
+-- Embedded user profiles and their precomputed job/session matches (see recommendations.py)
+CREATE TABLE IF NOT EXISTS recommendations (
+    user_id TEXT PRIMARY KEY, profile_hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL,
+    matches TEXT NOT NULL, updated_at TEXT NOT NULL
+);
+
+-- Content hash of each knowledge-base document the stored matches were scored against
+CREATE TABLE IF NOT EXISTS recommendation_catalog (
+    doc_id TEXT PRIMARY KEY, hash TEXT NOT NULL
+);
+"""),
+    ("bulk imports", """
+-- Streamed bulk imports and their progress, readable by every worker (see bulk_import.py)
+CREATE TABLE IF NOT EXISTS bulk_imports (
+    id TEXT PRIMARY KEY, entity TEXT NOT NULL, status TEXT NOT NULL, created_at TEXT NOT NULL, data TEXT NOT NULL
+);
+-- Ids an import wrote; changed = 1 if the record was new or different. Read back by its embedding job
+CREATE TABLE IF NOT EXISTS bulk_import_items (
+    import_id TEXT NOT NULL, item_id TEXT NOT NULL, changed INTEGER NOT NULL, PRIMARY KEY (import_id, item_id)
+);
+"""),
+    ("feedback column defaults", """
+-- Legacy feedback without a status is listed and counted as pending; without a timestamp it sorts first
+UPDATE feedback SET status = 'pending' WHERE status IS NULL;
+UPDATE feedback SET timestamp = '' WHERE timestamp IS NULL;
+"""),
+]
+
+def _statements(script: str) -> Iterator[str]:
+    """Splits a migration into statements (execute() runs one at a time, and executescript() would commit)."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ""
+
+class DataStore:
+    """Thread-safe access to the embedded database (one connection per thread)."""
+
+    def __init__(self, db_path: Path):
+        # Nothing touches the disk until the first query: the database is created and migrated then
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._migrated = False
+        self._migrate_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not self._migrated:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None: we issue BEGIN/COMMIT ourselves
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            if not self._migrated:
+                with self._migrate_lock:
+                    try:
+                        if not self._migrated:
+                            self._migrate()
+                            self._migrated = True
+                    except Exception:
+                        self._local.conn = None
+                        conn.close()
+                        raise
+        return conn
+
+    def schema_version(self) -> int:
+        row = self._connection().execute("SELECT value FROM store_meta WHERE key = 'schema_version'").fetchone()
+        return int(row['value']) if row else 0
+
+    def _migrate(self):
+        """Applies the migrations this database has not had yet (see MIGRATIONS)."""
+        self._connection().executescript(STORE_META_SCHEMA)
+        if self.schema_version() >= len(MIGRATIONS):
+            return
+        with self.transaction() as conn:
+            applied = self.schema_version() # Another process may have migrated while we waited for the lock
+            for name, script in MIGRATIONS[applied:]:
+                for statement in _statements(script):
+                    conn.execute(statement)
+                logger.info(f"Applied schema migration '{name}' to {self.db_path}")
+            conn.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('schema_version', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (str(max(applied, len(MIGRATIONS))),)
+            )
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Runs a write transaction; BEGIN IMMEDIATE serializes writers across threads and processes."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _bump_version(self, conn: sqlite3.Connection, entity: str):
+        conn.execute(
+            "INSERT INTO data_versions (entity, version) VALUES (?, 1) "
+            "ON CONFLICT(entity) DO UPDATE SET version = version + 1", (entity,)
+        )
+
+    def data_version(self, entity: str) -> int:
+        """A counter that changes whenever the entity is written (by any process)."""
+        row = self._connection().execute("SELECT version FROM data_versions WHERE entity = ?", (entity,)).fetchone()
+        return row['version'] if row else 0
+
+    def _row_values(self, entity: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        defaults = COLUMN_DEFAULTS.get(entity, {})
+        values = {column: record.get(key) for column, key in ENTITY_COLUMNS[entity].items()}
+        return {column: defaults.get(column) if value is None else value for column, value in values.items()}
+
+    def _upsert(self, conn: sqlite3.Connection, entity: str, record: Dict[str, Any], position: int, extra: Optional[Dict[str, Any]] = None):
+        values = {'id': str(record['id']), 'position': position, **self._row_values(entity, record), **(extra or {}),
+                  'data': json.dumps(record, ensure_ascii=False)}
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{c}" for c in values)
+        updates = ", ".join(f"{c}=excluded.{c}" for c in values if c != 'id')
+        conn.execute(f"INSERT INTO {entity} ({columns}) VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {updates}", values)
+
+    # --- Generic entity access (jobs, sessions, trusted_sources) ---
+    def list_items(self, entity: str) -> List[Dict[str, Any]]:
+        """Returns all records of an entity in their stored order."""
+        rows = self._connection().execute(f"SELECT data FROM {entity} ORDER BY position").fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def get_item(self, entity: str, item_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(f"SELECT data FROM {entity} WHERE id = ?", (str(item_id),)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def count_items(self, entity: str) -> int:
+        return self._connection().execute(f"SELECT COUNT(*) FROM {entity}").fetchone()[0]
+
+    def replace_items(self, entity: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Makes the entity match `items`, writing only the rows that changed. Returns the written and deleted ids."""
+        with self.transaction() as conn:
+            return self._replace_rows(conn, entity, items)
+
+    def _replace_rows(self, conn: sqlite3.Connection, entity: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        existing = {row['id']: (row['position'], row['data'])
+                    for row in conn.execute(f"SELECT id, position, data FROM {entity}")}
+        seen = set()
+        written = []
+        for position, item in enumerate(items):
+            item_id = str(item['id'])
+            seen.add(item_id)
+            if existing.get(item_id) != (position, json.dumps(item, ensure_ascii=False)):
+                self._upsert(conn, entity, item, position)
+                written.append(item_id)
+        removed = [item_id for item_id in existing if item_id not in seen]
+        conn.executemany(f"DELETE FROM {entity} WHERE id = ?", [(item_id,) for item_id in removed])
+        if written or removed:
+            self._bump_version(conn, entity)
+        return {'written': written, 'deleted': removed}
+
+    def upsert_item(self, entity: str, item: Dict[str, Any]):
+        """Inserts or updates a single record, appending new ones at the end."""
+        with self.transaction() as conn:
+            row = conn.execute(f"SELECT position FROM {entity} WHERE id = ?", (str(item['id']),)).fetchone()
+            if row:
+                position = row['position']
+            else:
+                position = conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {entity}").fetchone()[0]
+            self._upsert(conn, entity, item, position)
+            self._bump_version(conn, entity)
+
+    def upsert_items(self, entity: str, items: List[Dict[str, Any]], import_id: Optional[str] = None,
+                     first_position: Optional[int] = None) -> List[str]:
+        """Writes a chunk of records in one transaction, skipping unchanged ones. Returns the ids written.
+
+        New records are appended at the end, unless `first_position` numbers
+        the chunk. With `import_id`, every id is also recorded for that import.
+        """
+        with self.transaction() as conn:
+            ids = [str(item['id']) for item in items]
+            existing = {}
+            for start in range(0, len(ids), 500): # SQLite's bound-parameter limit
+                chunk = ids[start:start + 500]
+                existing.update((row['id'], (row['position'], row['data'])) for row in conn.execute(
+                    f"SELECT id, position, data FROM {entity} WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+            next_position = conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {entity}").fetchone()[0]
+            written = []
+            for offset, (item_id, item) in enumerate(zip(ids, items)):
+                if first_position is not None:
+                    position = first_position + offset
+                elif item_id in existing:
+                    position = existing[item_id][0]
+                else:
+                    position, next_position = next_position, next_position + 1
+                data = json.dumps(item, ensure_ascii=False)
+                if existing.get(item_id) != (position, data):
+                    self._upsert(conn, entity, item, position)
+                    existing[item_id] = (position, data)
+                    written.append(item_id)
+            if import_id is not None:
+                changed = set(written)
+                conn.executemany(
+                    "INSERT INTO bulk_import_items (import_id, item_id, changed) VALUES (?, ?, ?) "
+                    "ON CONFLICT(import_id, item_id) DO UPDATE SET changed = MAX(changed, excluded.changed)",
+                    [(import_id, item_id, int(item_id in changed)) for item_id in ids]
+                )
+            if written:
+                self._bump_version(conn, entity)
+        return written
+
+    def delete_items_not_imported(self, entity: str, import_id: str) -> List[str]:
+        """Deletes the entity's records the import did not write (a replacing import). Returns their ids."""
+        with self.transaction() as conn:
+            where = "id NOT IN (SELECT item_id FROM bulk_import_items WHERE import_id = ?)"
+            removed = [row['id'] for row in conn.execute(f"SELECT id FROM {entity} WHERE {where}", (import_id,))]
+            conn.execute(f"DELETE FROM {entity} WHERE {where}", (import_id,))
+            if removed:
+                self._bump_version(conn, entity)
+        return removed
+
+    def delete_item(self, entity: str, item_id: str) -> bool:
+        with self.transaction() as conn:
+            deleted = conn.execute(f"DELETE FROM {entity} WHERE id = ?", (str(item_id),)).rowcount > 0
+            if deleted:
+                self._bump_version(conn, entity)
+            return deleted
+
+    # --- Feedback ---
+    def save_feedback(self, record: Dict[str, Any]):
+        """Stores a full feedback record (replacing any previous one with the same id)."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM feedback WHERE id = ?", (str(record['id']),))
+            position = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM feedback").fetchone()[0]
+            self._upsert(conn, 'feedback', record, position, extra={'preview': record.get('preview')})
+            self._bump_version(conn, 'feedback')
+
+    def get_feedback(self, feedback_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_item('feedback', feedback_id)
+
+    def update_feedback_status(self, feedback_id: str, status: str) -> Optional[Dict[str, Any]]:
+        """Point update of one feedback item's status; returns the updated record or None."""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE feedback SET status = ?, data = json_set(data, '$.status', ?) WHERE id = ?",
+                (status, status, str(feedback_id))
+            )
+            if cursor.rowcount == 0:
+                return None
+            self._bump_version(conn, 'feedback')
+            row = conn.execute("SELECT data FROM feedback WHERE id = ?", (str(feedback_id),)).fetchone()
+        return json.loads(row['data'])
+
+    def list_feedback_summaries(self) -> List[Dict[str, Any]]:
+        """Returns the feedback list in the shape of the old feedback_list.json."""
+        rows = self._connection().execute(
+            "SELECT id, feedback_type, timestamp, status, preview FROM feedback ORDER BY position"
+        ).fetchall()
+        return [{'id': row['id'], 'feedbackType': row['feedback_type'] or 'general', 'timestamp': row['timestamp'] or None,
+                 'status': row['status'], 'preview': row['preview']} for row in rows]
+
+    def _feedback_where(self, status: Optional[str] = None, feedback_type: Optional[str] = None,
+                        since: Optional[str] = None, until: Optional[str] = None) -> Tuple[List[str], List[Any]]:
+        """Builds WHERE clauses for the feedback filters.
+
+        Dates are ISO dates or date-times (anything else raises ValueError); a
+        bare `until` date is inclusive.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        for bound in (since, until):
+            if bound:
+                try:
+                    datetime.fromisoformat(bound)
+                except ValueError:
+                    raise ValueError(f"Invalid date: {bound}") from None
+        if status:
+            clauses.append("status = ?"); params.append(status)
+        if feedback_type:
+            clauses.append("feedback_type = ?"); params.append(feedback_type)
+        if since:
+            clauses.append("timestamp >= ?"); params.append(since)
+        if until:
+            if len(until) == 10: # YYYY-MM-DD: include the whole day
+                clauses.append("timestamp < ?"); params.append((date.fromisoformat(until) + timedelta(days=1)).isoformat())
+            else:
+                clauses.append("timestamp <= ?"); params.append(until)
+        return clauses, params
+
+    def query_feedback(self, status: Optional[str] = None, feedback_type: Optional[str] = None,
+                       since: Optional[str] = None, until: Optional[str] = None, sort: str = 'desc',
+                       limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Returns one page of feedback summaries ordered by timestamp, using keyset pagination on (timestamp, id)."""
+        clauses, params = self._feedback_where(status, feedback_type, since, until)
+        descending = sort != 'asc'
+        if cursor:
+            last_timestamp, last_id = decode_cursor(cursor)
+            clauses.append(f"(timestamp, id) {'<' if descending else '>'} (?, ?)")
+            params.extend([last_timestamp, last_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        rows = self._connection().execute(
+            f"SELECT id, feedback_type, timestamp, status, preview FROM feedback {where} "
+            f"ORDER BY timestamp {direction}, id {direction} LIMIT ?", (*params, limit + 1)
+        ).fetchall()
+        items = [{'id': row['id'], 'feedbackType': row['feedback_type'] or 'general', 'timestamp': row['timestamp'] or None,
+                  'status': row['status'], 'preview': row['preview']} for row in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1]['timestamp'], rows[limit - 1]['id']) if len(rows) > limit and items else None
+        return {'items': items, 'next_cursor': next_cursor}
+
+    def iter_feedback(self, status: Optional[str] = None, feedback_type: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None, after: Optional[str] = None,
+                      batch_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Returns an iterator of (cursor, full record), oldest first, fetching `batch_size` rows per query.
+
+        Each batch is its own keyset query on (timestamp, id), so no read
+        transaction stays open while the caller is busy, and `after` (a
+        cursor from a previous export) resumes right after that record.
+        Malformed filters or cursors raise ValueError here, not mid-iteration.
+        """
+        clauses, params = self._feedback_where(status, feedback_type, since, until)
+        last = decode_cursor(after) if after else None
+
+        def batches() -> Iterator[Tuple[str, Dict[str, Any]]]:
+            nonlocal last
+            while True:
+                keyset = ["(timestamp, id) > (?, ?)"] if last is not None else []
+                where = f"WHERE {' AND '.join(clauses + keyset)}" if clauses or keyset else ""
+                rows = self._connection().execute(
+                    f"SELECT id, timestamp, data FROM feedback {where} ORDER BY timestamp ASC, id ASC LIMIT ?",
+                    (*params, *(last or ()), batch_size)
+                ).fetchall()
+                for row in rows:
+                    yield encode_cursor(row['timestamp'], row['id']), json.loads(row['data'])
+                if len(rows) < batch_size:
+                    return
+                last = (rows[-1]['timestamp'], rows[-1]['id'])
+        return batches()
+
+    def feedback_status_counts(self, feedback_type: Optional[str] = None, since: Optional[str] = None,
+                               until: Optional[str] = None) -> Dict[str, int]:
+        """Counts feedback per status for the given (non-status) filters."""
+        clauses, params = self._feedback_where(None, feedback_type, since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT status, COUNT(*) AS n FROM feedback {where} GROUP BY status", params
+        ).fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    # --- External content (crawled trusted-source chunks) ---
+    def list_external_chunks(self, source_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if source_id is None:
+            rows = self._connection().execute("SELECT data FROM external_chunks ORDER BY source_id, position").fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT data FROM external_chunks WHERE source_id = ? ORDER BY position", (str(source_id),)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def replace_external_chunks(self, source_id: str, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Makes a source's chunks match `chunks`. Returns the chunks that are new and the ids that were removed.
+
+        Chunk ids are content hashes, so unchanged text is never re-embedded. A
+        chunk already stored for another source is skipped (cross-source dedupe).
+        """
+        source_id = str(source_id)
+        with self.transaction() as conn:
+            owners = {row['id']: row['source_id'] for row in conn.execute(
+                "SELECT id, source_id FROM external_chunks WHERE source_id = ? OR id IN (SELECT value FROM json_each(?))",
+                (source_id, json.dumps([chunk['id'] for chunk in chunks]))
+            )}
+            added, kept = [], set()
+            for position, chunk in enumerate(chunks):
+                owner = owners.get(chunk['id'])
+                if chunk['id'] in kept or (owner is not None and owner != source_id):
+                    continue
+                kept.add(chunk['id'])
+                if owner is None:
+                    added.append(chunk)
+                conn.execute(
+                    "INSERT INTO external_chunks (id, source_id, position, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET position = excluded.position, data = excluded.data",
+                    (chunk['id'], source_id, position, json.dumps(chunk, ensure_ascii=False))
+                )
+            removed = [chunk_id for chunk_id, owner in owners.items() if owner == source_id and chunk_id not in kept]
+            conn.executemany("DELETE FROM external_chunks WHERE id = ?", [(chunk_id,) for chunk_id in removed])
+        return {'added': added, 'removed': removed, 'kept': len(kept)}
+
+    def delete_external_source(self, source_id: str) -> List[str]:
+        """Drops a source's chunks and crawl state. Returns the removed chunk ids."""
+        with self.transaction() as conn:
+            removed = [row['id'] for row in conn.execute("SELECT id FROM external_chunks WHERE source_id = ?", (str(source_id),))]
+            conn.execute("DELETE FROM external_chunks WHERE source_id = ?", (str(source_id),))
+            conn.execute("DELETE FROM crawl_state WHERE source_id = ?", (str(source_id),))
+        return removed
+
+    def get_crawl_states(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._connection().execute("SELECT source_id, data FROM crawl_state").fetchall()
+        return {row['source_id']: json.loads(row['data']) for row in rows}
+
+    def save_crawl_state(self, source_id: str, state: Dict[str, Any]):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO crawl_state (source_id, next_run, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(source_id) DO UPDATE SET next_run = excluded.next_run, data = excluded.data",
+                (str(source_id), state.get('next_run'), json.dumps(state, ensure_ascii=False))
+            )
+
+    def add_token_usage(self, user_id: str, day: str, input_tokens: int, output_tokens: int, calls: int = 1):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO token_usage (user_id, day, input_tokens, output_tokens, calls) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id, day) DO UPDATE SET input_tokens = input_tokens + excluded.input_tokens, "
+                "output_tokens = output_tokens + excluded.output_tokens, calls = calls + excluded.calls",
+                (str(user_id), day, int(input_tokens), int(output_tokens), int(calls))
+            )
+
+    def token_usage(self, user_id: str, day: str) -> Dict[str, int]:
+        row = self._connection().execute(
+            "SELECT input_tokens, output_tokens, calls FROM token_usage WHERE user_id = ? AND day = ?", (str(user_id), day)
+        ).fetchone()
+        return dict(row) if row else {'input_tokens': 0, 'output_tokens': 0, 'calls': 0}
+
+    # --- Profile recommendations ---
+    def get_recommendation(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM recommendations WHERE user_id = ?", (str(user_id),)).fetchone()
+        return {**dict(row), 'matches': json.loads(row['matches'])} if row else None
+
+    def save_recommendation(self, user_id: str, profile_hash: str, model: str, vector: bytes, matches: List[Any], updated_at: str):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO recommendations (user_id, profile_hash, model, vector, matches, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET profile_hash = excluded.profile_hash, model = excluded.model, "
+                "vector = excluded.vector, matches = excluded.matches, updated_at = excluded.updated_at",
+                (str(user_id), profile_hash, model, sqlite3.Binary(vector), json.dumps(matches), updated_at)
+            )
+
+    def delete_recommendation(self, user_id: str) -> bool:
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM recommendations WHERE user_id = ?", (str(user_id),)).rowcount > 0
+
+    def count_recommendations(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+
+    def iter_recommendations(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Yields all stored profiles in user_id order, `batch_size` rows at a time."""
+        after = ""
+        while True:
+            rows = self._connection().execute(
+                "SELECT * FROM recommendations WHERE user_id > ? ORDER BY user_id LIMIT ?", (after, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield [{**dict(row), 'matches': json.loads(row['matches'])} for row in rows]
+            after = rows[-1]['user_id']
+
+    def update_recommendation_matches(self, updates: List[Tuple[str, str, List[Any]]], updated_at: str) -> int:
+        """Stores (user_id, profile_hash, matches) rows; a row whose profile changed since it was read is left alone."""
+        with self.transaction() as conn:
+            return sum(conn.execute(
+                "UPDATE recommendations SET matches = ?, updated_at = ? WHERE user_id = ? AND profile_hash = ?",
+                (json.dumps(matches), updated_at, str(user_id), profile_hash)
+            ).rowcount for user_id, profile_hash, matches in updates)
+
+    def recommendation_catalog(self) -> Dict[str, str]:
+        return {row['doc_id']: row['hash'] for row in self._connection().execute("SELECT doc_id, hash FROM recommendation_catalog")}
+
+    def update_recommendation_catalog(self, upserted: Dict[str, str], removed: List[str]):
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM recommendation_catalog WHERE doc_id = ?", [(doc_id,) for doc_id in removed])
+            conn.executemany(
+                "INSERT INTO recommendation_catalog (doc_id, hash) VALUES (?, ?) ON CONFLICT(doc_id) DO UPDATE SET hash = excluded.hash",
+                list(upserted.items())
+            )
+
+    # --- Bulk imports ---
+    def save_bulk_import(self, record: Dict[str, Any]):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO bulk_imports (id, entity, status, created_at, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, data = excluded.data",
+                (record['id'], record['entity'], record['status'], record['created_at'], json.dumps(record, ensure_ascii=False))
+            )
+
+    def get_bulk_import(self, import_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM bulk_imports WHERE id = ?", (str(import_id),)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def bulk_import_item_ids(self, import_id: str, changed_only: bool = True) -> List[str]:
+        query = "SELECT item_id FROM bulk_import_items WHERE import_id = ?" + (" AND changed = 1" if changed_only else "")
+        return [row['item_id'] for row in self._connection().execute(query, (import_id,))]
+
+    def clear_bulk_import_items(self, import_id: str):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM bulk_import_items WHERE import_id = ?", (import_id,))
+
+    # --- Import / Export of the legacy file formats ---
+    def import_from_files(self, jobs_file: Path, sessions_file: Path, sources_file: Path, feedback_dir: Path, first_run_only: bool = True) -> Dict[str, int]:
+        """Loads the CSV/JSON data files into the database.
+
+        By default this happens once per database: the import is recorded in
+        store_meta, so entities an admin has since emptied are not re-imported
+        on the next start. Marker check, import and marker are one transaction,
+        so of several workers starting together only one imports. Databases
+        from before the marker import only their empty entities, once.
+        """
+        counts: Dict[str, int] = {}
+        loaders = {
+            'jobs': lambda: _read_csv_records(jobs_file),
+            'sessions': lambda: _read_json_records(sessions_file),
+            'trusted_sources': lambda: _read_json_records(sources_file),
+            'feedback': lambda: _read_feedback_records(feedback_dir),
+        }
+        with self.transaction() as conn:
+            if first_run_only and conn.execute("SELECT 1 FROM store_meta WHERE key = 'files_imported'").fetchone():
+                return counts
+            for entity, load in loaders.items():
+                if first_run_only and conn.execute(f"SELECT 1 FROM {entity} LIMIT 1").fetchone():
+                    continue
+                records = [r for r in load() if isinstance(r, dict) and r.get('id') not in (None, '')]
+                if entity == 'feedback':
+                    conn.execute("DELETE FROM feedback")
+                    for position, record in enumerate(records):
+                        self._upsert(conn, 'feedback', record, position, extra={'preview': record.get('preview')})
+                    self._bump_version(conn, 'feedback')
+                else:
+                    self._replace_rows(conn, entity, records)
+                counts[entity] = len(records)
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('files_imported', ?) "
+                         "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (datetime.now().isoformat(),))
+        if counts:
+            logger.info(f"Imported data files into {self.db_path}: {counts}")
+        return counts
+
+    def export_to_files(self, jobs_file: Path, sessions_file: Path, sources_file: Path, feedback_dir: Path):
+        """Writes the database back out in the original CSV/JSON formats."""
+        _write_csv(jobs_file, self.list_items('jobs'))
+        _write_json(sessions_file, self.list_items('sessions'))
+        _write_json(sources_file, self.list_items('trusted_sources'))
+        feedback_dir.mkdir(parents=True, exist_ok=True)
+        for record in self.list_items('feedback'):
+            _write_json(feedback_dir / f"{record['id']}.json", record)
+        _write_json(feedback_dir / "feedback_list.json", self.list_feedback_summaries())
+
+def encode_cursor(timestamp: str, item_id: str) -> str:
+    """Opaque pagination cursor for the last item of a page."""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, item_id]).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        timestamp, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(timestamp), str(item_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _read_csv_records(file_path: Path) -> List[Dict[str, Any]]:
+    if not file_path.exists():
+        return []
+    with file_path.open('r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def _read_json_records(file_path: Path) -> Any:
+    if not file_path.exists():
+        return []
+    try:
+        with file_path.open('r', encoding='utf-8') as f:
+            content = f.read().strip()
+        return json.loads(content) if content else []
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        logger.error(f"Error reading JSON file {file_path} for import: {e}")
+        return []
+
+def _read_feedback_records(feedback_dir: Path) -> List[Dict[str, Any]]:
+    """Feedback detail files in the order of feedback_list.json, then the detail files it missed."""
+    records = []
+    list_file = feedback_dir / "feedback_list.json"
+    ordered_ids = [str(item.get('id')) for item in _read_json_records(list_file) if isinstance(item, dict)]
+    detail_files = {p.stem: p for p in feedback_dir.glob("*.json") if p.name != list_file.name} if feedback_dir.exists() else {}
+    for feedback_id in ordered_ids + sorted(set(detail_files) - set(ordered_ids)):
+        record = _read_json_records(detail_files[feedback_id]) if feedback_id in detail_files else None
+        if isinstance(record, dict):
+            records.append({**record, 'id': feedback_id})
+    return records
+
+def _write_json(file_path: Path, data: Any):
+    with file_lock(file_path):
+        atomic_write_json(file_path, data)
+
+def _write_csv(file_path: Path, rows: List[Dict[str, Any]]):
+    with file_lock(file_path):
+        atomic_write_csv(file_path, rows, JOB_FIELDNAMES)
+
+if __name__ == "__main__":
+    # python storage.py import|export  (run from backend/)
+    import sys
+    data_dir = Path(__file__).parent / "data"
+    store = DataStore(data_dir / "asha.db")
+    paths = (data_dir / "job_listing_data.csv", data_dir / "session_details.json",
+             data_dir / "trusted_sources.json", data_dir / "feedback")
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "import":
+        print(store.import_from_files(*paths, first_run_only=False))
+    elif command == "export":
+        store.export_to_files(*paths)
+        print(f"Exported {store.db_path} to {data_dir}")
+    else:
+        print("Usage: python storage.py import|export")
+        sys.exit(1)
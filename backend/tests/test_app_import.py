@@ -0,0 +1,26 @@
+"""Importing app is free of side effects; building it (wsgi.py, create_app) sets up the data directory."""
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _run(code: str, data_dir: Path) -> str:
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+                            env={**os.environ, "ASHA_DATA_DIR": str(data_dir)})
+    return result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+
+
+def test_import_creates_nothing(tmp_path):
+    _run("import app, ingest, crawl, build_kb", tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_wsgi_builds_the_app_and_imports_the_data_files(tmp_path):
+    (tmp_path / "trusted_sources.json").write_text(json.dumps([{'id': "s1", 'name': "Source"}]))
+    out = _run("import wsgi, app; print(app.data_store.count_items('trusted_sources'), wsgi.app.name)", tmp_path)
+    assert out == "1 app"
+    assert {path.name for path in tmp_path.iterdir()} >= {"asha.db", "analytics", "feedback", "chroma_db"}
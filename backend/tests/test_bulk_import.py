@@ -0,0 +1,87 @@
+"""Streamed job imports: chunked writes, rejected-row reporting, replace mode and background embedding (bulk_import.py)."""
+import io
+import json
+
+import pytest
+
+from bulk_import import BulkImporter
+from storage import DataStore
+
+HEADER = "id,title,company,location,deadline\n"
+
+
+class Sync:
+    def __init__(self, ok=True):
+        self.calls, self.ok = [], ok
+
+    def __call__(self, kind, changed, deleted, progress):
+        progress(len(changed), len(changed))
+        self.calls.append((kind, sorted(changed), sorted(deleted)))
+        return self.ok
+
+
+@pytest.fixture
+def importer(tmp_path):
+    return BulkImporter(DataStore(tmp_path / "asha.db"), Sync(), chunk_rows=2)
+
+
+def _run(importer, text, fmt='csv', mode='upsert'):
+    record = importer.start('jobs', io.BytesIO(text.encode('utf-8')), fmt, mode)
+    importer._executor.submit(lambda: None).result(timeout=10) # Waits for the queued embedding
+    return importer.get(record['id'])
+
+
+def test_rejected_rows_are_reported_with_their_line_numbers(importer):
+    upload = ("\ufeff" + HEADER + "j1,Analyst,Acme,Pune,2026-05-01\n"
+              "j2,Engineer,,Pune,\n" # Missing company
+              "j3,Designer,Globex,Remote,next week\n"
+              "j4,Writer,Initech,Delhi,,extra cell\n"
+              "j5,Tester,Acme,Pune,\n")
+    record = _run(importer, upload)
+    assert record['rows'] == {'read': 5, 'written': 3, 'unchanged': 0, 'rejected': 2, 'deleted': 0}
+    assert record['errors'] == [{'line': 3, 'error': "missing company"},
+                                {'line': 4, 'error': "deadline must be YYYY-MM-DD, got 'next week'"}]
+    assert record['status'] == 'done' and record['embedding'] == {'total': 3, 'done': 3}
+    assert importer.sync.calls == [('job', ["j1", "j4", "j5"], [])]
+    assert importer.store.get_item('jobs', "j4")['description'] == ""
+
+    again = _run(importer, upload) # Nothing changed: nothing to embed
+    assert again['rows']['unchanged'] == 3 and again['status'] == 'done' and len(importer.sync.calls) == 1
+    assert importer.store.bulk_import_item_ids(record['id']) == []
+
+
+def test_replace_deletes_what_the_upload_left_out_and_keeps_its_order(importer):
+    _run(importer, HEADER + "".join(f"j{i},Role {i},Acme,Pune,\n" for i in range(5)))
+    record = _run(importer, HEADER + "j4,Role 4,Acme,Pune,\nj9,Role 9,Acme,Pune,\nj1,Role 1b,Acme,Pune,\n", mode='replace')
+    assert record['rows']['deleted'] == 3 and record['status'] == 'done'
+    assert [job['id'] for job in importer.store.list_items('jobs')] == ["j4", "j9", "j1"]
+    assert importer.sync.calls[-1] == ('job', ["j1", "j4", "j9"], ["j0", "j2", "j3"]) # j4 moved to the top
+
+
+def test_replace_deletes_nothing_unless_the_whole_upload_was_read(importer):
+    _run(importer, HEADER + "j1,Role,Acme,Pune,\nj2,Role,Acme,Pune,\n")
+    empty = _run(importer, HEADER + "j3,,,Pune,\n", mode='replace')
+    assert empty['status'] == 'failed' and empty['error'] == "No valid rows; nothing was replaced"
+
+    broken = io.BytesIO((HEADER + "j1,Role,Acme,Pune,\n").encode('utf-8') + b"j5,\xff\xfe,Acme,Pune,\n")
+    record = importer.start('jobs', broken, 'csv', 'replace')
+    importer._executor.submit(lambda: None).result(timeout=10)
+    assert record['error'].startswith("Upload could not be read") and record['rows']['deleted'] == 0
+    assert importer.store.count_items('jobs') == 2
+
+
+def test_ndjson_uploads_and_failed_embedding(tmp_path):
+    importer = BulkImporter(DataStore(tmp_path / "asha.db"), Sync(ok=False))
+    lines = [json.dumps({'id': "j1", 'title': "Analyst", 'company': "Acme"}), "", "{not json",
+             json.dumps(["a list"]), json.dumps({'id': "j2", 'title': "Lead", 'company': "Acme", 'location': ["x"]})]
+    record = _run(importer, "\n".join(lines) + "\n", fmt='ndjson')
+    assert [error['line'] for error in record['errors']] == [3, 4, 5]
+    assert record['errors'][1]['error'] == "expected an object"
+    assert record['status'] == 'failed' and record['error'] == "Rows were saved, but the knowledge base update failed"
+    assert importer.store.get_item('jobs', "j1")['title'] == "Analyst"
+
+
+def test_unsupported_requests_are_rejected_up_front(importer):
+    for entity, fmt, mode in (('sessions', 'csv', 'upsert'), ('jobs', 'xlsx', 'upsert'), ('jobs', 'csv', 'merge')):
+        with pytest.raises(ValueError):
+            importer.start(entity, io.BytesIO(b""), fmt, mode)
@@ -0,0 +1,67 @@
+"""The bounded server-side conversation store: recent turns, rolling summary and eviction (conversations.py)."""
+import time
+
+from conversations import ConversationStore
+
+
+def _exchanges(store, conversation_id, n, start=0):
+    for i in range(start, start + n):
+        store.record_exchange(conversation_id, f"Question {i} about returnships", f"Answer {i} with some programmes")
+
+
+def test_old_turns_are_folded_into_the_summary():
+    store = ConversationStore(recent_turns=4)
+    conversation_id, context = store.open(None, "u1")
+    assert context == {'history': [], 'summary': "", 'user_turns': 0}
+    _exchanges(store, conversation_id, 3)
+
+    _, context = store.open(conversation_id, "u1")
+    assert [turn['content'] for turn in context['history']] == [
+        "Question 1 about returnships", "Answer 1 with some programmes",
+        "Question 2 about returnships", "Answer 2 with some programmes"]
+    assert context['summary'].splitlines() == ["User asked: Question 0 about returnships",
+                                               "Asha answered: Answer 0 with some programmes"]
+    assert context['user_turns'] == 3
+
+
+def test_summary_drops_the_oldest_gists_when_over_budget():
+    store = ConversationStore(recent_turns=2, summary_max_tokens=30)
+    conversation_id, _ = store.open(None, "u1")
+    _exchanges(store, conversation_id, 10)
+    summary = store.open(conversation_id, "u1")[1]['summary'].splitlines()
+    assert summary == ["User asked: Question 8 about returnships", # ~11 tokens per gist: a third won't fit
+                       "Asha answered: Answer 8 with some programmes"]
+
+
+def test_least_recently_used_conversation_is_evicted():
+    store = ConversationStore(max_conversations=2)
+    first, _ = store.open(None, "u1")
+    second, _ = store.open(None, "u2")
+    store.open(first, "u1") # Touch: `second` is now the LRU entry
+    store.open(None, "u3")
+    assert len(store) == 2 and store.stats['evicted_capacity'] == 1
+    assert store.knows(first, "u1") and not store.knows(second, "u2")
+
+
+def test_idle_conversations_are_dropped():
+    store = ConversationStore(idle_seconds=0.05)
+    idle, _ = store.open(None, "u1")
+    time.sleep(0.1)
+    store.open(None, "u2")
+    assert not store.knows(idle, "u1") and store.stats['evicted_idle'] == 1
+
+
+def test_unknown_or_foreign_ids_start_fresh_from_the_seed():
+    store = ConversationStore()
+    mine, _ = store.open("client-chosen_1", "u1")
+    assert mine == "client-chosen_1"
+    _exchanges(store, mine, 1)
+
+    theirs, context = store.open(mine, "u2") # Another user's conversation is not shared
+    assert theirs != mine and context['history'] == [] and not store.knows(mine, "u2")
+
+    seeded, context = store.open("bad id!", "u1", seed_history=[{'role': 'user', 'content': "Hi"}, "junk",
+                                                                {'role': 'bot', 'content': "Hello"}, {'role': 'user'}])
+    assert seeded != "bad id!"
+    assert context['history'] == [{'role': 'user', 'content': "Hi"}, {'role': 'assistant', 'content': "Hello"}]
+    store.record_exchange("evicted", "q", "a") # No-op
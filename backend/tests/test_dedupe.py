@@ -0,0 +1,63 @@
+"""MinHash near-duplicate clustering of jobs and sessions before embedding (dedupe.py)."""
+import dedupe
+from dedupe import NearDuplicateDetector, minhash_signature, SHINGLE_CHARS
+
+DESCRIPTION = ("Join our analytics team to build dashboards, clean data pipelines and present insights to "
+               "product managers. Flexible hours and a structured returnship for women restarting their careers.")
+
+
+def _job(i, title="Data Analyst", company="Acme", location="Pune", description=DESCRIPTION):
+    return {'id': f"j{i}", 'title': title, 'company': company, 'location': location, 'type': "Full-time",
+            'description': description}
+
+
+def _shingles(text):
+    normalized = " ".join(dedupe._WORD.findall(text.lower()))
+    return {normalized[i:i + SHINGLE_CHARS] for i in range(len(normalized) - SHINGLE_CHARS + 1)}
+
+
+def test_signatures_estimate_jaccard_similarity():
+    edited = DESCRIPTION.replace("dashboards", "reports").replace("Flexible", "Remote-friendly")
+    a, b = _shingles(DESCRIPTION), _shingles(edited)
+    jaccard = len(a & b) / len(a | b)
+    estimate = (minhash_signature(DESCRIPTION) == minhash_signature(edited)).mean()
+    assert abs(estimate - jaccard) < 0.12
+    assert (minhash_signature("DATA, analyst!") == minhash_signature("data analyst")).all() # Case and punctuation
+
+
+def test_reposts_cluster_within_a_block_only():
+    jobs = [
+        _job(0),
+        _job(1, title="Data Analyst (Returnship)", location="Pune, Maharashtra"), # Same posting, edited title
+        _job(2, description=DESCRIPTION.replace("Flexible hours", "Flexible working hours")),
+        _job(3, location="Mumbai"), # Same text in another city: another opening
+        _job(4, company="Globex"), # ... or at another company
+        _job(5, title="Nurse", description="Ward duties in a city hospital, night shifts on rotation."),
+    ]
+    assert NearDuplicateDetector().cluster(jobs, 'job') == [[0, 1, 2], [3], [4], [5]]
+    assert NearDuplicateDetector().cluster([], 'job') == []
+
+
+def test_sessions_are_blocked_by_date_and_city():
+    sessions = [{'id': f"s{i}", 'title': "Resume clinic", 'description': DESCRIPTION, 'date': day, 'location': "Online"}
+                for i, day in enumerate(["2026-05-01", "2026-05-01", "2026-05-02"])]
+    assert NearDuplicateDetector().cluster(sessions, 'session') == [[0, 1], [2]]
+
+
+def test_canonical_documents_list_their_variants():
+    jobs = [_job(0), _job(1), _job(2, title="Nurse", description="Ward duties, night shifts."), _job(3)]
+    documents, stats = NearDuplicateDetector().canonical_documents(jobs, 'job')
+    assert [doc_id for doc_id, _, _ in documents] == ["job_j0", "job_j2"]
+    assert documents[0][2]['duplicate_ids'] == "j1,j3" and documents[0][2]['duplicate_count'] == 2
+    assert 'duplicate_ids' not in documents[1][2]
+    assert stats == {'kind': 'job', 'records': 4, 'canonical': 2, 'duplicates': 2, 'dedupe_ratio': 0.5}
+
+
+def test_signatures_of_unchanged_texts_are_reused(monkeypatch):
+    computed = []
+    original = dedupe.minhash_signature
+    monkeypatch.setattr(dedupe, 'minhash_signature', lambda text: computed.append(text) or original(text))
+    detector = NearDuplicateDetector()
+    detector.cluster([_job(0), _job(1, title="Nurse")], 'job')
+    detector.cluster([_job(0), _job(2, title="Teacher")], 'job')
+    assert len(computed) == 3
@@ -0,0 +1,84 @@
+"""Columnar analytics queries over JSON day files and their compacted .col copies (eventstore.py)."""
+import json
+from datetime import date
+
+import pytest
+
+from eventstore import EventStore
+
+DAY1, DAY2 = "2026-03-30", "2026-04-02"
+
+
+def _chat(day, hour, user, topic, seconds=None, tokens=None):
+    data = {'user_id': user, 'topic': topic, 'language': "en"}
+    if seconds is not None:
+        data['response_time_sec'] = seconds
+    if tokens is not None:
+        data['tokens'] = {'input': sum(tokens.values()), 'output': 1, 'calls': len(tokens),
+                          'by_stage': {stage: {'input': n, 'output': 0} for stage, n in tokens.items()}}
+    return {'timestamp': f"{day}T{hour:02d}:15:00", 'event_type': "chat_message", 'data': data}
+
+
+def _write(directory, day, events):
+    (directory / f"events_{day}.json").write_text(json.dumps(events), encoding='utf-8')
+
+
+@pytest.fixture
+def store(tmp_path):
+    analytics = tmp_path / "analytics"
+    analytics.mkdir()
+    _write(analytics, DAY1, [
+        _chat(DAY1, 9, "u1", "career", 1.0, {'classify': 10, 'generate': 100}),
+        _chat(DAY1, 9, "u2", "career", 3.0, {'generate': 50}),
+        {'timestamp': f"{DAY1}T10:00:00", 'event_type': "feedback", 'data': {'helpful': True}},
+        {'event_type': "no timestamp"}, "junk", # Skipped, like the JSON aggregation does
+    ])
+    _write(analytics, DAY2, [_chat(DAY2, 18, "u1", "education", None), _chat(DAY2, 18, "u3", None, 2.0)])
+    return EventStore(analytics, analytics / "columnar")
+
+
+def test_group_by_across_days_and_months(store):
+    rows = store.query(date(2026, 3, 1), date(2026, 4, 30), group_by=['month', 'event_type'])
+    assert rows == [{'month': "2026-03", 'event_type': "chat_message", 'count': 2},
+                    {'month': "2026-03", 'event_type': "feedback", 'count': 1},
+                    {'month': "2026-04", 'event_type': "chat_message", 'count': 2}]
+    assert store.query(date(2026, 4, 1), date(2026, 4, 30), group_by=['hour']) == [{'hour': 18, 'count': 2}]
+    assert store.query(date(2026, 5, 1), date(2026, 5, 31)) == []
+
+
+def test_aggregates_filters_and_ordering(store):
+    span = (date(2026, 3, 1), date(2026, 4, 30))
+    rows = store.query(*span, group_by=['topic'], aggregates=['count', 'avg:response_time', 'distinct:user_id'],
+                       filters={'event_type': ["chat_message"]}, order_by='count')
+    assert rows[0] == {'topic': "career", 'count': 2, 'avg_response_time': 2.0, 'distinct_user_id': 2}
+    assert {'topic': "education", 'count': 1, 'avg_response_time': None, 'distinct_user_id': 1} in rows
+    assert store.query(*span, filters={'topic': [None], 'event_type': ["chat_message"]}) == [{'count': 1}]
+    assert store.values(*span, 'response_time', last=2) == [3.0, 2.0]
+
+
+def test_stages_table_has_one_row_per_event_and_stage(store):
+    rows = store.query(date(2026, 3, 1), date(2026, 4, 30), group_by=['stage'], aggregates=['sum:tokens_input'],
+                       table='stages', filters={'user_id': ["u1"]})
+    assert rows == [{'stage': "classify", 'sum_tokens_input': 10}, {'stage': "generate", 'sum_tokens_input': 100}]
+
+
+def test_closed_days_are_compacted_and_late_writes_are_seen(store, tmp_path):
+    span = (date(2026, 3, 1), date(2026, 4, 30))
+    before = store.query(*span, group_by=['date'])
+    assert sorted(p.name for p in (tmp_path / "analytics" / "columnar").iterdir()) == [
+        f"events_{DAY1}.col", f"events_{DAY2}.col"]
+    assert store.compact() == 0 # Already up to date
+
+    reopened = EventStore(tmp_path / "analytics", tmp_path / "analytics" / "columnar")
+    assert reopened.query(*span, group_by=['date']) == before # Read back from the .col files
+
+    _write(tmp_path / "analytics", DAY2, [_chat(DAY2, 8, "u4", "career")])
+    assert store.query(*span, group_by=['date'])[-1] == {'date': DAY2, 'count': 1}
+
+
+def test_invalid_queries_are_rejected(store):
+    span = (date(2026, 3, 1), date(2026, 4, 30))
+    for kwargs in ({'group_by': ['response_time']}, {'aggregates': ['sum:topic']}, {'aggregates': ['count:topic']},
+                   {'filters': {'stage': ["generate"]}}, {'table': 'users'}, {'order_by': 'sum_tokens_input'}):
+        with pytest.raises(ValueError):
+            store.query(*span, **kwargs)
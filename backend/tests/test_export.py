@@ -0,0 +1,67 @@
+"""Streaming export: incremental JSON array parsing, resumable cursors and chunk encoders (export.py)."""
+import csv
+import gzip
+import io
+import json
+from datetime import date
+
+import pytest
+
+from export import (iter_json_array, iter_events, parse_event_cursor, ndjson_chunks, csv_chunks, event_row,
+                    incomplete_chunk, gzip_chunks, EVENT_CSV_FIELDS)
+
+ITEMS = [12345, {'text': "a, b ] \"c\" \\ é", 'n': [1, 2.5e3, None]}, "x" * 40, True, -7, [], {}, 0.125, None]
+
+
+def _write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_items_straddling_every_read_boundary(tmp_path):
+    path = _write(tmp_path / "a.json", " [\n" + ",\n  ".join(json.dumps(item, ensure_ascii=False) for item in ITEMS) + "\n] ")
+    for chunk_chars in range(1, len(path.read_text(encoding='utf-8')) + 2):
+        assert list(iter_json_array(path, chunk_chars=chunk_chars)) == ITEMS, chunk_chars
+
+
+def test_empty_and_broken_arrays(tmp_path):
+    assert list(iter_json_array(_write(tmp_path / "empty.json", ""))) == []
+    assert list(iter_json_array(_write(tmp_path / "none.json", "[ ]"), chunk_chars=1)) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array(_write(tmp_path / "cut.json", '[{"a": 1}, {"b"'), chunk_chars=4))
+    with pytest.raises(ValueError):
+        list(iter_json_array(_write(tmp_path / "open.json", '[1, 2'), chunk_chars=3))
+
+
+def test_events_resume_after_a_cursor(tmp_path):
+    _write(tmp_path / "events_2026-04-01.json", json.dumps([{'event_type': "chat"}, {'event_type': "feedback"}, "junk"]))
+    _write(tmp_path / "events_2026-04-02.json", json.dumps([{'event_type': "chat"}]))
+    _write(tmp_path / "events_2026-04-03.json", '[{"event_type": "chat"}, {"event_ty') # Corrupt: rest skipped
+    _write(tmp_path / "events_2026-04-04.json", json.dumps([{'event_type': "chat"}]))
+    span = (date(2026, 4, 1), date(2026, 4, 30))
+    cursors = [cursor for cursor, _ in iter_events(tmp_path, *span)]
+    assert cursors == ["2026-04-01:0", "2026-04-01:1", "2026-04-02:0", "2026-04-03:0", "2026-04-04:0"]
+    assert [c for c, _ in iter_events(tmp_path, *span, after="2026-04-01:0")] == cursors[1:]
+    assert [c for c, _ in iter_events(tmp_path, *span, event_types=["feedback"])] == ["2026-04-01:1"]
+    assert [c for c, _ in iter_events(tmp_path, date(2026, 4, 2), date(2026, 4, 2))] == ["2026-04-02:0"]
+    assert parse_event_cursor("2026-04-01:7") == (date(2026, 4, 1), 7)
+    for bad in ("2026-04-01", "yesterday:1", "2026-04-01:x"):
+        with pytest.raises(ValueError):
+            parse_event_cursor(bad)
+
+
+def test_chunk_encoders_round_trip():
+    records = [(f"2026-04-01:{i}", {'event_type': "chat", 'data': {'user_id': f"u{i}", 'text': "é,\"q\""}}) for i in range(50)]
+    chunks = list(ndjson_chunks(records, flush_bytes=200))
+    assert len(chunks) > 1 and all(chunk.endswith(b"\n") for chunk in chunks)
+    lines = b"".join(chunks).decode('utf-8').splitlines()
+    assert [json.loads(line)['_cursor'] for line in lines] == [cursor for cursor, _ in records]
+
+    body = b"".join(gzip_chunks(csv_chunks(records, EVENT_CSV_FIELDS, event_row, flush_bytes=200)))
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(body).decode('utf-8'))))
+    assert len(rows) == 50 and rows[3]['user_id'] == "u3" and json.loads(rows[3]['data'])['text'] == "é,\"q\""
+    assert next(csv_chunks(records[:1], EVENT_CSV_FIELDS, event_row, header=False)).startswith(b"2026-04-01:0,")
+
+    assert json.loads(incomplete_chunk('ndjson', "timeout", "2026-04-01:3")) == {
+        '_error': "export incomplete: timeout", '_cursor': "2026-04-01:3"}
+    assert incomplete_chunk('csv', "timeout", "2026-04-01:3") == b"# export incomplete: timeout; resume with after=2026-04-01:3\n"
@@ -0,0 +1,80 @@
+"""Exports whose later pages meet a full export queue.
+
+The first page of an export is fetched before the response starts; the
+following pages are fetched while it streams, when a 503 can no longer be
+sent. A busy scheduler there must either be waited out or end the export
+with an explicit marker, never with a stream that looks complete.
+"""
+import os
+import json
+import tempfile
+
+os.environ.setdefault("ASHA_DATA_DIR", tempfile.mkdtemp(prefix="asha-test-"))
+
+import app
+import admin_tasks
+from export import ndjson_chunks, csv_chunks, EVENT_CSV_FIELDS, event_row
+from scheduler import SchedulerBusy
+
+RECORDS = 6
+PAGE = 2
+
+
+def _export_page(source, export_format, params, after, header):
+    start = int(after) if after else 0
+    records = [(str(i + 1), {'id': f"e{i}", 'event_type': 'chat'}) for i in range(start, min(start + PAGE, RECORDS))]
+    if export_format == 'csv':
+        chunks = list(csv_chunks(records, EVENT_CSV_FIELDS, event_row, header=header))
+    else:
+        chunks = list(ndjson_chunks(records))
+    return chunks, records[-1][0] if start + PAGE < RECORDS else None
+
+
+class BusyScheduler:
+    """Runs jobs inline, but turns away the calls numbered in `busy` (1-based)."""
+
+    def __init__(self, busy):
+        self.busy = set(busy)
+        self.calls = 0
+
+    def call(self, work_class, fn, *args, timeout=None):
+        self.calls += 1
+        if self.calls in self.busy:
+            raise SchedulerBusy(work_class, retry_after=0)
+        return fn(*args)
+
+
+def _export(monkeypatch, scheduler, export_format='ndjson'):
+    monkeypatch.setattr(app, 'scheduler', scheduler)
+    monkeypatch.setattr(admin_tasks, 'export_page', _export_page)
+    return b"".join(app._export_pages('events', export_format, {}, None)).decode('utf-8')
+
+
+def test_busy_page_is_retried(monkeypatch):
+    scheduler = BusyScheduler(busy={2, 3})
+    lines = [json.loads(line) for line in _export(monkeypatch, scheduler).splitlines()]
+    assert [line['id'] for line in lines] == [f"e{i}" for i in range(RECORDS)]
+    assert not any('_error' in line for line in lines)
+    assert scheduler.calls == RECORDS // PAGE + 2
+
+
+def test_export_that_stays_busy_ends_with_marker(monkeypatch):
+    monkeypatch.setattr(app.Config, 'ADMIN_JOB_TIMEOUT', 0)
+    lines = [json.loads(line) for line in _export(monkeypatch, BusyScheduler(busy=range(2, 100))).splitlines()]
+    assert [line['id'] for line in lines[:-1]] == ["e0", "e1"]
+    assert lines[-1]['_error'].startswith("export incomplete")
+    assert lines[-1]['_cursor'] == "2"
+
+
+def test_csv_export_that_fails_ends_with_marker(monkeypatch):
+    def fail_after_first(source, export_format, params, after, header):
+        if after:
+            raise RuntimeError("worker died")
+        return _export_page(source, export_format, params, after, header)
+
+    monkeypatch.setattr(app, 'scheduler', BusyScheduler(busy=()))
+    monkeypatch.setattr(admin_tasks, 'export_page', fail_after_first)
+    lines = b"".join(app._export_pages('events', 'csv', {}, None)).decode('utf-8').splitlines()
+    assert lines[0].startswith("cursor,")
+    assert len(lines) == 1 + PAGE + 1
+    assert lines[-1] == "# export incomplete: worker died; resume with after=2"
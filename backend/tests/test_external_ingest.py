@@ -0,0 +1,98 @@
+"""Trusted-source crawling: text extraction, chunking and incremental chunk updates (external_ingest.py)."""
+import hashlib
+
+import pytest
+
+from external_ingest import ExternalIngestor, extract_text, chunk_text, chunk_id
+from storage import DataStore
+
+PARAGRAPHS = [f"Paragraph {i} describes one returnship programme for women in some detail." for i in range(6)]
+
+
+def _page(paragraphs) -> str:
+    return ("<html><head><script>var tracking = 'a b c d e f';</script></head><body>"
+            "<nav>Home About Programmes Contact Login Register</nav>"
+            + "".join(f"<p>{text}</p>" for text in paragraphs) + "<p>Short line.</p></body></html>")
+
+
+class FakeFetcher:
+    """Serves pages from a dict, as ContentFetcher would after a refresh."""
+
+    def __init__(self):
+        self.pages = {}
+
+    def refresh_all(self, urls, force=False):
+        return {url: ({'content_hash': hashlib.sha256(self.pages[url].encode()).hexdigest()} if url in self.pages
+                      else {'error': "404"}) for url in urls}
+
+    def read_body(self, url):
+        return self.pages.get(url)
+
+
+class Sink:
+    def __init__(self):
+        self.calls, self.ok = [], True
+
+    def __call__(self, added, removed):
+        self.calls.append(({chunk['id'] for chunk in added}, set(removed)))
+        return self.ok
+
+
+@pytest.fixture
+def setup(tmp_path):
+    store, fetcher, sink = DataStore(tmp_path / "asha.db"), FakeFetcher(), Sink()
+    store.replace_items('trusted_sources', [{'id': "s1", 'name': "Returnships", 'url': "https://example.org/a"},
+                                            {'id': "s2", 'name': "Mirror", 'url': "https://example.org/b"}])
+    fetcher.pages["https://example.org/a"] = _page(PARAGRAPHS)
+    return store, fetcher, sink, ExternalIngestor(store, fetcher, sink, chunk_words=24)
+
+
+def test_extract_text_keeps_only_body_paragraphs():
+    text = extract_text(_page(PARAGRAPHS[:2]))
+    assert text.splitlines() == PARAGRAPHS[:2]
+
+
+def test_chunk_text_packs_paragraphs_and_splits_long_ones():
+    chunks = chunk_text("\n".join(PARAGRAPHS), max_words=24)
+    assert all(len(chunk.split()) <= 24 for chunk in chunks)
+    assert [line for chunk in chunks for line in chunk.splitlines()] == PARAGRAPHS
+    long = " ".join(["word"] * 50) + ". End."
+    assert [len(chunk.split()) for chunk in chunk_text(long, max_words=20)] == [20, 20, 11]
+
+
+def test_only_changed_chunks_reach_the_knowledge_base(setup):
+    store, fetcher, sink, ingestor = setup
+    first = {r['source_id']: r for r in ingestor.run_due()}
+    assert first['s1']['added'] == 3 and first['s2']['error'] == "404"
+    assert len(store.list_external_chunks("s1")) == 3
+
+    store.save_crawl_state("s1", {**store.get_crawl_states()["s1"], 'next_run': None})
+    assert ingestor.run_due()[0]['unchanged'] # Same content hash: nothing re-chunked
+
+    edited = PARAGRAPHS[:5] + ["Paragraph 5 now describes a different programme for women returning to work."]
+    fetcher.pages["https://example.org/a"] = _page(edited)
+    store.save_crawl_state("s1", {**store.get_crawl_states()["s1"], 'next_run': None})
+    result = ingestor.run_due()[0]
+    assert (result['added'], result['removed']) == (1, 1) # The first two chunks kept their hashes
+    assert sink.calls[-1] == ({chunk_id("\n".join(edited[4:]))}, {chunk_id("\n".join(PARAGRAPHS[4:]))})
+
+
+def test_failed_sink_restores_the_chunks_and_retries(setup):
+    store, fetcher, sink, ingestor = setup
+    sink.ok = False
+    result = [r for r in ingestor.run_due() if r['source_id'] == "s1"][0]
+    assert result['error'] == "knowledge base update failed"
+    assert store.list_external_chunks("s1") == []
+    assert 'content_hash' not in store.get_crawl_states()["s1"]
+
+
+def test_duplicate_content_is_stored_once_and_removed_sources_are_pruned(setup):
+    store, fetcher, sink, ingestor = setup
+    fetcher.pages["https://example.org/b"] = _page(PARAGRAPHS) # Same text under another source
+    ingestor.run_due()
+    assert len(store.list_external_chunks("s1")) == 3 and store.list_external_chunks("s2") == []
+
+    ids = {chunk['id'] for chunk in store.list_external_chunks("s1")}
+    store.replace_items('trusted_sources', [{'id': "s2", 'name': "Mirror", 'url': "https://example.org/b"}])
+    assert ingestor.prune_removed_sources() == 3
+    assert store.list_external_chunks() == [] and sink.calls[-1] == (set(), ids)
@@ -0,0 +1,64 @@
+"""Paging, filtering and counting the admin feedback list (DataStore.query_feedback)."""
+import sqlite3
+
+import pytest
+
+from storage import DataStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DataStore(tmp_path / "asha.db")
+    for i in range(5):
+        store.save_feedback({'id': f"new-{i}", 'feedbackType': 'response', 'status': 'pending',
+                             'timestamp': f"2026-01-0{i + 1}T10:00:00", 'preview': f"new {i}"})
+    store.save_feedback({'id': "done", 'feedbackType': 'response', 'status': 'resolved', 'timestamp': "2026-01-03T12:00:00"})
+    for i in range(3): # Legacy records, from before status and timestamps were always set
+        store.save_feedback({'id': f"legacy-{i}", 'feedbackType': 'response'})
+    return store
+
+
+def _all_pages(store, **filters):
+    ids, cursor = [], None
+    while True:
+        page = store.query_feedback(limit=2, cursor=cursor, **filters)
+        ids += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_pages_reach_records_without_timestamp(store):
+    assert _all_pages(store) == ["new-4", "new-3", "done", "new-2", "new-1", "new-0", "legacy-2", "legacy-1", "legacy-0"]
+    assert _all_pages(store, sort='asc')[:3] == ["legacy-0", "legacy-1", "legacy-2"]
+
+
+def test_pending_total_matches_the_pending_pages(store):
+    counts = store.feedback_status_counts()
+    assert counts == {'pending': 8, 'resolved': 1}
+    assert len(_all_pages(store, status='pending')) == counts['pending']
+
+
+def test_legacy_rows_are_listed_without_timestamp(store):
+    legacy = [item for item in store.list_feedback_summaries() if item['id'].startswith("legacy")]
+    assert {item['status'] for item in legacy} == {'pending'}
+    assert {item['timestamp'] for item in legacy} == {None}
+
+
+def test_date_filters(store):
+    assert _all_pages(store, since="2026-01-03", until="2026-01-04") == ["new-3", "done", "new-2"]
+    assert _all_pages(store, until="2026-01-01T10:00:00") == ["new-0", "legacy-2", "legacy-1", "legacy-0"]
+    for bad in ({'since': "yesterday"}, {'until': "2026-13-01"}, {'since': "2026-01-01' OR 1=1 --"}):
+        with pytest.raises(ValueError):
+            store.query_feedback(**bad)
+
+
+def test_null_columns_from_older_databases_are_backfilled(tmp_path):
+    path = tmp_path / "asha.db"
+    DataStore(path).schema_version() # Created and migrated on first use
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("INSERT INTO feedback (id, position, data) VALUES ('old', 0, '{\"id\": \"old\"}')")
+        conn.execute("DELETE FROM store_meta WHERE key = 'schema_version'")
+    store = DataStore(path)
+    assert store.feedback_status_counts() == {'pending': 1}
+    assert _all_pages(store, status='pending') == ["old"]
@@ -0,0 +1,115 @@
+"""ContentFetcher against a local stub server: conditional GETs, stale-while-revalidate and failures."""
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetcher import ContentFetcher, extract_summary
+
+PAGE = """<html><head><title>Returnship {version}</title>
+<meta name="description" content="Programmes for women restarting careers, v{version}."></head><body>...</body></html>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if self.path == "/broken":
+            self.send_error(500)
+            return
+        if self.path == "/slow":
+            time.sleep(0.3)
+        etag = f'"v{server.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PAGE.format(version=server.version).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Mon, 05 Jan 2026 10:00:00 GMT')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1,localhost")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.version, httpd.requests = 1, []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _fetcher(tmp_path, **kwargs) -> ContentFetcher:
+    return ContentFetcher(tmp_path / "cache", max_workers=2, per_host_interval=0, timeout=5, **kwargs)
+
+
+def test_unchanged_page_is_revalidated_with_a_conditional_get(server, tmp_path):
+    fetcher, url = _fetcher(tmp_path), server.url + "/page"
+    first = fetcher.refresh(url)
+    assert (first['status'], first['title'], first['etag']) == (200, "Returnship 1", '"v1"')
+    assert first['description'] == "Programmes for women restarting careers, v1."
+    assert "Returnship 1" in fetcher.read_body(url)
+
+    second = fetcher.refresh(url)
+    headers = server.requests[-1][1]
+    assert headers['If-None-Match'] == '"v1"'
+    assert headers['If-Modified-Since'] == 'Mon, 05 Jan 2026 10:00:00 GMT'
+    assert second['content_hash'] == first['content_hash'] and second['checked_at'] >= first['checked_at']
+
+    server.version = 2
+    assert fetcher.refresh(url)['title'] == "Returnship 2"
+
+
+def test_stale_entries_are_served_while_revalidating(server, tmp_path):
+    fetcher, url = _fetcher(tmp_path, ttl=0), server.url + "/page"
+    assert fetcher.get_many([url]) == {url: None} # Missing: fetched in the background
+    fetcher.refresh_async(url).result(timeout=5)
+    server.version = 2
+    assert fetcher.get_many([url])[url]['title'] == "Returnship 1" # Stale, answered from the cache
+    fetcher.refresh_async(url).result(timeout=5)
+    assert fetcher.get_many([url])[url]['title'] == "Returnship 2"
+
+    reopened = _fetcher(tmp_path) # The cache survives a restart
+    assert reopened.cached(url)['title'] == "Returnship 2" and not reopened.is_stale(reopened.cached(url))
+
+
+def test_concurrent_refreshes_share_one_fetch(server, tmp_path):
+    fetcher, url = _fetcher(tmp_path), server.url + "/slow"
+    futures = {fetcher.refresh_async(url) for _ in range(5)}
+    assert len(futures) == 1
+    assert futures.pop().result(timeout=5)['title'] == "Returnship 1"
+    assert [path for path, _ in server.requests] == ["/slow"]
+
+
+def test_failures_keep_the_previous_content_and_retry_sooner(server, tmp_path):
+    fetcher = _fetcher(tmp_path, ttl=3600, error_ttl=0)
+    missing = fetcher.refresh(server.url + "/broken")
+    assert missing['error'] and 'title' not in missing and fetcher.read_body(server.url + "/broken") is None
+    assert fetcher.is_stale(missing)
+
+    url = server.url + "/page"
+    fetcher.refresh(url)
+    server.shutdown() # Nothing listens any more
+    server.server_close()
+    failed = fetcher.refresh(url)
+    assert failed['error'] and failed['title'] == "Returnship 1"
+    assert "Returnship 1" in fetcher.read_body(url)
+    assert fetcher.is_stale(failed)
+
+
+def test_extract_summary_prefers_the_plain_description():
+    page = ('<title> A &amp; B </title><meta property="og:description" content="social">'
+            '<meta name="description" content="plain">')
+    assert extract_summary(page) == {'title': "A & B", 'description': "plain"}
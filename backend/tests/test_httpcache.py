@@ -0,0 +1,73 @@
+"""ETag/304, body caching and compression of read-heavy GET endpoints (httpcache.ResponseCache)."""
+import gzip
+
+import pytest
+from flask import Flask, jsonify
+
+from httpcache import ResponseCache
+
+
+@pytest.fixture
+def service():
+    app = Flask(__name__)
+    cache = ResponseCache(max_entries=2, min_compress_bytes=100)
+    state = {'version': 1, 'calls': 0, 'size': 10}
+
+    @app.route('/items')
+    @cache.cached(lambda: state['version'])
+    def items():
+        state['calls'] += 1
+        return jsonify({'version': state['version'], 'items': ["x" * state['size']]})
+
+    @app.route('/broken')
+    @cache.cached(lambda: state['version'])
+    def broken():
+        state['calls'] += 1
+        return jsonify({'error': "boom"}), 500
+
+    return app.test_client(), cache, state
+
+
+def test_body_is_cached_until_the_version_changes(service):
+    client, cache, state = service
+    first = client.get('/items')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    assert client.get('/items').get_json() == first.get_json()
+    assert state['calls'] == 1 and cache.stats['hits'] == 1
+
+    state['version'] = 2
+    second = client.get('/items')
+    assert second.get_json()['version'] == 2 and second.headers['ETag'] != first.headers['ETag']
+    assert state['calls'] == 2
+
+
+def test_matching_etag_gets_304_without_running_the_view(service):
+    client, cache, state = service
+    etag = client.get('/items').headers['ETag']
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b"" and response.headers['ETag'] == etag
+    assert state['calls'] == 1 and cache.stats['not_modified'] == 1
+
+    state['version'] = 2
+    assert client.get('/items', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_large_bodies_are_compressed_once_per_version(service):
+    client, cache, state = service
+    state['size'] = 5000
+    response = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] in ('gzip', 'br') and response.headers['Vary'] == 'Accept-Encoding'
+    if response.headers['Content-Encoding'] == 'gzip':
+        assert b'"version":1' in gzip.decompress(response.data).replace(b" ", b"")
+    plain = client.get('/items')
+    assert 'Content-Encoding' not in plain.headers and len(plain.data) > len(response.data)
+    assert state['calls'] == 1
+
+
+def test_errors_are_not_cached_and_the_lru_is_bounded(service):
+    client, cache, state = service
+    assert client.get('/broken').status_code == 500 and client.get('/broken').status_code == 500
+    assert state['calls'] == 2
+    for query in ("a", "b", "c"):
+        client.get(f'/items?q={query}')
+    assert len(cache._entries) == 2
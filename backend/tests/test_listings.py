@@ -0,0 +1,92 @@
+"""In-memory listing search: keyword matching, facets, date ranges and cursor paging (listings.py)."""
+import pytest
+
+from listings import ListingIndex
+
+
+def _job(i, title, location="Pune, Maharashtra", job_type="Full-time", deadline=None, **extra):
+    return {'id': f"j{i}", 'title': title, 'company': extra.pop('company', "Acme"), 'location': location,
+            'type': job_type, 'category': extra.pop('category', "Tech"), 'deadline': deadline or f"2026-05-{i % 28 + 1:02d}",
+            'description': extra.pop('description', "A role for women returning to work.")}
+
+
+JOBS = [
+    _job(1, "Software Engineer", deadline="2026-05-03"),
+    _job(2, "Data Engineer", location="Bangalore", deadline="2026-05-01"),
+    _job(3, "Marketing Lead", location="Bangalore, Karnataka", job_type="Part-time", deadline="2026-05-02",
+         description="Engineering background welcome.", category="Marketing"),
+    _job(4, "HR Partner", location="Remote", deadline="not a date"),
+]
+
+
+def _index(records):
+    index = ListingIndex('jobs')
+    index.sync(1, lambda: records)
+    return index
+
+
+def _pages(index, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = index.search(cursor=cursor, **kwargs)
+        pages.append([item['id'] for item in page['items']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_words_match_by_prefix_and_titles_rank_first():
+    index = _index(JOBS)
+    result = index.search("engineer")
+    assert [item['id'] for item in result['items']] == ["j2", "j1", "j3"] # Whole title words, then the description prefix
+    assert result['sort'] == 'relevance' and result['total'] == 3
+    assert [item['id'] for item in index.search("eng data")['items']] == ["j2"] # Every term must match
+    assert index.search("plumber")['total'] == 0
+
+
+def test_facets_are_normalised_and_counted_with_the_other_filters():
+    index = _index(JOBS)
+    result = index.search(filters={'location': ["bangalore"], 'type': ["Part-time"]})
+    assert [item['id'] for item in result['items']] == ["j3"]
+    assert result['facets']['location'] == [{'value': "Bangalore", 'count': 1}] # Counted with type=Part-time only
+    assert {'value': "Full-time", 'count': 1} in result['facets']['type'] # Counted with location=Bangalore only
+    empty = index.search(filters={'location': ["Pune"], 'type': ["Part-time"]}) # A selected value is listed even at 0
+    assert empty['total'] == 0 and empty['facets']['location'] == [{'value': "Bangalore", 'count': 1}, {'value': "Pune", 'count': 0}]
+    assert index.search(filters={'unknown': ["x"]})['total'] == 4
+
+
+def test_date_order_and_ranges():
+    index = _index(JOBS)
+    assert [item['id'] for item in index.search()['items']] == ["j2", "j3", "j1", "j4"] # Undated last
+    assert [item['id'] for item in index.search(date_from="2026-05-02", date_to="2026-05-03")['items']] == ["j3", "j1"]
+    for bad in ({'date_from': "May"}, {'sort': "price"}, {'cursor': "not-a-cursor"}):
+        with pytest.raises(ValueError):
+            index.search(**bad)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'filters': {'category': ["Marketing"]}}, {'query': "women"}])
+def test_pages_cover_every_match_once(kwargs):
+    jobs = [_job(i, f"Role {i}", category="Marketing" if i % 10 == 0 else "Tech") for i in range(100)]
+    index = _index(jobs)
+    pages = _pages(index, limit=7, **kwargs)
+    found = [listing_id for page in pages for listing_id in page]
+    assert len(found) == len(set(found)) == index.search(**kwargs)['total']
+    assert all(len(page) == 7 for page in pages[:-1])
+
+
+def test_paging_is_stable_while_listings_are_added():
+    jobs = [_job(i, f"Role {i}", deadline=f"2026-05-{i + 1:02d}") for i in range(10)]
+    index = _index(jobs)
+    first = index.search(limit=4)
+    index.sync(2, lambda: jobs + [_job(99, "Early role", deadline="2026-04-01")])
+    second = index.search(limit=4, cursor=first['next_cursor'])
+    assert [item['id'] for item in second['items']] == ["j4", "j5", "j6", "j7"]
+
+
+def test_sync_reindexes_only_what_changed():
+    index = _index(JOBS)
+    assert index.sync(1, lambda: []) == {'indexed': 0, 'removed': 0} # Same version: not reloaded
+    edited = [JOBS[0], {**JOBS[1], 'title': "Data Analyst"}, JOBS[2]]
+    assert index.sync(2, lambda: edited) == {'indexed': 1, 'removed': 1}
+    assert index.search("analyst")['total'] == 1 and index.search("hr")['total'] == 0
+    assert [f['value'] for f in index.search()['facets']['location']] == ["Bangalore", "Pune"]
@@ -0,0 +1,107 @@
+"""Live /admin/analytics totals: bulk load vs. incremental updates, merge-patch deltas and file following (liveanalytics.py)."""
+import copy
+import json
+from datetime import date
+
+from eventstore import EventStore
+from liveanalytics import AnalyticsState, LiveAnalytics, _DayTail
+
+DAY = "2026-03-30"
+
+
+def _event(event_type, user=None, tokens=0, hour=9, **data):
+    if user is not None:
+        data['user_id'] = user
+    if tokens:
+        data['tokens'] = {'input': tokens, 'output': 1, 'calls': 1, 'by_stage': {'generate': {'input': tokens, 'output': 1}}}
+    return {'timestamp': f"{DAY}T{hour:02d}:00:00", 'event_type': event_type, 'data': data}
+
+
+EVENTS = [
+    _event("chat", "u1", 100, language="en", topic="career", response_time_sec=1.5),
+    _event("chat", "anonymous", 500, language="hi"),
+    _event("chat", "u2", 40, language="en", topic="education"),
+    _event("bias_detected", "u2", bias_type="gender", prevented=True),
+    _event("feedback", "u1", accuracy_rating="Accurate", helpful=True),
+    _event("feedback", accuracy_rating="meh", helpful=False),
+]
+
+
+def _apply(target, patch): # RFC 7386
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _apply(target[key], value)
+        else:
+            target[key] = value
+
+
+def _without_timestamps(rendered):
+    return {section: {k: v for k, v in values.items() if k != 'last_updated'} for section, values in rendered.items()}
+
+
+def test_bulk_load_matches_adding_events_one_by_one(tmp_path):
+    (tmp_path / f"events_{DAY}.json").write_text(json.dumps(EVENTS), encoding='utf-8')
+    loaded = AnalyticsState()
+    loaded.load(EventStore(tmp_path, tmp_path / "columnar"), date(2026, 1, 1), date(2026, 12, 31))
+    added = AnalyticsState()
+    for event in EVENTS + ["junk", {'event_type': "chat"}]:
+        added.add(event)
+    assert _without_timestamps(loaded.render()) == _without_timestamps(added.render())
+
+    rendered = added.render()
+    assert rendered["conversations"]["topic_distribution"] == {"career": 1, "general": 1, "education": 1}
+    assert rendered["conversations"]["bias_metrics"]["prevention_rate"] == 100.0
+    assert rendered["feedback"]["accuracy_ratings"] == {"accurate": 1, "inaccurate": 0, "unsure": 0, "other": 1}
+    assert rendered["users"]["total_users"] == 3 # Including the shared anonymous id
+
+
+def test_deltas_patch_the_previous_render_into_the_current_one():
+    state = AnalyticsState(top_users=2)
+    state.add(EVENTS[0])
+    dashboard = state.render()
+    assert state.take_delta() is not None and state.take_delta() is None
+
+    for event in EVENTS[1:] + [_event("chat", "u3", 5, response_time_sec=2.0)]:
+        state.add(event)
+    delta = state.take_delta()
+    assert delta["response_times"] == [2.0]
+    _apply(dashboard, delta["patch"])
+    dashboard["conversations"]["response_times"] += delta["response_times"]
+    assert _without_timestamps(dashboard) == _without_timestamps(state.render())
+
+
+def test_top_users_are_ranked_without_anonymous_visitors():
+    state = AnalyticsState(top_users=2)
+    for user, tokens in (("u1", 10), ("anonymous", 900), ("anonymous_3", 800), ("u2", 30), ("u3", 20), ("u1", 15)):
+        state.add(_event("chat", user, tokens))
+    assert [(row["user_id"], row["input"]) for row in state.render()["tokens"]["top_users"]] == [("u2", 30), ("u1", 25)]
+    assert state.render()["tokens"]["total_input"] == 1775 # Anonymous tokens still count in the totals
+
+
+def test_day_tail_reads_only_appended_events(tmp_path):
+    path = tmp_path / "events_today.json"
+    tail = _DayTail(path, date.today())
+    assert tail.read_new() == []
+    path.write_text(json.dumps(EVENTS[:2], indent=2), encoding='utf-8')
+    assert tail.read_new() == EVENTS[:2] and tail.read_new() == []
+    path.write_text(json.dumps(EVENTS[:4], indent=2), encoding='utf-8') # Appends rewrite "[..., new]"
+    assert tail.read_new() == EVENTS[2:4]
+    path.write_text(json.dumps(EVENTS[:5], separators=(',', ':')), encoding='utf-8') # Reformatted: re-read and skip
+    assert tail.read_new() == EVENTS[4:5]
+
+
+def test_subscribers_get_a_snapshot_then_deltas(tmp_path):
+    today = date.today()
+    analytics = LiveAnalytics(EventStore(tmp_path, tmp_path / "columnar"), tmp_path, poll_interval=3600)
+    subscriber, snapshot = analytics.subscribe()
+    assert snapshot["type"] == "snapshot" and len(analytics) == 1
+    events = [{**event, 'timestamp': f"{today.isoformat()}T09:00:00"} for event in EVENTS[:1]]
+    (tmp_path / f"events_{today.isoformat()}.json").write_text(json.dumps(events), encoding='utf-8')
+    analytics.poll()
+    message = analytics.next_message(subscriber, timeout=1)
+    assert message["type"] == "delta" and message["seq"] == snapshot["seq"] + 1
+    dashboard = copy.deepcopy(snapshot["data"])
+    _apply(dashboard, message["patch"])
+    assert dashboard["conversations"]["total_conversations"] == snapshot["data"]["conversations"]["total_conversations"] + 1
+    analytics.unsubscribe(subscriber)
+    assert len(analytics) == 0
@@ -0,0 +1,80 @@
+"""Token accounting of Gemini calls per request scope and stage (llm.py), and anonymous ids (users.py)."""
+from types import SimpleNamespace
+
+import pytest
+
+from llm import LLMClient, start_scope, end_scope, summarize
+from prompting import estimate_tokens
+from users import is_anonymous
+
+
+class FakeGenai:
+    def __init__(self, usage=True, fail=False):
+        self.usage, self.fail = usage, fail
+
+    def GenerativeModel(self, name):
+        return self
+
+    def generate_content(self, prompt):
+        if self.fail:
+            raise RuntimeError("503 Service Unavailable")
+        usage = SimpleNamespace(prompt_token_count=11, candidates_token_count=7) if self.usage else None
+        return SimpleNamespace(text="An answer.", usage_metadata=usage)
+
+    def embed_content(self, model, content, task_type):
+        if self.fail:
+            raise RuntimeError("429 Resource Exhausted")
+        return {"embedding": [[0.0] for _ in content]}
+
+
+def _client(genai):
+    client, seen = LLMClient(lambda: genai), []
+    client.add_listener(seen.append)
+    return client, seen
+
+
+def test_calls_are_collected_per_scope_and_summarized_by_stage():
+    client, seen = _client(FakeGenai())
+    calls, token = start_scope()
+    try:
+        client.generate("flash", "Classify this", stage="classify")
+        client.generate("pro", "Answer this", stage="generate")
+        client.generate("flash", "Classify again", stage="classify")
+        client.embed("embedding-001", ["one query"], task_type="retrieval_query", stage="embed_query")
+    finally:
+        end_scope(token)
+    client.generate("flash", "Outside any request", stage="classify")
+
+    assert len(calls) == 4 and len(seen) == 5
+    usage = summarize(calls)
+    assert (usage['input'], usage['output'], usage['calls'], usage['estimated']) == (33 + estimate_tokens("one query"), 21, 4, True)
+    assert usage['by_stage']['classify'] == {'model': "flash", 'input': 22, 'output': 14, 'calls': 2}
+    assert summarize([]) == {'input': 0, 'output': 0, 'calls': 0, 'estimated': False, 'by_stage': {}}
+
+
+def test_missing_usage_metadata_is_estimated():
+    client, seen = _client(FakeGenai(usage=False))
+    client.generate("flash", "A prompt of some length", stage="generate")
+    assert seen[0]['input_tokens'] == estimate_tokens("A prompt of some length")
+    assert seen[0]['output_tokens'] == estimate_tokens("An answer.") and seen[0]['estimated']
+
+
+def test_failed_calls_are_recorded_with_zero_tokens():
+    client, seen = _client(FakeGenai(fail=True))
+    with pytest.raises(RuntimeError):
+        client.generate("flash", "A long prompt " * 50, stage="generate")
+    with pytest.raises(RuntimeError):
+        client.embed("embedding-001", ["text"] * 10, task_type="retrieval_document", stage="embed")
+    assert [(c['stage'], c['input_tokens'], c['output_tokens'], c['ok']) for c in seen] == [
+        ("generate", 0, 0, False), ("embed", 0, 0, False)]
+
+
+def test_a_failing_listener_does_not_break_the_call():
+    client = LLMClient(lambda: FakeGenai())
+    client.add_listener(lambda call: 1 / 0)
+    assert client.generate("flash", "Hi", stage="generate") == "An answer."
+
+
+def test_is_anonymous():
+    assert all(is_anonymous(user) for user in (None, "", "anonymous", "anonymous_17"))
+    assert not any(is_anonymous(user) for user in ("u1", "anonymously", 42))
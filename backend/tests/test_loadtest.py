@@ -0,0 +1,57 @@
+"""The load-test harness: baseline comparison, latency summaries and the fake backends (benchmarks/)."""
+import pytest
+
+from benchmarks.fakes import FakeGemini, FakeGeminiError, FakeFirestore, LatencyModel, fake_embedding
+from benchmarks.loadtest import compare, _summarize
+
+
+def _report(error_rate=0.0, **scenario):
+    base = {"requests": 200, "errors": 0, "throughput_rps": 100.0, "p95_ms": 200.0}
+    return {"config": {"error_rate": error_rate}, "scenarios": {"chat": {**base, **scenario}}}
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = _report()
+    assert compare(_report(p95_ms=260.0, throughput_rps=71.0), baseline, tolerance=0.3) == []
+    assert compare(_report(p95_ms=60.0), _report(p95_ms=20.0), tolerance=0.3) == [] # 3x, but inside the noise floor
+    assert compare(_report(p95_ms=261.0, throughput_rps=69.0), baseline, tolerance=0.3) == [
+        "chat: p95 261.0 ms > baseline 200.0 ms",
+        "chat: throughput 69.0/s < baseline 100.0/s",
+    ]
+
+
+def test_compare_allows_for_injected_errors_and_new_scenarios():
+    baseline = _report()
+    assert compare(_report(errors=1), baseline, tolerance=0.3) == []
+    assert compare(_report(errors=3), baseline, tolerance=0.3) == ["chat: 3 errors (baseline 0)"]
+    assert compare(_report(error_rate=0.05, errors=20), baseline, tolerance=0.3) == []
+    assert compare(_report(), {"scenarios": {}}, tolerance=0.3) == []
+
+
+def test_summarize_reports_percentiles_in_ms():
+    summary = _summarize([i / 1000 for i in range(1, 101)], errors=2, wall=2.0)
+    assert (summary["requests"], summary["errors"], summary["throughput_rps"]) == (100, 2, 50.0)
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50.5, 95.1, 99.0)
+    assert _summarize([0.25], errors=0, wall=1.0)["p99_ms"] == 250.0
+
+
+def test_fake_gemini_is_deterministic_and_injects_errors():
+    gemini = FakeGemini(LatencyModel(0, error_rate=0.0), LatencyModel(0))
+    model = gemini.GenerativeModel("gemini-1.5-flash")
+    assert model.generate_content("Classify the following message: hi").text == "career"
+    assert gemini.embed_content("models/embedding-001", ["a b", "a b"])["embedding"][0] == fake_embedding("a b")
+    assert gemini.calls == {"gemini-1.5-flash": 1, "models/embedding-001": 1}
+    assert sum(x * x for x in fake_embedding("women returning to work")) == pytest.approx(1.0, abs=1e-5)
+
+    failing = FakeGemini(LatencyModel(0, error_rate=1.0), LatencyModel(0))
+    with pytest.raises(FakeGeminiError):
+        failing.GenerativeModel("gemini-1.5-flash").generate_content("hello")
+
+
+def test_fake_firestore_round_trips_documents():
+    firestore = FakeFirestore(LatencyModel(0), profiles={"u1": {"name": "Asha"}})
+    profile = firestore.collection("profiles").document("u1")
+    assert profile.get().to_dict() == {"name": "Asha"}
+    assert not firestore.collection("profiles").document("u2").get().exists
+    profile.set({"name": "Meera"})
+    assert profile.get().to_dict() == {"name": "Meera"}
@@ -0,0 +1,64 @@
+"""The in-process metrics registry and its Prometheus text rendering (metrics.py)."""
+import pytest
+
+from metrics import Metrics
+
+
+def _samples(text: str) -> dict:
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if not line.startswith("#")}
+
+
+def test_counters_and_labels():
+    metrics = Metrics()
+    metrics.describe("llm_calls_total", "Gemini API calls.")
+    metrics.inc("llm_calls_total", model="flash", outcome="ok")
+    metrics.inc("llm_calls_total", 2, outcome="ok", model="flash")
+    metrics.inc("llm_calls_total", model='say "hi"\n', outcome="error")
+    text = metrics.render()
+    assert "# HELP asha_llm_calls_total Gemini API calls.\n# TYPE asha_llm_calls_total counter" in text
+    samples = _samples(text)
+    assert samples['asha_llm_calls_total{model="flash",outcome="ok"}'] == 3
+    assert samples['asha_llm_calls_total{model="say \\"hi\\"\\n",outcome="error"}'] == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics()
+    for value in (0.01, 0.3, 0.3, 50):
+        metrics.observe("request_duration_seconds", value, buckets=(0.01, 0.5, 1.0), endpoint="chat")
+    samples = _samples(metrics.render())
+    bucket = 'asha_request_duration_seconds_bucket{endpoint="chat",le="%s"}'
+    assert [samples[bucket % le] for le in ("0.01", "0.5", "1", "+Inf")] == [1, 3, 3, 4]
+    assert samples['asha_request_duration_seconds_count{endpoint="chat"}'] == 4
+    assert samples['asha_request_duration_seconds_sum{endpoint="chat"}'] == pytest.approx(50.61)
+
+
+def test_span_times_stages_and_counts_failures():
+    metrics = Metrics()
+    with metrics.span("retrieval"):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.span("generate"):
+            raise ValueError("model down")
+    samples = _samples(metrics.render())
+    assert samples['asha_stage_duration_seconds_count{stage="retrieval"}'] == 1
+    assert samples['asha_errors_total{where="generate"}'] == 1
+    assert 'asha_errors_total{where="retrieval"}' not in samples
+
+
+def test_collectors_are_sampled_at_scrape_time_and_failures_skipped():
+    metrics = Metrics()
+    queued = {'n': 1}
+    metrics.register_collector(lambda: [("admin_jobs_queued", "gauge", "Queued jobs.", {'class': "export"}, queued['n'])])
+    metrics.register_collector(lambda: 1 / 0)
+    queued['n'] = 4
+    text = metrics.render()
+    assert "# TYPE asha_admin_jobs_queued gauge" in text
+    assert _samples(text)['asha_admin_jobs_queued{class="export"}'] == 4
+
+
+def test_disabled_registry_records_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.inc("llm_calls_total")
+    with metrics.span("generate"):
+        pass
+    assert metrics.render() == "\n"
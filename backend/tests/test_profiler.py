@@ -0,0 +1,60 @@
+"""The opt-in sampling profiler: request tracking, collapsed stacks and session control (profiler.py)."""
+import time
+import threading
+
+import pytest
+
+from profiler import SamplingProfiler
+
+
+def _busy_handler(profiler: SamplingProfiler, endpoint: str, seconds: float):
+    profiler.enter(endpoint)
+    try:
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            sum(range(100))
+    finally:
+        profiler.exit()
+
+
+def test_only_tracked_requests_are_sampled():
+    profiler = SamplingProfiler(interval=0.001)
+    assert profiler.enter("api.chat") is False # No session running
+    profiler.start(seconds=5)
+    worker = threading.Thread(target=_busy_handler, args=(profiler, "api.chat", 0.2))
+    idle = threading.Thread(target=time.sleep, args=(0.2,)) # Untracked thread
+    for thread in (worker, idle):
+        thread.start()
+    for thread in (worker, idle):
+        thread.join()
+    status = profiler.stop()
+
+    assert not status['running'] and status['requests'] == {'api.chat': 1}
+    assert status['samples'] > 0 and set(status['samples_by_endpoint']) == {"api.chat"}
+    lines = profiler.collapsed().splitlines()
+    assert lines and all(line.startswith("api.chat;") for line in lines)
+    assert any("test_profiler.py:_busy_handler" in line for line in lines)
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True) and sum(counts) == status['samples']
+    assert profiler.collapsed("api.jobs") == ""
+
+
+def test_sample_rate_zero_tracks_nothing():
+    profiler = SamplingProfiler()
+    profiler.start(seconds=5, sample_rate=0)
+    assert profiler.enter("api.chat") is False
+    assert profiler.stop()['requests'] == {}
+
+
+def test_sessions_do_not_overlap_and_end_on_their_own():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start(seconds=0.05)
+    with pytest.raises(RuntimeError):
+        profiler.start(seconds=1)
+    profiler._thread.join(timeout=5)
+    status = profiler.status()
+    assert not status['running'] and status['ended_at'] >= status['started_at']
+
+    profiler._stacks["stale;stack"] = 3 # A new session clears the previous results
+    profiler.start(seconds=1)
+    assert profiler.stop()['unique_stacks'] == 0
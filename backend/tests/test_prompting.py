@@ -0,0 +1,72 @@
+"""Prompt assembly from the snippets and context lines rendered at ingest time."""
+from benchmarks.bench_prompt import legacy_make_rag_prompt, _synthetic_passages
+from prompting import (make_rag_prompt, render_snippet, render_job_context_line, render_session_context_line,
+                       estimate_tokens, compress_text, SNIPPET_LENGTH)
+
+JOB = {'title': "Data Analyst", 'company': "Acme", 'location': "Pune", 'description': "Analyse hiring data.",
+       'applyUrl': "https://example.com/apply/1"}
+SESSION = {'title': "Returnship AMA", 'location': "Virtual", 'date': "2026-03-01", 'description': "",
+           'registerUrl': "https://example.com/register/1"}
+
+
+def test_render_snippet():
+    assert render_snippet("") == "Details available."
+    assert render_snippet("  Short.  ") == "Short...."
+    assert render_snippet("x" * 500) == "x" * SNIPPET_LENGTH + "..."
+
+
+def test_context_lines_show_links_only_when_present():
+    assert render_job_context_line(JOB).endswith("   *Apply here:* https://example.com/apply/1\n")
+    assert render_job_context_line({**JOB, 'applyUrl': '#'}).endswith("   *Application link not provided.*\n")
+    assert render_session_context_line(SESSION) == (
+        "**Returnship AMA** (Virtual on 2026-03-01)\n   *Details:* Details available.\n"
+        "   *Register here:* https://example.com/register/1\n")
+    assert render_session_context_line({**SESSION, 'registerUrl': 'N/A'}).endswith("   *Registration link not provided.*\n")
+
+
+def test_precomputed_context_line_is_used_as_is():
+    prompt = make_rag_prompt("jobs in Pune", [("doc", {'context_line': "PRECOMPUTED\n"})], topic="career")
+    assert "1. PRECOMPUTED\n" in prompt
+
+
+def test_documents_ingested_before_precomputing_render_from_metadata():
+    meta = {'title': JOB['title'], 'company': JOB['company'], 'location': JOB['location'],
+            'description': JOB['description'], 'apply_url': JOB['applyUrl']}
+    prompt = make_rag_prompt("jobs in Pune", [("doc", meta)], topic="career")
+    assert "1. " + render_job_context_line(JOB) in prompt
+
+
+def test_career_prompt_matches_the_previous_builder():
+    passages = _synthetic_passages(200)["career"]
+    assert make_rag_prompt("returnships", passages, topic="career") == legacy_make_rag_prompt("returnships", passages, topic="career")
+    assert make_rag_prompt("returnships", [], topic="general") == legacy_make_rag_prompt("returnships", [], topic="general")
+
+
+def test_estimate_tokens_counts_indic_scripts_denser():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("नौकरी खोजें") > estimate_tokens("find a job")
+
+
+def test_compress_text_keeps_leading_sentences():
+    text = "First sentence here. Second sentence follows. " + "Third one is much longer. " * 20
+    compressed = compress_text(text, 15)
+    assert compressed.startswith("First sentence here. Second sentence follows.")
+    assert compressed.endswith("…")
+    assert estimate_tokens(compressed) <= 15
+    assert compress_text("short", 15) == "short"
+
+
+def test_general_prompt_stays_within_budget():
+    passages = [(doc, {}) for doc, _ in _synthetic_passages(20000)["career"]]
+    for budget in (500, 2000):
+        assert estimate_tokens(make_rag_prompt("returnships", passages, topic="general", token_budget=budget)) <= budget * 1.05
+
+
+def test_compressed_listing_keeps_its_link():
+    job = {**JOB, 'description': "Lead analytics for our hiring funnel. " * 20}
+    passages = [("doc", {'context_line': render_job_context_line(job)}) for _ in range(3)]
+    full = make_rag_prompt("analyst roles", passages, topic="career", token_budget=10_000)
+    prompt = make_rag_prompt("analyst roles", passages, topic="career", token_budget=estimate_tokens(full) - 15)
+    assert prompt.count("*Apply here:* https://example.com/apply/1") == 3
+    assert "funnel. …\n   *Apply here:* https://example.com/apply/1\n" in prompt
@@ -0,0 +1,66 @@
+"""Recall of int8 and product-quantized snapshot search against exact float32 search (quantization.py)."""
+import numpy as np
+import pytest
+
+from kb_snapshot import SnapshotIndex, build_snapshot
+from quantization import train_quantizer, load_quantizer
+
+DIMENSIONS, DOCUMENTS, QUERIES, K = 64, 3000, 30, 10
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    """Clustered unit vectors with a decaying variance spectrum, like text embeddings, and queries near documents."""
+    rng = np.random.default_rng(3)
+    spectrum = 1 / np.sqrt(np.arange(1, DIMENSIONS + 1))
+    centers = rng.standard_normal((60, DIMENSIONS)) * spectrum
+    vectors = centers[rng.integers(0, 60, DOCUMENTS)] + 0.6 * rng.standard_normal((DOCUMENTS, DIMENSIONS)) * spectrum
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    queries = vectors[rng.integers(0, DOCUMENTS, QUERIES)] + 0.02 * rng.standard_normal((QUERIES, DIMENSIONS)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = [set(np.argsort(-(vectors @ query))[:K].tolist()) for query in queries]
+    return vectors, queries, exact
+
+
+def _recall(found, exact) -> float:
+    return float(np.mean([len(set(f) & e) / K for f, e in zip(found, exact)]))
+
+
+def _snapshot(tmp_path, vectors, method):
+    documents = [(f"doc_{i}", f"document {i}", {'source_type': "job" if i % 2 else "session", 'row': i})
+                 for i in range(len(vectors))]
+    rows = {text: i for i, (_, text, _) in enumerate(documents)}
+    summary = build_snapshot(tmp_path, documents, lambda texts: [vectors[rows[text]] for text in texts], "synthetic",
+                             batch_size=1000, workers=1, quantization=method, pq_subspaces=16)
+    return SnapshotIndex(tmp_path / summary['version']), summary
+
+
+@pytest.mark.parametrize('method, bytes_per_vector, codes_recall', [('int8', DIMENSIONS, 0.95), ('pq', 16, 0.5)])
+def test_rescored_search_recalls_the_exact_top_k(tmp_path, corpus, method, bytes_per_vector, codes_recall):
+    vectors, queries, exact = corpus
+    index, summary = _snapshot(tmp_path, vectors, method)
+    assert summary['quantization']['bytes_per_vector'] == bytes_per_vector == index.bytes_per_vector
+
+    approximate = [np.argsort(-index.quantizer.score(index.codes, query))[:K].tolist() for query in queries]
+    assert _recall(approximate, exact) >= codes_recall # The codes alone only shortlist
+    found = [[meta['row'] for _, meta in index.search(query, n_results=K)] for query in queries]
+    assert _recall(found, exact) >= 0.97 # Re-scoring the shortlist with float32 restores the exact order
+    assert all(meta['source_type'] == "job" for _, meta in index.search(queries[0], n_results=K, source_type_filter="job"))
+
+
+def test_quantizers_round_trip_through_their_parameters(corpus):
+    vectors, queries, _ = corpus
+    for method in ('int8', 'pq'):
+        quantizer = train_quantizer(method, vectors[:500], pq_subspaces=8)
+        codes = quantizer.encode(vectors[:500])
+        reloaded = load_quantizer(method, quantizer.parameters())
+        assert np.array_equal(reloaded.score(codes, queries[0]), quantizer.score(codes, queries[0]))
+    assert train_quantizer('none', vectors) is None
+
+
+def test_invalid_settings_are_rejected(corpus):
+    vectors, _, _ = corpus
+    with pytest.raises(ValueError):
+        train_quantizer('float16', vectors)
+    with pytest.raises(ValueError):
+        train_quantizer('pq', vectors[:300], pq_subspaces=7) # 64 dimensions don't split into 7
@@ -0,0 +1,94 @@
+"""Stored profile matches and their incremental sync with the knowledge base (recommendations.py)."""
+import numpy as np
+import pytest
+
+from recommendations import Recommender, Catalog, profile_text
+from storage import DataStore
+
+DIMENSIONS = 8
+
+
+def _vector(seed):
+    vector = np.random.default_rng(seed).normal(size=DIMENSIONS).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _catalog(version, docs):
+    """docs: {doc_id: (kind, seed)}; the content hash changes with the seed."""
+    ids = list(docs)
+    return Catalog(version, ids, np.stack([_vector(seed) for _, seed in docs.values()]),
+                   [{'source_type': kind, 'title': doc_id} for doc_id, (kind, _) in docs.items()],
+                   [f"hash-{seed}" for _, seed in docs.values()])
+
+
+def _best(recommender, user_seed, catalog, kind):
+    """What a full rescore would pick: the top_n documents of a kind by cosine similarity."""
+    scores = catalog.vectors @ _vector(user_seed)
+    rows = [r for r in np.argsort(-scores) if catalog.kinds[r] == kind]
+    return [catalog.ids[r] for r in rows[:recommender.top_n]]
+
+
+DOCS = {**{f"job{i}": ('job', i) for i in range(8)}, **{f"session{i}": ('session', 100 + i) for i in range(4)}}
+PROFILES = {f"u{i}": {'careerGoals': f"Goal {i}", 'domainsOfInterest': ["Data", " "], 'industry': "IT"} for i in range(5)}
+
+
+@pytest.fixture
+def recommender(tmp_path):
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return _vector(1000 + int(text.split("Goal ")[1][0])).tolist() # One fixed vector per user
+
+    recommender = Recommender(DataStore(tmp_path / "asha.db"), embed, "embedding-001", tmp_path / "recs.lock", top_n=2)
+    recommender.embedded = embedded
+    return recommender
+
+
+def test_profiles_are_embedded_once_per_change(recommender):
+    catalog = _catalog("v1", DOCS)
+    assert profile_text(PROFILES["u1"]) == "Career Goals: Goal 1\nDomains of Interest: Data\nIndustry: IT"
+    assert recommender.observe_profile("u1", PROFILES["u1"], catalog)
+    assert not recommender.observe_profile("u1", PROFILES["u1"], catalog)
+    assert recommender.observe_profile("u1", {**PROFILES["u1"], 'careerGoals': "Goal 2"}, catalog)
+    assert len(recommender.embedded) == 2
+
+    assert not recommender.observe_profile("u1", {'careerGoals': " "}, catalog) # Nothing to match on: dropped
+    assert recommender.store.get_recommendation("u1") is None
+
+
+def test_matches_are_the_best_per_kind(recommender):
+    catalog = _catalog("v1", DOCS)
+    recommender.sync(catalog)
+    recommender.observe_profile("u1", PROFILES["u1"], catalog)
+    jobs = recommender.matches("u1", catalog, kind='job')
+    assert [m['id'] for m in jobs] == _best(recommender, 1001, catalog, 'job')
+    assert jobs[0]['score'] >= jobs[1]['score'] and jobs[0]['metadata']['title'] == jobs[0]['id']
+    assert [m['kind'] for m in recommender.matches("u1", catalog)] == ['job', 'job', 'session', 'session']
+    assert recommender.matches("nobody", catalog) == []
+
+
+def test_incremental_sync_agrees_with_a_full_rescore(recommender):
+    first = _catalog("v1", DOCS)
+    recommender.sync(first)
+    for user, profile in PROFILES.items():
+        recommender.observe_profile(user, profile, first)
+
+    docs = dict(DOCS)
+    for doc_id, kind, _ in recommender.store.get_recommendation("u1")['matches']:
+        if kind == 'job': # All of u1's stored jobs: its list falls short and is rescored in full
+            docs.pop(doc_id, None)
+    docs.pop(_best(recommender, 1003, first, 'job')[0], None) # u3 can do with its remaining candidates
+    docs["session1"] = ('session', 50) # Edited
+    docs["session9"] = ('session', 51) # Added
+    second = _catalog("v2", docs)
+    summary = recommender.sync(second)
+    assert summary['changed'] == 2 and summary['removed'] == len(set(DOCS) - set(docs))
+    assert summary['profiles'] == len(PROFILES) and 1 <= summary['full_rescores'] < len(PROFILES)
+
+    for user in PROFILES:
+        for kind in ('job', 'session'):
+            picked = [m['id'] for m in recommender.matches(user, second, kind=kind)]
+            assert picked == _best(recommender, 1000 + int(user[1]), second, kind), (user, kind)
+    assert len(recommender.embedded) == len(PROFILES) # Nothing was re-embedded
+    assert recommender.sync(second)['changed'] == 0
@@ -0,0 +1,77 @@
+"""Model routing: ladder escalation, task parsers and local heuristics (routing.py)."""
+import pytest
+
+from metrics import Metrics
+from routing import (ModelRouter, RoutingError, parse_topic, topic_heuristic, parse_bias_reply, bias_heuristic,
+                     parse_answer)
+
+
+class FakeLLM:
+    """Replies per model; an Exception instance is raised instead of returned."""
+
+    def __init__(self, replies):
+        self.replies, self.asked = replies, []
+
+    def generate(self, model, prompt, stage):
+        self.asked.append(model)
+        reply = self.replies[model]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def _router(replies):
+    llm, metrics = FakeLLM(replies), Metrics()
+    return ModelRouter(llm, metrics, {'topic': ["heuristic", "flash", "pro"]}), llm, metrics
+
+
+def test_confident_heuristic_skips_the_models():
+    router, llm, _ = _router({})
+    assert router.run('topic', "prompt", parse_topic, heuristic=lambda: "career") == ("career", "heuristic")
+    assert llm.asked == []
+
+
+def test_unusable_output_and_errors_escalate_to_the_next_rung():
+    router, llm, metrics = _router({'flash': "Probably jobs?", 'pro': "Interview Prep."})
+    assert router.run('topic', "prompt", parse_topic, heuristic=lambda: None) == ("interview prep", "pro")
+    assert llm.asked == ["flash", "pro"]
+    assert 'routing_decisions_total{outcome="rejected",rung="flash",task="topic"} 1' in metrics.render()
+
+    router, llm, _ = _router({'flash': RuntimeError("429"), 'pro': "general"})
+    assert router.run('topic', "prompt", parse_topic) == ("general", "pro") # No heuristic: that rung is skipped
+
+
+def test_routing_error_says_whether_any_rung_raised():
+    router, _, _ = _router({'flash': "??", 'pro': "??"})
+    with pytest.raises(RoutingError) as unusable:
+        router.run('topic', "prompt", parse_topic)
+    assert not unusable.value.errors
+
+    router, _, _ = _router({'flash': "??", 'pro': RuntimeError("503")})
+    with pytest.raises(RoutingError) as failed:
+        router.run('topic', "prompt", parse_topic)
+    assert failed.value.errors and failed.value.task == 'topic'
+
+
+def test_topic_parser_and_heuristic():
+    assert parse_topic(' "Skill Development". ') == "skill development"
+    assert parse_topic("careers") is None
+    assert topic_heuristic("Any returnship jobs in Pune?") == "career"
+    assert topic_heuristic("Can you set up a mock interview?") == "interview prep"
+    assert topic_heuristic("A course to learn new skills") is None # Education and skill development
+    assert topic_heuristic("Hello there") is None
+
+
+def test_bias_reply_parser_and_heuristic():
+    assert parse_bias_reply("Biased: No") == (False, None)
+    assert parse_bias_reply("**Biased**: Yes, Type: Gender") == (True, "gender")
+    assert parse_bias_reply("Biased: yes\nType: height") == (True, "other")
+    assert parse_bias_reply("Biased: Yes") == (True, "other")
+    assert parse_bias_reply("I think it is biased") is None
+    assert bias_heuristic("Why women can’t be engineers?") == (True, "gender")
+    assert bias_heuristic("Jobs for women returning to work") is None
+
+
+def test_empty_answers_are_unusable():
+    assert parse_answer("  An answer.\n") == "An answer."
+    assert parse_answer(" \n") is None
@@ -0,0 +1,88 @@
+"""Admin work scheduling: per-class limits, busy rejection, cancellation and pool failures (scheduler.py)."""
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import pytest
+
+from scheduler import WorkScheduler, SchedulerBusy
+
+CLASSES = {
+    'analytics': {'priority': 0, 'concurrency': 2, 'max_queued': 4},
+    'ingest': {'priority': 1, 'concurrency': 1, 'max_queued': 1},
+}
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = WorkScheduler(CLASSES, processes=0) # Jobs run on threads of this process
+    yield scheduler
+    scheduler.shutdown()
+
+
+def _blocker():
+    release = threading.Event()
+    return release, lambda: release.wait(10)
+
+
+def test_results_and_errors_reach_the_caller(scheduler):
+    assert scheduler.call('analytics', sum, [1, 2, 3], timeout=5) == 6
+    with pytest.raises(ZeroDivisionError):
+        scheduler.call('analytics', divmod, 1, 0, timeout=5)
+    assert scheduler.stats['analytics']['completed'] == 1 and scheduler.stats['analytics']['failed'] == 1
+    with pytest.raises(ValueError):
+        scheduler.submit('reports', sum, [])
+
+
+def test_class_limits_queue_and_then_turn_jobs_away(scheduler):
+    release, block = _blocker()
+    running = scheduler.submit('ingest', block)
+    queued = scheduler.submit('ingest', sum, [1])
+    assert scheduler.snapshot()['ingest'] == {'queued': 1, 'running': 1}
+    with pytest.raises(SchedulerBusy) as busy:
+        scheduler.submit('ingest', sum, [2])
+    assert busy.value.work_class == 'ingest' and scheduler.stats['ingest']['rejected'] == 1
+    assert scheduler.call('analytics', sum, [4], timeout=5) == 4 # Other classes are not held up
+
+    release.set()
+    assert running.result(timeout=5) and queued.result(timeout=5) == 1
+    assert scheduler.snapshot()['ingest'] == {'queued': 0, 'running': 0}
+
+
+def test_timed_out_jobs_are_dropped_before_they_start(scheduler):
+    release, block = _blocker()
+    running = scheduler.submit('ingest', block)
+    with pytest.raises(FutureTimeoutError):
+        scheduler.call('ingest', sum, [1], timeout=0.05)
+    release.set()
+    running.result(timeout=5) # The freed slot skips the cancelled job
+    assert scheduler.call('ingest', sum, [2], timeout=5) == 2
+    assert scheduler.stats['ingest']['cancelled'] == 1
+
+
+def test_jobs_cancelled_inside_the_pool_still_finish_their_future(scheduler):
+    scheduler._pool = ThreadPoolExecutor(max_workers=1) # Fewer threads than the class may run at once
+    release, block = _blocker()
+    first = scheduler.submit('analytics', block)
+    second = scheduler.submit('analytics', sum, [1]) # Pending inside the pool
+    scheduler.shutdown(wait=False) # Cancels what the pool has not started
+    release.set()
+    with pytest.raises(CancelledError):
+        second.result(timeout=5)
+    assert first.result(timeout=5)
+    assert scheduler.snapshot()['analytics']['running'] == 0 and scheduler.stats['analytics']['cancelled'] == 1
+
+
+def test_a_pool_that_cannot_take_jobs_fails_them(scheduler, monkeypatch):
+    class BrokenPool:
+        def submit(self, fn, *args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    monkeypatch.setattr(scheduler, '_executor', BrokenPool)
+    future = scheduler.submit('ingest', sum, [1])
+    with pytest.raises(RuntimeError):
+        future.result(timeout=1)
+    assert scheduler.snapshot()['ingest'] == {'queued': 0, 'running': 0}
+    assert scheduler.stats['ingest']['failed'] == 1
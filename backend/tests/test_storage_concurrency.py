@@ -0,0 +1,67 @@
+"""Concurrent writers on one DataStore file, from threads and from separate processes.
+
+Each writer submits feedback, creates jobs and then updates them (as PUT
+/admin/jobs/<id> does), and adds to one shared token-usage counter. With the
+old JSON/CSV files, interleaved read-modify-write cycles silently dropped
+records; here every write must be present exactly once at the end.
+"""
+import threading
+import multiprocessing
+from pathlib import Path
+
+from storage import DataStore, JOB_FIELDNAMES
+
+THREADS_PER_WRITER = 4
+PROCESSES = 2
+ROUNDS = 25
+DAY = "2026-01-01"
+
+
+def _job(job_id: str, title: str) -> dict:
+    return {**{field: '' for field in JOB_FIELDNAMES}, 'id': job_id, 'title': title, 'company': 'Acme'}
+
+
+def _write(db_path: str, writer: str):
+    store = DataStore(Path(db_path))
+    for i in range(ROUNDS):
+        store.save_feedback({'id': f"fb-{writer}-{i}", 'feedbackType': 'response', 'status': 'pending',
+                             'timestamp': f"{DAY}T00:00:{i:02d}", 'preview': f"{writer} {i}"})
+        store.upsert_item('jobs', _job(f"job-{writer}-{i}", "draft"))
+        store.upsert_item('jobs', _job(f"job-{writer}-{i}", f"{writer} v2"))
+        store.add_token_usage("shared", DAY, 1, 2)
+
+
+def _write_from_threads(db_path: str, prefix: str):
+    threads = [threading.Thread(target=_write, args=(db_path, f"{prefix}t{n}")) for n in range(THREADS_PER_WRITER)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_writers_lose_no_updates(tmp_path):
+    db_path = str(tmp_path / "asha.db")
+    DataStore(Path(db_path)) # Schema first, so the writers only race on data
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_write_from_threads, args=(db_path, f"p{n}")) for n in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    _write_from_threads(db_path, "main")
+    for process in processes:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    writers = [f"{prefix}t{n}" for prefix in ["main"] + [f"p{n}" for n in range(PROCESSES)] for n in range(THREADS_PER_WRITER)]
+    expected = len(writers) * ROUNDS
+    store = DataStore(Path(db_path))
+
+    assert store.count_items('feedback') == expected
+    assert {item['id'] for item in store.list_items('feedback')} == {f"fb-{w}-{i}" for w in writers for i in range(ROUNDS)}
+
+    jobs = store.list_items('jobs')
+    assert len(jobs) == expected
+    assert all(job['title'] == f"{job['id'].split('-')[1]} v2" for job in jobs)
+    positions = [row[0] for row in store._connection().execute("SELECT position FROM jobs")]
+    assert sorted(positions) == list(range(expected)) # Appends never reused a position
+
+    assert store.token_usage("shared", DAY) == {'input_tokens': expected, 'output_tokens': 2 * expected, 'calls': expected}
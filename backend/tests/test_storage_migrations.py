@@ -0,0 +1,40 @@
+"""Schema migrations run in order, once per database, recorded in store_meta."""
+import sqlite3
+
+from storage import DataStore, MIGRATIONS
+
+
+def _indexes(path) -> set:
+    with sqlite3.connect(str(path)) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_new_database_gets_every_migration(tmp_path):
+    store = DataStore(tmp_path / "asha.db")
+    assert store.schema_version() == len(MIGRATIONS)
+    assert store.count_items('jobs') == 0
+    assert store.token_usage("u1", "2026-01-01")['calls'] == 0
+
+
+def test_applied_migrations_do_not_run_again(tmp_path):
+    path = tmp_path / "asha.db"
+    DataStore(path).schema_version() # Created and migrated on first use
+    with sqlite3.connect(str(path)) as conn: # Would be dropped again if the one-off migration re-ran
+        conn.execute("CREATE INDEX idx_feedback_status ON feedback(status)")
+    DataStore(path).schema_version()
+    assert "idx_feedback_status" in _indexes(path)
+
+
+def test_unversioned_database_is_migrated(tmp_path):
+    path = tmp_path / "asha.db"
+    with sqlite3.connect(str(path)) as conn: # As created before the migration list existed
+        conn.execute("CREATE TABLE feedback (id TEXT PRIMARY KEY, position INTEGER NOT NULL, feedback_type TEXT, "
+                     "status TEXT, timestamp TEXT, preview TEXT, data TEXT NOT NULL)")
+        conn.execute("CREATE INDEX idx_feedback_status ON feedback(status)")
+        conn.execute("INSERT INTO feedback (id, position, status, timestamp, data) "
+                     "VALUES ('fb1', 0, 'pending', '2026-01-01T00:00:00', '{\"id\": \"fb1\"}')")
+    store = DataStore(path)
+    assert store.schema_version() == len(MIGRATIONS)
+    assert "idx_feedback_status" not in _indexes(path)
+    assert "idx_feedback_status_ts" in _indexes(path)
+    assert store.get_feedback("fb1") == {'id': "fb1"}
@@ -0,0 +1,15 @@
+from typing import Any
+
+# -----------------------------------------------------------------------------
+# User Identity
+# -----------------------------------------------------------------------------
+# The frontend sends user_id "anonymous" (or "anonymous_<n>" per visitor) for
+# logged-out visitors. Those ids do not name one person, so per-user features
+# (token budgets, top-user rankings, recommendations) must skip them.
+
+ANONYMOUS = "anonymous"
+
+def is_anonymous(user_id: Any) -> bool:
+    """True without a signed-in user: no id, the frontend's "anonymous" or a per-visitor "anonymous_<n>"."""
+    user = str(user_id or "")
+    return not user or user == ANONYMOUS or user.startswith(ANONYMOUS + "_")
@@ -0,0 +1,8 @@
+"""WSGI entry point, e.g. `gunicorn wsgi:app` (run from backend/).
+
+Importing app has no side effects; building the app here creates the data
+directories and imports the legacy data files into a new database.
+"""
+from app import create_app
+
+app = create_app()
@@ -72,6 +72,24 @@ interface AnalyticsData {
   };
 }
 
+// Keeps the nested sections the page reads, whatever else the API returns
+const normalizeAnalytics = (result: any): AnalyticsData => ({
+  conversations: typeof result.conversations === 'object' ? result.conversations : {},
+  users: typeof result.users === 'object' ? result.users : {},
+  feedback: typeof result.feedback === 'object' ? result.feedback : {}
+});
+
+// RFC 7386 JSON merge patch; returns new objects along the changed paths so React re-renders
+const applyMergePatch = (target: any, patch: any): any => {
+  if (patch === null || typeof patch !== 'object' || Array.isArray(patch)) return patch;
+  const result = { ...(target && typeof target === 'object' && !Array.isArray(target) ? target : {}) };
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) delete result[key];
+    else result[key] = applyMergePatch(result[key], value);
+  }
+  return result;
+};
+
 // --- Reusable UI Components ---
 
 // Chart placeholder component
@@ -268,6 +286,8 @@ export default function AdminAnalytics() {
 
   // Fetch main analytics data based on selected year
   const fetchAnalyticsData = useCallback(async () => {
+    // The current year is kept up to date by the live stream (see the effect below)
+    if (selectedYear === currentGlobalYear && typeof EventSource !== 'undefined') return;
     setError(null); // Clear error before fetch
     // setLoading(true); // Set loading in refreshData or initial useEffect
     try {
@@ -281,12 +301,7 @@ export default function AdminAnalytics() {
       if (!result || typeof result !== 'object') throw new Error("Invalid API response format");
 
       // Basic validation of nested structures before setting state
-      const normalizedData: AnalyticsData = {
-        conversations: typeof result.conversations === 'object' ? result.conversations : {},
-        users: typeof result.users === 'object' ? result.users : {},
-        feedback: typeof result.feedback === 'object' ? result.feedback : {}
-      };
-      setData(normalizedData);
+      setData(normalizeAnalytics(result));
 
     } catch (err) {
       console.error('Error fetching analytics data:', err);
@@ -295,7 +310,32 @@ export default function AdminAnalytics() {
     } finally {
         // setLoading(false); // Handled by calling function (refreshData or useEffect)
     }
-  }, [selectedYear]);
+  }, [selectedYear, currentGlobalYear]);
+
+  // Live updates for the current year: one snapshot, then merge-patch deltas as events are logged
+  useEffect(() => {
+    if (selectedYear !== currentGlobalYear || typeof EventSource === 'undefined') return;
+    const source = new EventSource(`${API_URL}/admin/analytics/stream`);
+    source.addEventListener('snapshot', (event) => {
+      const message = JSON.parse((event as MessageEvent).data);
+      setData(normalizeAnalytics(message.data));
+      setError(null);
+    });
+    source.addEventListener('delta', (event) => {
+      const message = JSON.parse((event as MessageEvent).data);
+      setData(prev => {
+        if (!prev) return prev;
+        const next: AnalyticsData = applyMergePatch(prev, message.patch);
+        if (message.response_times?.length) {
+          const times = [...(next.conversations?.response_times ?? []), ...message.response_times].slice(-2000);
+          next.conversations = { ...next.conversations, response_times: times };
+        }
+        return next;
+      });
+    });
+    // EventSource reconnects by itself (and gets a fresh snapshot) if the connection drops
+    return () => source.close();
+  }, [selectedYear, currentGlobalYear]);
 
   // Fetch total feedback count (independent of year)
   const fetchFeedbackCount = useCallback(async () => {
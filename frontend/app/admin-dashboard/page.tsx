@@ -30,6 +30,7 @@ const API_URL = process.env.NEXT_PUBLIC_API_URL || "https://asha-backend-app.azu
 interface Session { id: string | number; title: string; date: string; time: string; location: string; description: string; organizer?: string; registerUrl?: string; verified?: boolean; category?: string; tags?: string[]; source?: string; }
 interface Job { id: string | number; title: string; company: string; location: string; type: string; deadline: string; description?: string; applyUrl?: string; verified?: boolean; category?: string; source?: string; diversity_focus?: string; }
 interface ChatbotUrl { id: string | number; title: string; url: string; }
+interface BulkImport { id: string; status: 'receiving' | 'queued' | 'embedding' | 'done' | 'failed'; error: string | null; errors: { line: number; error: string; }[]; rows: { read: number; written: number; unchanged: number; rejected: number; deleted: number; }; embedding: { total: number; done: number; }; }
 interface Feedback { id: string; feedbackType: string; timestamp: string; status: string; preview: string; }
 interface FeedbackDetail { id: string; messageId: string; messageContent: string; feedbackType: string; feedbackText: string; timestamp: string; status: string; conversationHistory: { id: string; content: string; sender: string; timestamp: string; }[]; }
 interface AnalyticsSummary { user_engagement: { total_queries: number; queries_by_day: { [key: string]: number }; language_distribution: { [key: string]: number }; }; response_accuracy: { feedback_received: number; accuracy_rating: { accurate: number; inaccurate: number; }; topics: { [key: string]: number }; }; bias_metrics: { bias_detected_count: number; bias_prevented_count: number; bias_types: { [key: string]: number }; }; }
@@ -209,6 +210,17 @@ function AddFormCard<T extends Record<string, any>>({
   );
 }
 
+// Feedback list paging
+const FEEDBACK_PAGE_SIZE = 50;
+
+const mapFeedbackItems = (items: any): Feedback[] => Array.isArray(items) ? items.map((item: any) => ({
+  id: item.id || item.feedback_id || `unknown-${Math.random()}`,
+  feedbackType: item.feedbackType || item.feedback_type || 'unknown',
+  timestamp: item.timestamp || new Date().toISOString(),
+  status: item.status || 'pending',
+  preview: item.additionalDetails || item.additional_details || item.preview || 'No preview available'
+})) : [];
+
 // Feedback Badges (Keep as is)
 const FeedbackTypeBadge = ({ type }: { type: string }) => {
   const baseClass = "px-2 py-1 text-xs rounded-full";
@@ -247,6 +259,9 @@ export default function AdminDashboard() {
   const [notification, setNotification] = useState({ show: false, message: "", type: "success" });
   const [isLoading, setIsLoading] = useState(true);
   const [feedbackLoading, setFeedbackLoading] = useState(true);
+  const [feedbackLoadingMore, setFeedbackLoadingMore] = useState(false);
+  const [feedbackCursor, setFeedbackCursor] = useState<string | null>(null);
+  const [feedbackTotal, setFeedbackTotal] = useState(0);
   const [feedbackDetailLoading, setFeedbackDetailLoading] = useState(false);
   const [analyticsLoading, setAnalyticsLoading] = useState(true);
   const [analyticsPeriod, setAnalyticsPeriod] = useState("7days");
@@ -257,6 +272,8 @@ export default function AdminDashboard() {
 
   const initialJobState: Omit<Job, 'id'> = { title: "", company: "", location: "", type: "full-time", deadline: "", description: "", applyUrl: "", category: "engineering", verified: true, diversity_focus: "women_in_tech" };
   const [newJob, setNewJob] = useState(initialJobState);
+  const [jobImport, setJobImport] = useState<BulkImport | null>(null);
+  const [jobImportUploading, setJobImportUploading] = useState(false);
 
   const initialUrlState: TrustedSource = {
     id: '',
@@ -344,16 +361,10 @@ export default function AdminDashboard() {
         // Jobs
         safeFetch(`${API_URL}/admin/jobs`).then(data => setJobListings(data || [])).catch(err => { console.error("Jobs fetch error:", err); showNotification("Failed to load jobs", "error"); setJobListings([]); }),
         // Feedback
-        safeFetch(`${API_URL}/admin/feedback`).then(data => {
-            // Handle potential sample data logic or structure mapping if needed
-             const feedbackItems = Array.isArray(data) ? data.map((item: any) => ({
-              id: item.id || item.feedback_id || `unknown-${Math.random()}`,
-              feedbackType: item.feedbackType || item.feedback_type || 'unknown',
-              timestamp: item.timestamp || new Date().toISOString(),
-              status: item.status || 'pending',
-              preview: item.additionalDetails || item.additional_details || item.preview || 'No preview available'
-            })) : []; // Default to empty array if not an array
-            setFeedbackList(feedbackItems);
+        safeFetch(`${API_URL}/admin/feedback?limit=${FEEDBACK_PAGE_SIZE}`).then(data => {
+            setFeedbackList(mapFeedbackItems(data?.items));
+            setFeedbackCursor(data?.next_cursor || null);
+            setFeedbackTotal(data?.total ?? 0);
         }).catch(err => {
             console.error("Feedback fetch error:", err);
             showNotification("Failed to load feedback", "error");
@@ -458,6 +469,34 @@ export default function AdminDashboard() {
     if (updated) setJobListings(updated);
   };
 
+  // Bulk import: the file is streamed as the request body; embedding progress is polled until it finishes
+  const handleImportJobs = async (file: File, mode: 'upsert' | 'replace') => {
+    const format = /\.(nd)?jsonl?$/i.test(file.name) ? 'ndjson' : 'csv';
+    setJobImportUploading(true);
+    try {
+      const response = await fetch(`${API_URL}/admin/jobs/import?format=${format}&mode=${mode}`, {
+        method: 'POST',
+        headers: { 'Content-Type': format === 'csv' ? 'text/csv' : 'application/x-ndjson' },
+        body: file,
+      });
+      const record = await response.json();
+      if (!response.ok) throw new Error(record?.error || `Request failed: ${response.status}`);
+      setJobImport(record);
+      let current: BulkImport = record;
+      while (current.status === 'queued' || current.status === 'embedding') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        current = await safeFetch(`${API_URL}/admin/imports/${record.id}`);
+        setJobImport(current);
+      }
+      showNotification(current.status === 'done' ? `Imported ${current.rows.written} job(s)` : current.error || "Import failed", current.status === 'done' ? "success" : "error");
+      safeFetch(`${API_URL}/admin/jobs`).then(data => setJobListings(data || [])).catch(() => {});
+    } catch (error) {
+      showNotification(error instanceof Error ? `Import failed: ${error.message}` : "Import failed", "error");
+    } finally {
+      setJobImportUploading(false);
+    }
+  };
+
   // Chatbot URL Handlers (Local State Only for now)
   const handleAddUrl = () => {
     if (!newUrl.name || !newUrl.url) {
@@ -505,6 +544,20 @@ export default function AdminDashboard() {
   };
 
   // Feedback Handlers
+  const loadMoreFeedback = async () => {
+    if (!feedbackCursor) return;
+    setFeedbackLoadingMore(true);
+    try {
+      const data = await safeFetch(`${API_URL}/admin/feedback?limit=${FEEDBACK_PAGE_SIZE}&cursor=${encodeURIComponent(feedbackCursor)}`);
+      setFeedbackList(prev => [...prev, ...mapFeedbackItems(data?.items)]);
+      setFeedbackCursor(data?.next_cursor || null);
+    } catch (error) {
+      showNotification("Failed to load more feedback", "error");
+    } finally {
+      setFeedbackLoadingMore(false);
+    }
+  };
+
   const fetchFeedbackDetail = async (id: string) => {
     setFeedbackDetailLoading(true);
     setSelectedFeedback(null); // Clear previous selection
@@ -826,6 +879,39 @@ export default function AdminDashboard() {
                     onSubmit={handleAddJob}
                     submitButtonText="Add Job"
                       />
+                  <Card className="mt-4">
+                    <CardHeader className="pb-2">
+                      <CardTitle className="text-lg font-semibold">Import Jobs</CardTitle>
+                      <CardDescription>Upload a CSV (with a header row) or NDJSON file. Rows are matched by id.</CardDescription>
+                    </CardHeader>
+                    <CardContent className="space-y-3">
+                      {(['upsert', 'replace'] as const).map(mode => (
+                        <div key={mode} className="space-y-1">
+                          <Label htmlFor={`job-import-${mode}`}>{mode === 'upsert' ? 'Add or update jobs' : 'Replace all jobs'}</Label>
+                          <Input
+                            id={`job-import-${mode}`}
+                            type="file"
+                            accept=".csv,.ndjson,.jsonl"
+                            disabled={jobImportUploading}
+                            onChange={(e) => { const file = e.target.files?.[0]; e.target.value = ''; if (file) handleImportJobs(file, mode); }}
+                          />
+                        </div>
+                      ))}
+                      {jobImport && (
+                        <div className="text-sm text-gray-600 space-y-1">
+                          <p>
+                            {jobImport.rows.read} rows read: {jobImport.rows.written} written, {jobImport.rows.unchanged} unchanged, {jobImport.rows.rejected} rejected
+                            {jobImport.rows.deleted ? `, ${jobImport.rows.deleted} deleted` : ''}.
+                          </p>
+                          <p>
+                            {jobImport.status === 'embedding' ? `Embedding ${jobImport.embedding.done} / ${jobImport.embedding.total}...`
+                              : jobImport.status === 'queued' ? 'Waiting to embed...' : jobImport.status === 'done' ? 'Done.' : jobImport.error}
+                          </p>
+                          {jobImport.errors.slice(0, 5).map(e => <p key={e.line} className="text-red-600">Line {e.line}: {e.error}</p>)}
+                        </div>
+                      )}
+                    </CardContent>
+                  </Card>
                     </div>
                     </div>
         </TabsContent>
@@ -905,7 +991,7 @@ export default function AdminDashboard() {
                   <Card className="h-full">
                     <CardHeader className="pb-2">
                       <CardTitle className="text-lg font-semibold">Feedback List</CardTitle>
-                      <CardDescription>User feedback on AI responses</CardDescription>
+                      <CardDescription>User feedback on AI responses{feedbackTotal > 0 ? ` (${feedbackList.length} of ${feedbackTotal})` : ''}</CardDescription>
               </CardHeader>
               <CardContent>
                       {feedbackLoading ? (
@@ -930,6 +1016,11 @@ export default function AdminDashboard() {
                                 <FeedbackStatusBadge status={feedback.status} />
                               </button>
                           ))}
+                          {feedbackCursor && (
+                            <Button variant="outline" size="sm" className="w-full" disabled={feedbackLoadingMore} onClick={loadMoreFeedback}>
+                              {feedbackLoadingMore ? 'Loading...' : 'Load more'}
+                            </Button>
+                          )}
                         </div>
                     </ScrollArea>
                       )}
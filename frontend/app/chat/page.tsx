@@ -103,6 +103,8 @@ export default function ChatPage() {
 
   const { user } = useAuth()
   const [currentConversationId, setCurrentConversationId] = useState<string | null>(null)
+  // Server-side conversation (backend /chat); only new messages are sent while the server still has it
+  const [chatConversationId, setChatConversationId] = useState<string | null>(null)
 
   // Scroll to bottom when messages change
   useEffect(() => {
@@ -292,33 +294,45 @@ export default function ChatPage() {
       }
       const mappedLangLabel = languageMap[selectedLanguage] || "English"
 
-      const response = await axios.post(
-        `${API_URL}/chat`,
-        {
-          query: userMessage,
-          language: mappedLangLabel,
-          topic,
-          query_type: queryType,
-          chart_data: chartData,
-          conversation_history: messages.map((m) => ({
-            role: m.sender === "user" ? "user" : "assistant",
-            content: m.content,
-          })),
-          user_id: user?.uid || "anonymous",
-          timestamp: new Date().toISOString(),
-        },
-        {
-          headers: { "Content-Type": "application/json", Accept: "application/json" },
-          timeout: 30000,
-          validateStatus: () => true,
-        }
-      )
+      const postChat = (withHistory: boolean) =>
+        axios.post(
+          `${API_URL}/chat`,
+          {
+            query: userMessage,
+            language: mappedLangLabel,
+            topic,
+            query_type: queryType,
+            chart_data: chartData,
+            conversation_id: withHistory ? undefined : chatConversationId,
+            conversation_history: withHistory
+              ? messages.map((m) => ({
+                  role: m.sender === "user" ? "user" : "assistant",
+                  content: m.content,
+                }))
+              : undefined,
+            user_id: user?.uid || "anonymous",
+            timestamp: new Date().toISOString(),
+          },
+          {
+            headers: { "Content-Type": "application/json", Accept: "application/json" },
+            timeout: 30000,
+            validateStatus: () => true,
+          }
+        )
+
+      // Only the new message while the server holds the conversation; the whole history to start or rebuild it
+      let response = await postChat(!chatConversationId)
+      if (response.status === 409 && response.data?.conversation_unknown) {
+        response = await postChat(true)
+      }
 
       if (response.status !== 200) {
         console.error("API error:", response.data)
         throw new Error(response.data?.error || "Server error")
       }
 
+      if (response.data.conversation_id) setChatConversationId(response.data.conversation_id)
+
       const endTime = performance.now()
       const responseTime = (endTime - startTime) / 1000
       const botResponse = response.data.response
@@ -46,6 +46,21 @@ interface SessionEvent {
   source?: string;
 }
 
+// One page of /api/search results
+interface FacetCount {
+  value: string;
+  count: number;
+}
+
+interface SearchPage<T> {
+  items: T[];
+  total: number;
+  next_cursor: string | null;
+  facets: Record<string, FacetCount[]>;
+}
+
+type ListingKind = "jobs" | "sessions"
+
 interface Mentor {
   id: number;
   name: string;
@@ -82,61 +97,90 @@ const courses: Course[] = [
 ]
 // --- END MOCK DATA ---
 
+const PAGE_SIZE = 24
+const SEARCH_DEBOUNCE_MS = 250 // Wait for a pause in typing before querying the server
+
 
 export default function DiscoverPage() {
   const [searchQuery, setSearchQuery] = useState("")
   const [activeTab, setActiveTab] = useState("jobs")
+  const [debouncedQuery, setDebouncedQuery] = useState("")
   const [selectedLocation, setSelectedLocation] = useState("all") // State for location filter
+  const [selectedJobType, setSelectedJobType] = useState("all")
 
-  // State for fetched data
+  // State for fetched data (one page at a time; "Load more" appends the next)
   const [jobListings, setJobListings] = useState<Job[]>([])
   const [eventListings, setEventListings] = useState<SessionEvent[]>([])
+  const [jobPage, setJobPage] = useState<Omit<SearchPage<Job>, "items"> | null>(null)
+  const [eventPage, setEventPage] = useState<Omit<SearchPage<SessionEvent>, "items"> | null>(null)
   const [isLoadingJobs, setIsLoadingJobs] = useState(true)
   const [isLoadingEvents, setIsLoadingEvents] = useState(true)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [fetchError, setFetchError] = useState<string | null>(null)
 
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedQuery(searchQuery.trim()), SEARCH_DEBOUNCE_MS)
+    return () => clearTimeout(timer)
+  }, [searchQuery])
+
   // --- Data Fetching ---
-  const fetchJobs = useCallback(async () => {
-    setIsLoadingJobs(true)
+  // Searching, filtering and paging happen on the server (/api/search)
+  const searchListings = useCallback(async <T,>(kind: ListingKind, cursor?: string | null): Promise<SearchPage<T>> => {
+    const params = new URLSearchParams({ kind, limit: String(PAGE_SIZE) })
+    if (debouncedQuery) params.set("q", debouncedQuery)
+    if (selectedLocation !== "all") params.set("location", selectedLocation)
+    if (kind === "jobs" && selectedJobType !== "all") params.set("type", selectedJobType)
+    if (cursor) params.set("cursor", cursor)
+    const response = await fetch(`${API_URL}/api/search?${params}`)
+    if (!response.ok) throw new Error(`Failed to search ${kind}: ${response.statusText}`)
+    return await response.json()
+  }, [debouncedQuery, selectedLocation, selectedJobType]);
+
+  const fetchJobs = useCallback(async (cursor?: string | null) => {
+    if (cursor) setIsLoadingMore(true); else setIsLoadingJobs(true)
     setFetchError(null)
     try {
-      const response = await fetch(`${API_URL}/admin/jobs`)
-      if (!response.ok) throw new Error(`Failed to fetch jobs: ${response.statusText}`)
-      const data = await response.json()
-      setJobListings(Array.isArray(data) ? data : [])
+      const { items, ...page } = await searchListings<Job>("jobs", cursor)
+      setJobListings(prev => cursor ? [...prev, ...items] : items)
+      setJobPage(page)
     } catch (error: any) {
       console.error("Error fetching jobs:", error)
       setFetchError("Could not load job opportunities.")
-      setJobListings([])
+      if (!cursor) setJobListings([])
     } finally {
       setIsLoadingJobs(false)
+      setIsLoadingMore(false)
     }
-  }, []); // No dependencies needed if only fetched once
+  }, [searchListings]);
 
-  const fetchEvents = useCallback(async () => {
-    setIsLoadingEvents(true)
+  const fetchEvents = useCallback(async (cursor?: string | null) => {
+    if (cursor) setIsLoadingMore(true); else setIsLoadingEvents(true)
     setFetchError(null)
     try {
-      const response = await fetch(`${API_URL}/admin/sessions`)
-      if (!response.ok) throw new Error(`Failed to fetch events: ${response.statusText}`)
-      const data = await response.json()
-      setEventListings(Array.isArray(data) ? data : [])
+      const { items, ...page } = await searchListings<SessionEvent>("sessions", cursor)
+      setEventListings(prev => cursor ? [...prev, ...items] : items)
+      setEventPage(page)
     } catch (error: any) {
       console.error("Error fetching events:", error)
       setFetchError("Could not load events.")
-      setEventListings([])
+      if (!cursor) setEventListings([])
     } finally {
       setIsLoadingEvents(false)
+      setIsLoadingMore(false)
     }
-  }, []); // No dependencies needed if only fetched once
+  }, [searchListings]);
 
-  // Fetch data on component mount
+  // Fetch the first page on mount and whenever the query or a filter changes
   useEffect(() => {
     fetchJobs();
     fetchEvents();
     // Add fetch calls for mentors and courses here when ready
   }, [fetchJobs, fetchEvents]); // Include fetch functions in dependency array
 
+  // Filter options come from the server's facet counts for the active tab
+  const locationOptions = (activeTab === "events" ? eventPage : jobPage)?.facets.location ?? []
+  const jobTypeOptions = jobPage?.facets.type ?? []
+
   // --- Helper Functions ---
   const formatDate = (dateString: string | undefined | null): string => {
     if (!dateString) return "N/A";
@@ -149,27 +193,9 @@ export default function DiscoverPage() {
     }
   };
 
-  // --- Filtering Logic ---
-  const filteredJobs = jobListings.filter(job => {
-    const matchesQuery = job.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                         job.company.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                         (job.description && job.description.toLowerCase().includes(searchQuery.toLowerCase()));
-    const matchesLocation = selectedLocation === 'all' ||
-                            (job.location && job.location.toLowerCase().includes(selectedLocation.toLowerCase())) ||
-                            (selectedLocation === 'remote' && job.location?.toLowerCase().includes('remote'));
-    return matchesQuery && matchesLocation;
-  });
-
-  const filteredEvents = eventListings.filter(event => {
-     const matchesQuery = event.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                          (event.organizer && event.organizer.toLowerCase().includes(searchQuery.toLowerCase())) ||
-                          (event.description && event.description.toLowerCase().includes(searchQuery.toLowerCase())) ||
-                          (event.tags && event.tags.some(tag => tag.toLowerCase().includes(searchQuery.toLowerCase())));
-     const matchesLocation = selectedLocation === 'all' ||
-                             (event.location && event.location.toLowerCase().includes(selectedLocation.toLowerCase())) ||
-                             (selectedLocation === 'virtual' && event.location?.toLowerCase().includes('virtual')); // Assume 'virtual' maps to remote
-     return matchesQuery && matchesLocation;
-  });
+  // --- Filtering Logic (jobs and events are filtered by the server) ---
+  const filteredJobs = jobListings
+  const filteredEvents = eventListings
 
   // Add filtering for mentors and courses when data is available
   const filteredMentors = mentors.filter(mentor =>
@@ -204,6 +230,19 @@ export default function DiscoverPage() {
        </div>
      </div>
   );
+
+  const renderLoadMore = (shown: number, total: number, cursor: string | null, loadMore: (cursor: string) => void) => (
+    total > 0 ? (
+      <div className="flex flex-col items-center gap-2 pt-2">
+        <p className="text-xs text-muted-foreground">Showing {shown} of {total}</p>
+        {cursor && (
+          <Button variant="outline" onClick={() => loadMore(cursor)} disabled={isLoadingMore} className="gap-2">
+            {isLoadingMore && <Loader2 className="h-4 w-4 animate-spin" />} Load more
+          </Button>
+        )}
+      </div>
+    ) : null
+  );
   // --- End Loading/Error States ---
 
   return (
@@ -236,16 +275,27 @@ export default function DiscoverPage() {
               </SelectTrigger>
               <SelectContent>
                 <SelectItem value="all">All Locations</SelectItem>
-                <SelectItem value="bangalore">Bangalore</SelectItem>
-                <SelectItem value="mumbai">Mumbai</SelectItem>
-                <SelectItem value="delhi">Delhi</SelectItem>
-                <SelectItem value="hyderabad">Hyderabad</SelectItem>
-                <SelectItem value="pune">Pune</SelectItem>
-                <SelectItem value="chennai">Chennai</SelectItem>
-                <SelectItem value="remote">Remote</SelectItem>
-                <SelectItem value="virtual">Virtual</SelectItem>
+                {selectedLocation !== "all" && !locationOptions.some(option => option.value === selectedLocation) && (
+                  <SelectItem value={selectedLocation}>{selectedLocation}</SelectItem>
+                )}
+                {locationOptions.map(option => (
+                  <SelectItem key={option.value} value={option.value}>{option.value} ({option.count})</SelectItem>
+                ))}
               </SelectContent>
             </Select>
+            {activeTab === "jobs" && (
+              <Select value={selectedJobType} onValueChange={setSelectedJobType}>
+                <SelectTrigger className="w-full sm:w-[160px]">
+                  <SelectValue placeholder="Job type" />
+                </SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="all">All Types</SelectItem>
+                  {jobTypeOptions.map(option => (
+                    <SelectItem key={option.value} value={option.value}>{option.value} ({option.count})</SelectItem>
+                  ))}
+                </SelectContent>
+              </Select>
+            )}
             {/* Add more filter buttons/selects here as needed */}
             {/* <Button variant="outline" className="gap-2 w-full sm:w-auto"> <Filter className="h-4 w-4" /> More Filters </Button> */}
         </div>
@@ -300,6 +350,7 @@ export default function DiscoverPage() {
               </div>
              )
           )}
+          {!isLoadingJobs && jobPage && renderLoadMore(jobListings.length, jobPage.total, jobPage.next_cursor, fetchJobs)}
         </TabsContent>
 
         {/* --- EVENTS TAB --- */}
@@ -348,6 +399,7 @@ export default function DiscoverPage() {
                </div>
              )
            )}
+           {!isLoadingEvents && eventPage && renderLoadMore(eventListings.length, eventPage.total, eventPage.next_cursor, fetchEvents)}
         </TabsContent>
 
         {/* --- MENTORS TAB --- */}
@@ -16,6 +16,7 @@ import { User, Settings, Shield, History, Briefcase, GraduationCap, Award, X, Pl
 import { useRouter } from "next/navigation"
 import { useAuth } from "@/hooks/useAuth"
 import { getUserProfile, saveUserProfile } from "@/lib/firebase"
+import { API_URL } from "@/lib/constants"
 // Make sure this import path points to your actual types file
 import { UserProfile, UserPreferences } from "@/types/user"
 
@@ -236,6 +237,9 @@ export default function ProfilePage() {
 
     try {
       await saveUserProfile(user.uid, profileDataToSave);
+      // Let the backend re-embed the profile for its job/session matches (no-op if the matched fields are unchanged)
+      fetch(`${API_URL}/api/recommendations/${user.uid}/refresh`, { method: "POST" })
+        .catch(err => console.warn("Could not refresh recommendations:", err));
       setProfileSaveSuccess(true);
       // Update local profile state optimistically or refetch if needed
       setProfile(prev => ({ ...(prev || {} as UserProfile), ...profileDataToSave }));